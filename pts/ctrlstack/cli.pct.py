@@ -27,32 +27,51 @@ import inspect
 import asyncio
 import json
 from pydantic import BaseModel, TypeAdapter
-from ctrlstack.type_utils import is_query_param_type
+from ctrlstack.method_spec import MethodSpec, compile_method_spec, get_method_spec
+from ctrlstack.type_utils import get_type_adapter
+import sys
+
+# %% [markdown]
+# A streamed argument (see `MethodSpec.input_stream_param`) is given on the command line as a JSON array, or
+# as `-` to read NDJSON items from stdin as the method consumes them.
+
+# %%
+#|exporti
+async def _aiter_sync(items):
+    for item in items:
+        yield item
+
+def _make_input_stream_converter(spec: MethodSpec) -> Callable[[str], Any]:
+    def convert(value: str):
+        if value == "-":
+            items = (spec.input_item_adapter.validate_json(line) for line in sys.stdin if line.strip())
+        else:
+            items = get_type_adapter(List[spec.input_item_type or Any]).validate_json(value)
+        return _aiter_sync(items) if spec.input_stream_is_async else items
+    return convert
 
 # %%
 #|exporti
-def _make_typer_compatible_func(func):
+def _make_typer_compatible_func(func, spec: Optional[MethodSpec] = None):
+    spec = spec or compile_method_spec(func)
     sig = inspect.signature(func)
     params = list(sig.parameters.values())
-    type_hints = get_type_hints(func)
 
     new_params = []
     converters: dict[str, Callable[[str], Any]] = {}
     changed_params: set[str] = set()
 
     for p in params:
-        ann = type_hints.get(p.name)
-        if ann is None:
-            new_params.append(p)
-            continue
-
-        if is_query_param_type(ann):
-            new_params.append(p)  # Typer handles natively (int, str, bool, Enum, etc.)
-        else:
+        if p.name in spec.body_params:
             new_params.append(p.replace(annotation=str))
-            ta = TypeAdapter(ann)
-            converters[p.name] = ta.validate_json
+            converters[p.name] = spec.arg_adapters[p.name].validate_json
             changed_params.add(p.name)
+        elif p.name == spec.input_stream_param:
+            new_params.append(p.replace(annotation=str))
+            converters[p.name] = _make_input_stream_converter(spec)
+            changed_params.add(p.name)
+        else:
+            new_params.append(p)  # Unannotated, or handled natively by Typer (int, str, bool, Enum, etc.)
 
     new_sig = sig.replace(parameters=new_params)
 
@@ -106,12 +125,19 @@ show_doc(this_module.create_controller_cli)
 
 # %%
 #|export
-def create_controller_cli(controller: Controller, prepend_method_group: bool=False) -> typer.Typer:
+def create_controller_cli(
+    controller: Controller,
+    prepend_method_group: bool=False,
+    echo_result: Optional[Callable[[Any], None]] = None,
+) -> typer.Typer:
     """
     Get the controller server instance.
     
     Args:
         controller (Controller): The controller to get the server for.
+        prepend_method_group (bool): Whether to prefix each command name with the group of its method.
+        echo_result (Optional[Callable[[Any], None]]): Called with the return value of each (non-streaming) command
+            invocation. Defaults to echoing values that are not None.
 
     Returns:
         FastAPI: The controller server instance.
@@ -119,6 +145,10 @@ def create_controller_cli(controller: Controller, prepend_method_group: bool=Fal
     if not isinstance(controller, Controller):
         raise TypeError("The controller must be an instance of ctrlstack.Controller")
     
+    if echo_result is None:
+        def echo_result(res):
+            if res is not None: typer.echo(res)
+
     app = typer.Typer(invoke_without_command=True)
     
     @app.callback()
@@ -126,17 +156,25 @@ def create_controller_cli(controller: Controller, prepend_method_group: bool=Fal
         if ctx.invoked_subcommand is None:
             typer.echo(ctx.get_help())
             
-    def register_func(bound_method: Callable, cmd_name: str): 
-        func = _make_typer_compatible_func(bound_method.__func__)
+    def register_func(bound_method: Callable, spec: MethodSpec, cmd_name: str): 
+        func = _make_typer_compatible_func(bound_method.__func__, spec)
         
-        if inspect.iscoroutinefunction(bound_method):
+        if spec.is_stream and spec.is_async:
             def wrapper(*args, **kwargs):
-                res = asyncio.run(func(bound_method.__self__, *args, **kwargs))
-                if res is not None: typer.echo(res)
+                async def echo_items():
+                    async for item in func(bound_method.__self__, *args, **kwargs):
+                        typer.echo(item)
+                asyncio.run(echo_items())
+        elif spec.is_stream:
+            def wrapper(*args, **kwargs):
+                for item in func(bound_method.__self__, *args, **kwargs):
+                    typer.echo(item)
+        elif inspect.iscoroutinefunction(bound_method):
+            def wrapper(*args, **kwargs):
+                echo_result(asyncio.run(func(bound_method.__self__, *args, **kwargs)))
         else:
             def wrapper(*args, **kwargs):
-                res = func(bound_method.__self__, *args, **kwargs)
-                if res is not None: typer.echo(res)
+                echo_result(func(bound_method.__self__, *args, **kwargs))
 
         wrapper.__name__ = func.__name__
         wrapper.__doc__ = func.__doc__
@@ -150,15 +188,14 @@ def create_controller_cli(controller: Controller, prepend_method_group: bool=Fal
         wrapper.__signature__ = new_sig
         app.command(name=cmd_name)(wrapper)
     
-    method_names = controller.get_controller_methods()
-    for method_name in method_names:
+    for method_name in controller.get_controller_methods():
         method = getattr(controller, method_name)
-        if hasattr(method, "_is_controller_method"):
-            if prepend_method_group:
-                cmd_name = f"{method._controller_method_group}-{method_name}" if method._controller_method_group else method_name
-            else:
-                cmd_name = method_name
-            register_func(method, cmd_name)
+        spec = get_method_spec(type(controller), method_name)
+        if prepend_method_group:
+            cmd_name = f"{spec.group}-{method_name}" if spec.group else method_name
+        else:
+            cmd_name = method_name
+        register_func(method, spec, cmd_name)
 
     return app
 
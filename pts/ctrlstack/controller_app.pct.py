@@ -31,6 +31,14 @@ def _add_method_to_class(func: Callable, controller_cls: Type[Controller], name:
         async def method(self, *args, **kwargs):
             if pass_self: return await func(self, *args, **kwargs)
             return await func(*args, **kwargs)
+    elif inspect.isasyncgenfunction(func):
+        async def method(self, *args, **kwargs):
+            async for item in (func(self, *args, **kwargs) if pass_self else func(*args, **kwargs)):
+                yield item
+    elif inspect.isgeneratorfunction(func):
+        def method(self, *args, **kwargs):
+            if pass_self: return (yield from func(self, *args, **kwargs))
+            return (yield from func(*args, **kwargs))
     else:
         def method(self, *args, **kwargs):
             if pass_self: return func(self, *args, **kwargs)
@@ -57,6 +65,7 @@ def _add_method_to_class(func: Callable, controller_cls: Type[Controller], name:
         
     method.__name__ = name or func.__name__
     setattr(controller_cls, method.__name__, method)
+    controller_cls._update_controller_method_registry(method.__name__)
 
 # %%
 #|export
@@ -69,23 +78,24 @@ class ControllerApp:
     def controller_cls(self) -> Type[Controller]:
         return self._controller_cls
     
-    def register(self, method_type: ControllerMethodType, group: str, name: Optional[str] = None):
+    def register(self, method_type: ControllerMethodType, group: str, name: Optional[str] = None, **options):
+        """Register a function as a controller method. `options` are passed on to `ctrl_method`."""
         def decorator(func: Callable):
-            _func = ctrl_method(method_type=method_type, group=group)(func)
+            _func = ctrl_method(method_type=method_type, group=group, **options)(func)
             _add_method_to_class(_func, self._controller_cls, name)
             return func
         return decorator
     
-    def register_cmd(self, name: Optional[str] = None):
+    def register_cmd(self, name: Optional[str] = None, **options):
         def decorator(func: Callable):
-            _func = ctrl_cmd_method(func)
+            _func = ctrl_cmd_method(func, **options)
             _add_method_to_class(_func, self._controller_cls, name)
             return func
         return decorator
     
-    def register_query(self, name: Optional[str] = None):
+    def register_query(self, name: Optional[str] = None, **options):
         def decorator(func: Callable):
-            _func = ctrl_query_method(func)
+            _func = ctrl_query_method(func, **options)
             _add_method_to_class(_func, self._controller_cls, name)
             return func
         return decorator
@@ -0,0 +1,201 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # jobs
+#
+# Background jobs of the server. Commands marked with `background=True` are submitted to a `JobManager`
+# instead of running within their request. At most `max_workers` jobs run at once, the others wait in order
+# of submission. Finished jobs (and their results) are kept for `result_ttl` seconds.
+#
+# Cancelling a pending or async job stops it right away. A sync command that is already running in the
+# threadpool cannot be interrupted: it is marked as `cancel_requested`, runs to completion, and its result
+# is discarded.
+
+# %%
+#|default_exp jobs
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.jobs as this_module
+
+# %%
+#|export
+from fastapi import HTTPException
+from starlette.status import HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR
+from ctrlstack.method_spec import MethodSpec
+from ctrlstack.protocol import JobInfo, JobStatus
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+# %%
+#|exporti
+logger = logging.getLogger(__name__)
+
+class _Job:
+    def __init__(self, info: JobInfo):
+        self.info = info
+        self.task: Optional[asyncio.Task] = None
+        self.result: Any = None  # Encoded to JSON-safe form
+
+# %%
+#|export
+class JobManager:
+    """
+    Runs background jobs on the event loop of the server.
+
+    Args:
+        max_workers (int): Maximum number of jobs that run at once.
+        result_ttl (float): Seconds that finished jobs and their results are kept.
+        clock (Callable[[], float]): Clock used for the job timestamps and expiry.
+    """
+    def __init__(self, max_workers: int = 4, result_ttl: float = 3600.0, clock: Callable[[], float] = time.time):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.clock = clock
+        self._jobs: Dict[str, _Job] = {}
+        self._finished: deque = deque()  # (finished_at, job_id), in order of completion
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _prune(self):
+        expiry = self.clock() - self.result_ttl
+        while self._finished and self._finished[0][0] <= expiry:
+            _, job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
+
+    def submit(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]], kwargs: Dict[str, Any]) -> JobInfo:
+        """Start a job running `handler(kwargs)` as soon as a worker is free. Must be called from the event loop."""
+        self._prune()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        job = _Job(JobInfo(job_id=uuid.uuid4().hex, method=spec.name, created_at=self.clock()))
+        self._jobs[job.info.job_id] = job
+        job.task = asyncio.ensure_future(self._run(job, spec, handler, kwargs))
+        job.task.add_done_callback(lambda task: self._finish(job.info))
+        return job.info
+
+    def _finish(self, info: JobInfo):
+        if info.status == JobStatus.PENDING:  # Cancelled before `_run` got to start
+            info.status = JobStatus.CANCELLED
+            info.error = {"status_code": HTTP_409_CONFLICT, "detail": "Job was cancelled"}
+        info.finished_at = self.clock()
+        self._finished.append((info.finished_at, info.job_id))
+
+    async def _run(self, job: _Job, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]], kwargs: Dict[str, Any]):
+        info = job.info
+        try:
+            async with self._semaphore:
+                info.status = JobStatus.RUNNING
+                info.started_at = self.clock()
+                run = asyncio.ensure_future(handler(kwargs))
+                try:
+                    result = await asyncio.shield(run)
+                except asyncio.CancelledError:
+                    if spec.is_async:
+                        run.cancel()
+                    # Threads cannot be interrupted, so a sync method keeps its worker until it returns
+                    await asyncio.wait({run})
+                    raise
+            if info.cancel_requested:
+                raise asyncio.CancelledError()
+            job.result = spec.encode_result(result)
+            info.status = JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            info.status = JobStatus.CANCELLED
+            info.error = {"status_code": HTTP_409_CONFLICT, "detail": "Job was cancelled"}
+        except HTTPException as e:
+            info.status = JobStatus.FAILED
+            info.error = {"status_code": e.status_code, "detail": e.detail}
+        except Exception:
+            logger.exception(f"Error in background job {info.job_id} ('{info.method}')")
+            info.status = JobStatus.FAILED
+            info.error = {"status_code": HTTP_500_INTERNAL_SERVER_ERROR, "detail": "Internal Server Error"}
+
+    def _get(self, job_id: str) -> _Job:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def get(self, job_id: str) -> JobInfo:
+        """Return the `JobInfo` of a job. Raises `KeyError` for unknown (or expired) jobs."""
+        return self._get(job_id).info
+
+    def list(self) -> List[JobInfo]:
+        self._prune()
+        return [job.info for job in self._jobs.values()]
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> JobInfo:
+        """Wait up to `timeout` seconds for a job to finish, and return its `JobInfo`."""
+        job = self._get(job_id)
+        if not job.info.status.finished and timeout != 0:
+            await asyncio.wait({job.task}, timeout=timeout)
+        return job.info
+
+    def result(self, job_id: str) -> Any:
+        """The encoded result of a job that succeeded."""
+        job = self._get(job_id)
+        if job.info.status != JobStatus.SUCCEEDED:
+            raise ValueError(f"Job {job_id} has not succeeded (status: {job.info.status.value})")
+        return job.result
+
+    def cancel(self, job_id: str) -> JobInfo:
+        job = self._get(job_id)
+        if not job.info.status.finished and not job.info.cancel_requested:
+            job.info.cancel_requested = True
+            job.task.cancel()
+        return job.info
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs by status."""
+        self._prune()
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.info.status.value] += 1
+        return counts
+
+# %%
+from ctrlstack import Controller, ctrl_cmd_method
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_cmd_method(background=True)
+    def work(self, x: int) -> int:
+        pass
+
+spec = get_method_spec(FooController, 'work')
+now = [0.0]
+jobs = JobManager(max_workers=1, result_ttl=10, clock=lambda: now[0])
+
+async def _handler(kwargs):
+    await asyncio.sleep(0.01)
+    return kwargs['x'] * 2
+
+async def _check_jobs():
+    first, second = jobs.submit(spec, _handler, {'x': 1}), jobs.submit(spec, _handler, {'x': 2})
+    await asyncio.sleep(0)
+    assert (first.status, second.status) == (JobStatus.RUNNING, JobStatus.PENDING)  # One worker
+    assert (await jobs.wait(second.job_id)).status == JobStatus.SUCCEEDED
+    assert jobs.result(second.job_id) == 4
+
+    third = jobs.submit(spec, _handler, {'x': 3})
+    jobs.cancel(third.job_id)
+    assert (await jobs.wait(third.job_id)).status == JobStatus.CANCELLED
+
+asyncio.run(_check_jobs())
+assert jobs.stats() == {'pending': 0, 'running': 0, 'succeeded': 2, 'failed': 0, 'cancelled': 1}
+now[0] = 11.0
+assert jobs.list() == []
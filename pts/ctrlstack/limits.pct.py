@@ -0,0 +1,243 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # limits
+#
+# Concurrency limits of the server. A limit caps the number of calls of a method (or of all methods of a
+# group) that execute at once. Further calls wait in a FIFO queue of at most `max_queue` calls, and calls
+# that find the queue full are rejected right away with `429 Too Many Requests`.
+#
+# The `Retry-After` header of a rejection estimates when a slot frees up, from the recent execution times
+# of the limited calls and the length of the queue.
+#
+# Limits apply to the execution of the method only: cache hits and calls that share an in-flight execution
+# do not take a slot.
+
+# %%
+#|default_exp limits
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.limits as this_module
+
+# %%
+#|export
+from fastapi import HTTPException
+from ctrlstack.method_spec import MethodSpec
+from ctrlstack.protocol import HTTP_429_TOO_MANY_REQUESTS
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
+import asyncio
+import math
+import time
+
+# %%
+#|export
+class ConcurrencyLimit(NamedTuple):
+    """
+    Args:
+        max_concurrency (int): Maximum number of calls that execute at once.
+        max_queue (Optional[int]): Maximum number of calls waiting for a slot. None means no limit.
+    """
+    max_concurrency: int
+    max_queue: Optional[int] = None
+
+class LimiterInfo(NamedTuple):
+    max_concurrency: int
+    max_queue: Optional[int]
+    active: int
+    queued: int
+    admitted: int
+    rejected: int
+
+# %%
+#|export
+class Limiter:
+    """
+    FIFO concurrency limiter with a bounded queue.
+
+    Args:
+        name (str): Name used in the detail of rejections.
+        limit (ConcurrencyLimit): The limit.
+        clock (Callable[[], float]): Monotonic clock used to time the calls.
+    """
+    _DURATION_SMOOTHING = 0.2  # Weight of the latest call in the moving average of durations
+
+    def __init__(self, name: str, limit: ConcurrencyLimit, clock: Callable[[], float] = time.monotonic):
+        if limit.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if limit.max_queue is not None and limit.max_queue < 0:
+            raise ValueError("max_queue must not be negative.")
+        self.name = name
+        self.limit = limit
+        self.clock = clock
+        self._active = 0
+        self._waiters: deque = deque()
+        self._mean_duration = 0.0
+        self.admitted = self.rejected = 0
+
+    def info(self) -> LimiterInfo:
+        return LimiterInfo(self.limit.max_concurrency, self.limit.max_queue, self._active, len(self._waiters),
+                           self.admitted, self.rejected)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queued call would get a slot, as an integer of at least 1."""
+        rounds = (len(self._waiters) + 1) / self.limit.max_concurrency
+        return max(1, math.ceil(self._mean_duration * rounds))
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time it was taken. Raises a 429 `HTTPException` if the queue is full."""
+        if self._active < self.limit.max_concurrency and not self._waiters:
+            self._active += 1
+        elif self.limit.max_queue is not None and len(self._waiters) >= self.limit.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many concurrent calls of {self.name}",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()  # The slot was handed over just before the cancellation
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.admitted += 1
+        return self.clock()
+
+    def release(self, started_at: Optional[float] = None):
+        """Free a slot, handing it over to the longest waiting call. `started_at` is the value returned by `acquire`."""
+        if started_at is not None:
+            duration = self.clock() - started_at
+            self._mean_duration += self._DURATION_SMOOTHING * (duration - self._mean_duration)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot passes on, so `_active` stays the same
+                return
+        self._active -= 1
+
+# %%
+#|exporti
+async def _release_after_stream(chunks: AsyncIterator[List[Any]], release: Callable[[], None]) -> AsyncIterator[List[Any]]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'aclose'):
+            await chunks.aclose()
+        release()
+
+# %%
+#|export
+class ConcurrencyLimits:
+    """
+    The concurrency limiters of a server.
+
+    Args:
+        method_limits (Optional[Dict[str, ConcurrencyLimit]]): Limits by method name. These take precedence
+            over the limits declared with `ctrl_method(max_concurrency=...)`.
+        group_limits (Optional[Dict[str, ConcurrencyLimit]]): Limits shared by all methods of a group.
+        clock (Callable[[], float]): Monotonic clock used to time the calls.
+    """
+    def __init__(
+        self,
+        method_limits: Optional[Dict[str, ConcurrencyLimit]] = None,
+        group_limits: Optional[Dict[str, ConcurrencyLimit]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.method_limits = {name: ConcurrencyLimit(*limit) for name, limit in (method_limits or {}).items()}
+        self.clock = clock
+        self._methods: Dict[str, Limiter] = {}
+        self._groups: Dict[str, Limiter] = {
+            group: Limiter(f"group '{group}'", ConcurrencyLimit(*limit), clock) for group, limit in (group_limits or {}).items()
+        }
+
+    def get_limiters(self, spec: MethodSpec) -> List[Limiter]:
+        """The limiters that apply to a method, from the narrowest to the widest."""
+        limiters = []
+        limit = self.method_limits.get(spec.name)
+        if limit is None and spec.max_concurrency is not None:
+            limit = ConcurrencyLimit(spec.max_concurrency, spec.max_queue)
+        if limit is not None:
+            if spec.name not in self._methods:
+                self._methods[spec.name] = Limiter(f"'{spec.name}'", limit, self.clock)
+            limiters.append(self._methods[spec.name])
+        if spec.group in self._groups:
+            limiters.append(self._groups[spec.group])
+        return limiters
+
+    def wrap(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """
+        Wrap a handler so that it runs within the limits of its method. Returns the handler as is if no limit applies.
+        For streaming methods, the slots are held until the stream is exhausted or closed.
+        """
+        limiters = self.get_limiters(spec)
+        if not limiters:
+            return handler
+
+        async def limited_handler(kwargs: Dict[str, Any]):
+            taken = []
+            def release():
+                for limiter, started_at in reversed(taken):
+                    limiter.release(started_at)
+                taken.clear()
+            try:
+                for limiter in limiters:
+                    taken.append((limiter, await limiter.acquire()))
+                result = await handler(kwargs)
+            except BaseException:
+                release()
+                raise
+            if spec.is_stream:
+                return _release_after_stream(result, release)
+            release()
+            return result
+        return limited_handler
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """State and counters of each limiter, by method and by group."""
+        return {
+            "methods": {name: limiter.info()._asdict() for name, limiter in self._methods.items()},
+            "groups": {group: limiter.info()._asdict() for group, limiter in self._groups.items()},
+        }
+
+# %%
+from ctrlstack import Controller, ctrl_cmd_method
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_cmd_method(max_concurrency=1, max_queue=1)
+    def work(self, x: int) -> int:
+        pass
+
+limits = ConcurrencyLimits(group_limits={'cmd': ConcurrencyLimit(2)})
+spec = get_method_spec(FooController, 'work')
+assert [limiter.name for limiter in limits.get_limiters(spec)] == ["'work'", "group 'cmd'"]
+
+async def _handler(kwargs):
+    await asyncio.sleep(0.01)
+    return kwargs['x']
+
+work = limits.wrap(spec, _handler)
+
+async def _check_limits():
+    results = await asyncio.gather(*[work({'x': i}) for i in range(3)], return_exceptions=True)
+    assert results[:2] == [0, 1]  # One running, one queued
+    assert isinstance(results[2], HTTPException) and results[2].status_code == HTTP_429_TOO_MANY_REQUESTS
+    assert results[2].headers["Retry-After"] == "1"
+
+asyncio.run(_check_limits())
+assert limits.stats()['methods']['work'] == {'max_concurrency': 1, 'max_queue': 1, 'active': 0, 'queued': 0, 'admitted': 2, 'rejected': 1}
@@ -0,0 +1,267 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # local_server
+#
+# Starting, checking and stopping a local server process, whose address and PID are kept in a lockfile.
+#
+# Only starting a server needs `ctrlstack.server` (and with it fastapi and uvicorn), so it is imported there.
+# Checking or stopping a server, as the remote CLI does on every command in local mode, only reads the lockfile.
+#
+# A server listens either on a TCP port of 127.0.0.1 or on a Unix domain socket. The socket is bound by the server
+# process before it records it in the lockfile, so unlike a free port found beforehand, it cannot be taken in
+# between, and a socket a server is listening on is never replaced. The socket file is created with its final
+# permissions, so only users with write permission on it can connect (by default its owner), and calls skip the TCP
+# stack. Clients connect with `RemoteController(..., uds=path)`.
+
+# %%
+#|default_exp local_server
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.local_server as this_module
+
+# %%
+#|export
+from ctrlstack import Controller
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import errno
+import os
+import signal
+import socket
+import stat
+import time
+
+# %%
+#|exporti
+def _is_port_free(port: int, host: str = "127.0.0.1") -> bool:
+    """Return True if the given port is available for binding."""
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        return s.connect_ex((host, port)) != 0
+
+def _find_free_port(host: str = "127.0.0.1") -> int:
+    """Find and return an available port on the given host."""
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.bind((host, 0))  # 0 = OS picks a free port
+        return s.getsockname()[1]
+
+def _is_socket_listening(path: str) -> bool:
+    """Return True if a server accepts connections on the Unix domain socket at the given path."""
+    with closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as s:
+        try:
+            s.connect(path)
+        except OSError:
+            return False
+        return True
+
+def _is_listening(address: Union[int, str]) -> bool:
+    """Return True if a server accepts connections on the given port or Unix domain socket."""
+    return _is_socket_listening(address) if isinstance(address, str) else not _is_port_free(address)
+
+def _bind_unix_socket(path: str, mode: int) -> socket.socket:
+    """
+    Bind a Unix domain socket at the given path with the given permissions, replacing a stale socket file, and
+    listen on it. The socket file is created with these permissions (under a matching umask), so it is never
+    reachable by others in between. It listens at once, so the server counts as running (and its socket is not
+    taken as stale) while the app starts up; connections wait in the backlog until the app serves them. Raises
+    `OSError` (EADDRINUSE) if a server is listening on the path.
+    """
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        if _is_socket_listening(path):
+            raise OSError(errno.EADDRINUSE, f"A server is already listening on {path}")
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o777 & ~mode)
+    try:
+        sock.bind(path)
+        sock.listen()
+    except BaseException:
+        sock.close()
+        raise
+    finally:
+        os.umask(umask)
+    os.chmod(path, mode)  # Adds bits the previous umask would not have removed
+    return sock
+
+def _delete_socket(address: Union[int, str, None]):
+    """Delete the file of a Unix domain socket, if the address is one and it exists."""
+    if isinstance(address, str) and os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.unlink(address)
+
+def _pid_exists(pid: int) -> bool:
+    """Return True if a process with the given PID exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    else:
+        return True
+
+# %%
+#|exporti
+def _read_lockfile(lockfile_path: str) -> Optional[Tuple[Union[int, str], int]]:
+    """Read and parse a lockfile. Returns (port or socket path, pid) or None if lockfile doesn't exist."""
+    path = Path(lockfile_path)
+    if not path.exists():
+        return None
+    lines = path.read_text().splitlines()
+    if len(lines) != 2:
+        raise ValueError(f"Invalid lockfile format: {lockfile_path}")
+    address = lines[0].strip()
+    return int(address) if address.isdigit() else address, int(lines[1].strip())
+
+def _write_lockfile(lockfile_path: str, address: Union[int, str], pid: int):
+    """Write port (or socket path) and PID to lockfile."""
+    Path(lockfile_path).write_text(f"{address}\n{pid}\n")
+
+def _delete_lockfile(lockfile_path: str):
+    """Delete lockfile if it exists."""
+    path = Path(lockfile_path)
+    if path.exists():
+        path.unlink()
+
+# %%
+assert _is_port_free(_find_free_port())
+
+import tempfile
+with tempfile.TemporaryDirectory() as tmp_dir:
+    _socket_path = os.path.join(tmp_dir, "server.sock")
+    assert not _is_listening(_socket_path)
+    with _bind_unix_socket(_socket_path, 0o600) as _sock:
+        assert stat.S_IMODE(os.stat(_socket_path).st_mode) == 0o600
+        assert _is_listening(_socket_path)
+        try:
+            _bind_unix_socket(_socket_path, 0o600)  # Does not take the socket of a running server
+        except OSError as e:
+            assert e.errno == errno.EADDRINUSE
+        else:
+            assert False
+    _bind_unix_socket(_socket_path, 0o600).close()  # Replaces the stale socket file
+    _delete_socket(_socket_path)
+    assert not os.path.exists(_socket_path)
+    _write_lockfile(os.path.join(tmp_dir, "lock"), _socket_path, 1)
+    assert _read_lockfile(os.path.join(tmp_dir, "lock")) == (_socket_path, 1)
+
+# %%
+#|export
+def start_local_controller_server_process(
+    controller: Controller|Callable[[], Controller],
+    lockfile_path: str,
+    port: Optional[int] = None,
+    server_kwargs: Optional[Dict[str, Any]] = None,
+    socket_path: Optional[str] = None,
+    socket_mode: int = 0o600,
+) -> Tuple[Union[int, str], int, bool]:
+    """
+    Start a local server for the given controller.
+
+    Args:
+        controller (Controller|Callable[[], Controller]): The controller or a callable that returns the controller to run.
+        lockfile_path (str): Path to the lockfile that stores the address and PID.
+        port (Optional[int]): The port to run the server on. If None, a free port will be found.
+        server_kwargs (Optional[Dict[str, Any]]): Further arguments of `create_controller_server`.
+        socket_path (Optional[str]): If given, the server listens on a Unix domain socket at this path instead of a
+            TCP port.
+        socket_mode (int): The permissions of the socket file. Connecting requires write permission.
+    """
+    if port is not None and socket_path is not None:
+        raise ValueError("Give either 'port' or 'socket_path', not both.")
+    info = _read_lockfile(lockfile_path)
+    if info is not None:
+        existing_address, pid = info
+        if _pid_exists(pid):
+            return existing_address, pid, False  # Already running, didn't start new
+        _delete_lockfile(lockfile_path)  # Stale lockfile, clean up
+        _delete_socket(existing_address)
+
+    if socket_path is not None:
+        socket_path = os.path.abspath(socket_path)  # The lockfile is read from other working directories
+    elif port is None:
+        port = _find_free_port()
+
+    from ctrlstack.server import create_controller_server, _start_fastapi_server  # Only needed by the server process
+    controller_factory = controller if callable(controller) else None
+    controller = controller() if callable(controller) else controller
+    app = create_controller_server(controller, controller_factory=controller_factory, **(server_kwargs or {}))
+
+    if socket_path is None:
+        _write_lockfile(lockfile_path, port, os.getpid())
+        _start_fastapi_server(app, port=port)  # Blocks (uvicorn.run)
+        return
+
+    sock = _bind_unix_socket(socket_path, socket_mode)
+    _write_lockfile(lockfile_path, socket_path, os.getpid())
+    try:
+        _start_fastapi_server(app, port=None, uvicorn_kwargs={"fd": sock.fileno()})  # Blocks (uvicorn.run)
+    finally:
+        sock.close()
+        _delete_socket(socket_path)
+
+# %%
+#|export
+def check_local_controller_server_process(
+    lockfile_path: str,
+) -> Tuple[Optional[Union[int, str]], Optional[int], bool]:
+    """
+    Check if a local server process is running and accepting connections.
+
+    Args:
+        lockfile_path (str): Path to the lockfile that stores the address and PID.
+
+    Returns:
+        Tuple[Optional[Union[int, str]], Optional[int], bool]: A tuple containing the port number (or socket path), process ID, and a boolean indicating if the server is running and accepting connections.
+    """
+    info = _read_lockfile(lockfile_path)
+    if info is None:
+        return None, None, False
+    address, pid = info
+    if _pid_exists(pid) and _is_listening(address):
+        return address, pid, True
+    # Stale lockfile: process dead or address not accepting connections
+    if not _pid_exists(pid):
+        _delete_lockfile(lockfile_path)
+        _delete_socket(address)
+    return None, None, False
+
+# %%
+#|export
+def stop_local_controller_server_process(lockfile_path: str) -> Tuple[Optional[Union[int, str]], Optional[int], bool]:
+    """
+    Stop a local server process.
+
+    Args:
+        lockfile_path (str): Path to the lockfile that stores the address and PID.
+
+    Returns:
+        Tuple[Optional[Union[int, str]], Optional[int], bool]: A tuple containing the port number (or socket path), process ID, and whether the process was running.
+    """
+    info = _read_lockfile(lockfile_path)
+    if info is None:
+        return None, None, False
+    address, pid = info
+    if not _pid_exists(pid):
+        _delete_lockfile(lockfile_path)
+        _delete_socket(address)
+        return None, None, False
+
+    os.kill(pid, signal.SIGTERM)
+    # Wait for process to exit
+    for _ in range(50):  # up to 5 seconds
+        if not _pid_exists(pid):
+            break
+        time.sleep(0.1)
+    _delete_lockfile(lockfile_path)
+    _delete_socket(address)  # In case the server could not remove it
+    return address, pid, True
@@ -0,0 +1,573 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # method_spec
+#
+# A `MethodSpec` holds everything the server, the CLI and `RemoteController` need to know about a
+# controller method: its signature (without `self`), resolved type hints, which arguments go in the
+# query string and which in the body, the argument and return `TypeAdapter`s, and its route.
+#
+# Specs are compiled once per controller method and cached on the controller class, either eagerly
+# with `compile_method_specs` or lazily on first use with `get_method_spec`.
+
+# %%
+#|default_exp method_spec
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.method_spec as this_module
+
+# %%
+#|export
+from ctrlstack.controller import Controller, ControllerMethodType, _STREAM_ORIGINS, _check_execution_options
+from ctrlstack.type_utils import is_query_param_type, serialize_value, serialize_for_query_param, get_type_adapter
+from typing import Type, Optional, Dict, Any, Callable, List, Tuple, Union, Iterable, Iterator, AsyncIterable, AsyncIterator, get_type_hints, get_origin, get_args
+from pydantic import TypeAdapter
+import collections.abc
+import functools
+import importlib
+import inspect
+import json
+
+# %%
+#|exporti
+def _construct_route(method: Callable, method_name:Optional[str]=None, prepend_method_group: bool=True):
+    method_name = method_name or method.__name__
+    if prepend_method_group:
+        route = f"/{method._controller_method_group}/{method_name}" if method._controller_method_group else f"/{method_name}"
+    else:
+        route = f"/{method_name}"
+    return route
+
+# %% [markdown]
+# Generator methods (sync or async) stream their results. The item type is read from the return annotation,
+# e.g. `Iterator[Row]`, `AsyncIterator[Row]` or `Generator[Row, None, None]`.
+
+# %%
+#|exporti
+_ASYNC_STREAM_ORIGINS = (collections.abc.AsyncIterator, collections.abc.AsyncIterable, collections.abc.AsyncGenerator)
+
+def _get_stream_item_type(return_type: Any) -> Any:
+    if get_origin(return_type) in _STREAM_ORIGINS:
+        args = get_args(return_type)
+        return args[0] if args else None
+    return None
+
+# %%
+#|export
+def is_stream_function(func: Callable) -> bool:
+    """Whether `func` is a (sync or async) generator function, i.e. a method whose results are streamed."""
+    return inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+
+# %%
+#|exporti
+def _request_body(json_body: Dict[str, Any], body_params) -> Any:
+    """
+    FastAPI expects a route's only body parameter unwrapped, and several body parameters embedded by name,
+    even when only some of them are sent.
+    """
+    if len(json_body) == 1 and len(body_params) <= 1:
+        return next(iter(json_body.values()))
+    return json_body
+
+# %%
+#|export
+class MethodSpec:
+    """
+    Compiled call specification of a controller method.
+
+    Args:
+        func (Callable): The (unbound) controller method.
+        name (Optional[str]): The name the method is registered under. Defaults to `func.__name__`.
+    """
+    def __init__(self, func: Callable, name: Optional[str] = None):
+        self.func = func
+        self.name = name or func.__name__
+        self.method_type: Optional[ControllerMethodType] = getattr(func, '_controller_method_type', None)
+        self.group: Optional[str] = getattr(func, '_controller_method_group', None)
+        self.is_stream = is_stream_function(func)
+        self.is_async = inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func)
+
+        sig = inspect.signature(func)
+        params = list(sig.parameters.values())
+        if params and params[0].name in ('self', 'cls'):
+            params = params[1:]
+        self.signature = sig.replace(parameters=params)
+
+        self.type_hints = get_type_hints(func)
+        self.return_type = self.type_hints.get('return')
+        if self.is_stream:
+            self.item_type = _get_stream_item_type(self.return_type)
+            self.item_adapter = get_type_adapter(self.item_type) if self.item_type is not None else None
+            self.return_adapter = None
+        else:
+            self.item_type = self.item_adapter = None
+            self.return_adapter = get_type_adapter(self.return_type) if self.return_type is not None and self.return_type is not type(None) else None
+
+        self.arg_types: Dict[str, Any] = {p.name: self.type_hints.get(p.name) for p in params}
+        self.arg_adapters: Dict[str, TypeAdapter] = {
+            name: get_type_adapter(hint) for name, hint in self.arg_types.items()
+            if hint is not None and get_origin(hint) not in _STREAM_ORIGINS  # Streamed arguments are encoded item by item
+        }
+        self.query_params: List[str] = [name for name, hint in self.arg_types.items() if hint is not None and is_query_param_type(hint)]
+        self.body_params: List[str] = [name for name, hint in self.arg_types.items() if hint is not None and not is_query_param_type(hint)]
+
+        # A command can take one (async) iterable parameter, whose items are uploaded as the NDJSON request body
+        self.input_stream_param: Optional[str] = None
+        self.input_item_type = self.input_item_adapter = None
+        self.input_stream_is_async = False
+        stream_params = [name for name in self.body_params if get_origin(self.arg_types[name]) in _STREAM_ORIGINS]
+        if stream_params:
+            if self.method_type != ControllerMethodType.COMMAND:
+                raise ValueError(f"Only commands can take streamed arguments, but '{self.name}' is a {self.method_type}.")
+            if len(self.body_params) > 1:
+                raise ValueError(f"'{self.name}' takes a streamed argument, so all its other arguments must be query parameters.")
+            self.input_stream_param = stream_params[0]
+            self.body_params = []
+            hint = self.arg_types[self.input_stream_param]
+            self.input_stream_is_async = get_origin(hint) in _ASYNC_STREAM_ORIGINS
+            if self.input_stream_is_async and not self.is_async:
+                raise ValueError(f"'{self.name}' takes an async iterable, so it must be an async method.")
+            self.input_item_type = _get_stream_item_type(hint)
+            self.input_item_adapter = get_type_adapter(self.input_item_type if self.input_item_type is not None else Any)
+
+        self.cache_ttl: Optional[float] = getattr(func, '_controller_method_cache_ttl', None)
+        self.cache_max_entries: int = getattr(func, '_controller_method_cache_max_entries', 1024)
+        self.cache_key_args: Optional[List[str]] = getattr(func, '_controller_method_cache_key_args', None)
+        if self.cache_key_args is not None:
+            unknown = [arg for arg in self.cache_key_args if arg not in self.signature.parameters]
+            if unknown:
+                raise ValueError(f"Unknown cache key arguments of '{self.name}': {unknown}")
+        if self.is_stream and self.cache_ttl is not None:
+            raise ValueError(f"Streaming method '{self.name}' cannot be cached.")
+        self.background: bool = getattr(func, '_controller_method_background', False)
+        self.max_concurrency: Optional[int] = getattr(func, '_controller_method_max_concurrency', None)
+        self.max_queue: Optional[int] = getattr(func, '_controller_method_max_queue', None)
+        self.thread_pool: Optional[str] = getattr(func, '_controller_method_thread_pool', None)
+        self.process_pool: bool = getattr(func, '_controller_method_process_pool', False)
+        self.micro_batch: Optional[str] = getattr(func, '_controller_method_micro_batch', None)
+        self.batch_max_size: int = getattr(func, '_controller_method_batch_max_size', 64)
+        self.batch_max_wait: float = getattr(func, '_controller_method_batch_max_wait', 0.005)
+        # Checked when the method was decorated, and again now that its streamed argument is known for sure
+        _check_execution_options(
+            func, self.background, self.max_concurrency, self.thread_pool, self.process_pool, self.micro_batch,
+            takes_stream=self.input_stream_param is not None, name=self.name,
+        )
+        invalidates = getattr(func, '_controller_method_invalidates', None)
+        if self.method_type == ControllerMethodType.COMMAND:
+            self.invalidates: List[str] = list(invalidates) if invalidates is not None else [self.group]
+        else:
+            self.invalidates = []
+
+        if self.group is not None:
+            self.route = _construct_route(func, self.name, prepend_method_group=True)
+            self.route_without_group = _construct_route(func, self.name, prepend_method_group=False)
+        else:
+            self.route = self.route_without_group = None
+
+    def __repr__(self):
+        return f"MethodSpec({self.name!r}, route={self.route!r})"
+
+    def get_route(self, prepend_method_group: bool = True) -> Optional[str]:
+        return self.route if prepend_method_group else self.route_without_group
+
+    def bind(self, args, kwargs) -> Dict[str, Any]:
+        """Bind call arguments (excluding `self`) to parameter names, applying defaults."""
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.arguments
+
+    def prepare_request_args(self, args, kwargs) -> Tuple[Dict[str, Any], Any]:
+        """
+        Split and encode call arguments into the query `params` and the `json` body of an HTTP request,
+        following FastAPI's conventions (a single body parameter is sent unwrapped).
+        """
+        params = {}
+        json_body = {}
+        for name, value in self.bind(args, kwargs).items():
+            if value is None or name == self.input_stream_param:
+                continue
+            adapter = self.arg_adapters.get(name)
+            if adapter is None:
+                # Unannotated parameter: decide from the runtime type of the value
+                value_type = type(value)
+                if is_query_param_type(value_type):
+                    params[name] = serialize_for_query_param(value)
+                else:
+                    json_body[name] = serialize_value(value, value_type)
+            elif name in self.body_params:
+                json_body[name] = adapter.dump_python(value, mode='json')
+            else:
+                params[name] = serialize_for_query_param(value)
+
+        return params, _request_body(json_body, self.body_params)
+
+    def encode_args(self, args, kwargs) -> Dict[str, Any]:
+        """Encode call arguments to a JSON-safe mapping of parameter names to values. `None` values are omitted."""
+        encoded = {}
+        for name, value in self.bind(args, kwargs).items():
+            if value is None:
+                continue
+            adapter = self.arg_adapters.get(name)
+            encoded[name] = adapter.dump_python(value, mode='json') if adapter is not None else serialize_value(value, type(value))
+        return encoded
+
+    def decode_args(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a mapping produced by `encode_args` into call keyword arguments."""
+        kwargs = {}
+        for name, value in data.items():
+            adapter = self.arg_adapters.get(name)
+            kwargs[name] = adapter.validate_python(value) if adapter is not None else value
+        self.signature.bind(**kwargs)  # Raises TypeError on missing or unexpected arguments
+        return kwargs
+
+    def call_key(self, kwargs: Dict[str, Any], arg_names: Optional[List[str]] = None) -> str:
+        """
+        Canonical string identifying a call, for caching and deduplication. Omitted arguments are filled
+        in with their defaults, so equivalent calls get the same key.
+
+        Args:
+            kwargs (Dict[str, Any]): The call keyword arguments.
+            arg_names (Optional[List[str]]): The arguments to include in the key. Defaults to all arguments.
+        """
+        bound = self.bind((), kwargs)
+        if arg_names is not None:
+            bound = {name: bound[name] for name in arg_names}
+        encoded = {}
+        for name, value in bound.items():
+            adapter = self.arg_adapters.get(name)
+            encoded[name] = adapter.dump_python(value, mode='json') if adapter is not None and value is not None else value
+        return json.dumps(encoded, sort_keys=True, default=str)
+
+    def encode_result(self, result: Any) -> Any:
+        """Encode a return value to JSON-safe form."""
+        adapter = self.return_adapter or get_type_adapter(Any)
+        return adapter.dump_python(result, mode='json')
+
+    def decode_result(self, data: Any) -> Any:
+        """Validate a JSON-decoded result against the return type of the method."""
+        if data is not None and self.return_adapter is not None:
+            return self.return_adapter.validate_python(data)
+        return data
+
+    def encode_input_items(self, items: Iterable[Any], chunk_size: int = 2**16) -> Iterator[bytes]:
+        """Encode the items of the streamed argument to NDJSON, in chunks of about `chunk_size` bytes."""
+        buffer = bytearray()
+        for item in items:
+            buffer += self.input_item_adapter.dump_json(item)
+            buffer += b"\n"
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+    async def aencode_input_items(self, items: Union[Iterable[Any], AsyncIterable[Any]], chunk_size: int = 2**16) -> AsyncIterator[bytes]:
+        """Like `encode_input_items`, for sync or async iterables."""
+        if not isinstance(items, collections.abc.AsyncIterable):
+            for chunk in self.encode_input_items(items, chunk_size):
+                yield chunk
+            return
+        buffer = bytearray()
+        async for item in items:
+            buffer += self.input_item_adapter.dump_json(item)
+            buffer += b"\n"
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+    def encode_item(self, item: Any) -> Any:
+        """Encode an item yielded by a streaming method to JSON-safe form."""
+        adapter = self.item_adapter or get_type_adapter(Any)
+        return adapter.dump_python(item, mode='json')
+
+    def decode_item(self, data: Any) -> Any:
+        """Validate a JSON-decoded item of a streaming method against its item type."""
+        if data is not None and self.item_adapter is not None:
+            return self.item_adapter.validate_python(data)
+        return data
+
+# %% [markdown]
+# Specs for functions that are not looked up through a controller class (e.g. in `prepare_requests_args`)
+# are cached on the function itself. `functools.wraps` copies the function `__dict__` to wrappers, so the
+# cached spec is only reused if it was compiled for that exact function.
+
+# %%
+#|export
+def compile_method_spec(func: Callable, name: Optional[str] = None) -> MethodSpec:
+    """Return the (cached) `MethodSpec` of a function."""
+    spec = func.__dict__.get('_controller_method_spec') if hasattr(func, '__dict__') else None
+    if spec is None or spec.func is not func or (name is not None and spec.name != name):
+        spec = MethodSpec(func, name)
+        try:
+            func._controller_method_spec = spec
+        except AttributeError:
+            pass
+    return spec
+
+# %%
+#|export
+def get_method_spec(controller_cls: Type[Controller], name: str) -> MethodSpec:
+    """
+    Return the `MethodSpec` of the controller method `name`, compiling it on first use.
+    """
+    registry = controller_cls._get_controller_method_registry()
+    spec = registry.specs.get(name)
+    if spec is None:
+        if name not in registry:
+            raise AttributeError(f"'{controller_cls.__name__}' has no controller method '{name}'")
+        spec = MethodSpec(getattr(controller_cls, name), name)
+        registry.specs[name] = spec
+    return spec
+
+def compile_method_specs(controller_cls: Type[Controller]) -> Dict[str, MethodSpec]:
+    """Eagerly compile the `MethodSpec`s of all controller methods of a controller class."""
+    return {name: get_method_spec(controller_cls, name) for name in controller_cls.get_controller_methods()}
+
+# %% [markdown]
+# ## Precomputed specs
+#
+# Clients generated by `ctrlstack.stubgen` do not compile their specs from the controller methods. A
+# `StaticMethodSpec` holds what `RemoteController` needs, computed when the client was generated: the route, and
+# which parameters go in the query string and which in the body. Arguments are encoded by their runtime type.
+#
+# Return types are kept as source strings, evaluated in a `LazyTypes` namespace when a result is first decoded.
+# The modules defining the types are only imported then, so that loading a client costs next to nothing.
+
+# %%
+#|export
+class LazyTypes:
+    """
+    A namespace for evaluating type annotations, whose names are imported on first use.
+
+    Args:
+        namespace (Dict[str, Any]): Names available without imports (e.g. the `globals()` of a module importing
+            `typing` names).
+        imports (Dict[str, Tuple[str, str]]): Other names, as (module, attribute) pairs.
+    """
+    def __init__(self, namespace: Dict[str, Any], imports: Dict[str, Tuple[str, str]]):
+        self._namespace = namespace
+        self._imports = imports
+        self._imported: Optional[Dict[str, Any]] = None
+
+    def resolve(self, annotation: str) -> Any:
+        """Evaluate an annotation, importing the names of the namespace if it needs them."""
+        try:
+            return eval(annotation, dict(self._namespace))
+        except NameError:
+            if self._imported is None:
+                self._imported = {**self._namespace}
+                for name, (module, attribute) in self._imports.items():
+                    self._imported[name] = getattr(importlib.import_module(module), attribute)
+            return eval(annotation, self._imported)
+
+# %%
+#|export
+class StaticMethodSpec:
+    """
+    The call specification of a method of a generated client (see `ctrlstack.stubgen`).
+
+    Args:
+        name (str): The name of the method.
+        method_type (str): The `ControllerMethodType` value of the method.
+        group (str): The group of the method.
+        route (str): The route of the method, with its group.
+        route_without_group (str): The route of the method, without its group.
+        params (Tuple[str, ...]): The parameter names, in order.
+        query_params (Tuple[str, ...]): The parameters sent in the query string.
+        body_params (Tuple[str, ...]): The parameters sent in the body. Parameters that are neither query nor body
+            parameters (e.g. unannotated ones) are placed by the type of their value.
+        input_stream_param (Optional[str]): The parameter whose items are uploaded as the NDJSON request body.
+        is_stream (bool): Whether the method streams its results.
+        background (bool): Whether the method runs as a background job.
+        returns (Optional[str]): The return type (the item type for streams) as source, or None to return results
+            as decoded JSON.
+        types (Optional[LazyTypes]): The namespace to evaluate `returns` in.
+    """
+    def __init__(
+        self,
+        name: str,
+        method_type: str,
+        group: str,
+        route: str,
+        route_without_group: str,
+        params: Tuple[str, ...] = (),
+        query_params: Tuple[str, ...] = (),
+        body_params: Tuple[str, ...] = (),
+        input_stream_param: Optional[str] = None,
+        is_stream: bool = False,
+        background: bool = False,
+        returns: Optional[str] = None,
+        types: Optional[LazyTypes] = None,
+    ):
+        self.name = name
+        self.method_type = ControllerMethodType(method_type)
+        self.group = group
+        self.route = route
+        self.route_without_group = route_without_group
+        self.params = params
+        self.query_params = query_params
+        self.body_params = body_params
+        self.input_stream_param = input_stream_param
+        self.is_stream = is_stream
+        self.background = background
+        self.returns = returns
+        self._types = types
+
+    def __repr__(self):
+        return f"StaticMethodSpec({self.name!r}, route={self.route!r})"
+
+    @functools.cached_property
+    def _returns_adapter(self) -> Optional[TypeAdapter]:
+        if self.returns is None:
+            return None
+        return get_type_adapter(self._types.resolve(self.returns) if self._types is not None else eval(self.returns))
+
+    @property
+    def return_adapter(self) -> Optional[TypeAdapter]:
+        return None if self.is_stream else self._returns_adapter
+
+    @property
+    def item_adapter(self) -> Optional[TypeAdapter]:
+        return self._returns_adapter if self.is_stream else None
+
+    @property
+    def input_item_adapter(self) -> TypeAdapter:
+        return get_type_adapter(Any)  # Items are encoded by their runtime type
+
+    get_route = MethodSpec.get_route
+    decode_result = MethodSpec.decode_result
+    decode_item = MethodSpec.decode_item
+    encode_input_items = MethodSpec.encode_input_items
+    aencode_input_items = MethodSpec.aencode_input_items
+
+    def bind(self, args, kwargs) -> Dict[str, Any]:
+        """Map call arguments (excluding `self`) to parameter names. Generated methods pass all their arguments."""
+        arguments = dict(zip(self.params, args))
+        arguments.update(kwargs)
+        return arguments
+
+    def prepare_request_args(self, args, kwargs) -> Tuple[Dict[str, Any], Any]:
+        """Split and encode call arguments into the query `params` and the `json` body of an HTTP request."""
+        params = {}
+        json_body = {}
+        for name, value in self.bind(args, kwargs).items():
+            if value is None or name == self.input_stream_param:
+                continue
+            if name in self.query_params:
+                params[name] = serialize_for_query_param(value)
+            elif name in self.body_params or not is_query_param_type(type(value)):
+                json_body[name] = serialize_value(value, type(value))
+            else:
+                params[name] = serialize_for_query_param(value)
+
+        return params, _request_body(json_body, self.body_params)
+
+    def encode_args(self, args, kwargs) -> Dict[str, Any]:
+        """Encode call arguments to a JSON-safe mapping of parameter names to values. `None` values are omitted."""
+        return {name: serialize_value(value, type(value)) for name, value in self.bind(args, kwargs).items() if value is not None}
+
+# %%
+from ctrlstack import ctrl_cmd_method, ctrl_query_method, ctrl_method
+from pydantic import BaseModel
+from typing import List
+
+class FooModel(BaseModel):
+    name: str
+
+class FooController(Controller):
+    @ctrl_cmd_method
+    def bar(self, x: int, model: FooModel, items: List[int], raw=None) -> List[FooModel]:
+        pass
+
+    @ctrl_method(ControllerMethodType.QUERY, "q")
+    def qux(self):
+        pass
+
+specs = compile_method_specs(FooController)
+spec = specs['bar']
+assert spec.route == "/cmd/bar" and spec.route_without_group == "/bar"
+assert spec.query_params == ['x']
+assert spec.body_params == ['model', 'items']
+assert list(spec.signature.parameters) == ['x', 'model', 'items', 'raw']
+assert get_method_spec(FooController, 'bar') is spec
+
+params, body = spec.prepare_request_args([1, FooModel(name="a"), [1, 2]], {})
+assert params == {'x': 1}
+assert body == {'model': {'name': 'a'}, 'items': [1, 2]}
+assert spec.decode_result([{'name': 'b'}]) == [FooModel(name='b')]
+
+encoded = spec.encode_args([1, FooModel(name="a"), [1, 2]], {})
+assert encoded == {'x': 1, 'model': {'name': 'a'}, 'items': [1, 2]}
+assert spec.decode_args(encoded) == {'x': 1, 'model': FooModel(name="a"), 'items': [1, 2]}
+assert spec.encode_result([FooModel(name="b")]) == [{'name': 'b'}]
+assert specs['qux'].route == "/q/qux"
+assert specs['qux'].cache_ttl is None and specs['qux'].invalidates == []
+assert spec.invalidates == ['cmd']
+
+class CachedController(Controller):
+    @ctrl_query_method(cache_ttl=5, cache_key_args=['x'])
+    def get(self, x: int, verbose: bool = False) -> int:
+        pass
+
+cached_spec = get_method_spec(CachedController, 'get')
+assert cached_spec.cache_ttl == 5
+assert cached_spec.call_key({'x': 1}) == cached_spec.call_key({'verbose': False, 'x': 1})
+assert cached_spec.call_key({'x': 1, 'verbose': True}, cached_spec.cache_key_args) == cached_spec.call_key({'x': 1}, ['x'])
+
+from typing import Iterator, AsyncIterator
+
+class StreamController(Controller):
+    @ctrl_query_method
+    def rows(self, n: int) -> Iterator[FooModel]:
+        yield from (FooModel(name=str(i)) for i in range(n))
+
+    @ctrl_query_method
+    async def arows(self, n: int) -> AsyncIterator[int]:
+        yield n
+
+rows_spec, arows_spec = get_method_spec(StreamController, 'rows'), get_method_spec(StreamController, 'arows')
+assert rows_spec.is_stream and not rows_spec.is_async and rows_spec.item_type is FooModel
+assert arows_spec.is_stream and arows_spec.is_async and arows_spec.item_type is int
+assert rows_spec.decode_item(rows_spec.encode_item(FooModel(name="a"))) == FooModel(name="a")
+assert not spec.is_stream
+
+from typing import Iterable, AsyncIterable
+
+class IngestController(Controller):
+    @ctrl_cmd_method
+    def ingest(self, rows: Iterable[FooModel], source: str = "") -> int:
+        return sum(1 for _ in rows)
+
+    @ctrl_cmd_method
+    async def aingest(self, rows: AsyncIterable[int]) -> int:
+        return 0
+
+ingest_spec = get_method_spec(IngestController, 'ingest')
+assert ingest_spec.input_stream_param == 'rows' and ingest_spec.input_item_type is FooModel
+assert ingest_spec.body_params == [] and ingest_spec.query_params == ['source']
+assert ingest_spec.prepare_request_args([[FooModel(name="a")]], {'source': 'x'}) == ({'source': 'x'}, {})
+assert list(ingest_spec.encode_input_items([FooModel(name="a"), FooModel(name="b")], chunk_size=1)) == [b'{"name":"a"}\n', b'{"name":"b"}\n']
+assert get_method_spec(IngestController, 'aingest').input_stream_is_async
+
+# %%
+static_spec = StaticMethodSpec(
+    "bar", "command", "cmd", "/cmd/bar", "/bar", params=("x", "model", "items", "raw"), query_params=("x",),
+    body_params=("model", "items"), returns="List[FooModel]", types=LazyTypes({"List": List}, {"FooModel": (__name__, "FooModel")}),
+)
+args = ([1, FooModel(name="a"), [1, 2]], {})
+assert static_spec.prepare_request_args(*args) == spec.prepare_request_args(*args)
+assert static_spec.encode_args(*args) == spec.encode_args(*args)
+assert static_spec.prepare_request_args((1,), {"raw": 2, "model": None}) == ({"x": 1, "raw": 2}, {})
+assert static_spec.prepare_request_args((1, FooModel(name="a")), {}) == ({"x": 1}, {"model": {"name": "a"}})  # Still embedded
+assert static_spec.get_route(False) == "/bar" and static_spec.method_type == ControllerMethodType.COMMAND
+assert static_spec.decode_result([{'name': 'b'}]) == [FooModel(name='b')]
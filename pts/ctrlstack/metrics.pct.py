@@ -0,0 +1,248 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # metrics
+#
+# Request metrics of the server, in the Prometheus text exposition format. `MetricsMiddleware` is a plain ASGI
+# middleware that records, per route and HTTP method:
+#
+# - `ctrlstack_requests_total`: requests by response status.
+# - `ctrlstack_request_errors_total`: requests that failed with a 5xx status or an unhandled exception.
+# - `ctrlstack_request_duration_seconds`: latency histogram, until the response body is sent.
+# - `ctrlstack_requests_in_flight`: requests being handled.
+# - `ctrlstack_request_size_bytes` and `ctrlstack_response_size_bytes`: body size histograms.
+#
+# and `ctrlstack_auth_failures_total`, the requests rejected for a missing or invalid API key. Every response with
+# the auth failure status (401 on the server) is counted, including those of methods that raise it themselves.
+#
+# Routes are labelled with their path template, and requests that match no route share the label
+# `<unmatched>`. Methods other than the standard HTTP methods share the label `OTHER`. Both keep the number of
+# series bounded, whatever clients send. Each (route, method) pair has its own series
+# object, found with a dict lookup. The middleware runs on the event loop thread only, so the series are
+# updated with plain integer increments and no locks; scraping reads them as they are.
+
+# %%
+#|default_exp metrics
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.metrics as this_module
+
+# %%
+#|export
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, List, Optional, Tuple
+import bisect
+import time
+
+# %%
+#|export
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)  # Bytes
+
+UNMATCHED_ROUTE = "<unmatched>"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"})
+OTHER_METHOD = "OTHER"
+
+# %%
+#|exporti
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one counts values above all buckets
+        self.sum = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self) -> Dict[str, int]:
+        """Number of values at most each bucket bound ("le"), and in total under "+Inf"."""
+        result, total = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result[bound] = total
+        return result
+
+    def expose(self, name: str, labels: str, lines: List[str]):
+        cumulative = self.cumulative()
+        for bound, total in cumulative.items():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative["+Inf"]}')
+
+class _Series:
+    """The metrics of one (route, HTTP method) pair."""
+    __slots__ = ("labels", "statuses", "errors", "in_flight", "duration", "request_size", "response_size")
+
+    def __init__(self, route: str, method: str):
+        self.labels = f'route="{_escape(route)}",method="{method}"'
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.in_flight = 0
+        self.duration = _Histogram(LATENCY_BUCKETS)
+        self.request_size = _Histogram(SIZE_BUCKETS)
+        self.response_size = _Histogram(SIZE_BUCKETS)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# %%
+#|export
+class ServerMetrics:
+    """
+    The registry of request metrics of a server.
+
+    Args:
+        auth_failure_status (int): Response status that counts as an authentication failure.
+    """
+    def __init__(self, auth_failure_status: int = 401):
+        self.auth_failure_status = auth_failure_status
+        self.auth_failures = 0
+        self._series: Dict[Tuple[str, str], _Series] = {}
+
+    def get_series(self, route: str, method: str) -> _Series:
+        series = self._series.get((route, method))
+        if series is None:
+            series = self._series[(route, method)] = _Series(route, method)
+        return series
+
+    def expose(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        series = list(self._series.values())
+        lines = [
+            "# HELP ctrlstack_requests_total Requests handled, by response status.",
+            "# TYPE ctrlstack_requests_total counter",
+        ]
+        for s in series:
+            for status, count in sorted(s.statuses.items()):
+                lines.append(f'ctrlstack_requests_total{{{s.labels},status="{status}"}} {count}')
+        lines += ["# HELP ctrlstack_request_errors_total Requests that failed with a 5xx status or an unhandled exception.",
+                  "# TYPE ctrlstack_request_errors_total counter"]
+        lines += [f"ctrlstack_request_errors_total{{{s.labels}}} {s.errors}" for s in series]
+        lines += ["# HELP ctrlstack_requests_in_flight Requests being handled.",
+                  "# TYPE ctrlstack_requests_in_flight gauge"]
+        lines += [f"ctrlstack_requests_in_flight{{{s.labels}}} {s.in_flight}" for s in series]
+        for name, attr, help in [
+            ("ctrlstack_request_duration_seconds", "duration", "Time until the response was sent."),
+            ("ctrlstack_request_size_bytes", "request_size", "Size of the request body."),
+            ("ctrlstack_response_size_bytes", "response_size", "Size of the response body."),
+        ]:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+            for s in series:
+                getattr(s, attr).expose(name, s.labels, lines)
+        lines += ["# HELP ctrlstack_auth_failures_total Requests rejected for a missing or invalid API key.",
+                  "# TYPE ctrlstack_auth_failures_total counter",
+                  f"ctrlstack_auth_failures_total {self.auth_failures}"]
+        return "\n".join(lines) + "\n"
+
+# %%
+#|export
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the request metrics of an app into a `ServerMetrics`.
+
+    Args:
+        app (ASGIApp): The wrapped app.
+        metrics (ServerMetrics): The registry to record into.
+        routes (Optional[list]): The routes used to label requests, usually `app.routes` of the FastAPI app.
+    """
+    def __init__(self, app: ASGIApp, metrics: ServerMetrics, routes: Optional[list] = None):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes if routes is not None else []
+        self._route_labels: Dict[str, str] = {}  # Path -> label, for paths that are routes without parameters
+
+    def _get_route_label(self, scope: Scope) -> str:
+        path = scope["path"]
+        label = self._route_labels.get(path)
+        if label is not None:
+            return label
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                label = getattr(route, "path", UNMATCHED_ROUTE)
+                if label == path:
+                    self._route_labels[path] = label
+                return label
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        series = self.metrics.get_series(self._get_route_label(scope), method if method in HTTP_METHODS else OTHER_METHOD)
+        start = time.perf_counter()
+        status = 500
+        request_size = response_size = 0
+
+        async def counting_receive() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        series.in_flight += 1
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        except BaseException:
+            status = 500
+            raise
+        finally:
+            series.in_flight -= 1
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            if status >= 500:
+                series.errors += 1
+            if status == self.metrics.auth_failure_status:
+                self.metrics.auth_failures += 1
+            series.duration.observe(time.perf_counter() - start)
+            series.request_size.observe(request_size)
+            series.response_size.observe(response_size)
+
+# %%
+import asyncio
+
+metrics = ServerMetrics()
+
+async def _app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"hello"})
+
+async def _receive():
+    return {"type": "http.request", "body": b"abc", "more_body": False}
+
+async def _send(message):
+    pass
+
+asyncio.run(MetricsMiddleware(_app, metrics)({"type": "http", "path": "/x", "method": "GET"}, _receive, _send))
+exposition = metrics.expose()
+assert 'ctrlstack_requests_total{route="<unmatched>",method="GET",status="200"} 1' in exposition
+assert 'ctrlstack_response_size_bytes_sum{route="<unmatched>",method="GET"} 5' in exposition
+assert 'ctrlstack_request_size_bytes_bucket{route="<unmatched>",method="GET",le="100"} 1' in exposition
+
+asyncio.run(MetricsMiddleware(_app, metrics)({"type": "http", "path": "/x", "method": "FOO"}, _receive, _send))
+assert 'ctrlstack_requests_total{route="<unmatched>",method="OTHER",status="200"} 1' in metrics.expose()
@@ -0,0 +1,216 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # micro_batch
+#
+# Server-side micro-batching of single-item calls. A method declared with `ctrl_method(micro_batch=...)` names a
+# vectorised implementation on the same controller, which takes each argument of the method as a list (one
+# entry per call) and returns the list of results, in order.
+#
+# The server collects concurrent calls of the method until `batch_max_size` calls are pending, or the first of
+# them has waited `batch_max_wait` seconds. It then calls the vectorised implementation once, and each caller
+# gets its own entry of the results. An error raised by the implementation is raised to every caller of the batch.
+# On shutdown, the server runs the calls still collecting and waits for the batches in progress.
+#
+# ```python
+# class ScoreController(Controller):
+#     @ctrl_query_method(micro_batch="score_many", batch_max_size=64, batch_max_wait=0.005)
+#     def score(self, item: Item) -> float:
+#         return self.score_many([item])[0]
+#
+#     def score_many(self, item: List[Item]) -> List[float]:
+#         return self.model.predict(np.stack([i.features for i in item])).tolist()
+# ```
+
+# %%
+#|default_exp micro_batch
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.micro_batch as this_module
+
+# %%
+#|export
+from ctrlstack.method_spec import MethodSpec
+from ctrlstack.metrics import _Histogram
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import time
+
+# %%
+#|export
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+BATCH_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)  # Seconds
+
+class MicroBatchInfo(NamedTuple):
+    calls: int
+    batches: int
+    errors: int  # Batches whose implementation raised
+    batch_sizes: Dict[str, int]  # Number of batches by size, in cumulative buckets ("le" upper bounds)
+    waits: Dict[str, int]  # Number of calls by seconds waited before their batch ran, in cumulative buckets
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.calls / self.batches if self.batches else 0.0
+
+# %%
+#|exporti
+class _Pending:
+    def __init__(self):
+        self.calls: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class _MethodBatcher:
+    def __init__(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]], clock: Callable[[], float]):
+        self.spec = spec
+        self.handler = handler
+        self.clock = clock
+        self.params = list(spec.signature.parameters)
+        self._pending: Dict[asyncio.AbstractEventLoop, _Pending] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.calls = self.batches = self.errors = 0
+        self.batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self.waits = _Histogram(BATCH_WAIT_BUCKETS)
+
+    async def call(self, kwargs: Dict[str, Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, _Pending())
+        future = loop.create_future()
+        pending.calls.append((self.spec.bind((), kwargs), future, self.clock()))
+        self.calls += 1
+        if len(pending.calls) >= self.spec.batch_max_size:
+            self._flush(loop)
+        elif pending.timer is None:
+            pending.timer = loop.call_later(self.spec.batch_max_wait, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        pending = self._pending.pop(loop, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        calls = [call for call in pending.calls if not call[1].cancelled()]  # Callers that went away are dropped
+        if calls:
+            task = loop.create_task(self._run(calls))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self):
+        loop = asyncio.get_running_loop()
+        self._flush(loop)
+        tasks = [task for task in self._tasks if task.get_loop() is loop]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, calls: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        started_at = self.clock()
+        self.batches += 1
+        self.batch_sizes.observe(len(calls))
+        for _, _, enqueued_at in calls:
+            self.waits.observe(started_at - enqueued_at)
+        columns = {name: [kwargs[name] for kwargs, _, _ in calls] for name in self.params}
+        try:
+            results = list(await self.handler(columns))
+            if len(results) != len(calls):
+                raise RuntimeError(f"The batch implementation of '{self.spec.name}' returned {len(results)} results for {len(calls)} calls")
+        except asyncio.CancelledError:
+            for _, future, _ in calls:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.errors += 1
+            for _, future, _ in calls:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(calls, results):
+            if not future.done():
+                future.set_result(result)
+
+    def info(self) -> MicroBatchInfo:
+        return MicroBatchInfo(self.calls, self.batches, self.errors, self.batch_sizes.cumulative(), self.waits.cumulative())
+
+# %%
+#|export
+class MicroBatcher:
+    """
+    Collects concurrent calls of micro-batched methods into calls of their vectorised implementations.
+
+    Args:
+        clock (Callable[[], float]): Monotonic clock used for the wait metrics.
+    """
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._methods: Dict[str, _MethodBatcher] = {}
+
+    def wrap(self, spec: MethodSpec, batch_handler: Callable[[Dict[str, Any]], Awaitable[List[Any]]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """
+        Return a handler of single calls of `spec`, given a handler of batches. `batch_handler` takes the arguments of
+        the method as lists, with one entry per call, and returns the list of their results.
+        """
+        batcher = self._methods[spec.name] = _MethodBatcher(spec, batch_handler, self.clock)
+        return batcher.call
+
+    def info(self, name: str) -> MicroBatchInfo:
+        return self._methods[name].info()
+
+    async def shutdown(self):
+        """Run the calls still collecting on the running event loop, and wait for its batches in progress."""
+        for batcher in self._methods.values():
+            await batcher.shutdown()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters and histograms of each micro-batched method, keyed by method name."""
+        stats = {}
+        for name, batcher in self._methods.items():
+            info = batcher.info()
+            stats[name] = {**info._asdict(), "mean_batch_size": info.mean_batch_size}
+        return stats
+
+# %%
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_query_method(micro_batch='double_many', batch_max_size=4, batch_max_wait=0.01)
+    def double(self, x: int, offset: int = 0) -> int:
+        return self.double_many([x], [offset])[0]
+
+    def double_many(self, x: List[int], offset: List[int]) -> List[int]:
+        batches.append(len(x))
+        return [2 * v + o for v, o in zip(x, offset)]
+
+batches = []
+ctrl = FooController()
+batcher = MicroBatcher()
+
+async def _batch_handler(columns):
+    return ctrl.double_many(**columns)
+
+double = batcher.wrap(get_method_spec(FooController, 'double'), _batch_handler)
+
+async def _check_micro_batch():
+    assert await asyncio.gather(*[double({'x': i}) for i in range(6)]) == [0, 2, 4, 6, 8, 10]
+    assert await double({'x': 1, 'offset': 1}) == 3
+
+asyncio.run(_check_micro_batch())
+assert batches == [4, 2, 1]  # Full batch, then the rest after batch_max_wait
+info = batcher.info('double')
+assert (info.calls, info.batches, info.mean_batch_size) == (7, 3, 7 / 3)
+assert info.batch_sizes['1'] == 1 and info.batch_sizes['4'] == 3 and info.batch_sizes['+Inf'] == 3
+assert info.waits['+Inf'] == 7
+
+async def _check_shutdown():
+    pending = asyncio.ensure_future(double({'x': 5}))
+    await asyncio.sleep(0)
+    await batcher.shutdown()  # Does not wait for batch_max_wait
+    assert pending.done() and pending.result() == 10
+
+asyncio.run(_check_shutdown())
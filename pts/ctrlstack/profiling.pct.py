@@ -0,0 +1,352 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # profiling
+#
+# Sampled profiling of controller methods inside a running server. Each method can be set to profile one call in
+# `sample_every`, at runtime through the profiling routes, and any call can ask to be profiled with the
+# `PROFILE_HEADER` request header. Each profiled call is written to its own file, in one of two formats:
+#
+# - `cprofile`: a deterministic `cProfile` profile, in the pstats format.
+# - `collapsed`: the stacks of the call, sampled from another thread every millisecond (at most every
+#   `sys.getswitchinterval()` while the call holds the GIL), as collapsed stacks for flame graphs. Cheaper than
+#   `cprofile` for calls with many small function calls, but only catches what runs for several milliseconds.
+#
+# Sync methods are profiled in the worker thread that runs them, so the profile only covers the call. Async
+# methods are profiled on the event loop thread, so their profile also includes whatever else the loop runs
+# meanwhile. A thread that is already being profiled does not start a second profile, and the call runs
+# unprofiled. Streaming, process-pool and micro-batched methods cannot be profiled.
+#
+# Methods without settings, and calls that are not sampled, only pay for a dict lookup.
+
+# %%
+#|default_exp profiling
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.profiling as this_module
+
+# %%
+#|export
+from ctrlstack.method_spec import MethodSpec
+from ctrlstack.protocol import PROFILE_HEADER, ProfileFormat, ProfileRecord, ProfileSettings, ProfilingInfo
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional
+import cProfile
+import functools
+import itertools
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# %%
+#|exporti
+_SAMPLE_INTERVAL = 0.001  # Seconds between stack samples of the collapsed format
+_FILE_SUFFIXES = {ProfileFormat.CPROFILE: "prof", ProfileFormat.COLLAPSED: "collapsed"}
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+class _StackSampler:
+    """Samples the stack of a thread from a background thread, and counts the collapsed stacks."""
+    def __init__(self, thread_id: int, interval: float = _SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="ctrlstack-profiler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack and not self._stop.is_set():  # Samples taken while stopping show `stop`, not the call
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: Path):
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.counts.most_common()))
+
+class _Session:
+    """One profiled call."""
+    def __init__(self, name: str, method: str, format: ProfileFormat, trigger: str, includes_other_tasks: bool = False):
+        self.name = name
+        self.method = method
+        self.format = format
+        self.trigger = trigger
+        self.includes_other_tasks = includes_other_tasks
+        self.created_at = time.time()
+        self.duration = 0.0
+        self.profiler: Any = None  # cProfile.Profile or _StackSampler, once started
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        """Profile the current thread while the block runs. Does nothing if the thread is already profiled."""
+        if sys.getprofile() is not None:
+            yield
+            return
+        if self.format == ProfileFormat.CPROFILE:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.profiler = _StackSampler(threading.get_ident())
+            self.profiler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.duration = time.perf_counter() - start
+            if self.format == ProfileFormat.CPROFILE:
+                self.profiler.disable()
+            else:
+                self.profiler.stop()
+
+    def record(self) -> ProfileRecord:
+        return ProfileRecord(
+            name=self.name, method=self.method, format=self.format, trigger=self.trigger,
+            created_at=self.created_at, duration=self.duration, includes_other_tasks=self.includes_other_tasks,
+        )
+
+class _HeaderRequest:
+    """The profile asked for with the request header, and the name of the profile once started."""
+    def __init__(self, format: Optional[ProfileFormat]):
+        self.format = format
+        self.name: Optional[str] = None
+
+_header_request: ContextVar[Optional[_HeaderRequest]] = ContextVar("ctrlstack_profile_header_request", default=None)
+_active_session: ContextVar[Optional[_Session]] = ContextVar("ctrlstack_profile_session", default=None)
+
+# %%
+#|export
+class Profiler:
+    """
+    Decides which calls of the controller methods are profiled, and keeps their profiles.
+
+    Sync methods are profiled in their worker thread. Async methods are profiled on the event loop thread across
+    their awaits, so their profiles also include the other requests and tasks the loop runs meanwhile; their records
+    have `includes_other_tasks` set.
+
+    Args:
+        output_dir (Optional[str]): Directory of the profile files. If None, a temporary directory is created on the
+            first profile, and removed by `cleanup`.
+        max_profiles (int): Number of profiles kept. The files of older ones are deleted.
+    """
+    def __init__(self, output_dir: Optional[str] = None, max_profiles: int = 100):
+        if max_profiles < 1:
+            raise ValueError("max_profiles must be at least 1.")
+        self._output_dir = Path(output_dir) if output_dir is not None else None
+        self._owns_output_dir = output_dir is None
+        self.max_profiles = max_profiles
+        self._specs: Dict[str, MethodSpec] = {}
+        self._settings: Dict[str, ProfileSettings] = {}
+        self._calls: Dict[str, int] = {}
+        self._profiles: Deque[ProfileRecord] = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def output_dir(self) -> Path:
+        if self._output_dir is None:
+            self._output_dir = Path(tempfile.mkdtemp(prefix="ctrlstack-profiles-"))
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        return self._output_dir
+
+    def cleanup(self):
+        """Remove the temporary directory of the profiles, if one was created. Directories given by the user are kept."""
+        with self._lock:
+            if self._owns_output_dir and self._output_dir is not None:
+                shutil.rmtree(self._output_dir, ignore_errors=True)
+                self._output_dir = None
+                self._profiles.clear()
+
+    @staticmethod
+    def supports(spec: MethodSpec) -> bool:
+        return not spec.is_stream and not spec.process_pool and spec.micro_batch is None
+
+    def configure(self, method: str, settings: ProfileSettings) -> ProfileSettings:
+        """Set the profile settings of a method. Raises `KeyError` for methods whose handler was not wrapped."""
+        if method not in self._specs:
+            raise KeyError(method)
+        self._settings[method] = settings
+        self._calls[method] = 0
+        return settings
+
+    def info(self) -> ProfilingInfo:
+        with self._lock:
+            profiles = list(self._profiles)
+        return ProfilingInfo(methods=dict(self._settings), profiles=profiles)
+
+    def get_profile_path(self, name: str) -> Path:
+        """Path of a kept profile. Raises `KeyError` for unknown names."""
+        with self._lock:
+            if not any(record.name == name for record in self._profiles):
+                raise KeyError(name)
+        return self.output_dir / name
+
+    def _select(self, spec: MethodSpec) -> Optional[_Session]:
+        header_request = _header_request.get()
+        settings = self._settings.get(spec.name)
+        if header_request is not None:
+            format = header_request.format or (settings.format if settings is not None else ProfileFormat.CPROFILE)
+            trigger = "header"
+        elif settings is None or settings.sample_every == 0:
+            return None
+        else:
+            self._calls[spec.name] += 1
+            if self._calls[spec.name] % settings.sample_every:
+                return None
+            format, trigger = settings.format, "sample"
+        name = f"{spec.name}-{time.strftime('%Y%m%dT%H%M%S')}-{next(self._ids)}.{_FILE_SUFFIXES[format]}"
+        if header_request is not None:
+            header_request.name = name
+        return _Session(name, spec.name, format, trigger, includes_other_tasks=spec.is_async)
+
+    def _save(self, session: _Session):
+        if session.profiler is None:
+            return  # The thread was already profiled
+        path = self.output_dir / session.name
+        if session.format == ProfileFormat.CPROFILE:
+            session.profiler.dump_stats(path)
+        else:
+            session.profiler.dump(path)
+        with self._lock:
+            self._profiles.append(session.record())
+            while len(self._profiles) > self.max_profiles:
+                (self.output_dir / self._profiles.popleft().name).unlink(missing_ok=True)
+
+    def wrap_method(self, spec: MethodSpec, method: Callable) -> Callable:
+        """Wrap a sync method, to profile the calls selected by the handler returned by `wrap` in their worker thread."""
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            session = _active_session.get()
+            if session is None:
+                return method(*args, **kwargs)
+            try:
+                with session.active():
+                    return method(*args, **kwargs)
+            finally:
+                self._save(session)
+        return profiled
+
+    def wrap(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """
+        Wrap the handler of a method, to select the calls to profile. Async methods are profiled here; the calls of
+        sync methods are profiled by their method wrapped with `wrap_method`.
+        """
+        self._specs[spec.name] = spec
+        if spec.is_async:
+            async def profiled_handler(kwargs: Dict[str, Any]) -> Any:
+                session = self._select(spec)
+                if session is None:
+                    return await handler(kwargs)
+                try:
+                    with session.active():
+                        return await handler(kwargs)
+                finally:
+                    await run_in_threadpool(self._save, session)
+        else:
+            async def profiled_handler(kwargs: Dict[str, Any]) -> Any:
+                session = self._select(spec)
+                if session is None:
+                    return await handler(kwargs)
+                token = _active_session.set(session)  # Copied into the context of the worker thread
+                try:
+                    return await handler(kwargs)
+                finally:
+                    _active_session.reset(token)
+        return profiled_handler
+
+# %%
+#|export
+class ProfileHeaderMiddleware:
+    """
+    ASGI middleware that marks requests carrying `PROFILE_HEADER` to be profiled, and returns the name of their
+    profile in the same response header.
+    """
+    _header = PROFILE_HEADER.lower().encode()
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = next((v for k, v in scope["headers"] if k == self._header), None)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+        value = value.decode().strip().lower()
+        request = _HeaderRequest(ProfileFormat(value) if value in ProfileFormat._value2member_map_ else None)
+
+        async def send_with_profile_name(message: Message):
+            if message["type"] == "http.response.start" and request.name is not None:
+                message = {**message, "headers": [*message.get("headers", []), (self._header, request.name.encode())]}
+            await send(message)
+
+        token = _header_request.set(request)
+        try:
+            await self.app(scope, receive, send_with_profile_name)
+        finally:
+            _header_request.reset(token)
+
+# %%
+import asyncio
+import pstats
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_query_method
+    def fib(self, n: int) -> int:
+        return n if n < 2 else self.fib(n - 1) + self.fib(n - 2)
+
+    @ctrl_query_method
+    async def afib(self, n: int) -> int:
+        return self.fib(n)
+
+ctrl = FooController()
+profiler = Profiler()
+fib_spec, afib_spec = get_method_spec(FooController, 'fib'), get_method_spec(FooController, 'afib')
+fib = profiler.wrap(fib_spec, lambda kwargs: run_in_threadpool(profiler.wrap_method(fib_spec, ctrl.fib), **kwargs))
+async def _afib_handler(kwargs):
+    return await ctrl.afib(**kwargs)
+afib = profiler.wrap(afib_spec, _afib_handler)
+
+profiler.configure('fib', ProfileSettings(sample_every=2))
+profiler.configure('afib', ProfileSettings(sample_every=1, format='collapsed'))
+
+async def _check_profiling():
+    assert [await fib({'n': 15}) for _ in range(4)] == [610] * 4
+    assert await afib({'n': 25}) == 75025
+
+asyncio.run(_check_profiling())
+info = profiler.info()
+assert [(p.method, p.trigger) for p in info.profiles] == [('fib', 'sample'), ('fib', 'sample'), ('afib', 'sample')]
+stats = pstats.Stats(str(profiler.get_profile_path(info.profiles[0].name)))
+assert any(func[2] == 'fib' for func in stats.stats)
+assert 'FooController.fib' in profiler.get_profile_path(info.profiles[2].name).read_text()
@@ -0,0 +1,228 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # protocol
+#
+# Routes and message formats shared by the server and `RemoteController`, beyond the one route per
+# controller method.
+
+# %%
+#|default_exp protocol
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.protocol as this_module
+
+# %%
+#|export
+from pydantic import BaseModel, Field
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+# %%
+#|export
+CTRLSTACK_ROUTE_PREFIX = "/_ctrlstack"
+BATCH_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/batch"
+STATS_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/stats"
+JOBS_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/jobs"
+PROFILING_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/profiling"
+METRICS_ROUTE = "/metrics"  # The default path of Prometheus scrapers
+MANIFEST_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/manifest"
+
+# %% [markdown]
+# Status codes with a meaning in the protocol, for clients that do not import Starlette. A background job is
+# accepted with 202, and a call rejected by a full concurrency limit gets 429, with a `Retry-After` header.
+
+# %%
+#|export
+HTTP_202_ACCEPTED = 202
+HTTP_429_TOO_MANY_REQUESTS = 429
+
+# %% [markdown]
+# ## Batch calls
+#
+# The batch route takes a list of calls and returns one entry per call, in the same order. Arguments are
+# keyed by parameter name and encoded to JSON with the method's argument types. Each entry of the response
+# is either `{"result": ...}` or `{"error": {"status_code": ..., "detail": ...}}`.
+
+# %%
+#|export
+class BatchCallRequest(BaseModel):
+    method: str
+    args: Dict[str, Any] = {}
+
+def batch_result(result: Any) -> Dict[str, Any]:
+    return {"result": result}
+
+def batch_error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return {"error": {"status_code": status_code, "detail": detail}}
+
+# %%
+assert BatchCallRequest.model_validate({"method": "foo"}).args == {}
+assert batch_error(404, "nope") == {"error": {"status_code": 404, "detail": "nope"}}
+
+# %% [markdown]
+# ## Streamed results
+#
+# Generator methods respond with NDJSON: one JSON document per line, each either `{"item": ...}` or, if the
+# method fails after the response has started, a final `{"error": {"status_code": ..., "detail": ...}}`.
+
+# %%
+#|export
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def stream_item(item: Any) -> Dict[str, Any]:
+    return {"item": item}
+
+def stream_error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return batch_error(status_code, detail)
+
+# %%
+assert stream_item([1]) == {"item": [1]}
+
+# %% [markdown]
+# ## Background jobs
+#
+# Calling a command marked with `background=True` responds with `202 Accepted` and the `JobInfo` of the job
+# that runs it. The job routes are:
+#
+# - `GET {JOBS_ROUTE}`: list the jobs (`List[JobInfo]`).
+# - `GET {JOBS_ROUTE}/{job_id}`: the `JobInfo` of a job.
+# - `GET {JOBS_ROUTE}/{job_id}/result?wait=<seconds>`: wait up to `wait` seconds for the job to finish. Responds
+#   with `{"result": ...}` if it succeeded, the error of the job (status code and detail) if it failed or was
+#   cancelled, and `202 Accepted` with its `JobInfo` if it is still pending or running.
+# - `POST {JOBS_ROUTE}/{job_id}/cancel`: request cancellation, returns the `JobInfo`.
+
+# %%
+#|export
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+class JobInfo(BaseModel):
+    job_id: str
+    method: str
+    status: JobStatus = JobStatus.PENDING
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    error: Optional[Dict[str, Any]] = None  # {"status_code": ..., "detail": ...} of failed or cancelled jobs
+
+def job_route(job_id: str, action: Optional[str] = None) -> str:
+    return f"{JOBS_ROUTE}/{job_id}" + (f"/{action}" if action else "")
+
+# %%
+assert JobStatus.CANCELLED.finished and not JobStatus.RUNNING.finished
+assert job_route("abc", "result") == "/_ctrlstack/jobs/abc/result"
+
+# %% [markdown]
+# ## Profiling
+#
+# With profiling enabled, the server profiles one call in `sample_every` of each configured method, and every
+# call carrying the `PROFILE_HEADER` header (whose value may name the format). The response of a profiled call
+# carries the name of its profile in the same header. The profiling routes are:
+#
+# - `GET {PROFILING_ROUTE}`: the `ProfilingInfo` of the server.
+# - `PUT {PROFILING_ROUTE}/methods/{method}`: set the `ProfileSettings` of a method, returns them.
+# - `GET {PROFILING_ROUTE}/profiles/{name}`: download a profile.
+
+# %%
+#|export
+PROFILE_HEADER = "X-Ctrlstack-Profile"
+
+class ProfileFormat(str, Enum):
+    CPROFILE = "cprofile"  # Deterministic profile, in the pstats format (`python -m pstats`, snakeviz)
+    COLLAPSED = "collapsed"  # Sampled stacks, one "frame;frame;frame count" line each (flamegraph.pl, speedscope)
+
+class ProfileSettings(BaseModel):
+    sample_every: int = Field(0, ge=0)  # Profile one call in this many. 0 only profiles calls carrying PROFILE_HEADER
+    format: ProfileFormat = ProfileFormat.CPROFILE
+
+class ProfileRecord(BaseModel):
+    name: str
+    method: str
+    format: ProfileFormat
+    trigger: str  # "sample" or "header"
+    created_at: float
+    duration: float  # Seconds
+    includes_other_tasks: bool = False  # Async methods: also covers what the event loop ran during the call
+
+class ProfilingInfo(BaseModel):
+    methods: Dict[str, ProfileSettings]  # Methods with settings
+    profiles: List[ProfileRecord]  # Oldest first
+
+def profiling_route(method: Optional[str] = None, profile: Optional[str] = None) -> str:
+    if method is not None:
+        return f"{PROFILING_ROUTE}/methods/{method}"
+    if profile is not None:
+        return f"{PROFILING_ROUTE}/profiles/{profile}"
+    return PROFILING_ROUTE
+
+# %%
+assert ProfileSettings().format == ProfileFormat.CPROFILE
+assert profiling_route(profile="a.prof") == "/_ctrlstack/profiling/profiles/a.prof"
+
+# %% [markdown]
+# ## Tracing
+#
+# Clients send the context of the span of a call in the W3C Trace Context `traceparent` header, and the server
+# records its spans of the request in the same trace.
+
+# %%
+#|export
+TRACEPARENT_HEADER = "traceparent"
+
+# %% [markdown]
+# ## Manifest
+#
+# With the manifest enabled, `GET {MANIFEST_ROUTE}` describes the controller methods of the server: their names,
+# groups and types, and the JSON schemas of their parameters and results. Clients can build a `RemoteController`
+# from it (see `ctrlstack.manifest`) without importing the controller. The `hash` of a manifest identifies its
+# content, and is sent as the `ETag` of the response, so that a client holding a copy can revalidate it with
+# `If-None-Match`.
+
+# %%
+#|export
+class ParamLocation(str, Enum):
+    QUERY = "query"
+    BODY = "body"
+    STREAM = "stream"  # The NDJSON request body of a command taking an iterable
+
+class ParamManifest(BaseModel):
+    name: str
+    kind: str  # The name of its `inspect.Parameter` kind, e.g. "POSITIONAL_OR_KEYWORD"
+    location: Optional[ParamLocation] = None  # None for unannotated parameters, placed by the type of their value
+    required: bool = True
+    default: Any = None  # JSON-encoded
+    json_schema: Dict[str, Any] = {}  # Of the items, for streamed parameters
+
+class MethodManifest(BaseModel):
+    name: str
+    method_type: str  # `ControllerMethodType` value
+    group: str
+    is_async: bool = False
+    is_stream: bool = False
+    background: bool = False
+    params: List[ParamManifest] = []
+    returns: Optional[Dict[str, Any]] = None  # JSON schema of the result, or of the items of streaming methods
+    doc: Optional[str] = None
+
+class ControllerManifest(BaseModel):
+    controller: str  # Name of the controller class
+    methods: List[MethodManifest]
+    hash: str = ""  # Of the content, see `ctrlstack.manifest.manifest_hash`
@@ -0,0 +1,210 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # query_cache
+#
+# In-process cache of query results, used by `create_controller_server`. Each query method declared with
+# `cache_ttl` gets its own LRU of results keyed by its (canonicalised) arguments. Commands drop the cached
+# results of the groups they invalidate (by default their own group).
+#
+# Invalidation bumps a per-group generation counter. A query that started before an invalidation does not
+# store its result, since it may have read state from before the command ran.
+
+# %%
+#|default_exp query_cache
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.query_cache as this_module
+
+# %%
+#|export
+from ctrlstack.method_spec import MethodSpec
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+import threading
+import time
+
+# %%
+#|export
+class QueryCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    currsize: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# %%
+#|exporti
+class _MethodCache:
+    def __init__(self, spec: MethodSpec):
+        self.spec = spec
+        self.entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def info(self) -> QueryCacheInfo:
+        return QueryCacheInfo(self.hits, self.misses, self.evictions, self.expirations, self.invalidations,
+                              len(self.entries), self.spec.cache_max_entries)
+
+# %%
+#|export
+class QueryCache:
+    """
+    LRU caches of query results, one per cached query method.
+
+    Args:
+        clock (Callable[[], float]): Monotonic clock used for expiry.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._caches: Dict[str, _MethodCache] = {}
+        self._caches_by_group: Dict[str, list] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_method(self, spec: MethodSpec):
+        """Register a cached query method."""
+        if spec.cache_ttl is None:
+            raise ValueError(f"Method '{spec.name}' is not cached.")
+        cache = _MethodCache(spec)
+        self._caches[spec.name] = cache
+        self._caches_by_group.setdefault(spec.group, []).append(cache)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._caches
+
+    def get(self, name: str, key: str) -> Tuple[bool, Any]:
+        """Return `(True, result)` for a live cached result, and `(False, None)` otherwise."""
+        cache = self._caches[name]
+        with self._lock:
+            entry = cache.entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    cache.entries.move_to_end(key)
+                    cache.hits += 1
+                    return True, entry[1]
+                del cache.entries[key]
+                cache.expirations += 1
+            cache.misses += 1
+            return False, None
+
+    def generation(self, group: str) -> int:
+        return self._generations.get(group, 0)
+
+    def put(self, name: str, key: str, value: Any, generation: Optional[int] = None):
+        """
+        Cache a result. If `generation` is given and the group of the method has been invalidated since,
+        the result is discarded.
+        """
+        cache = self._caches[name]
+        with self._lock:
+            if generation is not None and generation != self.generation(cache.spec.group):
+                return
+            cache.entries[key] = (self.clock() + cache.spec.cache_ttl, value)
+            cache.entries.move_to_end(key)
+            while len(cache.entries) > cache.spec.cache_max_entries:
+                cache.entries.popitem(last=False)
+                cache.evictions += 1
+
+    def invalidate(self, groups: Iterable[str]):
+        """Drop the cached results of all methods in the given groups."""
+        with self._lock:
+            for group in groups:
+                self._generations[group] = self.generation(group) + 1
+                for cache in self._caches_by_group.get(group, ()):
+                    if cache.entries:
+                        cache.entries.clear()
+                        cache.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.entries.clear()
+
+    def info(self, name: str) -> QueryCacheInfo:
+        with self._lock:
+            return self._caches[name].info()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters of each cached method, keyed by method name."""
+        with self._lock:
+            infos = {name: cache.info() for name, cache in self._caches.items()}
+        return {name: {**info._asdict(), 'hit_rate': info.hit_rate} for name, info in infos.items()}
+
+    def wrap_query(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Wrap the handler of a cached query so that repeated calls are served from the cache."""
+        if spec.name not in self._caches:
+            self.add_method(spec)
+        async def cached_handler(kwargs: Dict[str, Any]):
+            key = spec.call_key(kwargs, spec.cache_key_args)
+            hit, value = self.get(spec.name, key)
+            if hit:
+                return value
+            generation = self.generation(spec.group)
+            value = await handler(kwargs)
+            self.put(spec.name, key, value, generation)
+            return value
+        return cached_handler
+
+    def wrap_command(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Wrap the handler of a command so that it invalidates its groups once it has run (or failed)."""
+        async def invalidating_handler(kwargs: Dict[str, Any]):
+            try:
+                return await handler(kwargs)
+            finally:
+                self.invalidate(spec.invalidates)
+        return invalidating_handler
+
+# %%
+import asyncio
+from ctrlstack import Controller, ctrl_method, ControllerMethodType
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_method(ControllerMethodType.QUERY, "items", cache_ttl=10, cache_max_entries=2)
+    def get(self, x: int) -> int:
+        pass
+
+    @ctrl_method(ControllerMethodType.COMMAND, "items")
+    def set(self, x: int):
+        pass
+
+now = [0.0]
+cache = QueryCache(clock=lambda: now[0])
+calls = []
+async def _handler(kwargs):
+    calls.append(kwargs['x'])
+    return kwargs['x'] * 2
+
+get = cache.wrap_query(get_method_spec(FooController, 'get'), _handler)
+set_ = cache.wrap_command(get_method_spec(FooController, 'set'), _handler)
+
+async def _check_cache():
+    assert await get({'x': 1}) == 2
+    assert await get({'x': 1}) == 2
+    assert calls == [1]
+    await get({'x': 2}); await get({'x': 3})  # Evicts x=1
+    assert cache.info('get').evictions == 1
+    await set_({'x': 0})
+    assert cache.info('get').currsize == 0
+    await get({'x': 2})
+    now[0] = 11.0
+    await get({'x': 2})
+    assert cache.info('get').expirations == 1
+
+asyncio.run(_check_cache())
+cache.info('get')
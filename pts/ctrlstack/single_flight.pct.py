@@ -0,0 +1,111 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # single_flight
+#
+# Deduplication of concurrent identical calls on the server. While a call of a method is running, further
+# calls with the same (canonicalised) arguments wait for it and share its result, instead of running the
+# method again.
+#
+# The shared execution runs as its own task, so a caller that goes away (e.g. a client that disconnects)
+# does not cancel it for the others.
+
+# %%
+#|default_exp single_flight
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.single_flight as this_module
+
+# %%
+#|export
+from ctrlstack.method_spec import MethodSpec
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Tuple
+import asyncio
+
+# %%
+#|export
+class SingleFlightInfo(NamedTuple):
+    calls: int
+    executions: int
+    collapsed: int
+    inflight: int
+
+# %%
+#|exporti
+class _MethodCounters:
+    def __init__(self):
+        self.calls = self.executions = self.collapsed = 0
+
+# %%
+#|export
+class SingleFlight:
+    """Shares the execution of concurrent identical calls."""
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str, str], asyncio.Task] = {}
+        self._counters: Dict[str, _MethodCounters] = {}
+
+    def info(self, name: str) -> SingleFlightInfo:
+        counters = self._counters[name]
+        inflight = sum(1 for _, method, _ in self._inflight if method == name)
+        return SingleFlightInfo(counters.calls, counters.executions, counters.collapsed, inflight)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters of each deduplicated method, keyed by method name."""
+        return {name: self.info(name)._asdict() for name in self._counters}
+
+    def _finish(self, key, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved, in case every caller went away before it finished
+
+    def wrap(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Wrap a handler so that concurrent calls with equal arguments share one execution."""
+        counters = self._counters.setdefault(spec.name, _MethodCounters())
+        async def single_flight_handler(kwargs: Dict[str, Any]):
+            # Keyed by loop too, as tasks cannot be awaited from another event loop
+            key = (asyncio.get_running_loop(), spec.name, spec.call_key(kwargs))
+            counters.calls += 1
+            task = self._inflight.get(key)
+            if task is None:
+                counters.executions += 1
+                task = asyncio.ensure_future(handler(kwargs))
+                self._inflight[key] = task
+                task.add_done_callback(lambda task: self._finish(key, task))
+            else:
+                counters.collapsed += 1
+            return await asyncio.shield(task)
+        return single_flight_handler
+
+# %%
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+
+class FooController(Controller):
+    @ctrl_query_method
+    def get(self, x: int) -> int:
+        pass
+
+calls = []
+async def _handler(kwargs):
+    calls.append(kwargs)
+    await asyncio.sleep(0.01)
+    return kwargs['x']
+
+single_flight = SingleFlight()
+get = single_flight.wrap(get_method_spec(FooController, 'get'), _handler)
+
+async def _check_single_flight():
+    assert await asyncio.gather(*[get({'x': i % 2}) for i in range(10)]) == [i % 2 for i in range(10)]
+    assert len(calls) == 2
+    assert await get({'x': 0}) == 0  # Not in flight anymore
+
+asyncio.run(_check_single_flight())
+assert single_flight.info('get') == SingleFlightInfo(calls=11, executions=3, collapsed=8, inflight=0)
@@ -0,0 +1,333 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # stubgen
+#
+# `RemoteController` subclasses build their methods when they are defined, from the signatures and type hints
+# of the controller methods. For large controllers that is slow, and type checkers cannot see the methods.
+#
+# `generate_client_module` instead writes the source of a client module for a controller class. The client is a
+# `RemoteController` subclass with one plain method per controller method, and the route and the query/body
+# split of each method are precomputed (see `StaticMethodSpec`). Loading the module costs next to nothing:
+#
+# - The types in the signatures are only imported for type checkers (under `TYPE_CHECKING`), so importing the
+#   client does not import the controller or its dependencies.
+# - Results are decoded with their return type, whose module is imported when the method is first called.
+# - Defaults that are not literals (e.g. pydantic models or enum members) become `None`, so that the server
+#   applies the default.
+#
+# Regenerate the module when the controller changes, e.g. with
+#
+# ```
+# ctrlstack-stubgen my_package.controllers:MyController -o my_package/client.py --mode sync
+# ```
+
+# %%
+#|default_exp stubgen
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.stubgen as this_module
+
+# %%
+#|export
+from ctrlstack import Controller
+from ctrlstack.method_spec import MethodSpec, compile_method_specs
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union, get_args, get_origin
+import importlib
+import inspect
+import sys
+import types
+import typer
+import typing
+
+# %% [markdown]
+# ## Rendering types
+
+# %%
+#|exporti
+class _Unrenderable(Exception):
+    """A type that cannot be written as an importable annotation, e.g. a class defined in a function."""
+
+_RESERVED_NAMES = {"annotations", "TYPE_CHECKING", "LazyTypes", "RemoteController", "StaticMethodSpec", "_SPECS", "_types"}
+
+class _TypeRenderer:
+    """Writes types as source, collecting the names they need and the modules to import them from."""
+    def __init__(self, reserved: set):
+        self.names: Dict[Tuple[str, str], str] = {}  # (module, attribute) -> name in the generated module
+        self._used = set(reserved)
+
+    def name(self, module: str, attribute: str) -> str:
+        key = (module, attribute)
+        if key not in self.names:
+            name, n = attribute, 2
+            while name in self._used:
+                name, n = f"{attribute}_{n}", n + 1
+            self.names[key] = name
+            self._used.add(name)
+        return self.names[key]
+
+    def render(self, tp: Any) -> str:
+        if tp is None or tp is type(None):
+            return "None"
+        if tp is Any:
+            return self.name("typing", "Any")
+        if tp is Ellipsis:
+            return "..."
+        if isinstance(tp, list):  # The parameters of a Callable
+            return f"[{', '.join(self.render(arg) for arg in tp)}]"
+        origin, args = get_origin(tp), get_args(tp)
+        if origin is Union or origin is types.UnionType:
+            members = [arg for arg in args if arg is not type(None)]
+            if len(members) == 1 and len(args) == 2:
+                return f"{self.name('typing', 'Optional')}[{self.render(members[0])}]"
+            return f"{self.name('typing', 'Union')}[{', '.join(self.render(arg) for arg in args)}]"
+        if origin is Literal:
+            if not all(isinstance(arg, (str, int, bool, type(None))) for arg in args):
+                raise _Unrenderable(tp)
+            return f"{self.name('typing', 'Literal')}[{', '.join(repr(arg) for arg in args)}]"
+        if origin is not None:
+            alias = getattr(tp, '_name', None)
+            head = self.name("typing", alias) if alias is not None and hasattr(typing, alias) else self.render(origin)
+            return f"{head}[{', '.join(self.render(arg) for arg in args)}]" if args else head
+        if isinstance(tp, type):
+            if tp.__module__ == "builtins":
+                return tp.__qualname__
+            if "<locals>" in tp.__qualname__:
+                raise _Unrenderable(tp)
+            outer, _, inner = tp.__qualname__.partition(".")
+            name = self.name(tp.__module__, outer)
+            return f"{name}.{inner}" if inner else name
+        raise _Unrenderable(tp)  # e.g. TypeVars, NewTypes, forward references
+
+    def render_or_any(self, tp: Any) -> str:
+        try:
+            return self.render(tp)
+        except _Unrenderable:
+            return self.name("typing", "Any")
+
+# %%
+_renderer = _TypeRenderer(_RESERVED_NAMES)
+assert _renderer.render(Optional[List[Dict[str, int]]]) == "Optional[List[Dict[str, int]]]"
+assert _renderer.render(list[int] | None) == "Optional[list[int]]"
+assert _renderer.render(Tuple[int, ...]) == "Tuple[int, ...]"
+assert _renderer.render(typing.Callable[[int], str]) == "Callable[[int], str]"
+assert _renderer.render(Path) == "Path" and _renderer.names[("pathlib", "Path")] == "Path"
+assert _renderer.render(inspect.Parameter) == "Parameter"
+assert _renderer.render_or_any(typing.TypeVar("T")) == "Any"
+assert _renderer.name("other", "Path") == "Path_2"
+
+# %% [markdown]
+# ## Generating clients
+
+# %%
+#|exporti
+_LITERAL_DEFAULT_TYPES = (int, float, str, bool, type(None))
+
+def _render_default(value: Any) -> Optional[str]:
+    """The default as source, or None if it is not a literal."""
+    return repr(value) if type(value) in _LITERAL_DEFAULT_TYPES else None
+
+def _render_docstring(doc: Optional[str], indent: str) -> List[str]:
+    if not doc:
+        return []
+    if '"""' in doc or "\\" in doc or doc.endswith('"'):
+        return [f"{indent}{doc!r}"]
+    lines = doc.splitlines()
+    body = "\n".join([lines[0], *[f"{indent}{line}" if line else "" for line in lines[1:]]])
+    return [f'{indent}"""{body}"""' if len(lines) == 1 else f'{indent}"""\n{indent}{body}\n{indent}"""']
+
+def _render_params(spec: MethodSpec, renderer: _TypeRenderer) -> str:
+    params = list(spec.signature.parameters.values())
+    rendered = ["self"]
+    for i, param in enumerate(params):
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            raise ValueError(f"'{spec.name}' takes *{param.name}, which a generated client cannot pass on.")
+        if param.kind == inspect.Parameter.KEYWORD_ONLY and "*" not in rendered:
+            rendered.append("*")
+
+        hint = spec.arg_types.get(param.name)
+        annotation = renderer.render_or_any(hint) if hint is not None else None
+        default = None
+        if param.default is not inspect.Parameter.empty:
+            default = _render_default(param.default)
+            if default is None:  # Not a literal, so it is left to the server
+                default = "None"
+                if annotation is not None:
+                    annotation = f"{renderer.name('typing', 'Optional')}[{annotation}]"
+        text = param.name if annotation is None else f"{param.name}: {annotation}"
+        if default is not None:
+            text += f" = {default}" if annotation is not None else f"={default}"
+        rendered.append(text)
+
+        if param.kind == inspect.Parameter.POSITIONAL_ONLY and (i + 1 == len(params) or params[i + 1].kind != param.kind):
+            rendered.append("/")
+    return ", ".join(rendered)
+
+def _render_returns(spec: MethodSpec, renderer: _TypeRenderer, mode: str) -> Tuple[Optional[str], Optional[str]]:
+    """The return annotation of the generated method, and the type its results are decoded with."""
+    decoded_type = spec.item_type if spec.is_stream else spec.return_type
+    try:
+        decoded = renderer.render(decoded_type) if decoded_type is not None and decoded_type is not type(None) else None
+    except _Unrenderable:
+        decoded = None
+    if spec.background:
+        return renderer.name("ctrlstack.remote_controller", "AsyncJobHandle" if mode == "async" else "JobHandle"), decoded
+    if spec.is_stream:
+        iterator = renderer.name("typing", "AsyncIterator" if mode == "async" else "Iterator")
+        return f"{iterator}[{decoded or renderer.name('typing', 'Any')}]", decoded
+    if spec.return_type is None:
+        return None, None
+    return renderer.render_or_any(spec.return_type), decoded
+
+def _render_spec(spec: MethodSpec, returns: Optional[str]) -> str:
+    args = [repr(spec.name), repr(spec.method_type.value), repr(spec.group), repr(spec.route), repr(spec.route_without_group)]
+    args.append(f"params={tuple(spec.signature.parameters)!r}")
+    if spec.query_params:
+        args.append(f"query_params={tuple(spec.query_params)!r}")
+    if spec.body_params:
+        args.append(f"body_params={tuple(spec.body_params)!r}")
+    if spec.input_stream_param is not None:
+        args.append(f"input_stream_param={spec.input_stream_param!r}")
+    if spec.is_stream:
+        args.append("is_stream=True")
+    if spec.background:
+        args.append("background=True")
+    if returns is not None:
+        args.append(f"returns={returns!r}, types=_types")
+    return f"    {spec.name!r}: StaticMethodSpec({', '.join(args)}),"
+
+def _render_method(spec: MethodSpec, renderer: _TypeRenderer, mode: str) -> Tuple[List[str], str]:
+    """The lines of the generated method, and the entry of its spec."""
+    params = _render_params(spec, renderer)
+    annotation, decoded = _render_returns(spec, renderer, mode)
+    arguments = "{" + ", ".join(f"{name!r}: {name}" for name in spec.signature.parameters) + "}"
+    call = f'(_SPECS[{spec.name!r}], (), {arguments})'
+    if spec.is_stream:
+        head, body = "def", f"return self._stream_{mode}{call}"
+    elif mode == "async":
+        head, body = "async def", f"return await self._call_async{call}"
+    else:
+        head, body = "def", f"return self._call_sync{call}"
+    returns = f" -> {annotation}" if annotation is not None else ""
+    lines = [f"    {head} {spec.name}({params}){returns}:"]
+    lines += _render_docstring(inspect.getdoc(spec.func), " " * 8)
+    lines.append(f"        {body}")
+    return lines, _render_spec(spec, decoded)
+
+# %%
+#|export
+def generate_client_module(
+    controller_cls: Type[Controller],
+    mode: str = "async",
+    class_name: Optional[str] = None,
+    prepend_method_group: bool = True,
+) -> str:
+    """
+    Generate the source of a module with a client for a server of `controller_cls`.
+
+    Args:
+        controller_cls (Type[Controller]): The controller class served by the server.
+        mode (str): "async" for a client with async methods, "sync" for blocking ones.
+        class_name (Optional[str]): The name of the client class. Defaults to the name of the controller class
+            followed by "Client".
+        prepend_method_group (bool): Whether the routes of the server include the method groups.
+
+    Returns:
+        str: The source of the module. The client is created with the arguments of `RemoteController`, e.g.
+            `MyControllerClient(url="http://localhost:8000")`.
+    """
+    if mode not in ("async", "sync"):
+        raise ValueError(f"mode must be 'async' or 'sync', got {mode!r}")
+    class_name = class_name or f"{controller_cls.__name__}Client"
+    renderer = _TypeRenderer(_RESERVED_NAMES | {class_name})
+
+    methods, specs = [], []
+    for spec in compile_method_specs(controller_cls).values():
+        lines, entry = _render_method(spec, renderer, mode)
+        methods += ["", *lines]
+        specs.append(entry)
+
+    runtime_imports = {}
+    checking_imports = {}
+    lazy = {}
+    for (module, attribute), name in sorted(renderer.names.items()):
+        target = runtime_imports if module == "typing" else checking_imports
+        target.setdefault(module, []).append(attribute if name == attribute else f"{attribute} as {name}")
+        if module != "typing":
+            lazy[name] = (module, attribute)
+
+    source = [
+        '"""',
+        f"Client of `{controller_cls.__module__}.{controller_cls.__qualname__}`, generated by `ctrlstack.stubgen`.",
+        "Regenerate it when the controller changes.",
+        '"""',
+        "from __future__ import annotations",
+        f"from typing import {', '.join(sorted(['TYPE_CHECKING', *runtime_imports.get('typing', [])]))}",
+        "from ctrlstack.method_spec import LazyTypes, StaticMethodSpec",
+        "from ctrlstack.remote_controller import RemoteController",
+    ]
+    if checking_imports:
+        source += ["", "if TYPE_CHECKING:"]
+        source += [f"    from {module} import {', '.join(names)}" for module, names in checking_imports.items()]
+    source += ["", f"_types = LazyTypes(globals(), {lazy!r})", "", "_SPECS = {", *specs, "}", ""]
+    source += [
+        "",
+        f"class {class_name}(RemoteController, mode={mode!r}, prepend_method_group={prepend_method_group!r}):",
+        f'    """A {mode} client of `{controller_cls.__qualname__}`."""',
+        "",
+        "    _method_specs = _SPECS",
+        *methods,
+    ]
+    return "\n".join(source) + "\n"
+
+def write_client_module(controller_cls: Type[Controller], path: str, **kwargs):
+    """Write the module of `generate_client_module(controller_cls, **kwargs)` to `path`."""
+    Path(path).write_text(generate_client_module(controller_cls, **kwargs))
+
+# %% [markdown]
+# ## Command
+
+# %%
+#|exporti
+def _import_controller_cls(reference: str) -> Type[Controller]:
+    module_name, _, qualname = reference.partition(":")
+    if not qualname:
+        raise typer.BadParameter(f"Expected 'module:ControllerClass', got {reference!r}.")
+    obj = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        obj = getattr(obj, attribute)
+    if not (isinstance(obj, type) and issubclass(obj, Controller)):
+        raise typer.BadParameter(f"{reference!r} is not a Controller subclass.")
+    return obj
+
+# %%
+#|export
+app = typer.Typer(help="Generate client modules for ctrlstack controllers.", add_completion=False)
+
+@app.command()
+def generate(
+    controller: str = typer.Argument(..., help="The controller class, as 'module:ControllerClass'."),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="The file to write. Defaults to stdout."),
+    mode: str = typer.Option("async", help="'async' or 'sync'."),
+    class_name: Optional[str] = typer.Option(None, help="The name of the client class."),
+    prepend_method_group: bool = typer.Option(True, help="Whether the routes of the server include the method groups."),
+):
+    """Generate a client module for a controller class."""
+    if "" not in sys.path:
+        sys.path.insert(0, "")  # Find modules in the working directory, like `python -m`
+    source = generate_client_module(
+        _import_controller_cls(controller), mode=mode, class_name=class_name, prepend_method_group=prepend_method_group,
+    )
+    if output is None:
+        typer.echo(source, nl=False)
+    else:
+        output.write_text(source)
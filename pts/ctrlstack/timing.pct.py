@@ -0,0 +1,275 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # timing
+#
+# Where the time of a remote call goes. On the server, the handler and the method of each call are wrapped to
+# timestamp the phases of its request:
+#
+# - `decode`: routing, reading the request and validating the arguments.
+# - `queue`: waiting for a concurrency limit or a thread.
+# - `exec`: running the method. For process-pool methods, this includes waiting for a free worker process.
+# - `encode`: encoding the response (and, for the spans of `ctrlstack.tracing`, sending it).
+#
+# Calls that do not run the method (e.g. cache hits), or whose execution is not seen by the request
+# (micro-batched methods), have a single `handle` phase instead of `queue` and `exec`. Streamed responses have
+# `handle` and `stream` phases. The phases are reported in the `Server-Timing` response header by
+# `ServerTimingMiddleware`, and as spans by `ctrlstack.tracing`.
+#
+# On the client, `CallTimings` combines the phases of the HTTP exchange, as reported by httpx, with the time
+# spent encoding the arguments and decoding the result, and with the `Server-Timing` of the response.
+
+# %%
+#|default_exp timing
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.timing as this_module
+
+# %%
+#|export
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+import functools
+import time
+
+# %%
+#|export
+SERVER_TIMING_HEADER = "Server-Timing"
+
+def format_server_timing(phases: List[Tuple[str, float]]) -> str:
+    """The `Server-Timing` header of (name, seconds) pairs."""
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in phases)
+
+def parse_server_timing(value: str) -> Dict[str, float]:
+    """Durations in seconds by name, of the metrics of a `Server-Timing` header that have one."""
+    durations = {}
+    for metric in value.split(","):
+        name, *params = [part.strip() for part in metric.split(";")]
+        for param in params:
+            key, _, duration = param.partition("=")
+            if key.strip() == "dur":
+                try:
+                    durations[name] = float(duration) / 1000
+                except ValueError:
+                    pass
+    return durations
+
+# %%
+assert parse_server_timing(format_server_timing([("decode", 0.0012), ("exec", 0.5)])) == {"decode": 0.0012, "exec": 0.5}
+assert parse_server_timing('cache;desc="hit", db;dur=53') == {"db": 0.053}
+
+# %% [markdown]
+# ## Server
+
+# %%
+#|exporti
+class _RequestTimings:
+    """Times (`time.time_ns`) of the phases of a request, set by the wrapped handler and method as it goes through them."""
+    __slots__ = ("start", "handle_start", "handle_end", "exec_start", "exec_end", "stream")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.handle_start = self.handle_end = self.exec_start = self.exec_end = None
+        self.stream = False
+
+    def exec_started(self):
+        if self.exec_start is None:  # The first of the calls of a batch request
+            self.exec_start = time.time_ns()
+
+    def exec_ended(self):
+        self.exec_end = time.time_ns()  # The last of the calls of a batch request
+
+    def phases(self, end: int) -> List[Tuple[str, int, int]]:
+        """The (name, start, end) of the phases of the request that ended by `end`."""
+        if self.handle_start is None:
+            return []
+        phases = [("decode", self.start, self.handle_start)]
+        if self.stream:
+            phases += [("handle", self.handle_start, self.handle_end), ("stream", self.handle_end, end)]
+        elif self.exec_start is not None and self.exec_end is not None:
+            phases += [
+                ("queue", self.handle_start, self.exec_start),
+                ("exec", self.exec_start, self.exec_end),
+                ("encode", max(self.exec_end, self.handle_end or 0), end),
+            ]
+        else:
+            phases += [("handle", self.handle_start, self.handle_end), ("encode", self.handle_end, end)]
+        return [(name, s, e) for name, s, e in phases if s is not None and e is not None and s <= e <= end]
+
+_request_timings: ContextVar[Optional[_RequestTimings]] = ContextVar("ctrlstack_request_timings", default=None)
+
+def _begin_request() -> Tuple[_RequestTimings, Optional[Token]]:
+    """The timings of the current request, started now unless an outer middleware already did."""
+    timings = _request_timings.get()
+    if timings is not None:
+        return timings, None
+    timings = _RequestTimings(time.time_ns())
+    return timings, _request_timings.set(timings)
+
+# %%
+#|export
+def wrap_method(method: Callable) -> Callable:
+    """Wrap a sync method, to time its execution in its worker thread."""
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        timings = _request_timings.get()
+        if timings is None:
+            return method(*args, **kwargs)
+        timings.exec_started()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.exec_ended()
+    return timed
+
+def wrap_exec(handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+    """Wrap the innermost handler of an async method, or one that waits for a worker process, to time its execution."""
+    async def timed(kwargs: Dict[str, Any]) -> Any:
+        timings = _request_timings.get()
+        if timings is None:
+            return await handler(kwargs)
+        timings.exec_started()
+        try:
+            return await handler(kwargs)
+        finally:
+            timings.exec_ended()
+    return timed
+
+def wrap_handler(handler: Callable[[Dict[str, Any]], Awaitable[Any]], stream: bool = False) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+    """Wrap the outermost handler of a method, to time the request until the arguments were decoded."""
+    async def timed(kwargs: Dict[str, Any]) -> Any:
+        timings = _request_timings.get()
+        if timings is None:
+            return await handler(kwargs)
+        if timings.handle_start is None:
+            timings.handle_start = time.time_ns()
+        timings.stream = stream
+        try:
+            return await handler(kwargs)
+        finally:
+            timings.handle_end = time.time_ns()
+    return timed
+
+# %%
+#|export
+class ServerTimingMiddleware:
+    """ASGI middleware adding the phases of each request, up to its response, to the `Server-Timing` response header."""
+    _header = SERVER_TIMING_HEADER.lower().encode()
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings, token = _begin_request()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                now = time.time_ns()
+                phases = [(name, (e - s) / 1e9) for name, s, e in timings.phases(now)]
+                value = format_server_timing(phases + [("total", (now - timings.start) / 1e9)])
+                message = {**message, "headers": [*message.get("headers", []), (self._header, value.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                _request_timings.reset(token)
+
+# %% [markdown]
+# ## Client
+
+# %%
+#|export
+class CallTimings(NamedTuple):
+    """Seconds spent in each phase of a remote call, as seen by the client."""
+    method: str
+    total: float
+    serialize: float  # Encoding the arguments into a request
+    connect: float  # Opening a connection, 0 if a pooled one was reused
+    send: float  # Sending the request
+    wait: float  # From the request sent until the response headers arrived: the server, and the network round trip
+    receive: float  # Receiving the response body
+    deserialize: float  # Decoding the result
+    server: Dict[str, float]  # The `Server-Timing` phases of the response, if the server sent them
+
+    @property
+    def network(self) -> Optional[float]:
+        """Part of `wait` not spent in the server, if it sent its total time."""
+        return max(self.wait - self.server["total"], 0.0) if "total" in self.server else None
+
+    def format(self) -> str:
+        """A breakdown of the call in milliseconds, one phase per line."""
+        lines = [f"Timing of '{self.method}' (ms):"]
+        def line(name: str, seconds: float, depth: int = 1):
+            lines.append(f"{'  ' * depth}{name:<{16 - 2 * depth}}{seconds * 1000:10.3f}")
+        line("serialize", self.serialize)
+        line("connect", self.connect)
+        line("send", self.send)
+        line("wait", self.wait)
+        if "total" in self.server:
+            line("server", self.server["total"], 2)
+            for name, seconds in self.server.items():
+                if name != "total":
+                    line(name, seconds, 3)
+            line("network", self.network, 2)
+        line("receive", self.receive)
+        line("deserialize", self.deserialize)
+        line("total", self.total)
+        return "\n".join(lines)
+
+# %%
+#|exporti
+_HTTP_PHASES = {  # httpcore trace events -> phase of CallTimings
+    "connect_tcp": "connect", "connect_unix_socket": "connect", "start_tls": "connect",
+    "send_request_headers": "send", "send_request_body": "send",
+    "receive_response_headers": "wait",
+    "receive_response_body": "receive",
+}
+
+class _HTTPTimer:
+    """Sums the durations of the phases of an HTTP exchange, from the events of the httpx `trace` extension."""
+    def __init__(self):
+        self.durations = dict.fromkeys(["connect", "send", "wait", "receive"], 0.0)
+        self._started: Dict[str, float] = {}
+
+    def record(self, event: str, info: Dict[str, Any]):
+        prefix, _, state = event.rpartition(".")
+        phase = _HTTP_PHASES.get(prefix.partition(".")[2])
+        if phase is None:
+            return
+        if state == "started":
+            self._started[prefix] = time.perf_counter()
+        elif prefix in self._started:
+            self.durations[phase] += time.perf_counter() - self._started.pop(prefix)
+
+    async def arecord(self, event: str, info: Dict[str, Any]):
+        self.record(event, info)
+
+    def call_timings(self, method: str, start: float, serialized: float, received: float, end: float, server_timing: Optional[str]) -> CallTimings:
+        """The timings of a call, given the `time.perf_counter` of its start, of the request built, of the response received, and of its end."""
+        return CallTimings(
+            method=method, total=end - start, serialize=serialized - start, deserialize=end - received,
+            server=parse_server_timing(server_timing) if server_timing else {}, **self.durations,
+        )
+
+# %%
+timer = _HTTPTimer()
+for event in ["connection.connect_tcp.started", "connection.connect_tcp.complete", "http11.send_request_headers.started",
+              "http11.send_request_headers.complete", "http11.receive_response_headers.started", "http11.receive_response_headers.complete"]:
+    timer.record(event, {})
+timings = timer.call_timings("foo", 0.0, 0.001, 0.01, 0.011, "decode;dur=1, exec;dur=3, total;dur=4")
+assert timings.server == {"decode": 0.001, "exec": 0.003, "total": 0.004}
+assert timings.serialize == 0.001 and timings.network == max(timings.wait - 0.004, 0.0)
+assert "exec" in timings.format()
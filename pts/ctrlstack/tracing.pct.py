@@ -0,0 +1,312 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # tracing
+#
+# Spans of remote calls, from the client to the controller method. A `Tracer` given to `RemoteController` starts a
+# client span per call and sends its context in the W3C `traceparent` header. A `Tracer` given to
+# `create_controller_server` records a server span per request, continuing the trace of the header if there is
+# one, with a child span per phase of the request (`decode`, `queue`, `exec` and `encode`, see `ctrlstack.timing`).
+# Requests starting background jobs only get the server span.
+#
+# Code running within a call, on the client or on the server, can add its own spans with `Tracer.span`.
+#
+# Finished spans are kept in memory, and written to a file with `Tracer.export`, either as a Chrome trace (for
+# `chrome://tracing` or Perfetto) or as OTLP-JSON (for OpenTelemetry tools). Without a tracer, nothing is
+# wrapped or recorded.
+
+# %%
+#|default_exp tracing
+
+# %%
+#|hide
+import nblite; from nblite import show_doc; nblite.nbl_export()
+import ctrlstack.tracing as this_module
+
+# %%
+#|export
+from ctrlstack.protocol import TRACEPARENT_HEADER
+from ctrlstack.timing import _RequestTimings, _begin_request, _request_timings
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import random
+import re
+import threading
+import time
+
+# %%
+#|export
+class TraceFormat(str, Enum):
+    CHROME = "chrome"  # Trace event format, for chrome://tracing and Perfetto
+    OTLP = "otlp"  # OTLP-JSON, as sent to an OpenTelemetry collector
+
+class SpanKind(str, Enum):
+    INTERNAL = "internal"
+    SERVER = "server"
+    CLIENT = "client"
+
+class Span:
+    """A timed operation of a trace. Times are in nanoseconds since the epoch."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, kind: SpanKind = SpanKind.INTERNAL,
+                 start_ns: Optional[int] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes if attributes is not None else {}
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds, or 0 while the span is not ended."""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else 0.0
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.duration * 1000:.3f}ms)"
+
+# %%
+#|exporti
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+def _parse_traceparent(value: str) -> Optional[Tuple[str, str]]:
+    """The (trace id, parent span id) of a `traceparent` header, or None if it is invalid."""
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("ctrlstack_current_span", default=None)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+_OTLP_KINDS = {SpanKind.INTERNAL: 1, SpanKind.SERVER: 2, SpanKind.CLIENT: 3}
+_OTLP_STATUS_ERROR = 2
+
+# %%
+#|export
+class Tracer:
+    """
+    Records the spans of remote calls.
+
+    Args:
+        service_name (str): Name of the service in exported traces.
+        path (Optional[str]): File that `export` writes to by default. A server with this tracer exports to it
+            when it shuts down.
+        format (TraceFormat): Format that `export` writes by default.
+        max_spans (int): Number of finished spans kept. Older ones are dropped.
+    """
+    def __init__(self, service_name: str = "ctrlstack", path: Optional[str] = None,
+                 format: TraceFormat = TraceFormat.CHROME, max_spans: int = 100_000):
+        self.service_name = service_name
+        self.path = path
+        self.format = TraceFormat(format)
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, kind: SpanKind = SpanKind.INTERNAL, parent: Optional[Span] = None,
+                   traceparent: Optional[str] = None, start_ns: Optional[int] = None, **attributes) -> Span:
+        """
+        Start a span, as a child of `parent`, else of the span of `traceparent`, else of the current span. Without any,
+        the span starts a new trace. The span is recorded when it is ended with `end_span`.
+        """
+        context = _parse_traceparent(traceparent) if parent is None and traceparent else None
+        parent = parent or (_current_span.get() if context is None else None)
+        if context is not None:
+            trace_id, parent_id = context
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = _new_id(128), None
+        return Span(name, trace_id, parent_id, kind, start_ns, attributes)
+
+    def end_span(self, span: Span, end_ns: Optional[int] = None):
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self._spans.append(span)
+
+    @contextmanager
+    def client_span(self, name: str, request: Dict[str, Any]) -> Iterator[Span]:
+        """
+        Record the block as a client span of `request` (the keyword arguments of an HTTP request), and add the
+        `traceparent` header of the span to its headers. The span does not become the current span, so the block
+        may suspend in a generator.
+        """
+        span = self.start_span(name, SpanKind.CLIENT, **{"http.method": request["method"], "http.url": request["url"]})
+        request["headers"] = {**(request.get("headers") or {}), TRACEPARENT_HEADER: span.traceparent}
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            self.end_span(span)
+
+    @contextmanager
+    def span(self, name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes) -> Iterator[Span]:
+        """Record the block as a span, child of the current span, and make it the current span within the block."""
+        span = self.start_span(name, kind, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """The finished spans, of all traces or of one, in the order they ended."""
+        return [s for s in list(self._spans) if trace_id is None or s.trace_id == trace_id]
+
+    def clear(self):
+        self._spans.clear()
+
+    def to_chrome(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """Spans in the Chrome trace event format. Each trace is shown as its own thread."""
+        spans = self.spans() if spans is None else spans
+        rows: Dict[str, int] = {}
+        events = []
+        for s in sorted(spans, key=lambda s: (s.start_ns, -s.end_ns)):  # Parents before the children they start with
+            row = rows.setdefault(s.trace_id, len(rows) + 1)
+            args = {**s.attributes, "trace_id": s.trace_id, "span_id": s.span_id, "parent_id": s.parent_id}
+            if s.error is not None:
+                args["error"] = s.error
+            events.append({
+                "name": s.name, "cat": s.kind.value, "ph": "X", "pid": os.getpid(), "tid": row,
+                "ts": s.start_ns / 1000, "dur": (s.end_ns - s.start_ns) / 1000, "args": args,
+            })
+        events += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": row, "args": {"name": f"trace {trace_id[:8]}"}}
+                   for trace_id, row in rows.items()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """Spans as an OTLP-JSON `ExportTraceServiceRequest`."""
+        spans = self.spans() if spans is None else spans
+        otlp_spans = []
+        for s in spans:
+            otlp_span = {
+                "traceId": s.trace_id, "spanId": s.span_id, "name": s.name, "kind": _OTLP_KINDS[s.kind],
+                "startTimeUnixNano": str(s.start_ns), "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+            }
+            if s.parent_id is not None:
+                otlp_span["parentSpanId"] = s.parent_id
+            if s.error is not None:
+                otlp_span["status"] = {"code": _OTLP_STATUS_ERROR, "message": s.error}
+            otlp_spans.append(otlp_span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "ctrlstack"}, "spans": otlp_spans}],
+        }]}
+
+    def export(self, path: Optional[str] = None, format: Optional[TraceFormat] = None) -> Path:
+        """Write the finished spans to `path` (default: `self.path`), in `format` (default: `self.format`)."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to export the trace to.")
+        format = TraceFormat(format) if format is not None else self.format
+        document = self.to_chrome() if format == TraceFormat.CHROME else self.to_otlp()
+        with self._lock:
+            Path(path).write_text(json.dumps(document))
+        return Path(path)
+
+    def record_request(self, server_span: Span, timings: _RequestTimings, end_ns: int):
+        """End the server span of a request, and record a child span per phase of the request."""
+        for name, start, end in timings.phases(end_ns):
+            self.end_span(Span(name, server_span.trace_id, server_span.span_id, start_ns=start), end)
+        self.end_span(server_span, end_ns)
+
+# %%
+#|export
+class TracingMiddleware:
+    """
+    ASGI middleware recording a server span per request into a `Tracer`, as a child of the span of the request's
+    `traceparent` header if it has one.
+    """
+    _header = TRACEPARENT_HEADER.lower().encode()
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = next((v.decode() for k, v in scope["headers"] if k == self._header), None)
+        timings, timings_token = _begin_request()
+        span = self.tracer.start_span(
+            f"{scope['method']} {scope['path']}", SpanKind.SERVER, traceparent=traceparent, start_ns=timings.start,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    span.error = f"HTTP {message['status']}"
+            await send(message)
+
+        span_token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(span_token)
+            if timings_token is not None:
+                _request_timings.reset(timings_token)
+            self.tracer.record_request(span, timings, time.time_ns())
+
+# %%
+import asyncio
+assert _parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01") == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+assert _parse_traceparent("00-00000000000000000000000000000000-00f067aa0ba902b7-01") is None
+assert _parse_traceparent("garbage") is None
+
+tracer = Tracer()
+with tracer.span("outer", SpanKind.CLIENT) as outer:
+    with tracer.span("inner", key=1) as inner:
+        pass
+assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id and outer.parent_id is None
+assert [s.name for s in tracer.spans()] == ["inner", "outer"]
+
+remote = tracer.start_span("server", SpanKind.SERVER, traceparent=outer.traceparent)
+assert (remote.trace_id, remote.parent_id) == (outer.trace_id, outer.span_id)
+
+chrome = tracer.to_chrome()
+assert [e["name"] for e in chrome["traceEvents"] if e["ph"] == "X"] == ["outer", "inner"]
+otlp_spans = tracer.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+assert otlp_spans[0]["parentSpanId"] == outer.span_id and otlp_spans[0]["attributes"] == [{"key": "key", "value": {"intValue": "1"}}]
@@ -19,8 +19,11 @@ import ctrlstack.type_utils as this_module
 
 # %%
 #|export
-from typing import Any, Union, get_origin, get_args
+from typing import Any, Union, NamedTuple, get_origin, get_args
 from enum import Enum
+from collections import OrderedDict
+import threading
+import time
 from pydantic import TypeAdapter
 
 # %%
@@ -49,17 +52,105 @@ def serialize_for_query_param(value: Any) -> Any:
         return value.value
     return value
 
+# %% [markdown]
+# Building a `TypeAdapter` compiles a pydantic-core schema, which costs far more than validating or
+# dumping a value with it. Adapters are therefore cached per type hint in a bounded LRU cache.
+# Unhashable type hints (e.g. `Annotated` with unhashable metadata) are keyed by identity; the cache
+# holds a reference to them so that the id cannot be reused while the entry is alive.
+
+# %%
+#|export
+class TypeAdapterCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+    maxsize: int
+    build_time: float  # Total seconds spent building TypeAdapters
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# %%
+#|exporti
+class _TypeAdapterCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._adapters: OrderedDict = OrderedDict()  # key -> (type_hint, TypeAdapter)
+        self._hits = self._misses = self._evictions = 0
+        self._build_time = 0.0
+
+    @staticmethod
+    def _key(type_hint):
+        try:
+            hash(type_hint)
+            return type_hint
+        except TypeError:
+            return ('__unhashable__', id(type_hint))
+
+    def get(self, type_hint) -> TypeAdapter:
+        key = self._key(type_hint)
+        with self._lock:
+            entry = self._adapters.get(key)
+            if entry is not None:
+                self._adapters.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        start = time.perf_counter()
+        adapter = TypeAdapter(type_hint)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._build_time += elapsed
+            entry = self._adapters.setdefault(key, (type_hint, adapter))  # Another thread may have built it too
+            self._adapters.move_to_end(key)
+            while len(self._adapters) > self.maxsize:
+                self._adapters.popitem(last=False)
+                self._evictions += 1
+            return entry[1]
+
+    def info(self) -> TypeAdapterCacheInfo:
+        with self._lock:
+            return TypeAdapterCacheInfo(self._hits, self._misses, self._evictions, len(self._adapters), self.maxsize, self._build_time)
+
+    def clear(self):
+        with self._lock:
+            self._adapters.clear()
+            self._hits = self._misses = self._evictions = 0
+            self._build_time = 0.0
+
+_type_adapter_cache = _TypeAdapterCache()
+
+# %%
+#|export
+def get_type_adapter(type_hint) -> TypeAdapter:
+    """Return a cached `TypeAdapter` for the type hint."""
+    return _type_adapter_cache.get(type_hint)
+
+def type_adapter_cache_info() -> TypeAdapterCacheInfo:
+    """Hit/miss/eviction counters and total schema build time of the `TypeAdapter` cache."""
+    return _type_adapter_cache.info()
+
+def type_adapter_cache_clear():
+    """Empty the `TypeAdapter` cache and reset its counters."""
+    _type_adapter_cache.clear()
+
 # %%
 #|export
 def serialize_value(value: Any, type_hint) -> Any:
     """Serialize any Python value to JSON-safe form via TypeAdapter."""
-    return TypeAdapter(type_hint).dump_python(value, mode='json')
+    return get_type_adapter(type_hint).dump_python(value, mode='json')
 
 # %%
 #|export
 def deserialize_value(data: Any, type_hint) -> Any:
     """Deserialize JSON data to a typed Python object via TypeAdapter."""
-    return TypeAdapter(type_hint).validate_python(data)
+    return get_type_adapter(type_hint).validate_python(data)
 
 # %%
 # Inline tests for is_query_param_type
@@ -141,3 +232,52 @@ assert deserialize_value("high", Priority) == Priority.HIGH
 assert serialize_value(42, int) == 42
 assert deserialize_value(42, int) == 42
 assert serialize_value("hello", str) == "hello"
+
+
+# %%
+# Inline tests for the TypeAdapter cache
+from typing import Annotated
+from pydantic import Field
+
+type_adapter_cache_clear()
+assert get_type_adapter(List[Inner]) is get_type_adapter(List[Inner])
+info = type_adapter_cache_info()
+assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+# Unhashable type hints are cached by identity
+unhashable = Annotated[int, {'unhashable': 'metadata'}]
+assert get_type_adapter(unhashable) is get_type_adapter(unhashable)
+
+# LRU eviction
+small_cache = _TypeAdapterCache(maxsize=2)
+small_cache.get(int); small_cache.get(str); small_cache.get(int); small_cache.get(float)
+assert small_cache.info().evictions == 1
+assert small_cache._key(str) not in small_cache._adapters
+assert small_cache._key(int) in small_cache._adapters
+
+# %% [markdown]
+# ### Benchmark
+#
+# Per-call cost of `serialize_value` when a new `TypeAdapter` is built for every call (as before) versus
+# using the cache.
+
+# %%
+import timeit
+
+class Item(BaseModel):
+    name: str
+    tags: List[str]
+    inner: Inner
+
+item = Item(name="x", tags=["a", "b"], inner=Inner(x=1))
+cases = {
+    "BaseModel": (item, Item),
+    "List[BaseModel]": ([item] * 10, List[Item]),
+    "Dict[str, int]": ({str(i): i for i in range(10)}, Dict[str, int]),
+}
+n = 500
+for label, (value, hint) in cases.items():
+    uncached = timeit.timeit(lambda: TypeAdapter(hint).dump_python(value, mode='json'), number=n) / n
+    cached = timeit.timeit(lambda: serialize_value(value, hint), number=n) / n
+    print(f"{label:16s} uncached: {uncached*1e6:8.1f} us/call   cached: {cached*1e6:6.1f} us/call   speedup: {uncached/cached:5.1f}x")
+print(type_adapter_cache_info())
@@ -0,0 +1,84 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: ctrlstack (3.11.14)
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # CPU-bound methods in worker processes
+#
+# Sync controller methods run in threads of the server process, so CPU-bound methods are serialised by the GIL:
+# a single server uses a single core, however many requests arrive at once.
+#
+# Methods declared with `process_pool=True` run in worker processes instead. Each worker holds its own copy of
+# the controller, built once when the worker starts. Calls only send the method name and arguments to a worker.
+
+# %%
+import asyncio
+import os
+import time
+import httpx
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.server import create_controller_server
+
+class PrimeController(Controller):
+    @ctrl_query_method
+    def count_primes_in_thread(self, limit: int) -> int:
+        """Count primes below `limit`, in the threadpool of the server."""
+        return sum(all(n % d for d in range(2, int(n ** 0.5) + 1)) for n in range(2, limit))
+
+    @ctrl_query_method(process_pool=True)
+    def count_primes(self, limit: int) -> int:
+        """Count primes below `limit`, in a worker process."""
+        return self.count_primes_in_thread(limit)
+
+# %% [markdown]
+# ## Where the controller copies come from
+#
+# The workers build their controllers with `controller_factory`. Without one, the controller given to the
+# server is pickled to each worker. `start_local_controller_server_process` passes its controller factory on.
+
+# %%
+app = create_controller_server(PrimeController(), controller_factory=PrimeController, process_workers=2)
+
+# %% [markdown]
+# ## Benchmark
+#
+# The benchmark sends 16 concurrent calls and measures the throughput, for the threadpool and for process pools
+# of increasing size. Workers are started (and their controllers built) before measuring, as they are when the
+# server starts up.
+#
+# Whether throughput grows with the number of workers depends on the cores of the machine, and has not been
+# measured here: the only runs so far were on a single CPU, where one worker matches the threadpool and more
+# workers cannot help. Run it on the target machine before relying on the process pool for speed.
+
+# %%
+CALLS = 16
+LIMIT = 60_000
+
+async def measure(app, route: str) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None) as client:
+        if app.state.process_pool is not None:
+            await app.state.process_pool.start()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[client.get(route, params={"limit": LIMIT}) for _ in range(CALLS)])
+        elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses)
+    return CALLS / elapsed
+
+async def benchmark():
+    baseline = await measure(create_controller_server(PrimeController()), "/query/count_primes_in_thread")
+    print(f"threadpool:  {baseline:6.1f} calls/s")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        app = create_controller_server(PrimeController(), controller_factory=PrimeController, process_workers=workers)
+        try:
+            throughput = await measure(app, "/query/count_primes")
+        finally:
+            app.state.process_pool.shutdown()
+        print(f"{workers:2d} workers:  {throughput:6.1f} calls/s ({throughput / baseline:.1f}x)")
+        workers *= 2
+
+asyncio.run(benchmark())
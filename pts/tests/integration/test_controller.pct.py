@@ -19,6 +19,8 @@ import nblite; nblite.nbl_export()
 # %%
 #|export
 import pytest
+from typing import AsyncIterator, Iterable, Iterator
+from pydantic import BaseModel
 from ctrlstack.controller import Controller, ControllerMethodType, ctrl_method, ctrl_cmd_method, ctrl_query_method
 
 # %%
@@ -64,6 +66,71 @@ def test_ctrl_method_invalid_group_int():
     with pytest.raises(ValueError, match="Group must be a string"):
         ctrl_method(ControllerMethodType.COMMAND, 123)
 
+# %%
+#|export
+# --- Execution options ---
+
+def _sync(self, x: int) -> int: pass
+async def _async(self, x: int) -> int: pass
+def _stream(self, n: int) -> Iterator[int]: yield n
+async def _async_stream(self, n: int) -> AsyncIterator[int]: yield n
+def _ingest(self, values: Iterable[int]) -> int: pass
+
+@pytest.mark.parametrize("options,match", [
+    (dict(background=True, max_concurrency=2), "job workers"),
+    (dict(thread_pool="io", process_pool=True), "thread pool or on the process pool"),
+    (dict(micro_batch="many", background=True), "Micro-batched"),
+    (dict(micro_batch="many", process_pool=True), "Micro-batched"),
+])
+def test_exclusive_execution_options(options, match):
+    with pytest.raises(ValueError, match=match):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)
+
+@pytest.mark.parametrize("func,options,match", [
+    (_async, dict(thread_pool="io"), "is async"),
+    (_async_stream, dict(thread_pool="io"), "is async"),
+    (_async, dict(process_pool=True), "process pool"),
+    (_stream, dict(process_pool=True), "process pool"),
+    (_ingest, dict(process_pool=True), "process pool"),
+    (_stream, dict(micro_batch="many"), "micro-batched"),
+    (_ingest, dict(micro_batch="many"), "micro-batched"),
+    (_stream, dict(background=True), "background job"),
+    (_ingest, dict(background=True), "background job"),
+])
+def test_execution_options_that_do_not_suit_the_method(func, options, match):
+    decorator = ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)
+    with pytest.raises(ValueError, match=match):
+        decorator(func)
+
+_resolved = []
+
+def _resolve_int():
+    _resolved.append(True)
+    return int
+
+def test_annotations_are_only_resolved_for_options_that_need_them():
+    def q(self, x: "_resolve_int()") -> int: pass
+    ctrl_method(ControllerMethodType.QUERY, "query", thread_pool="io", max_concurrency=2)(q)
+    assert _resolved == []
+    ctrl_method(ControllerMethodType.COMMAND, "cmd", background=True)(q)
+    assert _resolved == [True]
+
+def test_execution_options_that_suit_the_method():
+    for func, options in [(_sync, dict(thread_pool="io")), (_sync, dict(process_pool=True)), (_async, dict(micro_batch="many")),
+                          (_sync, dict(background=True, micro_batch=None)), (_stream, dict(max_concurrency=1))]:
+        assert ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)(func) is func
+
+@ctrl_cmd_method(micro_batch="many")  # `LaterItem` is not defined yet, so the streamed argument is not seen here
+def _ingest_later(self, values: "Iterable[LaterItem]") -> int: pass
+
+class LaterItem(BaseModel):
+    x: int
+
+def test_unresolved_annotations_are_checked_with_the_method_spec():
+    from ctrlstack.method_spec import compile_method_spec
+    with pytest.raises(ValueError, match="micro-batched"):
+        compile_method_spec(_ingest_later)
+
 # %%
 #|export
 # --- ctrl_cmd_method / ctrl_query_method ---
@@ -166,3 +233,39 @@ def test_inheritance_parent_unaffected():
     methods = ParentController.get_controller_methods()
     assert 'parent_cmd' in methods
     assert 'child_query' not in methods
+
+# %%
+#|export
+# --- Method registry ---
+
+def test_registry_built_at_class_definition():
+    assert '_controller_method_registry' in SampleController.__dict__
+    assert '_controller_method_registry' in ChildController.__dict__
+
+def test_get_controller_methods_returns_copy():
+    methods = SampleController.get_controller_methods()
+    methods.append('injected')
+    assert 'injected' not in SampleController.get_controller_methods()
+
+def test_registry_update_on_added_method():
+    class Parent(Controller):
+        @ctrl_cmd_method
+        def b(self): pass
+    class Child(Parent): pass
+    @ctrl_query_method
+    def a(self): pass
+    Parent.a = a
+    Parent._update_controller_method_registry('a')
+    assert Parent.get_controller_methods() == ['a', 'b']
+    assert Parent.get_controller_methods(method_type=ControllerMethodType.QUERY) == ['a']
+    assert Parent.get_controller_method_groups() == ['query', 'cmd']
+    assert Child.get_controller_methods(group='query') == ['a']
+
+def test_registry_update_on_replaced_method():
+    class MyCtrl(Controller):
+        @ctrl_cmd_method
+        def a(self): pass
+    MyCtrl.a = lambda self: None
+    MyCtrl._update_controller_method_registry('a')
+    assert MyCtrl.get_controller_methods() == []
+    assert MyCtrl.get_controller_methods(method_type=ControllerMethodType.COMMAND) == []
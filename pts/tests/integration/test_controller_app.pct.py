@@ -20,7 +20,7 @@ import nblite; nblite.nbl_export()
 #|export
 import pytest
 import asyncio
-from ctrlstack.controller import Controller, ControllerMethodType
+from ctrlstack.controller import Controller, ControllerMethodType, ctrl_query_method
 from ctrlstack.controller_app import ControllerApp, _add_method_to_class
 
 # %%
@@ -185,3 +185,12 @@ def test_add_method_to_class_uses_name():
     _add_method_to_class(original_name, TestCtrl, "custom_name")
     assert hasattr(TestCtrl, "custom_name")
     assert not hasattr(TestCtrl, "original_name")
+
+def test_add_method_to_class_updates_registry():
+    class TestCtrl(Controller): pass
+    class SubCtrl(TestCtrl): pass
+    @ctrl_query_method
+    def my_func(): return "x"
+    _add_method_to_class(my_func, TestCtrl, "my_query")
+    assert TestCtrl.get_controller_methods(method_type=ControllerMethodType.QUERY) == ['my_query']
+    assert SubCtrl.get_controller_methods(group='query') == ['my_query']
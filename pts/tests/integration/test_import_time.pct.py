@@ -0,0 +1,83 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_import_time
+
+# %%
+#|default_exp test_import_time
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import json
+import subprocess
+import sys
+import textwrap
+
+# %%
+#|export
+_SERVER_MODULES = ["fastapi", "starlette", "uvicorn", "ctrlstack.server"]
+
+# Importing the remote CLI takes about 0.6 of the time of importing the server (0.3s vs 0.5s), in a fresh interpreter.
+# The budget is relative, so that it holds on machines of any speed.
+_IMPORT_BUDGET = 0.8
+
+_TIME_IMPORT = '''
+    import json, sys, time
+    start = time.perf_counter()
+    from {module} import {name}
+    print(json.dumps({{"seconds": time.perf_counter() - start}}))
+'''
+
+def _run(code: str, *args: str) -> dict:
+    """Run `code` in a fresh interpreter, which prints a JSON object as its last line."""
+    res = subprocess.run([sys.executable, "-c", textwrap.dedent(code), *args], capture_output=True, text=True, timeout=60)
+    assert res.returncode == 0, res.stderr
+    return json.loads(res.stdout.splitlines()[-1])
+
+# %%
+#|export
+def test_remote_cli_import_does_not_load_the_server():
+    result = _run('''
+        import json, sys
+        from ctrlstack.remote_cli import create_remote_controller_cli
+        from ctrlstack.remote_controller import create_remote_controller
+        print(json.dumps({"modules": sorted(sys.modules)}))
+    ''')
+    assert not set(_SERVER_MODULES) & set(result["modules"])
+
+def test_remote_cli_import_budget():
+    cli_seconds, server_seconds = [], []
+    for _ in range(3):  # Interleaved, and the fastest of each kept, to damp the noise of the machine
+        cli_seconds.append(_run(_TIME_IMPORT.format(module="ctrlstack.remote_cli", name="create_remote_controller_cli"))["seconds"])
+        server_seconds.append(_run(_TIME_IMPORT.format(module="ctrlstack.server", name="create_controller_server"))["seconds"])
+    assert min(cli_seconds) < _IMPORT_BUDGET * min(server_seconds)
+
+def test_local_mode_cli_does_not_load_the_server(tmp_path):
+    result = _run('''
+        import json, sys
+        from typer.testing import CliRunner
+        from ctrlstack import Controller, ctrl_query_method
+        from ctrlstack.remote_cli import create_remote_controller_cli
+
+        class FooController(Controller):
+            @ctrl_query_method
+            def foo(self) -> int:
+                return 1
+
+        app = create_remote_controller_cli(FooController, local_mode=True, controller=FooController, lockfile_path=sys.argv[1])
+        outputs = [CliRunner().invoke(app, args).stdout for args in (["--help"], ["get-server-status"], ["stop-local-server"])]
+        print(json.dumps({"outputs": outputs, "modules": sorted(sys.modules)}))
+    ''', str(tmp_path / "server.lock"))
+    assert "start-local-server" in result["outputs"][0]
+    assert result["outputs"][1:] == ["No local server is running.\n", "No local server running.\n"]
+    assert not set(_SERVER_MODULES) & set(result["modules"])
@@ -0,0 +1,241 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_jobs
+
+# %%
+#|default_exp test_jobs
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import json
+import threading
+import time
+import pytest
+import uvicorn
+from fastapi import HTTPException
+from typer.testing import CliRunner
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError, JobHandle, AsyncJobHandle
+from ctrlstack.remote_cli import create_remote_controller_cli
+from ctrlstack.protocol import BATCH_ROUTE, JOBS_ROUTE, JobInfo, JobStatus, job_route
+from fastapi.testclient import TestClient
+
+# %%
+#|export
+class JobController(Controller):
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.started = []
+
+    @ctrl_cmd_method(background=True)
+    def long_sync(self, x: int) -> int:
+        self.started.append(x)
+        self.release.wait(timeout=10)
+        return x * 2
+
+    @ctrl_cmd_method(background=True)
+    async def long_async(self, x: int) -> int:
+        self.started.append(x)
+        await asyncio.sleep(0.05)
+        return x * 3
+
+    @ctrl_cmd_method(background=True)
+    async def sleeper(self) -> int:
+        await asyncio.sleep(10)
+        return 0
+
+    @ctrl_cmd_method(background=True)
+    def failing(self) -> int:
+        raise HTTPException(status_code=409, detail="nope")
+
+    @ctrl_cmd_method
+    def quick(self) -> int:
+        return 1
+
+def _wait_result(client, job_id, wait=5):
+    return client.get(job_route(job_id, "result"), params={"wait": wait})
+
+# %%
+#|export
+def test_background_option_is_command_only():
+    assert get_method_spec(JobController, "long_sync").background
+    assert not get_method_spec(JobController, "quick").background
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.QUERY, "q", background=True)
+
+def test_no_job_routes_without_background_methods():
+    class Plain(Controller):
+        @ctrl_query_method
+        def q(self) -> int:
+            return 1
+    with TestClient(create_controller_server(Plain())) as client:
+        assert client.get(JOBS_ROUTE).status_code == 404
+
+def test_submit_returns_job_id_immediately():
+    ctrl = JobController()
+    ctrl.release.clear()
+    with TestClient(create_controller_server(ctrl)) as client:
+        response = client.post("/cmd/long_sync", params={"x": 4})
+        assert response.status_code == 202
+        info = JobInfo.model_validate(response.json())
+        assert info.method == "long_sync"
+        assert client.get(job_route(info.job_id)).json()["status"] in ("pending", "running")
+
+        ctrl.release.set()
+        assert _wait_result(client, info.job_id).json() == {"result": 8}
+        assert client.get(job_route(info.job_id)).json()["status"] == "succeeded"
+
+def test_result_of_unfinished_job_is_accepted():
+    ctrl = JobController()
+    ctrl.release.clear()
+    with TestClient(create_controller_server(ctrl)) as client:
+        job_id = client.post("/cmd/long_sync", params={"x": 1}).json()["job_id"]
+        response = _wait_result(client, job_id, wait=0.05)
+        assert response.status_code == 202
+        assert response.json()["job_id"] == job_id
+        ctrl.release.set()
+        assert _wait_result(client, job_id).json() == {"result": 2}
+
+def test_failed_job_reports_its_error():
+    with TestClient(create_controller_server(JobController())) as client:
+        job_id = client.post("/cmd/failing").json()["job_id"]
+        response = _wait_result(client, job_id)
+        assert response.status_code == 409
+        assert response.json() == {"detail": "nope"}
+        info = client.get(job_route(job_id)).json()
+        assert info["status"] == "failed"
+        assert info["error"] == {"status_code": 409, "detail": "nope"}
+
+def test_worker_pool_is_bounded():
+    ctrl = JobController()
+    ctrl.release.clear()
+    with TestClient(create_controller_server(ctrl, job_workers=2)) as client:
+        job_ids = [client.post("/cmd/long_sync", params={"x": i}).json()["job_id"] for i in range(4)]
+        time.sleep(0.2)
+        statuses = [client.get(job_route(job_id)).json()["status"] for job_id in job_ids]
+        assert statuses == ["running", "running", "pending", "pending"]
+        ctrl.release.set()
+        assert [_wait_result(client, job_id).json()["result"] for job_id in job_ids] == [0, 2, 4, 6]
+
+def test_cancel_pending_and_running_jobs():
+    ctrl = JobController()
+    with TestClient(create_controller_server(ctrl, job_workers=1)) as client:
+        running = client.post("/cmd/sleeper").json()["job_id"]
+        pending = client.post("/cmd/long_async", params={"x": 1}).json()["job_id"]
+        assert client.post(job_route(pending, "cancel")).json()["cancel_requested"]
+        client.post(job_route(running, "cancel"))
+        for job_id in [running, pending]:
+            assert _wait_result(client, job_id).status_code == 409
+            assert client.get(job_route(job_id)).json()["status"] == "cancelled"
+        assert ctrl.started == []  # The pending job never started
+
+def test_cancel_running_sync_job_discards_result():
+    ctrl = JobController()
+    ctrl.release.clear()
+    with TestClient(create_controller_server(ctrl)) as client:
+        job_id = client.post("/cmd/long_sync", params={"x": 1}).json()["job_id"]
+        time.sleep(0.1)
+        client.post(job_route(job_id, "cancel"))
+        assert client.get(job_route(job_id)).json()["status"] == "running"  # Cannot interrupt the thread
+        ctrl.release.set()
+        assert _wait_result(client, job_id).status_code == 409
+        assert client.get(job_route(job_id)).json()["status"] == "cancelled"
+
+def test_list_jobs_and_result_ttl():
+    app = create_controller_server(JobController(), job_result_ttl=60)
+    now = [1000.0]
+    app.state.jobs.clock = lambda: now[0]
+    with TestClient(app) as client:
+        job_ids = [client.post("/cmd/long_async", params={"x": i}).json()["job_id"] for i in range(2)]
+        for job_id in job_ids:
+            _wait_result(client, job_id)
+        assert sorted(info["job_id"] for info in client.get(JOBS_ROUTE).json()) == sorted(job_ids)
+        now[0] += 61
+        assert client.get(JOBS_ROUTE).json() == []
+        assert client.get(job_route(job_ids[0])).status_code == 404
+
+def test_background_methods_cannot_be_batched():
+    with TestClient(create_controller_server(JobController(), enable_batch=True)) as client:
+        response = client.post(BATCH_ROUTE, json=[{"method": "long_async", "args": {"x": 1}}])
+        assert response.json()[0]["error"]["status_code"] == 400
+
+# %%
+#|export
+@pytest.fixture(scope="module")
+def server_port():
+    port = _find_free_port()
+    config = uvicorn.Config(create_controller_server(JobController()), host="127.0.0.1", port=port, log_level="error")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield port
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_remote_sync_job_handle(server_port):
+    with create_remote_controller(JobController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        job = remote.long_async(5)
+        assert isinstance(job, JobHandle)
+        assert job.result() == 15
+        assert job.status().status == JobStatus.SUCCEEDED
+        assert job.job_id in [info.job_id for info in remote.list_jobs()]
+        assert remote.get_job(job.job_id, "long_async").result() == 15
+        assert remote.quick() == 1
+
+        with pytest.raises(RemoteCallError) as exc_info:
+            remote.failing().result()
+        assert exc_info.value.status_code == 409
+
+def test_remote_async_job_handle(server_port):
+    async def run():
+        async with create_remote_controller(JobController, url=f"http://localhost:{server_port}") as remote:
+            job = await remote.long_async(2)
+            assert isinstance(job, AsyncJobHandle)
+            assert await job == 6
+            assert (await job.status()).status == JobStatus.SUCCEEDED
+
+            sleeper = await remote.sleeper()
+            with pytest.raises(TimeoutError):
+                await sleeper.result(timeout=0.1)
+            await sleeper.cancel()
+            with pytest.raises(RemoteCallError):
+                await sleeper
+            return (await sleeper.status()).status
+
+    assert asyncio.run(run()) == JobStatus.CANCELLED
+
+def test_remote_cli_detach_and_job_status(server_port):
+    runner = CliRunner()
+    app = create_remote_controller_cli(JobController, url=f"http://localhost:{server_port}")
+
+    result = runner.invoke(app, ["long_async", "4"])
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "12"
+
+    result = runner.invoke(app, ["--detach", "long_async", "7"])
+    assert result.exit_code == 0
+    job_id = result.stdout.strip()
+
+    result = runner.invoke(app, ["job-result", job_id])
+    assert result.stdout.strip() == "21"
+    result = runner.invoke(app, ["job-status", job_id])
+    assert json.loads(result.stdout)["status"] == "succeeded"
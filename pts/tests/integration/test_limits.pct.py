@@ -0,0 +1,180 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_limits
+
+# %%
+#|default_exp test_limits
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from typing import AsyncIterator
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.limits import ConcurrencyLimit
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError
+
+# %%
+#|export
+class BusyController(Controller):
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def _work(self, seconds: float):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.running -= 1
+
+    @ctrl_cmd_method(max_concurrency=2, max_queue=2)
+    async def heavy(self, seconds: float = 0.1) -> str:
+        await self._work(seconds)
+        return "done"
+
+    @ctrl_cmd_method
+    async def other(self, seconds: float = 0.1) -> str:
+        await self._work(seconds)
+        return "done"
+
+    @ctrl_query_method
+    async def cheap(self) -> int:
+        return 1
+
+    @ctrl_query_method(max_concurrency=1, max_queue=0)
+    async def rows(self, n: int) -> AsyncIterator[int]:
+        for i in range(n):
+            await asyncio.sleep(0.01)
+            yield i
+
+    @ctrl_cmd_method(max_concurrency=1, max_queue=0)
+    def sync_heavy(self, seconds: float = 0.3) -> str:
+        time.sleep(seconds)
+        return "done"
+
+async def _gather_requests(app, requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*[client.request(method, url, params=params) for method, url, params in requests])
+
+# %%
+#|export
+def test_limit_options():
+    spec = get_method_spec(BusyController, "heavy")
+    assert (spec.max_concurrency, spec.max_queue) == (2, 2)
+    assert get_method_spec(BusyController, "other").max_concurrency is None
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", max_concurrency=0)
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", max_queue=3)
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", max_concurrency=1, background=True)
+    with pytest.raises(ValueError):
+        create_controller_server(BusyController(), method_limits={"missing": ConcurrencyLimit(1)})
+
+def test_overflow_is_rejected_with_retry_after():
+    ctrl = BusyController()
+    app = create_controller_server(ctrl, enable_stats=True)
+    responses = asyncio.run(_gather_requests(app, [("POST", "/cmd/heavy", {})] * 6))
+    assert [r.status_code for r in responses] == [200] * 4 + [429] * 2
+    assert all(int(r.headers["Retry-After"]) >= 1 for r in responses[4:])
+    assert ctrl.peak == 2
+    assert app.state.limits.stats()["methods"]["heavy"] == {
+        "max_concurrency": 2, "max_queue": 2, "active": 0, "queued": 0, "admitted": 4, "rejected": 2,
+    }
+
+def test_cheap_queries_are_not_held_up():
+    app = create_controller_server(BusyController())
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            heavy = [asyncio.ensure_future(client.post("/cmd/heavy", params={"seconds": 0.5})) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            assert (await client.get("/query/cheap")).json() == 1
+            elapsed = time.monotonic() - start
+            await asyncio.gather(*heavy)
+            return elapsed
+    assert asyncio.run(run()) < 0.25
+
+def test_group_limits_are_shared_across_methods():
+    ctrl = BusyController()
+    app = create_controller_server(ctrl, group_limits={"cmd": ConcurrencyLimit(1, max_queue=1)})
+    responses = asyncio.run(_gather_requests(app, [("POST", "/cmd/heavy", {}), ("POST", "/cmd/other", {}), ("POST", "/cmd/other", {})]))
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert ctrl.peak == 1
+
+def test_server_limits_override_decorator():
+    ctrl = BusyController()
+    app = create_controller_server(ctrl, method_limits={"heavy": ConcurrencyLimit(1)})
+    responses = asyncio.run(_gather_requests(app, [("POST", "/cmd/heavy", {"seconds": 0.01})] * 6))
+    assert all(r.status_code == 200 for r in responses)  # Unbounded queue
+    assert ctrl.peak == 1
+
+def test_stream_holds_its_slot_until_consumed():
+    app = create_controller_server(BusyController())
+    responses = asyncio.run(_gather_requests(app, [("GET", "/query/rows", {"n": 5})] * 2))
+    assert sorted(r.status_code for r in responses) == [200, 429]
+    assert app.state.limits.stats()["methods"]["rows"]["active"] == 0
+
+# %%
+#|export
+@pytest.fixture(scope="module")
+def server_port():
+    port = _find_free_port()
+    config = uvicorn.Config(create_controller_server(BusyController()), host="127.0.0.1", port=port, log_level="error")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield port
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def _call_concurrently(port, busy_retries):
+    results = []
+    def call():
+        with create_remote_controller(BusyController, url=f"http://localhost:{port}", mode="sync", busy_retries=busy_retries) as remote:
+            try:
+                results.append(remote.sync_heavy())
+            except RemoteCallError as e:
+                results.append(e.status_code)
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_remote_controller_honours_retry_after(server_port):
+    assert _call_concurrently(server_port, busy_retries=1) == ["done", "done"]
+
+def test_remote_controller_without_retries(server_port):
+    assert _call_concurrently(server_port, busy_retries=0) == [429, "done"]
+
+def test_async_remote_controller_retries(server_port):
+    async def run():
+        async with create_remote_controller(BusyController, url=f"http://localhost:{server_port}") as remote:
+            return await asyncio.gather(remote.sync_heavy(0.2), remote.sync_heavy(0.2))
+    assert asyncio.run(run()) == ["done", "done"]
@@ -0,0 +1,214 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_manifest
+
+# %%
+#|default_exp test_manifest
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import ast
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import pytest
+import uvicorn
+from enum import Enum
+from typing import Iterator, List, Optional
+from pydantic import BaseModel
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, fetch_manifest, JobHandle, RemoteCallError
+from ctrlstack.remote_cli import create_remote_controller_cli
+from ctrlstack.manifest import build_manifest, controller_cls_from_manifest, load_manifest
+from ctrlstack.protocol import MANIFEST_ROUTE, ControllerManifest
+from ctrlstack.transport import HTTPTransport
+from fastapi.testclient import TestClient
+
+# %%
+#|export
+class Color(str, Enum):
+    RED = "red"
+    BLUE = "blue"
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+class ShapeController(Controller):
+    @ctrl_query_method
+    def paint(self, color: Color, times: Optional[int] = 1) -> str:
+        """Paint in a color."""
+        return color.value * (times or 0)
+
+    @ctrl_query_method
+    async def shift(self, point: Point, dx: int = 1) -> Point:
+        return Point(x=point.x + dx, y=point.y)
+
+    @ctrl_query_method
+    def count(self, n: int) -> Iterator[int]:
+        yield from range(n)
+
+    @ctrl_cmd_method
+    def total(self, values: Iterator[int], scale: int = 1) -> int:
+        return scale * sum(values)
+
+    @ctrl_cmd_method(background=True)
+    async def slow(self, seconds: float) -> List[int]:
+        await asyncio.sleep(seconds)
+        return [1, 2]
+
+# %%
+#|export
+def test_manifest_route_is_opt_in():
+    assert TestClient(create_controller_server(ShapeController())).get(MANIFEST_ROUTE).status_code == 404
+
+def test_manifest_route():
+    client = TestClient(create_controller_server(ShapeController(), enable_manifest=True))
+    response = client.get(MANIFEST_ROUTE)
+    manifest = ControllerManifest.model_validate(response.json())
+    assert manifest == build_manifest(ShapeController)
+    assert response.headers["ETag"] == f'"{manifest.hash}"'
+    assert [m.name for m in manifest.methods] == ["count", "paint", "shift", "slow", "total"]
+
+    response = client.get(MANIFEST_ROUTE, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304 and response.content == b""
+    assert client.get(MANIFEST_ROUTE, headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_manifest_route_requires_api_key():
+    client = TestClient(create_controller_server(ShapeController(), enable_manifest=True, api_keys=["key"]))
+    assert client.get(MANIFEST_ROUTE).status_code == 401
+    assert client.get(MANIFEST_ROUTE, headers={"X-API-Key": "key"}).status_code == 200
+
+def test_manifest_hash_changes_with_the_methods():
+    class OtherController(ShapeController):
+        @ctrl_query_method
+        def paint(self, color: Color, times: int = 2) -> str:
+            return ""
+    assert build_manifest(OtherController).hash != build_manifest(ShapeController).hash
+    assert build_manifest(ShapeController).hash == build_manifest(ShapeController).hash
+
+def test_local_mode_needs_a_controller():
+    with pytest.raises(ValueError, match="'controller' must be given"):
+        create_remote_controller_cli(build_manifest(ShapeController), local_mode=True, lockfile_path="/tmp/unused.lock")
+
+# %%
+#|export
+@pytest.fixture(scope="module")
+def server_url():
+    port = _find_free_port()
+    server = uvicorn.Server(uvicorn.Config(create_controller_server(ShapeController(), enable_manifest=True), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield f"http://localhost:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_remote_controller_from_manifest(server_url):
+    manifest = fetch_manifest(server_url)
+    with create_remote_controller(manifest, url=server_url, mode="sync") as remote:
+        assert remote.paint(Color.BLUE, times=2) == "blueblue"
+        assert remote.paint("red") == "red"
+        assert remote.shift({"x": 1, "y": 2}, dx=3) == {"x": 4, "y": 2}  # Results are not typed
+        assert list(remote.count(3)) == [0, 1, 2]
+        assert remote.total(iter([1, 2, 3]), scale=2) == 12
+        job = remote.slow(0.01)
+        assert isinstance(job, JobHandle) and job.result() == [1, 2]
+        with pytest.raises(RemoteCallError):
+            remote.paint("green")
+
+    async def run():
+        async with create_remote_controller(manifest, url=server_url) as remote:
+            return await remote.shift(Point(x=0, y=0))
+    assert asyncio.run(run()) == {"x": 1, "y": 0}
+
+def test_fetch_manifest_cache(server_url, tmp_path):
+    cache_path = str(tmp_path / "manifest.json")
+    manifest = fetch_manifest(server_url, cache_path=cache_path)
+    assert load_manifest(cache_path) == manifest
+
+    # Used without contacting the server while fresh
+    assert fetch_manifest("http://localhost:1", cache_path=cache_path) == manifest
+    assert fetch_manifest("http://localhost:1", cache_path=cache_path, max_age=60) == manifest
+
+    # Revalidated once stale: unchanged, so kept and made fresh again
+    os.utime(cache_path, (0, 0))
+    assert fetch_manifest(server_url, cache_path=cache_path, max_age=60) == manifest
+    assert time.time() - os.path.getmtime(cache_path) < 60
+
+    # Replaced if the server has another manifest
+    stale = manifest.model_copy(update={"methods": manifest.methods[:1], "hash": "stale"})
+    (tmp_path / "manifest.json").write_text(stale.model_dump_json())
+    os.utime(cache_path, (0, 0))
+    assert fetch_manifest(server_url, cache_path=cache_path, max_age=60) == manifest
+    assert load_manifest(cache_path) == manifest
+
+    with pytest.raises(RemoteCallError):
+        fetch_manifest(server_url + "/nowhere")
+
+def test_fetch_manifest_over_uds(tmp_path):
+    socket_path = str(tmp_path / "server.sock")
+    server = uvicorn.Server(uvicorn.Config(create_controller_server(ShapeController(), enable_manifest=True), uds=socket_path, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    try:
+        manifest = fetch_manifest("http://localhost", uds=socket_path)
+        assert manifest == build_manifest(ShapeController)
+        with HTTPTransport(uds=socket_path) as transport:
+            assert fetch_manifest("http://localhost", transport=transport) == manifest
+            assert transport._client is not None  # Left open for its owner
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+def test_remote_cli_from_manifest(server_url):
+    app = create_remote_controller_cli(fetch_manifest(server_url), url=server_url)
+    runner = CliRunner()
+    help_text = runner.invoke(app, ["paint", "--help"]).stdout
+    assert "Paint in a color." in help_text and "red" in help_text and "blue" in help_text
+    assert runner.invoke(app, ["paint", "red", "--times", "2"]).stdout.strip() == "redred"
+    assert ast.literal_eval(runner.invoke(app, ["shift", '{"x": 1, "y": 1}']).stdout) == {"x": 2, "y": 1}
+    assert runner.invoke(app, ["count", "2"]).stdout.split() == ["0", "1"]
+    assert runner.invoke(app, ["total", "[1, 2]"]).stdout.strip() == "3"
+    assert runner.invoke(app, ["slow", "0"]).stdout.strip() == "[1, 2]"
+    assert "job-status" in runner.invoke(app, ["--help"]).stdout
+
+def test_thin_cli_does_not_import_the_controller(server_url, tmp_path):
+    cache_path = str(tmp_path / "manifest.json")
+    fetch_manifest(server_url, cache_path=cache_path)
+    script = textwrap.dedent('''
+        import sys
+        from ctrlstack.remote_controller import fetch_manifest
+        from ctrlstack.remote_cli import create_remote_controller_cli
+        url, cache_path = sys.argv[1], sys.argv[2]
+        app = create_remote_controller_cli(fetch_manifest(url, cache_path=cache_path), url=url)
+        assert "pydantic" in sys.modules and not any(name.startswith("test_manifest") for name in sys.modules)
+        app(sys.argv[3:])
+    ''')
+    res = subprocess.run([sys.executable, "-c", script, server_url, cache_path, "paint", "blue"], capture_output=True, text=True, timeout=30)
+    assert res.returncode == 0, res.stderr
+    assert res.stdout.strip() == "blue"
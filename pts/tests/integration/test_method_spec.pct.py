@@ -0,0 +1,145 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_method_spec
+
+# %%
+#|default_exp test_method_spec
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import pytest
+from enum import Enum
+from typing import Optional, List, Dict
+from pydantic import BaseModel
+from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
+from ctrlstack.controller_app import _add_method_to_class
+from ctrlstack.method_spec import MethodSpec, compile_method_spec, get_method_spec, compile_method_specs
+
+# %%
+#|export
+class Priority(Enum):
+    LOW = "low"
+    HIGH = "high"
+
+class MyModel(BaseModel):
+    name: str
+    value: int
+
+class SpecController(Controller):
+    @ctrl_cmd_method
+    def create(self, tag: str, model: MyModel, p: Priority = Priority.LOW) -> MyModel:
+        return model
+
+    @ctrl_query_method
+    async def list_models(self, limit: Optional[int] = None) -> List[MyModel]:
+        return []
+
+    @ctrl_method(ControllerMethodType.QUERY, "")
+    def ping(self, payload=None):
+        return "pong"
+
+# %%
+#|export
+# --- MethodSpec compilation ---
+
+def test_spec_signature_excludes_self():
+    spec = get_method_spec(SpecController, 'create')
+    assert list(spec.signature.parameters) == ['tag', 'model', 'p']
+
+def test_spec_query_body_split():
+    spec = get_method_spec(SpecController, 'create')
+    assert spec.query_params == ['tag', 'p']
+    assert spec.body_params == ['model']
+    assert set(spec.arg_adapters) == {'tag', 'model', 'p'}
+
+def test_spec_metadata():
+    spec = get_method_spec(SpecController, 'list_models')
+    assert spec.method_type == ControllerMethodType.QUERY
+    assert spec.group == 'query'
+    assert spec.is_async is True
+    assert spec.return_type == List[MyModel]
+
+def test_spec_routes():
+    assert get_method_spec(SpecController, 'create').get_route(True) == "/cmd/create"
+    assert get_method_spec(SpecController, 'create').get_route(False) == "/create"
+    assert get_method_spec(SpecController, 'ping').get_route(True) == "/ping"
+
+def test_spec_no_return_adapter_for_none():
+    spec = get_method_spec(SpecController, 'ping')
+    assert spec.return_adapter is None
+    assert spec.decode_result({"a": 1}) == {"a": 1}
+
+# %%
+#|export
+# --- Caching ---
+
+def test_get_method_spec_is_cached():
+    assert get_method_spec(SpecController, 'create') is get_method_spec(SpecController, 'create')
+
+def test_compile_method_specs_eager():
+    class MyCtrl(Controller):
+        @ctrl_cmd_method
+        def a(self): pass
+        @ctrl_query_method
+        def b(self): pass
+    specs = compile_method_specs(MyCtrl)
+    assert list(specs) == ['a', 'b']
+    assert MyCtrl._get_controller_method_registry().specs == specs
+
+def test_get_method_spec_unknown_method():
+    with pytest.raises(AttributeError, match="no controller method"):
+        get_method_spec(SpecController, 'nope')
+
+def test_spec_invalidated_when_method_replaced():
+    class MyCtrl(Controller): pass
+    @ctrl_query_method
+    def a(x: int) -> int: return x
+    _add_method_to_class(a, MyCtrl, 'a')
+    spec1 = get_method_spec(MyCtrl, 'a')
+    @ctrl_query_method
+    def a2(x: str) -> str: return x
+    _add_method_to_class(a2, MyCtrl, 'a')
+    spec2 = get_method_spec(MyCtrl, 'a')
+    assert spec1 is not spec2
+    assert spec2.arg_types == {'x': str}
+
+def test_compile_method_spec_not_shared_with_wrappers():
+    import functools
+    def f(self, x: int) -> int: return x
+    spec = compile_method_spec(f)
+    @functools.wraps(f)
+    def g(self, *args, **kwargs): return f(self, *args, **kwargs)
+    assert compile_method_spec(f) is spec
+    assert compile_method_spec(g).func is g
+
+# %%
+#|export
+# --- Request encoding ---
+
+def test_prepare_request_args():
+    spec = get_method_spec(SpecController, 'create')
+    params, body = spec.prepare_request_args(["t", MyModel(name="a", value=1)], {'p': Priority.HIGH})
+    assert params == {'tag': 't', 'p': 'high'}
+    assert body == {'name': 'a', 'value': 1}
+
+def test_prepare_request_args_unannotated_uses_runtime_type():
+    spec = get_method_spec(SpecController, 'ping')
+    assert spec.prepare_request_args([3], {}) == ({'payload': 3}, {})
+    assert spec.prepare_request_args([[1, 2]], {}) == ({}, [1, 2])
+
+def test_decode_result():
+    spec = get_method_spec(SpecController, 'list_models')
+    res = spec.decode_result([{'name': 'a', 'value': 1}])
+    assert res == [MyModel(name='a', value=1)]
+    assert spec.decode_result(None) is None
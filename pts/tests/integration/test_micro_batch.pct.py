@@ -0,0 +1,163 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_micro_batch
+
+# %%
+#|default_exp test_micro_batch
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from typing import Iterator, List
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.protocol import BATCH_ROUTE
+from ctrlstack.server import create_controller_server
+
+# %%
+#|export
+class Item(BaseModel):
+    name: str
+    weight: float
+
+class ScoreController(Controller):
+    def __init__(self):
+        self.batches: List[int] = []
+
+    @ctrl_query_method(micro_batch="score_many", batch_max_size=8, batch_max_wait=0.02)
+    def score(self, item: Item, scale: float = 1.0) -> float:
+        return self.score_many([item], [scale])[0]
+
+    def score_many(self, item: List[Item], scale: List[float]) -> List[float]:
+        self.batches.append(len(item))
+        return [i.weight * s for i, s in zip(item, scale)]
+
+    @ctrl_query_method(micro_batch="alength_many", batch_max_wait=0.02)
+    async def alength(self, text: str) -> int:
+        return (await self.alength_many([text]))[0]
+
+    async def alength_many(self, text: List[str]) -> List[int]:
+        self.batches.append(len(text))
+        return [len(t) for t in text]
+
+    @ctrl_query_method(micro_batch="refuse_many", batch_max_wait=0.02)
+    def refuse(self, x: int) -> int:
+        pass
+
+    def refuse_many(self, x: List[int]) -> List[int]:
+        if 0 in x:
+            raise HTTPException(status_code=409, detail="zero in batch")
+        return x[:-1]  # One result short
+
+async def _gather(app, requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test") as client:
+        return await asyncio.gather(*[client.request(method, url, **kwargs) for method, url, kwargs in requests])
+
+def _score_request(i):
+    return ("GET", "/query/score", dict(params={"scale": 2}, json={"name": f"i{i}", "weight": i}))
+
+# %%
+#|export
+def test_micro_batch_options():
+    spec = get_method_spec(ScoreController, "score")
+    assert (spec.micro_batch, spec.batch_max_size, spec.batch_max_wait) == ("score_many", 8, 0.02)
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.QUERY, "query", micro_batch="many", batch_max_size=0)
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", micro_batch="many", background=True)
+
+    with pytest.raises(ValueError, match="cannot be micro-batched"):
+        class StreamBatched(Controller):
+            @ctrl_query_method(micro_batch="rows_many")
+            def rows(self, n: int) -> Iterator[int]:
+                yield n
+
+def test_missing_implementation():
+    class Missing(Controller):
+        @ctrl_query_method(micro_batch="nope")
+        def q(self, x: int) -> int:
+            return x
+    with pytest.raises(ValueError):
+        create_controller_server(Missing())
+
+def test_concurrent_calls_are_batched():
+    ctrl = ScoreController()
+    app = create_controller_server(ctrl)
+    responses = asyncio.run(_gather(app, [_score_request(i) for i in range(20)]))
+    assert [r.json() for r in responses] == [2.0 * i for i in range(20)]
+    assert ctrl.batches == [8, 8, 4]
+
+    stats = app.state.micro_batcher.stats()["score"]
+    assert (stats["calls"], stats["batches"], stats["errors"]) == (20, 3, 0)
+    assert stats["mean_batch_size"] == pytest.approx(20 / 3)
+    assert stats["batch_sizes"]["4"] == 1 and stats["batch_sizes"]["8"] == 3
+    assert stats["waits"]["+Inf"] == 20
+
+def test_single_call_waits_at_most_batch_max_wait():
+    ctrl = ScoreController()
+    app = create_controller_server(ctrl)
+    [response] = asyncio.run(_gather(app, [_score_request(3)]))
+    assert response.json() == 6.0
+    assert ctrl.batches == [1]
+    assert app.state.micro_batcher.info("score").waits["0.05"] == 1
+
+def test_async_implementation():
+    ctrl = ScoreController()
+    app = create_controller_server(ctrl)
+    responses = asyncio.run(_gather(app, [("GET", "/query/alength", dict(params={"text": "x" * i})) for i in range(5)]))
+    assert [r.json() for r in responses] == list(range(5))
+    assert ctrl.batches == [5]
+
+def test_errors_reach_every_caller():
+    app = create_controller_server(ScoreController())
+    responses = asyncio.run(_gather(app, [("GET", "/query/refuse", dict(params={"x": x})) for x in [0, 1]]))
+    assert [r.status_code for r in responses] == [409, 409]
+
+    # A result list of the wrong length is an error of the implementation
+    responses = asyncio.run(_gather(app, [("GET", "/query/refuse", dict(params={"x": x})) for x in [1, 2]]))
+    assert [r.status_code for r in responses] == [500, 500]
+    assert app.state.micro_batcher.info("refuse").errors == 2
+
+def test_shutdown_runs_collecting_calls():
+    ctrl = ScoreController()
+    app = create_controller_server(ctrl)
+
+    async def run():
+        method, url, kwargs = _score_request(1)
+        request = asyncio.ensure_future(_gather(app, [(method, url, kwargs)]))
+        while app.state.micro_batcher.info("score").calls == 0:
+            await asyncio.sleep(0.001)
+        await app.state.micro_batcher.shutdown()
+        assert ctrl.batches == [1]  # Ran without waiting for batch_max_wait
+        [response] = await request
+        return response.json()
+    assert asyncio.run(run()) == 2.0
+    handlers = app.router.on_shutdown
+    assert handlers.index(app.state.micro_batcher.shutdown) < handlers.index(app.state.thread_pools.shutdown)
+
+def test_batch_route_calls_are_micro_batched():
+    ctrl = ScoreController()
+    app = create_controller_server(ctrl, enable_batch=True)
+    calls = [{"method": "score", "args": {"item": {"name": "a", "weight": w}}} for w in range(3)]
+    [response] = asyncio.run(_gather(app, [("POST", BATCH_ROUTE, dict(json=calls))]))
+    assert response.json() == [{"result": float(w)} for w in range(3)]
+    assert ctrl.batches == [3]
+
+def test_local_calls_use_the_single_item_method():
+    ctrl = ScoreController()
+    assert ctrl.score(Item(name="a", weight=2), scale=3) == 6.0
@@ -0,0 +1,132 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_process_pool
+
+# %%
+#|default_exp test_process_pool
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import os
+import time
+import httpx
+import pytest
+from fastapi import HTTPException
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.protocol import STATS_ROUTE, job_route
+from ctrlstack.server import create_controller_server
+from fastapi.testclient import TestClient
+
+# %%
+#|export
+class CpuController(Controller):
+    def __init__(self, label: str = "default"):
+        self.label = label
+        self.calls = 0
+
+    @ctrl_query_method(process_pool=True)
+    def fib(self, n: int) -> int:
+        return n if n < 2 else self.fib(n - 1) + self.fib(n - 2)
+
+    @ctrl_query_method(process_pool=True)
+    def whoami(self, seconds: float = 0.0) -> dict:
+        time.sleep(seconds)
+        self.calls += 1
+        return {"pid": os.getpid(), "label": self.label, "calls": self.calls}
+
+    @ctrl_cmd_method(process_pool=True)
+    def refuse(self) -> int:
+        raise HTTPException(status_code=409, detail="refused")
+
+    @ctrl_cmd_method(process_pool=True, background=True)
+    def crunch(self, n: int) -> int:
+        return sum(i * i for i in range(n))
+
+    @ctrl_query_method
+    def local_pid(self) -> int:
+        return os.getpid()
+
+def _labelled_factory():
+    return CpuController(label="factory")
+
+# %%
+#|export
+def test_process_pool_option():
+    assert get_method_spec(CpuController, "fib").process_pool
+    assert not get_method_spec(CpuController, "local_pid").process_pool
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.QUERY, "query", thread_pool="io", process_pool=True)
+
+    with pytest.raises(ValueError, match="process pool"):
+        class AsyncInProcess(Controller):
+            @ctrl_query_method(process_pool=True)
+            async def q(self) -> int:
+                return 1
+
+def test_no_process_pool_without_process_methods():
+    class Plain(Controller):
+        @ctrl_query_method
+        def q(self) -> int:
+            return 1
+    assert create_controller_server(Plain()).state.process_pool is None
+
+def test_methods_run_in_worker_processes():
+    app = create_controller_server(CpuController(), process_workers=2, enable_stats=True)
+    with TestClient(app) as client:
+        assert client.get("/query/fib", params={"n": 15}).json() == 610
+        assert client.get("/query/local_pid").json() == os.getpid()
+        assert client.get("/query/whoami").json()["pid"] != os.getpid()
+        stats = client.get(STATS_ROUTE).json()["process_pool"]
+        assert stats == {"max_workers": 2, "busy": 0, "submitted": 2, "completed": 2, "failed": 0, "restarts": 0}
+
+def test_workers_are_built_with_the_factory():
+    app = create_controller_server(CpuController(), controller_factory=_labelled_factory, process_workers=1)
+    with TestClient(app) as client:
+        results = [client.get("/query/whoami").json() for _ in range(2)]
+    assert [r["label"] for r in results] == ["factory", "factory"]
+    assert [r["calls"] for r in results] == [1, 2]  # The worker keeps its controller between calls
+
+def test_spawned_workers():
+    app = create_controller_server(CpuController(), controller_factory=_labelled_factory, process_workers=1, process_start_method="spawn")
+    with TestClient(app) as client:
+        assert client.get("/query/whoami").json()["label"] == "factory"
+
+def test_calls_run_in_parallel():
+    app = create_controller_server(CpuController(), process_workers=2)
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await app.state.process_pool.start()
+            start = time.monotonic()
+            responses = await asyncio.gather(*[client.get("/query/whoami", params={"seconds": 0.3}) for _ in range(2)])
+            return time.monotonic() - start, {r.json()["pid"] for r in responses}
+    try:
+        elapsed, pids = asyncio.run(run())
+    finally:
+        app.state.process_pool.shutdown()
+    assert len(pids) == 2
+    assert elapsed < 0.55
+
+def test_errors_and_background_jobs():
+    app = create_controller_server(CpuController(), process_workers=1)
+    with TestClient(app) as client:
+        response = client.post("/cmd/refuse")
+        assert response.status_code == 409
+        assert response.json() == {"detail": "refused"}
+        info = app.state.process_pool.info()
+        assert (info.submitted, info.completed, info.failed) == (1, 0, 1)
+
+        job_id = client.post("/cmd/crunch", params={"n": 1000}).json()["job_id"]
+        assert client.get(job_route(job_id, "result"), params={"wait": 10}).json() == {"result": sum(i * i for i in range(1000))}
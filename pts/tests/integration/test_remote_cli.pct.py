@@ -19,6 +19,8 @@ import nblite; nblite.nbl_export()
 # %%
 #|export
 import pytest
+import os
+import stat
 import subprocess
 import sys
 import textwrap
@@ -47,6 +49,7 @@ _REMOTE_CLI_SCRIPT = textwrap.dedent('''\
         FooController,
         local_mode=True,
         lockfile_path="{lockfile_path}",
+        local_socket_path={socket_path!r},
     )
 
     if __name__ == "__main__":
@@ -60,7 +63,7 @@ def remote_cli(tmp_path):
     """Create a temporary remote CLI script and lockfile, with cleanup."""
     lockfile = tmp_path / "ctrlstack_test.lock"
     script = tmp_path / "remote_cli.py"
-    script.write_text(_REMOTE_CLI_SCRIPT.format(lockfile_path=str(lockfile)))
+    script.write_text(_REMOTE_CLI_SCRIPT.format(lockfile_path=str(lockfile), socket_path=None))
     yield str(script), str(lockfile)
     # Cleanup: stop server if running
     stop_local_controller_server_process(str(lockfile))
@@ -103,3 +106,33 @@ def test_server_lifecycle(remote_cli):
     # Stopping again should say no server
     res = _run_cli(script, "stop-local-server")
     assert res.stdout.strip().startswith("No local server running")
+
+# %%
+#|export
+@pytest.fixture()
+def socket_remote_cli(tmp_path):
+    """Like `remote_cli`, with the local server listening on a Unix domain socket."""
+    lockfile, socket_path = tmp_path / "ctrlstack_test.lock", tmp_path / "ctrlstack_test.sock"
+    script = tmp_path / "remote_cli.py"
+    script.write_text(_REMOTE_CLI_SCRIPT.format(lockfile_path=str(lockfile), socket_path=str(socket_path)))
+    yield str(script), str(lockfile), str(socket_path)
+    stop_local_controller_server_process(str(lockfile))
+
+def test_server_lifecycle_on_socket(socket_remote_cli):
+    script, lockfile, socket_path = socket_remote_cli
+
+    res = _run_cli(script, "baz", "7")
+    assert res.stdout.strip() == "baz 7"
+    assert open(lockfile).read().splitlines()[0] == socket_path
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+    res = _run_cli(script, "get-server-status")
+    assert res.stdout.strip().startswith(f"Local server is running on socket {socket_path}")
+    assert _run_cli(script, "bar").stdout.strip() == "bar"
+
+    res = _run_cli(script, "start-local-server", "--port", "8000")
+    assert res.returncode != 0 and "socket" in res.stderr
+
+    res = _run_cli(script, "stop-local-server")
+    assert res.stdout.strip().startswith(f"Stopped local server on socket {socket_path}")
+    assert not os.path.exists(socket_path) and not os.path.exists(lockfile)
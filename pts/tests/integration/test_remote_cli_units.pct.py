@@ -18,10 +18,15 @@ import nblite; nblite.nbl_export()
 
 # %%
 #|export
+import asyncio
 import pytest
 import socket
+import threading
+import time
+import uvicorn
 from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
 from ctrlstack.remote_cli import create_remote_controller_cli, is_pickleable
+from ctrlstack.server import create_controller_server, _find_free_port
 from typer.testing import CliRunner
 
 # %%
@@ -55,6 +60,14 @@ def test_create_remote_cli_local_mode_with_url_raises():
             lockfile_path="/tmp/test.lock",
         )
 
+def test_create_remote_cli_non_local_with_socket_raises():
+    with pytest.raises(ValueError, match="local_socket_path"):
+        create_remote_controller_cli(
+            FooController,
+            url="http://localhost:8000",
+            local_socket_path="/tmp/test.sock",
+        )
+
 def test_create_remote_cli_non_local_with_controller_raises():
     with pytest.raises(ValueError, match="controller"):
         create_remote_controller_cli(
@@ -152,3 +165,34 @@ def test_remote_cli_no_subcommand_shows_help():
     assert result.exit_code == 0
     # Help text should be shown
     assert "bar" in result.stdout or "Usage" in result.stdout
+
+
+# %%
+#|export
+# --- Sync remote controller, also inside a running event loop ---
+
+class EchoController(Controller):
+    @ctrl_query_method
+    def echo(self, text: str) -> str:
+        return text
+
+def test_cli_commands_block_inside_a_running_loop():
+    port = _find_free_port()
+    server = uvicorn.Server(uvicorn.Config(create_controller_server(EchoController()), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+
+    async def inside():
+        app = create_remote_controller_cli(EchoController, url=f"http://localhost:{port}")
+        return runner.invoke(app, ["echo", "hi"])
+    try:
+        result = asyncio.run(inside())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "hi"
@@ -25,10 +25,11 @@ import time
 import uvicorn
 from enum import Enum
 from pydantic import BaseModel
+from fastapi import HTTPException
 from typing import List, Tuple, Optional, Dict
 from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
 from ctrlstack.server import create_controller_server, _find_free_port
-from ctrlstack.remote_controller import create_remote_controller
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError
 
 # %%
 #|export
@@ -111,13 +112,26 @@ class FooController(Controller):
     def accept_dict(self, data: Dict[str, int]) -> str:
         return f"sum={sum(data.values())}"
 
+    @ctrl_cmd_method
+    def concat(self, a: List[int], b: Optional[List[int]] = None) -> List[int]:
+        return a + (b or [])
+
+    @ctrl_cmd_method
+    def fail(self, code: int):
+        raise HTTPException(status_code=code, detail="failed")
+
+    @ctrl_query_method
+    async def slow(self, delay: float) -> float:
+        await asyncio.sleep(delay)
+        return delay
+
 # %%
 #|export
 @pytest.fixture(scope="module")
 def server_port():
     """Start a uvicorn server in a background thread and yield the port."""
     port = _find_free_port()
-    app = create_controller_server(FooController())
+    app = create_controller_server(FooController(), enable_batch=True)
     config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error")
     server = uvicorn.Server(config)
     thread = threading.Thread(target=server.run, daemon=True)
@@ -164,6 +178,12 @@ def test_bar2_with_optional(remote_ctrl):
     ))
     assert "Body3: #3." in res
 
+def test_omitted_optional_body_param(remote_ctrl):
+    spec = remote_ctrl._get_method_spec("concat")
+    assert spec.prepare_request_args((), {"a": [1, 2]}) == ({}, {"a": [1, 2]})
+    assert asyncio.run(remote_ctrl.concat(a=[1, 2])) == [1, 2]
+    assert asyncio.run(remote_ctrl.concat(a=[1, 2], b=[3])) == [1, 2, 3]
+
 def test_baz(remote_ctrl):
     res = asyncio.run(remote_ctrl.baz(x=123))
     assert res == 'baz 123'
@@ -211,3 +231,173 @@ def test_return_false(remote_ctrl):
 def test_accept_dict(remote_ctrl):
     res = asyncio.run(remote_ctrl.accept_dict(data={"a": 1, "b": 2}))
     assert res == 'sum=3'
+
+def test_connections_are_reused(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}") as rc:
+            for i in range(5):
+                assert await rc.baz(x=i) == f"baz {i}"
+            client, _ = rc._transport._get_async_client()
+            return len(client._transport._pool.connections)
+    assert asyncio.run(run()) == 1
+
+def test_concurrent_calls_overlap(server_port):
+    delay, n = 0.5, 10
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}") as rc:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[rc.slow(delay=delay) for _ in range(n)])
+            return results, time.perf_counter() - start
+    results, elapsed = asyncio.run(run())
+    assert results == [delay] * n
+    assert elapsed < 2 * delay
+
+def test_max_concurrency_caps_calls(server_port):
+    delay = 0.3
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", max_concurrency=2) as rc:
+            start = time.perf_counter()
+            await asyncio.gather(*[rc.slow(delay=delay) for _ in range(4)])
+            return time.perf_counter() - start
+    assert asyncio.run(run()) >= 2 * delay
+
+# %%
+#|export
+# --- Sync mode ---
+
+@pytest.fixture(scope="module")
+def sync_remote_ctrl(server_port):
+    with create_remote_controller(FooController, url=f"http://localhost:{server_port}", mode="sync") as rc:
+        yield rc
+
+def test_sync_bar(sync_remote_ctrl):
+    res = sync_remote_ctrl.bar(query_msg="Hello", body=FooMessage(body_msg='body'))
+    assert res == 'Message 1: Hello\nMessage 2: body'
+
+def test_sync_return_list_of_models(sync_remote_ctrl):
+    res = sync_remote_ctrl.return_list_of_models()
+    assert all(isinstance(m, FooMessage) for m in res)
+
+def test_sync_calls_reuse_connection(sync_remote_ctrl):
+    for i in range(5):
+        assert sync_remote_ctrl.baz(x=i) == f"baz {i}"
+    assert len(sync_remote_ctrl._transport.client._transport._pool.connections) == 1
+
+def test_sync_calls_from_threads(sync_remote_ctrl):
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda i: sync_remote_ctrl.baz(x=i), range(20)))
+    assert results == [f"baz {i}" for i in range(20)]
+
+
+# %%
+#|export
+# --- Batches ---
+
+def test_call_many(remote_ctrl):
+    res = asyncio.run(remote_ctrl.call_many([
+        ("baz", {"x": 1}),
+        ("return_model", {"name": "m"}),
+        ("bar", {"query_msg": "q", "body": FooMessage(body_msg="b")}),
+    ]))
+    assert res == ["baz 1", FooMessage(body_msg="m"), "Message 1: q\nMessage 2: b"]
+
+def test_call_many_sync(sync_remote_ctrl):
+    res = sync_remote_ctrl.call_many([("baz", {"x": i}) for i in range(50)])
+    assert res == [f"baz {i}" for i in range(50)]
+
+def test_call_many_errors(sync_remote_ctrl):
+    calls = [("baz", {"x": 1}), ("fail", {"code": 409})]
+    with pytest.raises(RemoteCallError) as exc_info:
+        sync_remote_ctrl.call_many(calls)
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == "failed"
+    res = sync_remote_ctrl.call_many(calls, return_exceptions=True)
+    assert res[0] == "baz 1"
+    assert isinstance(res[1], RemoteCallError)
+
+def test_batch_context_manager(remote_ctrl):
+    async def run():
+        async with remote_ctrl.batch() as batch:
+            a = batch.baz(1)
+            b = batch.return_list_of_models()
+            assert not a.done()
+        return a.result(), b.result()
+    a, b = asyncio.run(run())
+    assert a == "baz 1"
+    assert b == [FooMessage(body_msg="a"), FooMessage(body_msg="b")]
+
+def test_batch_context_manager_sync(sync_remote_ctrl):
+    with sync_remote_ctrl.batch() as batch:
+        a = batch.echo_enum(Priority.HIGH)
+        b = batch.return_falsy_int()
+    assert a.result() == "priority=high"
+    assert b.result() == 0
+
+def test_batch_result_before_send(sync_remote_ctrl):
+    batch = sync_remote_ctrl.batch()
+    res = batch.baz(1)
+    with pytest.raises(RuntimeError, match="not been sent"):
+        res.result()
+    with pytest.raises(AttributeError):
+        batch.not_a_method
+
+def test_remote_call_error(sync_remote_ctrl):
+    with pytest.raises(RemoteCallError) as exc_info:
+        sync_remote_ctrl.fail(code=409)
+    assert exc_info.value.status_code == 409
+
+def test_call_many_bad_arguments_fail_locally(sync_remote_ctrl):
+    with pytest.raises(TypeError):
+        sync_remote_ctrl.call_many([("baz", {})])
+
+# %%
+#|export
+# --- Call coalescing ---
+
+def test_coalescing_batches_concurrent_queries(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", coalesce_window=0.01) as rc:
+            results = await asyncio.gather(*[rc.baz(x=i) for i in range(50)])
+            return results, rc._coalescer.stats
+    results, stats = asyncio.run(run())
+    assert results == [f"baz {i}" for i in range(50)]
+    assert stats["calls"] == 50
+    assert stats["requests"] == 1
+
+def test_coalescing_deduplicates_identical_queries(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", coalesce_window=0.01) as rc:
+            results = await asyncio.gather(*[rc.return_model(name="same") for _ in range(20)], rc.baz(x=1))
+            return results, rc._coalescer.stats
+    results, stats = asyncio.run(run())
+    assert results[:20] == [FooMessage(body_msg="same")] * 20
+    assert results[20] == "baz 1"
+    assert stats["deduplicated"] == 19
+    assert stats["requests"] == 1
+
+def test_coalescing_skips_commands(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", coalesce_window=0.01) as rc:
+            await asyncio.gather(*[rc.accept_dict(data={"a": i}) for i in range(3)])
+            return rc._coalescer.stats
+    assert asyncio.run(run())["calls"] == 0
+
+def test_coalescing_single_call_uses_method_route(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", coalesce_window=0) as rc:
+            return await rc.echo_enum(priority=Priority.LOW)
+    assert asyncio.run(run()) == "priority=low"
+
+def test_coalescing_errors_per_call(server_port):
+    async def run():
+        async with create_remote_controller(FooController, url=f"http://localhost:{server_port}", coalesce_window=0.01,
+                                            coalesce_method_types=(ControllerMethodType.QUERY, ControllerMethodType.COMMAND)) as rc:
+            return await asyncio.gather(rc.baz(x=1), rc.fail(code=409), return_exceptions=True)
+    ok, err = asyncio.run(run())
+    assert ok == "baz 1"
+    assert isinstance(err, RemoteCallError) and err.status_code == 409
+
+def test_coalescing_requires_async_mode():
+    with pytest.raises(ValueError, match="async"):
+        create_remote_controller(FooController, url="http://localhost:8000", mode="sync", coalesce_window=0.01)
@@ -190,3 +190,64 @@ def test_create_remote_controller_has_methods():
 def test_init_subclass_non_controller_raises():
     with pytest.raises(TypeError, match="must be a subclass"):
         class Bad(RemoteController, base_controller_cls=str): pass
+
+# %%
+#|export
+# --- Transport ---
+
+def test_remote_controller_transport_limits():
+    class Base(Controller):
+        @ctrl_query_method
+        def info(self): pass
+    rc = create_remote_controller(Base, url="http://localhost:8000", max_connections=3, max_keepalive_connections=1, keepalive_expiry=2.0)
+    limits = rc._transport.limits
+    assert (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry) == (3, 1, 2.0)
+
+def test_remote_controller_transport_created_lazily():
+    class Base(Controller):
+        @ctrl_query_method
+        def info(self): pass
+    rc = create_remote_controller(Base, url="http://localhost:8000")
+    assert rc._transport._client is None
+
+def test_remote_controller_context_manager_closes():
+    class Base(Controller):
+        @ctrl_query_method
+        def info(self): pass
+    with create_remote_controller(Base, url="http://localhost:8000") as rc:
+        client = rc._transport.client
+        assert not client.is_closed
+    assert client.is_closed
+    assert rc._transport._client is None
+
+# %%
+#|export
+# --- Sync mode ---
+
+def test_sync_mode_generates_blocking_methods():
+    import inspect
+    class Base(Controller):
+        @ctrl_cmd_method
+        async def cmd1(self, x: int) -> int: pass
+        @ctrl_query_method
+        def query1(self): pass
+    rc = create_remote_controller(Base, url="http://localhost:8000", mode="sync")
+    assert not inspect.iscoroutinefunction(rc.cmd1)
+    assert not inspect.iscoroutinefunction(rc.query1)
+    assert list(inspect.signature(rc.cmd1).parameters) == ['x']
+    assert rc.get_controller_methods() == ['cmd1', 'query1']
+
+def test_async_mode_is_default():
+    import inspect
+    class Base(Controller):
+        @ctrl_query_method
+        def query1(self): pass
+    rc = create_remote_controller(Base, url="http://localhost:8000")
+    assert inspect.iscoroutinefunction(rc.query1)
+
+def test_invalid_mode_raises():
+    class Base(Controller):
+        @ctrl_query_method
+        def query1(self): pass
+    with pytest.raises(ValueError, match="mode"):
+        create_remote_controller(Base, url="http://localhost:8000", mode="threads")
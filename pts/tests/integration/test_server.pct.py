@@ -25,6 +25,8 @@ from pydantic import BaseModel
 from typing import List, Tuple, Optional, Dict
 from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
 from ctrlstack.server import create_controller_server
+from ctrlstack.protocol import BATCH_ROUTE
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 # %%
@@ -96,6 +98,14 @@ class FooController(Controller):
     def return_false(self) -> bool:
         return False
 
+    @ctrl_cmd_method
+    def fail(self, code: int):
+        raise HTTPException(status_code=code, detail="failed")
+
+    @ctrl_cmd_method
+    def crash(self):
+        raise RuntimeError("boom")
+
 fastapi_app = create_controller_server(FooController())
 client = TestClient(fastapi_app)
 
@@ -179,3 +189,64 @@ def test_return_false():
     response = client.get('/query/return_false')
     assert response.status_code == 200
     assert response.json() is False
+
+# %%
+#|export
+# --- Batch route ---
+
+batch_client = TestClient(create_controller_server(FooController(), enable_batch=True))
+
+def test_batch_route_disabled_by_default():
+    response = client.post(BATCH_ROUTE, json=[])
+    assert response.status_code in (404, 405)
+
+def test_batch_results_in_order():
+    response = batch_client.post(BATCH_ROUTE, json=[
+        {"method": "baz", "args": {"x": 1}},
+        {"method": "bar", "args": {"query_msg": "q", "body": {"body_msg": "b"}}},
+        {"method": "return_model", "args": {"name": "m"}},
+        {"method": "echo_enum", "args": {"priority": "high"}},
+        {"method": "qux"},
+    ])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"result": "baz 1"},
+        {"result": "Message 1: q\nMessage 2: b"},
+        {"result": {"body_msg": "m"}},
+        {"result": "priority=high"},
+        {"result": "qux"},
+    ]
+
+def test_batch_errors_in_order():
+    response = batch_client.post(BATCH_ROUTE, json=[
+        {"method": "nope"},
+        {"method": "baz", "args": {"x": "not an int"}},
+        {"method": "baz", "args": {}},
+        {"method": "fail", "args": {"code": 409}},
+        {"method": "crash"},
+        {"method": "baz", "args": {"x": 2}},
+    ])
+    assert response.status_code == 200
+    entries = response.json()
+    assert [e.get("error", {}).get("status_code") for e in entries] == [404, 422, 422, 409, 500, None]
+    assert entries[3]["error"]["detail"] == "failed"
+    assert entries[5] == {"result": "baz 2"}
+
+def test_batch_concurrency():
+    import threading, time
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    class SlowCtrl(Controller):
+        @ctrl_query_method
+        def slow(self) -> int:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 1
+    c = TestClient(create_controller_server(SlowCtrl(), enable_batch=True, batch_concurrency=3))
+    response = c.post(BATCH_ROUTE, json=[{"method": "slow"}] * 9)
+    assert [e["result"] for e in response.json()] == [1] * 9
+    assert 1 < peak[0] <= 3
@@ -21,6 +21,7 @@ import nblite; nblite.nbl_export()
 import pytest
 import os
 import socket
+import stat
 from contextlib import closing
 from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
 from ctrlstack.server import (
@@ -35,6 +36,7 @@ from ctrlstack.server import (
     check_local_controller_server_process,
     stop_local_controller_server_process,
 )
+from ctrlstack.local_server import _bind_unix_socket, _is_socket_listening
 
 # %%
 #|export
@@ -211,6 +213,34 @@ def test_stop_server_dead_pid(tmp_path):
     assert (port, pid, existed) == (None, None, False)
     assert not os.path.exists(path)
 
+def test_lockfile_with_socket_path(tmp_path):
+    path, socket_path = str(tmp_path / "uds.lock"), str(tmp_path / "server.sock")
+    _write_lockfile(path, socket_path, os.getpid())
+    assert _read_lockfile(path) == (socket_path, os.getpid())
+    # The process exists, but nothing listens on the socket
+    assert check_local_controller_server_process(path) == (None, None, False)
+    assert os.path.exists(path)
+
+def test_bind_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "server.sock")
+    with closing(_bind_unix_socket(socket_path, 0o600)) as sock:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert _is_socket_listening(socket_path)  # Before any server accepts on it
+        with pytest.raises(OSError, match="already listening"):
+            _bind_unix_socket(socket_path, 0o600)
+        assert _is_socket_listening(socket_path)  # Still served
+    # Stale once closed, so it is replaced
+    _bind_unix_socket(socket_path, 0o660).close()
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o660
+
+def test_check_server_stale_socket(tmp_path):
+    path, socket_path = str(tmp_path / "stale.lock"), str(tmp_path / "server.sock")
+    with closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as sock:
+        sock.bind(socket_path)
+    _write_lockfile(path, socket_path, 99999)
+    assert check_local_controller_server_process(path) == (None, None, False)
+    assert not os.path.exists(path) and not os.path.exists(socket_path)
+
 # %%
 #|export
 # --- Server auth edge case ---
@@ -224,3 +254,10 @@ def test_server_auth_no_header():
     client = TestClient(app)
     response = client.get('/query/info')
     assert response.status_code == 401
+
+def test_local_server_helpers_are_exported_by_the_server():
+    namespace = {}
+    exec("from ctrlstack.server import *", namespace)
+    import ctrlstack.local_server as local_server
+    for name in ["start_local_controller_server_process", "check_local_controller_server_process", "stop_local_controller_server_process"]:
+        assert namespace[name] is getattr(local_server, name)
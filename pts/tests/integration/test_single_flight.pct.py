@@ -0,0 +1,158 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_single_flight
+
+# %%
+#|default_exp test_single_flight
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_query_method, ctrl_cmd_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.single_flight import SingleFlight
+from ctrlstack.server import create_controller_server
+from ctrlstack.protocol import BATCH_ROUTE, STATS_ROUTE
+from fastapi.testclient import TestClient
+
+# %%
+#|export
+class SlowController(Controller):
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @ctrl_query_method
+    def sync_report(self, x: int) -> int:
+        with self.lock:
+            self.calls.append(("sync_report", x))
+        time.sleep(0.2)
+        return x * 2
+
+    @ctrl_query_method
+    async def async_report(self, x: int) -> int:
+        self.calls.append(("async_report", x))
+        await asyncio.sleep(0.2)
+        return x * 3
+
+    @ctrl_query_method
+    async def failing_report(self) -> int:
+        self.calls.append(("failing_report",))
+        await asyncio.sleep(0.1)
+        raise RuntimeError("boom")
+
+    @ctrl_cmd_method
+    async def slow_cmd(self, x: int) -> int:
+        self.calls.append(("slow_cmd", x))
+        await asyncio.sleep(0.1)
+        return x
+
+async def _gather_gets(app, requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*[client.request(method, url, params=params) for method, url, params in requests])
+
+# %%
+#|export
+@pytest.mark.parametrize("method,factor", [("sync_report", 2), ("async_report", 3)])
+def test_concurrent_identical_queries_share_one_execution(method, factor):
+    ctrl = SlowController()
+    app = create_controller_server(ctrl, single_flight_queries=True, enable_stats=True)
+    responses = asyncio.run(_gather_gets(app, [("GET", f"/query/{method}", {"x": 7})] * 50))
+    assert [r.json() for r in responses] == [7 * factor] * 50
+    assert ctrl.calls == [(method, 7)]
+
+    stats = TestClient(app).get(STATS_ROUTE).json()["single_flight"][method]
+    assert stats == {"calls": 50, "executions": 1, "collapsed": 49, "inflight": 0}
+
+def test_different_arguments_are_not_collapsed():
+    ctrl = SlowController()
+    app = create_controller_server(ctrl, single_flight_queries=True)
+    responses = asyncio.run(_gather_gets(app, [("GET", "/query/async_report", {"x": i % 3}) for i in range(9)]))
+    assert [r.json() for r in responses] == [(i % 3) * 3 for i in range(9)]
+    assert sorted(ctrl.calls) == [("async_report", i) for i in range(3)]
+    assert app.state.single_flight.info("async_report").collapsed == 6
+
+def test_sequential_queries_are_not_collapsed():
+    ctrl = SlowController()
+    client = TestClient(create_controller_server(ctrl, single_flight_queries=True))
+    client.get("/query/async_report", params={"x": 1})
+    client.get("/query/async_report", params={"x": 1})
+    assert len(ctrl.calls) == 2
+
+def test_errors_are_shared():
+    ctrl = SlowController()
+    app = create_controller_server(ctrl, single_flight_queries=True)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test") as client:
+            return await asyncio.gather(*[client.get("/query/failing_report") for _ in range(5)])
+
+    assert [r.status_code for r in asyncio.run(run())] == [500] * 5
+    assert ctrl.calls == [("failing_report",)]
+
+def test_commands_are_not_collapsed():
+    ctrl = SlowController()
+    app = create_controller_server(ctrl, single_flight_queries=True)
+    asyncio.run(_gather_gets(app, [("POST", "/cmd/slow_cmd", {"x": 1})] * 3))
+    assert ctrl.calls == [("slow_cmd", 1)] * 3
+
+def test_disabled_by_default():
+    ctrl = SlowController()
+    app = create_controller_server(ctrl)
+    asyncio.run(_gather_gets(app, [("GET", "/query/async_report", {"x": 1})] * 3))
+    assert len(ctrl.calls) == 3
+
+# %%
+#|export
+def test_batch_calls_join_inflight_route_calls():
+    ctrl = SlowController()
+    app = create_controller_server(ctrl, single_flight_queries=True, enable_batch=True)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(
+                client.get("/query/async_report", params={"x": 2}),
+                client.post(BATCH_ROUTE, json=[{"method": "async_report", "args": {"x": 2}}] * 3),
+            )
+
+    single, batch = asyncio.run(run())
+    assert single.json() == 6
+    assert batch.json() == [{"result": 6}] * 3
+    assert ctrl.calls == [("async_report", 2)]
+
+def test_shared_execution_survives_cancelled_caller():
+    single_flight = SingleFlight()
+    spec = get_method_spec(SlowController, "async_report")
+    calls = []
+
+    async def handler(kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return 1
+
+    wrapped = single_flight.wrap(spec, handler)
+
+    async def run():
+        first = asyncio.ensure_future(wrapped({"x": 1}))
+        second = asyncio.ensure_future(wrapped({"x": 1}))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 1
+    assert len(calls) == 1
@@ -0,0 +1,229 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_stubgen
+
+# %%
+#|default_exp test_stubgen
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import importlib.util
+import inspect
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import pytest
+import uvicorn
+from enum import Enum
+from typing import Dict, Iterator, List, Optional
+from pydantic import BaseModel
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import AsyncJobHandle, JobHandle, RemoteCallError
+from ctrlstack.stubgen import app, generate_client_module
+
+# %%
+#|export
+class Color(str, Enum):
+    RED = "red"
+    BLUE = "blue"
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+class ShapeController(Controller):
+    @ctrl_query_method
+    def paint(self, color: Color, times: Optional[int] = 1) -> str:
+        """Paint in a color."""
+        return color.value * (times or 0)
+
+    @ctrl_query_method
+    async def shift(self, point: Point, dx: int = 1, origin: Point = Point(x=0, y=0)) -> Point:
+        """
+        Shift a point.
+
+        Relative to an origin.
+        """
+        return Point(x=point.x + dx - origin.x, y=point.y - origin.y)
+
+    @ctrl_query_method
+    def count(self, n: int) -> Iterator[Point]:
+        for i in range(n):
+            yield Point(x=i, y=i)
+
+    @ctrl_cmd_method
+    def total(self, values: Iterator[int], scale: int = 1) -> int:
+        return scale * sum(values)
+
+    @ctrl_cmd_method
+    def merge(self, points: List[Point], weights: Dict[str, float], raw=None) -> List[Point]:
+        return points + [Point(x=len(weights), y=0 if raw is None else raw)]
+
+    @ctrl_cmd_method(background=True)
+    async def slow(self, seconds: float) -> List[Point]:
+        await asyncio.sleep(seconds)
+        return [Point(x=1, y=2)]
+
+def _load_module(source: str, path) -> object:
+    path.write_text(source)
+    module_spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return module
+
+# %%
+#|export
+def test_generated_signatures(tmp_path):
+    source = generate_client_module(ShapeController, mode="sync")
+    client_cls = _load_module(source, tmp_path / "sync_client.py").ShapeControllerClient
+    assert {"count", "merge", "paint", "shift", "slow", "total"} <= set(vars(client_cls))
+    assert str(inspect.signature(client_cls.paint)) == "(self, color: 'Color', times: 'Optional[int]' = 1) -> 'str'"
+    assert str(inspect.signature(client_cls.shift)) == (
+        "(self, point: 'Point', dx: 'int' = 1, origin: 'Optional[Point]' = None) -> 'Point'"  # Left to the server
+    )
+    assert inspect.signature(client_cls.count).return_annotation == "Iterator[Point]"
+    assert inspect.signature(client_cls.slow).return_annotation == "JobHandle"
+    assert client_cls.paint.__doc__ == "Paint in a color."
+    assert inspect.getdoc(client_cls.shift) == "Shift a point.\n\nRelative to an origin."
+    assert "if TYPE_CHECKING:\n    from ctrlstack.remote_controller import JobHandle\n" in source
+
+    async_source = generate_client_module(ShapeController, class_name="Shapes")
+    async_cls = _load_module(async_source, tmp_path / "async_client.py").Shapes
+    assert inspect.iscoroutinefunction(async_cls.paint) and not inspect.iscoroutinefunction(async_cls.count)
+    assert inspect.signature(async_cls.count).return_annotation == "AsyncIterator[Point]"
+    assert inspect.signature(async_cls.slow).return_annotation == "AsyncJobHandle"
+
+def test_generated_specs_match_the_controller(tmp_path):
+    from ctrlstack.method_spec import compile_method_specs
+    specs = _load_module(generate_client_module(ShapeController), tmp_path / "client.py")._SPECS
+    for name, spec in compile_method_specs(ShapeController).items():
+        static = specs[name]
+        assert (static.route, static.route_without_group, static.method_type) == (spec.route, spec.route_without_group, spec.method_type)
+        assert (list(static.query_params), list(static.body_params)) == (spec.query_params, spec.body_params)
+        assert (static.input_stream_param, static.is_stream, static.background) == (spec.input_stream_param, spec.is_stream, spec.background)
+
+def test_unsupported_signatures():
+    class VarController(Controller):
+        @ctrl_query_method
+        def foo(self, *names: str) -> int:
+            return len(names)
+    with pytest.raises(ValueError, match="cannot pass on"):
+        generate_client_module(VarController)
+    with pytest.raises(ValueError, match="mode"):
+        generate_client_module(ShapeController, mode="threads")
+
+def test_local_types_are_any():
+    class Local(BaseModel):
+        a: int
+
+    class LocalController(Controller):
+        @ctrl_query_method
+        def foo(self, local: Local) -> Local:
+            return local
+    source = generate_client_module(LocalController)
+    assert "async def foo(self, local: Any) -> Any:" in source and "returns=" not in source
+
+# %%
+#|export
+@pytest.fixture(scope="module")
+def server_url():
+    port = _find_free_port()
+    app = create_controller_server(ShapeController(), enable_batch=True)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield f"http://localhost:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_sync_client(server_url, tmp_path):
+    client_cls = _load_module(generate_client_module(ShapeController, mode="sync"), tmp_path / "sync_client.py").ShapeControllerClient
+    with client_cls(url=server_url) as remote:
+        assert remote.paint(Color.BLUE, times=2) == "blueblue"
+        assert remote.paint("red") == "red"
+        assert remote.shift(Point(x=1, y=2), dx=3) == Point(x=4, y=2)
+        assert remote.shift({"x": 1, "y": 2}, 0, origin=Point(x=1, y=1)) == Point(x=0, y=1)
+        assert list(remote.count(2)) == [Point(x=0, y=0), Point(x=1, y=1)]
+        assert remote.total(iter([1, 2, 3]), scale=2) == 12
+        assert remote.merge([Point(x=1, y=1)], {"a": 1.0}, raw=5) == [Point(x=1, y=1), Point(x=1, y=5)]
+        job = remote.slow(0.01)
+        assert isinstance(job, JobHandle) and job.result() == [Point(x=1, y=2)]
+        assert remote.get_job(job.job_id, "slow").result() == [Point(x=1, y=2)]
+        assert remote.call_many([("paint", {"color": "red", "times": 3}), ("shift", {"point": Point(x=0, y=0)})]) == ["redredred", Point(x=1, y=0)]
+        with remote.batch() as batch:
+            result = batch.paint(Color.RED)
+        assert result.result() == "red"
+        with pytest.raises(RemoteCallError):
+            remote.paint("green")
+        with pytest.raises(AttributeError):
+            remote.batch().nowhere
+
+def test_async_client(server_url, tmp_path):
+    client_cls = _load_module(generate_client_module(ShapeController), tmp_path / "async_client.py").ShapeControllerClient
+
+    async def run():
+        async with client_cls(url=server_url, coalesce_window=0.005) as remote:
+            shifted = await asyncio.gather(*(remote.shift(Point(x=i, y=0)) for i in range(3)))
+            items = [item async for item in remote.count(2)]
+            total = await remote.total(iter([1, 2]))
+            job = remote.slow(0)
+            job = await job
+            return shifted, items, total, job, await job.result()
+    shifted, items, total, job, result = asyncio.run(run())
+    assert shifted == [Point(x=1, y=0), Point(x=2, y=0), Point(x=3, y=0)]
+    assert items == [Point(x=0, y=0), Point(x=1, y=1)] and total == 3
+    assert isinstance(job, AsyncJobHandle) and result == [Point(x=1, y=2)]
+
+# %%
+#|export
+def test_loading_the_client_does_not_import_the_controller(server_url, tmp_path):
+    (tmp_path / "shape_client.py").write_text(generate_client_module(ShapeController, mode="sync"))
+    script = textwrap.dedent('''
+        import json, sys
+        import ctrlstack.remote_controller
+        from shape_client import ShapeControllerClient
+        loaded = "test_stubgen" in sys.modules
+        remote = ShapeControllerClient(url=sys.argv[1])
+        painted = remote.paint("red")
+        before_decode = "test_stubgen" in sys.modules
+        point = remote.shift({"x": 0, "y": 0})
+        print(json.dumps({"loaded": [loaded, before_decode, "test_stubgen" in sys.modules], "painted": painted, "point": type(point).__name__}))
+    ''')
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(tmp_path), os.path.dirname(__file__)])}
+    res = subprocess.run([sys.executable, "-c", script, server_url], capture_output=True, text=True, timeout=60, env=env)
+    assert res.returncode == 0, res.stderr
+    result = json.loads(res.stdout.splitlines()[-1])
+    assert result["loaded"] == [False, False, True]  # Imported to decode the first `Point`
+    assert result["painted"] == "red" and result["point"] == "Point"
+
+def test_stubgen_command(tmp_path):
+    output = tmp_path / "client.py"
+    runner = CliRunner()
+    result = runner.invoke(app, [f"{__name__}:ShapeController", "-o", str(output), "--mode", "sync", "--class-name", "Shapes"])
+    assert result.exit_code == 0, result.output
+    assert output.read_text() == generate_client_module(ShapeController, mode="sync", class_name="Shapes")
+    assert runner.invoke(app, [f"{__name__}:ShapeController"]).stdout == generate_client_module(ShapeController)
+    assert runner.invoke(app, [f"{__name__}:Point"]).exit_code != 0
+    assert runner.invoke(app, [__name__]).exit_code != 0
@@ -0,0 +1,150 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_timing
+
+# %%
+#|default_exp test_timing
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import asyncio
+import threading
+import time
+import pytest
+import uvicorn
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller
+from ctrlstack.remote_cli import create_remote_controller_cli
+from ctrlstack.timing import SERVER_TIMING_HEADER, parse_server_timing
+from ctrlstack.tracing import SpanKind, Tracer
+from fastapi.testclient import TestClient
+
+# %%
+#|export
+class TimedController(Controller):
+    @ctrl_query_method
+    def work(self, seconds: float) -> float:
+        time.sleep(seconds)
+        return seconds
+
+    @ctrl_query_method
+    async def awork(self, seconds: float) -> float:
+        await asyncio.sleep(seconds)
+        return seconds
+
+    @ctrl_query_method(cache_ttl=60)
+    def cached(self, x: int) -> int:
+        return x
+
+# %%
+#|export
+def test_server_timing_is_opt_in():
+    client = TestClient(create_controller_server(TimedController()))
+    assert SERVER_TIMING_HEADER not in client.get("/query/work", params={"seconds": 0}).headers
+
+def test_server_timing_phases():
+    client = TestClient(create_controller_server(TimedController(), server_timing=True))
+    timings = parse_server_timing(client.get("/query/work", params={"seconds": 0.05}).headers[SERVER_TIMING_HEADER])
+    assert list(timings) == ["decode", "queue", "exec", "encode", "total"]
+    assert timings["exec"] >= 0.045
+    assert timings["total"] >= sum(v for k, v in timings.items() if k != "total") - 1e-5
+
+    timings = parse_server_timing(client.get("/query/awork", params={"seconds": 0.01}).headers[SERVER_TIMING_HEADER])
+    assert timings["exec"] >= 0.005
+
+    for _ in range(2):
+        response = client.get("/query/cached", params={"x": 1})
+    assert list(parse_server_timing(response.headers[SERVER_TIMING_HEADER])) == ["decode", "handle", "encode", "total"]
+
+    # Requests that reach no method only report their total
+    assert list(parse_server_timing(client.get("/nowhere").headers[SERVER_TIMING_HEADER])) == ["total"]
+
+def test_server_timing_with_tracing():
+    tracer = Tracer()
+    client = TestClient(create_controller_server(TimedController(), server_timing=True, tracer=tracer))
+    timings = parse_server_timing(client.get("/query/work", params={"seconds": 0.02}).headers[SERVER_TIMING_HEADER])
+    [server_span] = [s for s in tracer.spans() if s.kind == SpanKind.SERVER]
+    [exec_span] = [s for s in tracer.spans() if s.name == "exec"]
+    assert exec_span.parent_id == server_span.span_id
+    assert abs(exec_span.duration - timings["exec"]) < 1e-5
+
+# %%
+#|export
+@pytest.fixture(scope="module")
+def server_url():
+    port = _find_free_port()
+    app = create_controller_server(TimedController(), server_timing=True)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield f"http://localhost:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_client_timings(server_url):
+    with create_remote_controller(TimedController, url=server_url, mode="sync") as remote:
+        remote.work(0)
+        assert remote.last_timings is None
+        remote.collect_timings()
+        assert remote.work(0.05) == 0.05
+        timings = remote.last_timings
+        remote.collect_timings(False)
+        remote.work(0)
+        assert remote.last_timings is timings
+
+    assert timings.method == "work"
+    assert timings.connect == 0  # The connection of the first call was reused
+    assert timings.server["exec"] >= 0.045
+    assert timings.send + timings.wait >= timings.server["total"]  # The server may start while the request is sent
+    assert timings.network == max(timings.wait - timings.server["total"], 0.0)
+    parts = timings.serialize + timings.connect + timings.send + timings.wait + timings.receive + timings.deserialize
+    assert parts <= timings.total
+    assert "exec" in timings.format() and "network" in timings.format()
+
+def test_async_client_timings(server_url):
+    async def run():
+        async with create_remote_controller(TimedController, url=server_url) as remote:
+            remote.collect_timings()
+            await remote.awork(0.01)
+            return remote.last_timings
+    timings = asyncio.run(run())
+    assert timings.connect > 0  # A new connection, on a new event loop
+    assert set(timings.server) == {"decode", "queue", "exec", "encode", "total"}
+
+def test_client_timings_without_server_timing():
+    client = TestClient(create_controller_server(TimedController()))
+    remote = create_remote_controller(TimedController, url="http://testserver", mode="sync")
+    remote._transport._client = client
+    remote.collect_timings()
+    remote.work(0)
+    assert remote.last_timings.server == {} and remote.last_timings.network is None
+    assert "server" not in remote.last_timings.format()
+
+def test_remote_cli_timing(server_url):
+    runner = CliRunner()
+    app = create_remote_controller_cli(TimedController, url=server_url)
+    result = runner.invoke(app, ["--timing", "work", "0.01"])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "0.01"
+    lines = result.stderr.splitlines()
+    assert lines[0] == "Timing of 'work' (ms):"
+    assert {line.split()[0] for line in lines[1:]} == {
+        "serialize", "connect", "send", "wait", "server", "decode", "queue", "exec", "encode", "network", "receive", "deserialize", "total",
+    }
@@ -0,0 +1,114 @@
+# ---
+# jupyter:
+#   kernelspec:
+#     display_name: Python 3
+#     language: python
+#     name: python3
+# ---
+
+# %% [markdown]
+# # test_transport
+
+# %%
+#|default_exp test_transport
+
+# %%
+#|hide
+import nblite; nblite.nbl_export()
+
+# %%
+#|export
+import pytest
+import asyncio
+import threading
+import time
+import httpx
+import uvicorn
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.server import create_controller_server
+from ctrlstack.remote_controller import create_remote_controller
+from ctrlstack.transport import HTTPTransport
+
+# %%
+#|export
+# --- Async clients ---
+
+def test_async_client_per_loop():
+    transport = HTTPTransport()
+    async def get_client():
+        return transport._get_async_client()[0]
+    client1 = asyncio.run(get_client())
+    client2 = asyncio.run(get_client())
+    assert client1 is not client2
+
+def test_async_clients_of_closed_loops_are_dropped():
+    transport = HTTPTransport()
+    async def get_client():
+        return transport._get_async_client()[0]
+    for _ in range(3):
+        asyncio.run(get_client())
+    assert len(transport._async_clients) <= 1
+
+def test_async_client_reused_within_loop():
+    transport = HTTPTransport()
+    async def run():
+        return transport._get_async_client()[0] is transport._get_async_client()[0]
+    assert asyncio.run(run())
+
+def test_max_concurrency_semaphores():
+    transport = HTTPTransport(max_concurrency=3)
+    assert transport._semaphore is not None
+    async def run():
+        return transport._get_async_client()[1]
+    assert asyncio.run(run())._value == 3
+    assert HTTPTransport()._semaphore is None
+
+def test_aclose_closes_loop_client():
+    async def run():
+        transport = HTTPTransport()
+        client = transport._get_async_client()[0]
+        await transport.aclose()
+        return client, transport
+    client, transport = asyncio.run(run())
+    assert client.is_closed
+    assert len(transport._async_clients) == 0
+
+# %%
+#|export
+# --- Unix domain sockets ---
+
+class EchoController(Controller):
+    @ctrl_query_method
+    def echo(self, x: int) -> int:
+        return x
+
+@pytest.fixture(scope="module")
+def socket_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("uds") / "server.sock")
+    server = uvicorn.Server(uvicorn.Config(create_controller_server(EchoController(), server_timing=True), uds=path, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield path
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_uds_transport(socket_path):
+    with HTTPTransport(uds=socket_path) as transport:
+        assert transport.request("GET", "http://localhost/query/echo", params={"x": 1}).json() == 1
+    with HTTPTransport() as transport, pytest.raises(httpx.ConnectError):
+        transport.request("GET", "http://localhost:1/query/echo", params={"x": 1})
+
+def test_remote_controller_over_uds(socket_path):
+    with create_remote_controller(EchoController, url="http://localhost", uds=socket_path, mode="sync") as remote:
+        remote.collect_timings()
+        assert remote.echo(2) == 2
+        assert remote.last_timings.connect > 0 and "exec" in remote.last_timings.server
+
+    async def run():
+        async with create_remote_controller(EchoController, url="http://localhost", uds=socket_path) as remote:
+            return await asyncio.gather(*(remote.echo(i) for i in range(5)))
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
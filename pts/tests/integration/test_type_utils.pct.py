@@ -23,6 +23,7 @@ from enum import Enum
 from typing import Optional, List, Dict, Union
 from pydantic import BaseModel
 from ctrlstack.type_utils import is_query_param_type, serialize_value, deserialize_value, serialize_for_query_param
+from ctrlstack.type_utils import get_type_adapter, type_adapter_cache_info, type_adapter_cache_clear, _TypeAdapterCache
 
 # %%
 #|export
@@ -188,3 +189,60 @@ def test_is_query_param_type_optional_model():
 
 def test_is_query_param_type_optional_list():
     assert is_query_param_type(Optional[List[int]]) is False
+
+
+# %%
+#|export
+# --- TypeAdapter cache ---
+
+def test_get_type_adapter_cached():
+    assert get_type_adapter(List[Inner]) is get_type_adapter(List[Inner])
+
+def test_serialize_value_uses_cache():
+    type_adapter_cache_clear()
+    serialize_value(Inner(x=1), Inner)
+    serialize_value(Inner(x=2), Inner)
+    deserialize_value({'x': 3}, Inner)
+    info = type_adapter_cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+    assert info.hit_rate == pytest.approx(2 / 3)
+    assert info.build_time > 0
+
+def test_type_adapter_cache_unhashable_type():
+    from typing import Annotated
+    hint = Annotated[int, {'unhashable': True}]
+    assert get_type_adapter(hint) is get_type_adapter(hint)
+    assert serialize_value(5, hint) == 5
+
+def test_type_adapter_cache_lru_eviction():
+    cache = _TypeAdapterCache(maxsize=2)
+    a = cache.get(int)
+    cache.get(str)
+    cache.get(int)  # int is now the most recently used
+    cache.get(float)  # evicts str
+    info = cache.info()
+    assert info.evictions == 1
+    assert info.currsize == 2
+    assert cache.get(int) is a
+    assert cache.info().misses == 3
+
+def test_type_adapter_cache_clear():
+    get_type_adapter(Outer)
+    type_adapter_cache_clear()
+    info = type_adapter_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+
+def test_type_adapter_cache_thread_safe():
+    import threading
+    cache = _TypeAdapterCache()
+    results = []
+    def worker():
+        for _ in range(50):
+            results.append(cache.get(Dict[str, List[Inner]]))
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len({id(r) for r in results}) == 1
+    info = cache.info()
+    assert info.hits + info.misses == 400
@@ -0,0 +1,156 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/cli.pct.py
+
+__all__ = ['create_controller_cli']
+
+# %% pts/ctrlstack/cli.pct.py 3
+import typer
+from . import Controller, ControllerMethodType
+import functools
+from typing import List, Callable, Optional, get_origin, get_args, get_type_hints, Dict, Union, Any, Mapping
+import inspect
+import asyncio
+import json
+from pydantic import BaseModel, TypeAdapter
+from .method_spec import MethodSpec, compile_method_spec, get_method_spec
+from .type_utils import get_type_adapter
+import sys
+
+# %% pts/ctrlstack/cli.pct.py 5
+async def _aiter_sync(items):
+    for item in items:
+        yield item
+
+def _make_input_stream_converter(spec: MethodSpec) -> Callable[[str], Any]:
+    def convert(value: str):
+        if value == "-":
+            items = (spec.input_item_adapter.validate_json(line) for line in sys.stdin if line.strip())
+        else:
+            items = get_type_adapter(List[spec.input_item_type or Any]).validate_json(value)
+        return _aiter_sync(items) if spec.input_stream_is_async else items
+    return convert
+
+# %% pts/ctrlstack/cli.pct.py 6
+def _make_typer_compatible_func(func, spec: Optional[MethodSpec] = None):
+    spec = spec or compile_method_spec(func)
+    sig = inspect.signature(func)
+    params = list(sig.parameters.values())
+
+    new_params = []
+    converters: dict[str, Callable[[str], Any]] = {}
+    changed_params: set[str] = set()
+
+    for p in params:
+        if p.name in spec.body_params:
+            new_params.append(p.replace(annotation=str))
+            converters[p.name] = spec.arg_adapters[p.name].validate_json
+            changed_params.add(p.name)
+        elif p.name == spec.input_stream_param:
+            new_params.append(p.replace(annotation=str))
+            converters[p.name] = _make_input_stream_converter(spec)
+            changed_params.add(p.name)
+        else:
+            new_params.append(p)  # Unannotated, or handled natively by Typer (int, str, bool, Enum, etc.)
+
+    new_sig = sig.replace(parameters=new_params)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def new_func(*args, **kwargs):
+            bound = new_sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            for name, conv in converters.items():
+                if name in bound.arguments and isinstance(bound.arguments[name], str):
+                    bound.arguments[name] = conv(bound.arguments[name])
+            return await func(*bound.args, **bound.kwargs)
+    else:
+        @functools.wraps(func)
+        def new_func(*args, **kwargs):
+            bound = new_sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            for name, conv in converters.items():
+                if name in bound.arguments and isinstance(bound.arguments[name], str):
+                    bound.arguments[name] = conv(bound.arguments[name])
+            return func(*bound.args, **bound.kwargs)
+
+    new_func.__signature__ = new_sig
+    orig_ann = dict(getattr(func, "__annotations__", {}))
+    for name in changed_params:
+        orig_ann[name] = str
+    new_func.__annotations__ = orig_ann
+
+    return new_func
+
+# %% pts/ctrlstack/cli.pct.py 9
+def create_controller_cli(
+    controller: Controller,
+    prepend_method_group: bool=False,
+    echo_result: Optional[Callable[[Any], None]] = None,
+) -> typer.Typer:
+    """
+    Get the controller server instance.
+    
+    Args:
+        controller (Controller): The controller to get the server for.
+        prepend_method_group (bool): Whether to prefix each command name with the group of its method.
+        echo_result (Optional[Callable[[Any], None]]): Called with the return value of each (non-streaming) command
+            invocation. Defaults to echoing values that are not None.
+
+    Returns:
+        FastAPI: The controller server instance.
+    """
+    if not isinstance(controller, Controller):
+        raise TypeError("The controller must be an instance of ctrlstack.Controller")
+    
+    if echo_result is None:
+        def echo_result(res):
+            if res is not None: typer.echo(res)
+
+    app = typer.Typer(invoke_without_command=True)
+    
+    @app.callback()
+    def entrypoint(ctx: typer.Context):
+        if ctx.invoked_subcommand is None:
+            typer.echo(ctx.get_help())
+            
+    def register_func(bound_method: Callable, spec: MethodSpec, cmd_name: str): 
+        func = _make_typer_compatible_func(bound_method.__func__, spec)
+        
+        if spec.is_stream and spec.is_async:
+            def wrapper(*args, **kwargs):
+                async def echo_items():
+                    async for item in func(bound_method.__self__, *args, **kwargs):
+                        typer.echo(item)
+                asyncio.run(echo_items())
+        elif spec.is_stream:
+            def wrapper(*args, **kwargs):
+                for item in func(bound_method.__self__, *args, **kwargs):
+                    typer.echo(item)
+        elif inspect.iscoroutinefunction(bound_method):
+            def wrapper(*args, **kwargs):
+                echo_result(asyncio.run(func(bound_method.__self__, *args, **kwargs)))
+        else:
+            def wrapper(*args, **kwargs):
+                echo_result(func(bound_method.__self__, *args, **kwargs))
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__module__ = func.__module__
+        wrapper.__annotations__ = func.__annotations__
+        # Remove the first parameter (self) from the signature
+        old_sig = inspect.signature(func)
+        new_sig = old_sig.replace(
+            parameters=list(old_sig.parameters.values())[1:]
+        )
+        wrapper.__signature__ = new_sig
+        app.command(name=cmd_name)(wrapper)
+    
+    for method_name in controller.get_controller_methods():
+        method = getattr(controller, method_name)
+        spec = get_method_spec(type(controller), method_name)
+        if prepend_method_group:
+            cmd_name = f"{spec.group}-{method_name}" if spec.group else method_name
+        else:
+            cmd_name = method_name
+        register_func(method, spec, cmd_name)
+
+    return app
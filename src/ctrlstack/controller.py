@@ -0,0 +1,298 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/controller.pct.py
+
+__all__ = ['Controller', 'ControllerMethodType', 'ctrl_cmd_method', 'ctrl_method', 'ctrl_query_method']
+
+# %% pts/ctrlstack/controller.pct.py 3
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_origin, get_type_hints
+import bisect
+import collections.abc
+import inspect
+
+# %% pts/ctrlstack/controller.pct.py 4
+class ControllerMethodType(Enum):
+    COMMAND = 'command'
+    QUERY = 'query'
+
+# %% pts/ctrlstack/controller.pct.py 5
+# The annotations of (async) iterables, whose items are streamed
+_STREAM_ORIGINS = (
+    collections.abc.Iterator, collections.abc.Iterable, collections.abc.Generator,
+    collections.abc.AsyncIterator, collections.abc.AsyncIterable, collections.abc.AsyncGenerator,
+)
+
+def _takes_stream_argument(func: Callable) -> bool:
+    """Whether a parameter of `func` is annotated as an (async) iterable. Annotations that cannot be resolved yet are skipped."""
+    try:
+        hints = get_type_hints(func)
+    except (NameError, TypeError):  # E.g. forward references to classes defined later
+        hints = {name: hint for name, hint in func.__annotations__.items() if not isinstance(hint, str)}
+    hints.pop('return', None)
+    return any(get_origin(hint) in _STREAM_ORIGINS for hint in hints.values())
+
+def _check_execution_options(
+    func: Optional[Callable] = None,
+    background: bool = False,
+    max_concurrency: Optional[int] = None,
+    thread_pool: Optional[str] = None,
+    process_pool: bool = False,
+    micro_batch: Optional[str] = None,
+    takes_stream: Optional[bool] = None,
+    name: Optional[str] = None,
+):
+    """
+    Reject the options of `ctrl_method` that decide where and how a method runs, if they exclude each other or,
+    when `func` is given, do not suit it. Whether `func` takes a streamed argument is read from its annotations,
+    unless `takes_stream` says so.
+    """
+    if background and max_concurrency is not None:
+        raise ValueError("Background jobs are limited by the job workers of the server, not by max_concurrency.")
+    if thread_pool is not None and process_pool:
+        raise ValueError("A method runs either on a thread pool or on the process pool.")
+    if micro_batch is not None and (background or process_pool):
+        raise ValueError("Micro-batched methods cannot run as background jobs or in the process pool.")
+    if func is None:
+        return
+    name = name or func.__name__
+    is_async = inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func)
+    if thread_pool is not None and is_async:
+        raise ValueError(f"'{name}' is async, so it runs on the event loop rather than a thread pool.")
+    if not (background or process_pool or micro_batch is not None):
+        return  # Nothing else depends on whether the method streams, which can take resolving its annotations
+    streams = inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+    if not streams:
+        streams = takes_stream if takes_stream is not None else _takes_stream_argument(func)
+    if process_pool and (is_async or streams):
+        raise ValueError(f"Only sync methods that do not stream can run in the process pool, unlike '{name}'.")
+    if micro_batch is not None and streams:
+        raise ValueError(f"Streaming method '{name}' cannot be micro-batched.")
+    if background and streams:
+        raise ValueError(f"Streaming method '{name}' cannot run as a background job.")
+
+# %% pts/ctrlstack/controller.pct.py 6
+def ctrl_method(
+    method_type: ControllerMethodType,
+    group: str,
+    cache_ttl: Optional[float] = None,
+    cache_max_entries: int = 1024,
+    cache_key_args: Optional[List[str]] = None,
+    invalidates: Optional[List[str]] = None,
+    background: bool = False,
+    max_concurrency: Optional[int] = None,
+    max_queue: Optional[int] = None,
+    thread_pool: Optional[str] = None,
+    process_pool: bool = False,
+    micro_batch: Optional[str] = None,
+    batch_max_size: int = 64,
+    batch_max_wait: float = 0.005,
+):
+    """
+    Decorator to define a Controller method
+
+    Args:
+        method_type (ControllerMethodType): Whether the method is a command or a query.
+        group (str): The group of the method.
+        cache_ttl (Optional[float]): Queries only. If given, the server caches results for this many seconds
+            (`math.inf` for no expiry). None disables caching.
+        cache_max_entries (int): Queries only. Maximum number of cached results of the method, least recently
+            used results are evicted first.
+        cache_key_args (Optional[List[str]]): Queries only. The arguments that identify a cached result.
+            Defaults to all arguments.
+        invalidates (Optional[List[str]]): Commands only. The groups whose cached query results are dropped
+            when the command runs. Defaults to the group of the command.
+        background (bool): Commands only. If True, the server runs the command as a background job and
+            responds with the job id immediately.
+        max_concurrency (Optional[int]): If given, the server executes at most this many calls of the method
+            at once. None means no limit.
+        max_queue (Optional[int]): Maximum number of calls waiting for one of the `max_concurrency` slots.
+            Calls beyond it are rejected with 429. None means no limit.
+        thread_pool (Optional[str]): Sync methods only. Name of the thread pool of the server that runs the
+            method, instead of the shared threadpool. Pools are sized in `create_controller_server`.
+        process_pool (bool): Sync methods only. If True, the server runs the method in a worker process holding
+            its own copy of the controller, for CPU-bound methods. See `ctrlstack.process_pool`.
+        micro_batch (Optional[str]): Name of a vectorised implementation of the method on the same controller,
+            taking each argument as a list and returning the list of results. If given, the server collects
+            concurrent calls and runs them as one call of the implementation. See `ctrlstack.micro_batch`.
+        batch_max_size (int): With `micro_batch`, the maximum number of calls in a batch.
+        batch_max_wait (float): With `micro_batch`, the maximum seconds a call waits for others to join its batch.
+
+    `background`, `max_concurrency`, `thread_pool`, `process_pool` and `micro_batch` decide where and how the
+    server runs the method. Combinations that exclude each other raise a ValueError here, and those that do not
+    suit the method (e.g. `thread_pool` for an async method, or `micro_batch` for a streaming one) when the
+    decorator is applied.
+    """
+    if group is None or not isinstance(group, str):
+        raise ValueError("Group must be a string.")
+    if not isinstance(method_type, ControllerMethodType):
+        raise ValueError("Method type must be an instance of ControllerMethodType Enum.")
+    if method_type != ControllerMethodType.QUERY and (cache_ttl is not None or cache_key_args is not None):
+        raise ValueError("Only query methods can be cached.")
+    if method_type != ControllerMethodType.COMMAND and invalidates is not None:
+        raise ValueError("Only command methods can invalidate cached queries.")
+    if method_type != ControllerMethodType.COMMAND and background:
+        raise ValueError("Only command methods can run as background jobs.")
+    if cache_ttl is not None and cache_ttl <= 0:
+        raise ValueError("cache_ttl must be positive.")
+    if cache_max_entries < 1:
+        raise ValueError("cache_max_entries must be at least 1.")
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    if max_queue is not None and (max_concurrency is None or max_queue < 0):
+        raise ValueError("max_queue must be non-negative, and requires max_concurrency.")
+    execution_options = dict(
+        background=background, max_concurrency=max_concurrency, thread_pool=thread_pool,
+        process_pool=process_pool, micro_batch=micro_batch,
+    )
+    _check_execution_options(**execution_options)
+    if batch_max_size < 1:
+        raise ValueError("batch_max_size must be at least 1.")
+    if batch_max_wait < 0:
+        raise ValueError("batch_max_wait must not be negative.")
+    def decorator(func):
+        _check_execution_options(func, **execution_options)
+        func._is_controller_method = True
+        func._controller_method_group = group
+        func._controller_method_type = method_type
+        func._controller_method_cache_ttl = cache_ttl
+        func._controller_method_cache_max_entries = cache_max_entries
+        func._controller_method_cache_key_args = list(cache_key_args) if cache_key_args is not None else None
+        func._controller_method_invalidates = list(invalidates) if invalidates is not None else None
+        func._controller_method_background = background
+        func._controller_method_max_concurrency = max_concurrency
+        func._controller_method_max_queue = max_queue
+        func._controller_method_thread_pool = thread_pool
+        func._controller_method_process_pool = process_pool
+        func._controller_method_micro_batch = micro_batch
+        func._controller_method_batch_max_size = batch_max_size
+        func._controller_method_batch_max_wait = batch_max_wait
+        return func
+    return decorator
+
+def ctrl_cmd_method(func=None, **options):
+    """
+    Decorator to define a command method in a Controller.
+
+    Can be used bare (`@ctrl_cmd_method`) or with the options of `ctrl_method` (`@ctrl_cmd_method(invalidates=[...])`).
+    """
+    decorator = ctrl_method(ControllerMethodType.COMMAND, 'cmd', **options)
+    return decorator if func is None else decorator(func)
+
+def ctrl_query_method(func=None, **options):
+    """
+    Decorator to define a query method in a Controller.
+
+    Can be used bare (`@ctrl_query_method`) or with the options of `ctrl_method` (`@ctrl_query_method(cache_ttl=60)`).
+    """
+    decorator = ctrl_method(ControllerMethodType.QUERY, 'query', **options)
+    return decorator if func is None else decorator(func)
+
+# %% pts/ctrlstack/controller.pct.py 8
+class _ControllerMethodRegistry:
+    """
+    Index of the controller methods of a single Controller class.
+
+    Method names are kept sorted (matching the order of `dir`), and are indexed by method type,
+    by group and by (method type, group), so that lookups do not need to scan the class.
+    """
+    def __init__(self):
+        self._entries: Dict[str, Tuple[ControllerMethodType, str]] = {}
+        self._names: List[str] = []
+        self._groups: List[str] = []
+        self._by_type: Dict[ControllerMethodType, List[str]] = {}
+        self._by_group: Dict[str, List[str]] = {}
+        self._by_type_and_group: Dict[Tuple[ControllerMethodType, str], List[str]] = {}
+        self.specs: Dict[str, Any] = {}  # Compiled `MethodSpec`s, see `ctrlstack.method_spec`
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def get(self, name: str) -> Optional[Tuple[ControllerMethodType, str]]:
+        """Return the (method type, group) of a controller method, or None if it is not registered."""
+        return self._entries.get(name)
+
+    def add(self, name: str, method_type: ControllerMethodType, group: str):
+        self.remove(name)
+        self._entries[name] = (method_type, group)
+        i = bisect.bisect_left(self._names, name)
+        self._names.insert(i, name)
+        self._groups.insert(i, group)
+        bisect.insort(self._by_type.setdefault(method_type, []), name)
+        bisect.insort(self._by_group.setdefault(group, []), name)
+        bisect.insort(self._by_type_and_group.setdefault((method_type, group), []), name)
+
+    def remove(self, name: str):
+        self.specs.pop(name, None)
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        method_type, group = entry
+        i = bisect.bisect_left(self._names, name)
+        del self._names[i]
+        del self._groups[i]
+        self._by_type[method_type].remove(name)
+        self._by_group[group].remove(name)
+        self._by_type_and_group[(method_type, group)].remove(name)
+
+    def get_methods(self, method_type: Optional[ControllerMethodType] = None, group: Optional[str] = None) -> List[str]:
+        if method_type is None and group is None:
+            names = self._names
+        elif group is None:
+            names = self._by_type.get(method_type, [])
+        elif method_type is None:
+            names = self._by_group.get(group, [])
+        else:
+            names = self._by_type_and_group.get((method_type, group), [])
+        return list(names)
+
+    def get_groups(self) -> List[str]:
+        return list(self._groups)
+
+# %% pts/ctrlstack/controller.pct.py 9
+class Controller(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_controller_method_registry()
+
+    @classmethod
+    def _build_controller_method_registry(cls) -> _ControllerMethodRegistry:
+        """Scan the class once and store the index of its controller methods on it."""
+        registry = _ControllerMethodRegistry()
+        for name in dir(cls):
+            attr = getattr(cls, name, None)
+            if getattr(attr, '_is_controller_method', False):
+                registry.add(name, attr._controller_method_type, attr._controller_method_group)
+        cls._controller_method_registry = registry
+        return registry
+
+    @classmethod
+    def _get_controller_method_registry(cls) -> _ControllerMethodRegistry:
+        registry = cls.__dict__.get('_controller_method_registry')
+        if registry is None:
+            registry = cls._build_controller_method_registry()
+        return registry
+
+    @classmethod
+    def _update_controller_method_registry(cls, name: str):
+        """
+        Re-index the attribute `name` after it has been set on the class after its definition.
+        Subclasses inherit the attribute, so their registries are updated as well.
+        """
+        registry = cls._get_controller_method_registry()
+        attr = getattr(cls, name, None)
+        if getattr(attr, '_is_controller_method', False):
+            registry.add(name, attr._controller_method_type, attr._controller_method_group)
+        else:
+            registry.remove(name)
+        for subclass in cls.__subclasses__():
+            subclass._update_controller_method_registry(name)
+
+    @classmethod
+    def get_controller_method_groups(cls):
+        """List of controller method types in this controller."""
+        return cls._get_controller_method_registry().get_groups()
+    
+    @classmethod
+    def get_controller_methods(cls, method_type: ControllerMethodType|None=None, group: str|None=None):
+        """List of controller methods in this controller."""
+        return cls._get_controller_method_registry().get_methods(method_type, group)
@@ -0,0 +1,164 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/manifest.pct.py
+
+__all__ = ['build_manifest', 'controller_cls_from_manifest', 'load_manifest', 'manifest_hash', 'save_manifest']
+
+# %% pts/ctrlstack/manifest.pct.py 3
+from . import Controller, ControllerMethodType, ctrl_method
+from .method_spec import MethodSpec, compile_method_specs
+from .protocol import ControllerManifest, MethodManifest, ParamLocation, ParamManifest
+from .type_utils import serialize_value
+from enum import Enum
+from pathlib import Path
+from pydantic import PydanticUserError, TypeAdapter
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+import hashlib
+import inspect
+import json
+
+# %% pts/ctrlstack/manifest.pct.py 5
+def _json_schema(adapter: Optional[TypeAdapter]) -> Dict[str, Any]:
+    """The JSON schema of a type, or the empty (any value) schema if it has none."""
+    if adapter is None:
+        return {}
+    try:
+        return adapter.json_schema()
+    except PydanticUserError:  # e.g. arbitrary types, callables
+        return {}
+
+def _encode_default(spec: MethodSpec, name: str, value: Any) -> Any:
+    adapter = spec.arg_adapters.get(name)
+    try:
+        return adapter.dump_python(value, mode='json') if adapter is not None else serialize_value(value, type(value))
+    except Exception:
+        return None  # Omitted by the client, so that the server applies the default
+
+def _param_manifest(spec: MethodSpec, param: inspect.Parameter) -> ParamManifest:
+    name = param.name
+    if name == spec.input_stream_param:
+        location, schema = ParamLocation.STREAM, _json_schema(spec.input_item_adapter)
+    elif name in spec.query_params:
+        location, schema = ParamLocation.QUERY, _json_schema(spec.arg_adapters.get(name))
+    elif name in spec.body_params:
+        location, schema = ParamLocation.BODY, _json_schema(spec.arg_adapters.get(name))
+    else:
+        location, schema = None, {}
+    required = param.default is inspect.Parameter.empty
+    return ParamManifest(
+        name=name, kind=param.kind.name, location=location, required=required,
+        default=None if required else _encode_default(spec, name, param.default), json_schema=schema,
+    )
+
+def _method_manifest(spec: MethodSpec) -> MethodManifest:
+    return MethodManifest(
+        name=spec.name, method_type=spec.method_type.value, group=spec.group, is_async=spec.is_async,
+        is_stream=spec.is_stream, background=spec.background,
+        params=[_param_manifest(spec, param) for param in spec.signature.parameters.values()],
+        returns=_json_schema(spec.item_adapter if spec.is_stream else spec.return_adapter) or None,
+        doc=inspect.getdoc(spec.func),
+    )
+
+# %% pts/ctrlstack/manifest.pct.py 6
+def manifest_hash(manifest: ControllerManifest) -> str:
+    """The hash of the content of a manifest (all but its `hash`)."""
+    content = json.dumps(manifest.model_dump(mode='json', exclude={'hash'}), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def build_manifest(controller_cls: Type[Controller]) -> ControllerManifest:
+    """Describe the controller methods of a controller class."""
+    specs = compile_method_specs(controller_cls)
+    manifest = ControllerManifest(controller=controller_cls.__name__, methods=[_method_manifest(spec) for spec in specs.values()])
+    manifest.hash = manifest_hash(manifest)
+    return manifest
+
+# %% pts/ctrlstack/manifest.pct.py 7
+def save_manifest(manifest: ControllerManifest, path: str):
+    """Write a manifest to a JSON file."""
+    Path(path).write_text(manifest.model_dump_json(indent=2))
+
+def load_manifest(path: str) -> ControllerManifest:
+    """Read a manifest written by `save_manifest`."""
+    return ControllerManifest.model_validate_json(Path(path).read_text())
+
+# %% pts/ctrlstack/manifest.pct.py 9
+_QUERY_TYPES = {"integer": int, "number": float, "string": str, "boolean": bool}
+
+def _resolve_ref(schema: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/$defs/"):
+        return defs.get(ref.removeprefix("#/$defs/"), {})
+    return schema
+
+def _query_param_type(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """The type of a query parameter with the given JSON schema."""
+    defs = schema.get("$defs", {}) if defs is None else defs
+    schema = _resolve_ref(schema, defs)
+    variants = schema.get("anyOf")
+    if variants is not None:
+        types = [variant for variant in variants if variant.get("type") != "null"]
+        if len(types) == 1:
+            return Optional[_query_param_type(types[0], defs)]
+        return str
+    values = schema.get("enum")
+    if values and all(isinstance(value, str) for value in values):
+        return Enum(schema.get("title", "Choice"), [(value, value) for value in values], type=str)
+    return _QUERY_TYPES.get(schema.get("type"), str)
+
+def _param_annotation(param: ParamManifest) -> Any:
+    if param.location == ParamLocation.QUERY:
+        return _query_param_type(param.json_schema)
+    if param.location == ParamLocation.BODY:
+        return Any
+    if param.location == ParamLocation.STREAM:
+        return Iterable[Any]
+    return inspect.Parameter.empty
+
+def _param_default(param: ParamManifest, annotation: Any) -> Any:
+    if param.required:
+        return inspect.Parameter.empty
+    if isinstance(annotation, type) and issubclass(annotation, Enum) and param.default is not None:
+        return annotation(param.default)
+    return param.default
+
+# %% pts/ctrlstack/manifest.pct.py 10
+def _stub_function(method: MethodManifest) -> Callable:
+    """A function with the signature of a method of the manifest, that cannot be called."""
+    message = f"'{method.name}' is only described by a manifest, and can only be called remotely."
+    if method.is_stream and method.is_async:
+        async def stub(self, *args, **kwargs):
+            raise NotImplementedError(message)
+            yield
+    elif method.is_stream:
+        def stub(self, *args, **kwargs):
+            raise NotImplementedError(message)
+            yield
+    elif method.is_async:
+        async def stub(self, *args, **kwargs):
+            raise NotImplementedError(message)
+    else:
+        def stub(self, *args, **kwargs):
+            raise NotImplementedError(message)
+
+    params = [inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+    annotations = {}
+    for param in method.params:
+        annotation = _param_annotation(param)
+        if annotation is not inspect.Parameter.empty:
+            annotations[param.name] = annotation
+        params.append(inspect.Parameter(
+            param.name, getattr(inspect.Parameter, param.kind), default=_param_default(param, annotation), annotation=annotation,
+        ))
+    stub.__name__ = stub.__qualname__ = method.name
+    stub.__doc__ = method.doc
+    stub.__signature__ = inspect.Signature(params)
+    stub.__annotations__ = annotations
+    return ctrl_method(ControllerMethodType(method.method_type), method.group, background=method.background)(stub)
+
+# %% pts/ctrlstack/manifest.pct.py 11
+def controller_cls_from_manifest(manifest: ControllerManifest) -> Type[Controller]:
+    """
+    A controller class with the methods described by a manifest, for `create_remote_controller` and
+    `create_remote_controller_cli`. Its methods cannot be called locally.
+    """
+    namespace = {method.name: _stub_function(method) for method in manifest.methods}
+    namespace['_manifest'] = manifest
+    return type(manifest.controller, (Controller,), namespace)
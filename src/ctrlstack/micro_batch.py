@@ -0,0 +1,137 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/micro_batch.pct.py
+
+__all__ = ['BATCH_SIZE_BUCKETS', 'BATCH_WAIT_BUCKETS', 'MicroBatchInfo', 'MicroBatcher']
+
+# %% pts/ctrlstack/micro_batch.pct.py 3
+from .method_spec import MethodSpec
+from .metrics import _Histogram
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import time
+
+# %% pts/ctrlstack/micro_batch.pct.py 4
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+BATCH_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)  # Seconds
+
+class MicroBatchInfo(NamedTuple):
+    calls: int
+    batches: int
+    errors: int  # Batches whose implementation raised
+    batch_sizes: Dict[str, int]  # Number of batches by size, in cumulative buckets ("le" upper bounds)
+    waits: Dict[str, int]  # Number of calls by seconds waited before their batch ran, in cumulative buckets
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.calls / self.batches if self.batches else 0.0
+
+# %% pts/ctrlstack/micro_batch.pct.py 5
+class _Pending:
+    def __init__(self):
+        self.calls: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class _MethodBatcher:
+    def __init__(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]], clock: Callable[[], float]):
+        self.spec = spec
+        self.handler = handler
+        self.clock = clock
+        self.params = list(spec.signature.parameters)
+        self._pending: Dict[asyncio.AbstractEventLoop, _Pending] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.calls = self.batches = self.errors = 0
+        self.batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self.waits = _Histogram(BATCH_WAIT_BUCKETS)
+
+    async def call(self, kwargs: Dict[str, Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, _Pending())
+        future = loop.create_future()
+        pending.calls.append((self.spec.bind((), kwargs), future, self.clock()))
+        self.calls += 1
+        if len(pending.calls) >= self.spec.batch_max_size:
+            self._flush(loop)
+        elif pending.timer is None:
+            pending.timer = loop.call_later(self.spec.batch_max_wait, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        pending = self._pending.pop(loop, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        calls = [call for call in pending.calls if not call[1].cancelled()]  # Callers that went away are dropped
+        if calls:
+            task = loop.create_task(self._run(calls))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self):
+        loop = asyncio.get_running_loop()
+        self._flush(loop)
+        tasks = [task for task in self._tasks if task.get_loop() is loop]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, calls: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        started_at = self.clock()
+        self.batches += 1
+        self.batch_sizes.observe(len(calls))
+        for _, _, enqueued_at in calls:
+            self.waits.observe(started_at - enqueued_at)
+        columns = {name: [kwargs[name] for kwargs, _, _ in calls] for name in self.params}
+        try:
+            results = list(await self.handler(columns))
+            if len(results) != len(calls):
+                raise RuntimeError(f"The batch implementation of '{self.spec.name}' returned {len(results)} results for {len(calls)} calls")
+        except asyncio.CancelledError:
+            for _, future, _ in calls:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.errors += 1
+            for _, future, _ in calls:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(calls, results):
+            if not future.done():
+                future.set_result(result)
+
+    def info(self) -> MicroBatchInfo:
+        return MicroBatchInfo(self.calls, self.batches, self.errors, self.batch_sizes.cumulative(), self.waits.cumulative())
+
+# %% pts/ctrlstack/micro_batch.pct.py 6
+class MicroBatcher:
+    """
+    Collects concurrent calls of micro-batched methods into calls of their vectorised implementations.
+
+    Args:
+        clock (Callable[[], float]): Monotonic clock used for the wait metrics.
+    """
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._methods: Dict[str, _MethodBatcher] = {}
+
+    def wrap(self, spec: MethodSpec, batch_handler: Callable[[Dict[str, Any]], Awaitable[List[Any]]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """
+        Return a handler of single calls of `spec`, given a handler of batches. `batch_handler` takes the arguments of
+        the method as lists, with one entry per call, and returns the list of their results.
+        """
+        batcher = self._methods[spec.name] = _MethodBatcher(spec, batch_handler, self.clock)
+        return batcher.call
+
+    def info(self, name: str) -> MicroBatchInfo:
+        return self._methods[name].info()
+
+    async def shutdown(self):
+        """Run the calls still collecting on the running event loop, and wait for its batches in progress."""
+        for batcher in self._methods.values():
+            await batcher.shutdown()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters and histograms of each micro-batched method, keyed by method name."""
+        stats = {}
+        for name, batcher in self._methods.items():
+            info = batcher.info()
+            stats[name] = {**info._asdict(), "mean_batch_size": info.mean_batch_size}
+        return stats
@@ -0,0 +1,135 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/process_pool.pct.py
+
+__all__ = ['ControllerProcessPool', 'ProcessPoolInfo']
+
+# %% pts/ctrlstack/process_pool.pct.py 3
+from fastapi import HTTPException
+from .controller import Controller
+from .method_spec import MethodSpec
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Union
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+
+# %% pts/ctrlstack/process_pool.pct.py 4
+logger = logging.getLogger(__name__)
+
+_worker_controller: Optional[Controller] = None
+
+def _init_worker(controller: Union[Controller, Callable[[], Controller]]):
+    global _worker_controller
+    _worker_controller = controller if isinstance(controller, Controller) else controller()
+
+class _WorkerHTTPException(Exception):
+    """Carries an `HTTPException` back from a worker, as those cannot be unpickled."""
+    def __init__(self, status_code: int, detail: Any, headers: Optional[Dict[str, str]]):
+        super().__init__(status_code, detail, headers)
+
+def _call_in_worker(method_name: str, kwargs: Dict[str, Any]) -> Any:
+    try:
+        return getattr(_worker_controller, method_name)(**kwargs)
+    except HTTPException as e:
+        raise _WorkerHTTPException(e.status_code, e.detail, e.headers) from None
+
+def _get_worker_pid() -> int:
+    return os.getpid()
+
+# %% pts/ctrlstack/process_pool.pct.py 5
+class ProcessPoolInfo(NamedTuple):
+    max_workers: int
+    busy: int  # Calls submitted and not finished yet
+    submitted: int
+    completed: int  # Calls that returned a result
+    failed: int  # Calls that raised, including those cut short by a dead worker
+    restarts: int  # Times the pool was replaced after a worker died
+
+# %% pts/ctrlstack/process_pool.pct.py 6
+class ControllerProcessPool:
+    """
+    A pool of worker processes that each hold a copy of a controller.
+
+    Args:
+        controller (Union[Controller, Callable[[], Controller]]): The controller, or a factory building it. A
+            factory is called in each worker; a controller is pickled to each worker.
+        max_workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs.
+        start_method (Optional[str]): The multiprocessing start method ("fork", "spawn" or "forkserver"). None uses
+            the default of the platform.
+    """
+    def __init__(
+        self,
+        controller: Union[Controller, Callable[[], Controller]],
+        max_workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ):
+        self.controller = controller
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.busy = self.submitted = self.completed = self.failed = self.restarts = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.controller,),
+                )
+            return self._executor
+
+    async def start(self):
+        """Start all the workers and build their controllers, so that the first calls do not wait for them."""
+        loop = asyncio.get_running_loop()
+        # Workers are started on demand, one per call submitted while all others are busy
+        await asyncio.gather(*[loop.run_in_executor(self.executor, _get_worker_pid) for _ in range(self.max_workers)])
+
+    async def run(self, method_name: str, kwargs: Dict[str, Any]) -> Any:
+        """Call a method of the controller in a worker process."""
+        executor = self.executor
+        self.submitted += 1
+        self.busy += 1
+        failed = True
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, _call_in_worker, method_name, kwargs)
+            failed = False
+            return result
+        except _WorkerHTTPException as e:
+            raise HTTPException(*e.args) from None
+        except BrokenProcessPool:
+            # A worker died (e.g. it was killed). Later calls get a new pool, this one cannot be recovered.
+            logger.error(f"A worker process died while calling '{method_name}', restarting the process pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            self.busy -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def make_handler(self, spec: MethodSpec) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """A handler (see `ctrlstack.server`) running the method of `spec` in the pool."""
+        async def handler(kwargs: Dict[str, Any]):
+            return await self.run(spec.name, kwargs)
+        return handler
+
+    def info(self) -> ProcessPoolInfo:
+        return ProcessPoolInfo(self.max_workers, self.busy, self.submitted, self.completed, self.failed, self.restarts)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers. The pool starts new workers if it is used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
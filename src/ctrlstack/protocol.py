@@ -0,0 +1,130 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/protocol.pct.py
+
+__all__ = ['BATCH_ROUTE', 'BatchCallRequest', 'CTRLSTACK_ROUTE_PREFIX', 'ControllerManifest', 'HTTP_202_ACCEPTED', 'HTTP_429_TOO_MANY_REQUESTS', 'JOBS_ROUTE', 'JobInfo', 'JobStatus', 'MANIFEST_ROUTE', 'METRICS_ROUTE', 'MethodManifest', 'NDJSON_MEDIA_TYPE', 'PROFILE_HEADER', 'PROFILING_ROUTE', 'ParamLocation', 'ParamManifest', 'ProfileFormat', 'ProfileRecord', 'ProfileSettings', 'ProfilingInfo', 'STATS_ROUTE', 'TRACEPARENT_HEADER', 'batch_error', 'batch_result', 'job_route', 'profiling_route', 'stream_error', 'stream_item']
+
+# %% pts/ctrlstack/protocol.pct.py 3
+from pydantic import BaseModel, Field
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+# %% pts/ctrlstack/protocol.pct.py 4
+CTRLSTACK_ROUTE_PREFIX = "/_ctrlstack"
+BATCH_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/batch"
+STATS_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/stats"
+JOBS_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/jobs"
+PROFILING_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/profiling"
+METRICS_ROUTE = "/metrics"  # The default path of Prometheus scrapers
+MANIFEST_ROUTE = f"{CTRLSTACK_ROUTE_PREFIX}/manifest"
+
+# %% pts/ctrlstack/protocol.pct.py 6
+HTTP_202_ACCEPTED = 202
+HTTP_429_TOO_MANY_REQUESTS = 429
+
+# %% pts/ctrlstack/protocol.pct.py 8
+class BatchCallRequest(BaseModel):
+    method: str
+    args: Dict[str, Any] = {}
+
+def batch_result(result: Any) -> Dict[str, Any]:
+    return {"result": result}
+
+def batch_error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return {"error": {"status_code": status_code, "detail": detail}}
+
+# %% pts/ctrlstack/protocol.pct.py 11
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def stream_item(item: Any) -> Dict[str, Any]:
+    return {"item": item}
+
+def stream_error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return batch_error(status_code, detail)
+
+# %% pts/ctrlstack/protocol.pct.py 14
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+class JobInfo(BaseModel):
+    job_id: str
+    method: str
+    status: JobStatus = JobStatus.PENDING
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    error: Optional[Dict[str, Any]] = None  # {"status_code": ..., "detail": ...} of failed or cancelled jobs
+
+def job_route(job_id: str, action: Optional[str] = None) -> str:
+    return f"{JOBS_ROUTE}/{job_id}" + (f"/{action}" if action else "")
+
+# %% pts/ctrlstack/protocol.pct.py 17
+PROFILE_HEADER = "X-Ctrlstack-Profile"
+
+class ProfileFormat(str, Enum):
+    CPROFILE = "cprofile"  # Deterministic profile, in the pstats format (`python -m pstats`, snakeviz)
+    COLLAPSED = "collapsed"  # Sampled stacks, one "frame;frame;frame count" line each (flamegraph.pl, speedscope)
+
+class ProfileSettings(BaseModel):
+    sample_every: int = Field(0, ge=0)  # Profile one call in this many. 0 only profiles calls carrying PROFILE_HEADER
+    format: ProfileFormat = ProfileFormat.CPROFILE
+
+class ProfileRecord(BaseModel):
+    name: str
+    method: str
+    format: ProfileFormat
+    trigger: str  # "sample" or "header"
+    created_at: float
+    duration: float  # Seconds
+    includes_other_tasks: bool = False  # Async methods: also covers what the event loop ran during the call
+
+class ProfilingInfo(BaseModel):
+    methods: Dict[str, ProfileSettings]  # Methods with settings
+    profiles: List[ProfileRecord]  # Oldest first
+
+def profiling_route(method: Optional[str] = None, profile: Optional[str] = None) -> str:
+    if method is not None:
+        return f"{PROFILING_ROUTE}/methods/{method}"
+    if profile is not None:
+        return f"{PROFILING_ROUTE}/profiles/{profile}"
+    return PROFILING_ROUTE
+
+# %% pts/ctrlstack/protocol.pct.py 20
+TRACEPARENT_HEADER = "traceparent"
+
+# %% pts/ctrlstack/protocol.pct.py 22
+class ParamLocation(str, Enum):
+    QUERY = "query"
+    BODY = "body"
+    STREAM = "stream"  # The NDJSON request body of a command taking an iterable
+
+class ParamManifest(BaseModel):
+    name: str
+    kind: str  # The name of its `inspect.Parameter` kind, e.g. "POSITIONAL_OR_KEYWORD"
+    location: Optional[ParamLocation] = None  # None for unannotated parameters, placed by the type of their value
+    required: bool = True
+    default: Any = None  # JSON-encoded
+    json_schema: Dict[str, Any] = {}  # Of the items, for streamed parameters
+
+class MethodManifest(BaseModel):
+    name: str
+    method_type: str  # `ControllerMethodType` value
+    group: str
+    is_async: bool = False
+    is_stream: bool = False
+    background: bool = False
+    params: List[ParamManifest] = []
+    returns: Optional[Dict[str, Any]] = None  # JSON schema of the result, or of the items of streaming methods
+    doc: Optional[str] = None
+
+class ControllerManifest(BaseModel):
+    controller: str  # Name of the controller class
+    methods: List[MethodManifest]
+    hash: str = ""  # Of the content, see `ctrlstack.manifest.manifest_hash`
@@ -0,0 +1,221 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/remote_cli.pct.py
+
+__all__ = ['create_remote_controller_cli']
+
+# %% pts/ctrlstack/remote_cli.pct.py 3
+import functools
+from pathlib import Path
+from typing import Type, Optional, Callable, Union
+import typer
+import inspect
+import os
+import subprocess
+import sys
+import time, math
+from . import Controller, ControllerMethodType
+from .cli import create_controller_cli
+from .local_server import start_local_controller_server_process, check_local_controller_server_process, stop_local_controller_server_process
+from .remote_controller import create_remote_controller, JobHandle
+from .protocol import ControllerManifest, ProfileFormat
+from .manifest import controller_cls_from_manifest
+
+# %% pts/ctrlstack/remote_cli.pct.py 5
+import pickle
+def is_pickleable(obj):
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+# %% pts/ctrlstack/remote_cli.pct.py 7
+def _describe_address(address) -> str:
+    return f"socket {address}" if isinstance(address, str) else f"port {address}"
+
+# %% pts/ctrlstack/remote_cli.pct.py 8
+def create_remote_controller_cli(
+    base_controller_cls: Union[Type[Controller], ControllerManifest],
+    url: Optional[str] = None,
+    api_key: Optional[str] = None,
+    local_mode: bool = False,
+    start_local_server_automatically: bool = True,
+    lockfile_path: Optional[str] = None,
+    controller: Controller|Callable[[], Controller] = None,
+    local_server_start_timeout: float = 10.0,
+    enable_profiling: bool = False,
+    local_socket_path: Optional[str] = None,
+) -> typer.Typer:
+    if isinstance(base_controller_cls, ControllerManifest):
+        if local_mode and controller is None:
+            raise ValueError("A local server cannot run a controller given by its manifest, so 'controller' must be given.")
+        base_controller_cls = controller_cls_from_manifest(base_controller_cls)
+    if not issubclass(base_controller_cls, Controller):
+        raise TypeError("base_controller_cls must be a subclass of ctrlstack.Controller")
+    if local_mode and url is not None:
+        raise ValueError("If 'local_mode' is True then 'url' must be None.")
+    if not local_mode and controller is not None:
+        raise ValueError("If 'local_mode' is False then 'controller' must be None.")
+    if not local_mode and local_socket_path is not None:
+        raise ValueError("If 'local_mode' is False then 'local_socket_path' must be None.")
+    if local_mode:
+        url = "http://localhost" # Placeholder
+        
+    if local_socket_path is not None:
+        local_socket_path = os.path.abspath(local_socket_path)
+
+    # Commands are plain blocking calls, whether or not an event loop is running where the CLI is invoked
+    remote_controller = create_remote_controller(base_controller_cls, url, api_key, mode="sync", uds=local_socket_path)
+    options = {"detach": False}
+
+    def echo_result(res):
+        if isinstance(res, JobHandle):
+            if options["detach"]:
+                typer.echo(res.job_id)
+                return
+            res = res.result()
+        if res is not None: typer.echo(res)
+
+    def echo_last_profile():
+        if remote_controller.last_profile is not None:
+            typer.echo(f"Profile: {remote_controller.last_profile}", err=True)
+
+    def echo_last_timings():
+        if remote_controller.last_timings is not None:
+            typer.echo(remote_controller.last_timings.format(), err=True)
+
+    cli_app = create_controller_cli(remote_controller, echo_result=echo_result)
+
+    has_background_methods = any(
+        getattr(getattr(base_controller_cls, name), '_controller_method_background', False)
+        for name in base_controller_cls.get_controller_methods()
+    )
+    if has_background_methods:
+        @cli_app.command()
+        def job_status(job_id: str):
+            """Print the status of a background job."""
+            typer.echo(remote_controller.get_job(job_id).status().model_dump_json(indent=2))
+
+        @cli_app.command()
+        def job_result(job_id: str, timeout: Optional[float] = None):
+            """Wait for a background job to finish and print its result."""
+            echo_result(remote_controller.get_job(job_id).result(timeout=timeout))
+
+        @cli_app.command()
+        def job_cancel(job_id: str):
+            """Request cancellation of a background job."""
+            typer.echo(remote_controller.get_job(job_id).cancel().model_dump_json(indent=2))
+
+    if enable_profiling:
+        @cli_app.command()
+        def profiling_status():
+            """Print the profile settings of the methods on the server, and the profiles it keeps."""
+            typer.echo(remote_controller.get_profiling().model_dump_json(indent=2))
+
+        @cli_app.command()
+        def profile_method(
+            method: str,
+            every: int = typer.Option(1, help="Profile one call in this many. 0 stops sampling the method."),
+            format: ProfileFormat = typer.Option(ProfileFormat.CPROFILE.value, help="Format of the profiles."),
+        ):
+            """Profile calls of a method on the server."""
+            typer.echo(remote_controller.set_profiling(method, every, format).model_dump_json(indent=2))
+
+        @cli_app.command()
+        def download_profile(name: str, output: Optional[Path] = typer.Option(None, help="File to write. Defaults to the profile name.")):
+            """Download a profile from the server."""
+            output = output or Path(name)
+            output.write_bytes(remote_controller.get_profile(name))
+            typer.echo(str(output))
+
+    local_server_commands = ["start-local-server", "get-server-status", "stop-local-server"]
+    server_kwargs = {"server_timing": True, "enable_profiling": enable_profiling}
+    
+    if local_mode:
+        controller = controller or base_controller_cls()
+        
+        if lockfile_path is None:
+            raise ValueError("If 'local_mode' is True then 'lockfile_path' must be specified.")
+        
+        def start_server(port: Optional[int]):
+            if port is not None and local_socket_path is not None:
+                raise typer.BadParameter("The local server listens on a Unix domain socket, not a port.", param_hint="--port")
+            start_local_controller_server_process(controller, lockfile_path, port=port, server_kwargs=server_kwargs, socket_path=local_socket_path)
+
+        @cli_app.command()
+        def start_local_server(verbose: bool = True, port: Optional[int] = None):
+            start_server(port)
+        
+        @cli_app.command()
+        def get_server_status():
+            address, pid, server_is_running = check_local_controller_server_process(lockfile_path)
+            if server_is_running:
+                typer.echo(f"Local server is running on {_describe_address(address)} with PID {pid}.")
+            else:
+                typer.echo("No local server is running.")
+        
+        @cli_app.command()
+        def stop_local_server(verbose: bool = True):
+            address, pid, proc_existed = stop_local_controller_server_process(lockfile_path)
+            if verbose:
+                if proc_existed:
+                    typer.echo(f"Stopped local server on {_describe_address(address)} with PID {pid}.")
+                else:
+                    typer.echo(f"No local server running.")
+                    
+        @cli_app.command()
+        def restart_local_server(verbose: bool = True, port: Optional[int] = None):
+            old_address, pid, proc_existed = stop_local_controller_server_process(lockfile_path)
+            if verbose:
+                if proc_existed:
+                    typer.echo(f"Stopped local server on {_describe_address(old_address)} with PID {pid}.")
+                else:
+                    typer.echo(f"No local server running.")
+            start_server(port)
+
+    def ensure_local_server():
+        _, _, server_is_running = check_local_controller_server_process(lockfile_path)
+        if not server_is_running:
+            subprocess.Popen([sys.executable, sys.argv[0]] + ["start-local-server"], start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        sleep_time = 0.1
+        max_tries = math.ceil(local_server_start_timeout / sleep_time)
+        for _ in range(max_tries):
+            address, pid, server_is_running = check_local_controller_server_process(lockfile_path)
+            if server_is_running:
+                break
+            time.sleep(sleep_time)
+        if not server_is_running:
+            typer.echo(f"Local server did not start within {local_server_start_timeout} seconds. Please check the logs.")
+            raise typer.Exit(code=1)
+        # The server may have been started by a CLI configured for the other kind of address
+        if local_socket_path is not None:
+            address_mismatch = address != local_socket_path
+        else:
+            address_mismatch = not isinstance(address, int)
+        if address_mismatch:
+            typer.echo(f"The local server is running on {_describe_address(address)}. Restart it with 'restart-local-server'.")
+            raise typer.Exit(code=1)
+        if local_socket_path is None:
+            remote_controller.set_url(f"http://localhost:{address}")
+                    
+    @cli_app.callback()
+    def entrypoint(
+        ctx: typer.Context,
+        detach: bool = typer.Option(False, "--detach", help="Print the job id of background commands instead of waiting for their result."),
+        profile: bool = typer.Option(False, "--profile", help="Profile the command on the server, if it has profiling enabled, and print the name of the profile."),
+        timing: bool = typer.Option(False, "--timing", help="Print where the time of the command's call went: client, network and server phases."),
+    ):
+        options["detach"] = detach
+        if profile:
+            remote_controller.profile_calls()
+            ctx.call_on_close(echo_last_profile)
+        if timing:
+            remote_controller.collect_timings()
+            ctx.call_on_close(echo_last_timings)
+        if local_mode and start_local_server_automatically and ctx.invoked_subcommand is not None and ctx.invoked_subcommand not in local_server_commands:
+            ensure_local_server()
+        
+        if ctx.invoked_subcommand is None:
+            typer.echo(ctx.get_help())
+        
+    return cli_app
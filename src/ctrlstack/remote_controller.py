@@ -0,0 +1,775 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/remote_controller.pct.py
+
+__all__ = ['AsyncJobHandle', 'BatchCallResult', 'JobHandle', 'RemoteBatch', 'RemoteCallError', 'RemoteController', 'create_remote_controller', 'fetch_manifest']
+
+# %% pts/ctrlstack/remote_controller.pct.py 3
+from . import Controller, ControllerMethodType, ctrl_method
+from .controller_app import _add_method_to_class
+import functools
+from typing import Type, Optional, Union, Dict, Any, Callable, List, Tuple, Iterator, AsyncIterator
+import inspect
+import asyncio
+import weakref
+import time
+from typing import get_type_hints, get_args, get_origin
+from pydantic import BaseModel, TypeAdapter
+from .method_spec import MethodSpec, StaticMethodSpec, compile_method_spec, get_method_spec, is_stream_function
+from .transport import HTTPTransport
+from .tracing import Tracer
+from .timing import SERVER_TIMING_HEADER, CallTimings, _HTTPTimer
+from .manifest import controller_cls_from_manifest, load_manifest, save_manifest
+from .protocol import HTTP_202_ACCEPTED, BATCH_ROUTE, JOBS_ROUTE, MANIFEST_ROUTE, NDJSON_MEDIA_TYPE, ControllerManifest, PROFILE_HEADER, JobInfo, ProfileFormat, ProfileSettings, ProfilingInfo, job_route, profiling_route
+import json
+import contextlib
+import os
+
+# %% pts/ctrlstack/remote_controller.pct.py 5
+def map_args_with_signature_types(func: Callable, args: List[Any], kwargs: Dict[str, Any], skip_self: bool = True) -> Dict[str, Tuple[Optional[Type], Any]]:
+    """
+    Map each argument name to a tuple of (signature_type, value) for the given function call.
+    If no type is annotated, signature_type will be None.
+    """
+    if skip_self:
+        spec = compile_method_spec(func)
+        return {
+            name: (spec.arg_types.get(name), value)
+            for name, value in spec.bind(args, kwargs).items()
+        }
+
+    sig = inspect.signature(func)
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    type_hints = get_type_hints(func)
+
+    return {
+        name: (type_hints.get(name), value)
+        for name, value in bound.arguments.items()
+    }
+
+# %% pts/ctrlstack/remote_controller.pct.py 7
+def prepare_requests_args(func: Callable, args: List[Any], kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    return compile_method_spec(func).prepare_request_args(args, kwargs)
+
+# %% pts/ctrlstack/remote_controller.pct.py 9
+class RemoteCallError(Exception):
+    """Error response of the server to a remote call."""
+    def __init__(self, message: str, status_code: Optional[int] = None, detail: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail
+
+# %% pts/ctrlstack/remote_controller.pct.py 10
+class BatchCallResult:
+    """Placeholder for the result of a call queued in a `RemoteBatch`, available once the batch has been sent."""
+    _PENDING = object()
+
+    def __init__(self, method_name: str):
+        self.method_name = method_name
+        self._value = self._PENDING
+
+    def done(self) -> bool:
+        return self._value is not self._PENDING
+
+    def result(self) -> Any:
+        if not self.done():
+            raise RuntimeError(f"The batch containing the call to '{self.method_name}' has not been sent yet.")
+        if isinstance(self._value, RemoteCallError):
+            raise self._value
+        return self._value
+
+class RemoteBatch:
+    """
+    Queues calls to a `RemoteController` and sends them to the server's batch route in one request when
+    the (async) context manager exits. Queued calls return a `BatchCallResult`.
+    """
+    def __init__(self, remote_controller: "RemoteController"):
+        self._remote_controller = remote_controller
+        self._calls: List[Tuple[MethodSpec, Dict[str, Any]]] = []
+        self._results: List[BatchCallResult] = []
+
+    def __getattr__(self, name: str) -> Callable[..., BatchCallResult]:
+        spec = self._remote_controller._get_method_spec(name)
+        def queue_call(*args, **kwargs) -> BatchCallResult:
+            result = BatchCallResult(name)
+            self._calls.append((spec, spec.encode_args(args, kwargs)))
+            self._results.append(result)
+            return result
+        return queue_call
+
+    def _set_results(self, values: List[Any]):
+        for result, value in zip(self._results, values):
+            result._value = value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None and self._calls:
+            self._set_results(self._remote_controller._send_batch(self._calls, return_exceptions=True))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *exc_info):
+        if exc_type is None and self._calls:
+            self._set_results(await self._remote_controller._asend_batch(self._calls, return_exceptions=True))
+
+# %% pts/ctrlstack/remote_controller.pct.py 12
+_MAX_JOB_RESULT_WAIT = 30.0  # Seconds per long-poll request for the result of a job
+
+class JobHandle:
+    """Handle of a background job on the server of a (sync) `RemoteController`."""
+    def __init__(self, remote_controller: "RemoteController", info: JobInfo, spec: Optional[MethodSpec] = None):
+        self._remote_controller = remote_controller
+        self._spec = spec
+        self.info = info  # As of the last request about the job
+
+    @property
+    def job_id(self) -> str:
+        return self.info.job_id
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.job_id!r}, method={self.info.method!r}, status={self.info.status.value!r})"
+
+    def _next_wait(self, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return _MAX_JOB_RESULT_WAIT
+        return max(0.0, min(_MAX_JOB_RESULT_WAIT, deadline - time.monotonic()))
+
+    def _handle_result_response(self, response, deadline: Optional[float]) -> Tuple[bool, Any]:
+        """Return `(done, result)`. Raises `RemoteCallError` if the job failed, and `TimeoutError` past the deadline."""
+        if response.status_code == HTTP_202_ACCEPTED:
+            self.info = JobInfo.model_validate(response.json())
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {self.job_id} did not finish in time (status: {self.info.status.value})")
+            return False, None
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error in job {self.job_id} ('{self.info.method}'): {response.text}", response.status_code, response.text)
+        result = response.json()["result"]
+        return True, self._spec.decode_result(result) if self._spec is not None else result
+
+    def status(self) -> JobInfo:
+        """Fetch the current `JobInfo` of the job."""
+        response = self._remote_controller._transport.request(**self._remote_controller._build_job_request("GET", self.job_id))
+        self.info = self._remote_controller._decode_job_info(response)
+        return self.info
+
+    def cancel(self) -> JobInfo:
+        """Request cancellation of the job."""
+        response = self._remote_controller._transport.request(**self._remote_controller._build_job_request("POST", self.job_id, "cancel"))
+        self.info = self._remote_controller._decode_job_info(response)
+        return self.info
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Wait for the job to finish and return its result. Raises `RemoteCallError` if it failed or was cancelled."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            request = self._remote_controller._build_job_request("GET", self.job_id, "result", wait=self._next_wait(deadline))
+            done, result = self._handle_result_response(self._remote_controller._transport.request(**request), deadline)
+            if done:
+                return result
+
+class AsyncJobHandle(JobHandle):
+    """Handle of a background job on the server of an async `RemoteController`. Awaiting it returns the result of the job."""
+    async def status(self) -> JobInfo:
+        response = await self._remote_controller._transport.arequest(**self._remote_controller._build_job_request("GET", self.job_id))
+        self.info = self._remote_controller._decode_job_info(response)
+        return self.info
+
+    async def cancel(self) -> JobInfo:
+        response = await self._remote_controller._transport.arequest(**self._remote_controller._build_job_request("POST", self.job_id, "cancel"))
+        self.info = self._remote_controller._decode_job_info(response)
+        return self.info
+
+    async def result(self, timeout: Optional[float] = None) -> Any:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            request = self._remote_controller._build_job_request("GET", self.job_id, "result", wait=self._next_wait(deadline))
+            done, result = self._handle_result_response(await self._remote_controller._transport.arequest(**request), deadline)
+            if done:
+                return result
+
+    def __await__(self):
+        return self.result().__await__()
+
+# %% pts/ctrlstack/remote_controller.pct.py 14
+class _CoalescingState:
+    def __init__(self):
+        self.pending: Dict[Tuple[str, str], Tuple[MethodSpec, tuple, dict, Dict[str, Any], asyncio.Future]] = {}
+        self.inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.flush_handle: Optional[asyncio.Handle] = None
+        self.tasks: set = set()  # Strong references to the running sends
+
+class _CallCoalescer:
+    def __init__(self, remote_controller: "RemoteController", window: float, method_types: Tuple[ControllerMethodType, ...]):
+        self._remote_controller = remote_controller
+        self.window = window
+        self.method_types = method_types
+        self._states: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # loop -> _CoalescingState
+        self.stats = {"calls": 0, "deduplicated": 0, "requests": 0}
+
+    def _get_state(self, loop: asyncio.AbstractEventLoop) -> _CoalescingState:
+        state = self._states.get(loop)
+        if state is None:
+            for closed_loop in [l for l in self._states if l.is_closed()]:
+                del self._states[closed_loop]
+            state = self._states[loop] = _CoalescingState()
+        return state
+
+    async def call(self, spec: MethodSpec, args: tuple, kwargs: dict) -> Any:
+        loop = asyncio.get_running_loop()
+        state = self._get_state(loop)
+        encoded_args = spec.encode_args(args, kwargs)
+        key = (spec.name, json.dumps(encoded_args, sort_keys=True, default=str))
+        self.stats["calls"] += 1
+        future = state.inflight.get(key)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            future = state.inflight[key] = loop.create_future()
+            state.pending[key] = (spec, args, kwargs, encoded_args, future)
+            if state.flush_handle is None:
+                state.flush_handle = loop.call_later(self.window, self._flush, loop, state)
+        # Shielded so that a cancelled caller does not cancel the call shared with other callers
+        return await asyncio.shield(future)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, state: _CoalescingState):
+        calls = list(state.pending.items())
+        state.pending = {}
+        state.flush_handle = None
+        task = loop.create_task(self._send(state, calls))
+        state.tasks.add(task)
+        task.add_done_callback(state.tasks.discard)
+
+    async def _send(self, state: _CoalescingState, calls):
+        self.stats["requests"] += 1
+        try:
+            if len(calls) == 1:
+                (spec, args, kwargs, _, _) = calls[0][1]
+                response = await self._remote_controller._transport.arequest(**self._remote_controller._build_request(spec, args, kwargs))
+                try:
+                    results = [self._remote_controller._decode_response(spec, response)]
+                except RemoteCallError as e:
+                    results = [e]
+            else:
+                results = await self._remote_controller._asend_batch(
+                    [(spec, encoded_args) for _, (spec, _, _, encoded_args, _) in calls], return_exceptions=True
+                )
+        except Exception as e:
+            results = [e] * len(calls)
+        for (key, (_, _, _, _, future)), result in zip(calls, results):
+            state.inflight.pop(key, None)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+# %% pts/ctrlstack/remote_controller.pct.py 15
+_NO_TRACE = contextlib.nullcontext()  # Reusable, and costs next to nothing per call when not tracing
+
+# %% pts/ctrlstack/remote_controller.pct.py 16
+class RemoteController(Controller):
+    _method_specs: Optional[Dict[str, StaticMethodSpec]] = None  # The precomputed specs of generated clients
+
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: Optional[float] = 5.0,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        busy_retries: int = 3,
+        max_retry_after: float = 30.0,
+        coalesce_window: Optional[float] = None,
+        coalesce_method_types: Tuple[ControllerMethodType, ...] = (ControllerMethodType.QUERY,),
+        tracer: Optional[Tracer] = None,
+        uds: Optional[str] = None,
+    ):
+        self.set_url(url)
+        self._api_key = api_key
+        
+        if self._api_key:
+            self._headers = {"X-API-Key": self._api_key}
+        else:
+            self._headers = {}
+
+        self._transport = HTTPTransport(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            busy_retries=busy_retries,
+            max_retry_after=max_retry_after,
+            uds=uds,
+        )
+
+        if coalesce_window is None:
+            self._coalescer = None
+        elif getattr(self, '_mode', 'async') != "async":
+            raise ValueError("Call coalescing requires mode='async'.")
+        else:
+            self._coalescer = _CallCoalescer(self, coalesce_window, tuple(coalesce_method_types))
+        self.last_profile: Optional[str] = None
+        self._tracer = tracer
+        self._collect_timings = False
+        self.last_timings: Optional[CallTimings] = None
+            
+    def set_url(self, url: str):
+        self._url = url.lstrip('/')
+
+    def close(self):
+        """Close the pooled connections to the server."""
+        self._transport.close()
+
+    async def aclose(self):
+        """Close the pooled connections to the server, including those of the running event loop."""
+        await self._transport.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    def _build_request(self, spec: MethodSpec, args, kwargs) -> Dict[str, Any]:
+        params, body = spec.prepare_request_args(args, kwargs)
+        match spec.method_type:
+            case ControllerMethodType.QUERY: http_method = "GET"
+            case ControllerMethodType.COMMAND: http_method = "POST"
+            case _: raise ValueError(f"Unsupported method type: {spec.method_type}")
+        url = f"{self._url}/{spec.get_route(self._prepend_method_group).lstrip('/')}"
+        if spec.input_stream_param is not None:
+            # Uploaded as a chunked NDJSON body, encoded lazily as the request is sent
+            items = spec.bind(args, kwargs)[spec.input_stream_param]
+            content = spec.aencode_input_items(items) if self._mode == "async" else spec.encode_input_items(items)
+            headers = {**self._headers, "Content-Type": NDJSON_MEDIA_TYPE}
+            return dict(method=http_method, url=url, params=params, content=content, headers=headers)
+        return dict(method=http_method, url=url, params=params, json=body, headers=self._headers)
+
+    def _trace_call(self, name: str, request: Dict[str, Any]):
+        """Record the block as a client span of `request` if tracing, and send the span context with the request."""
+        if self._tracer is None:
+            return _NO_TRACE
+        return self._tracer.client_span(name, request)
+
+    def collect_timings(self, enabled: bool = True):
+        """
+        Time the phases of the following calls, and keep the `CallTimings` of the last one in `last_timings`. Servers
+        created with `server_timing=True` add their own phases. Streaming and coalesced calls are not timed.
+        """
+        self._collect_timings = enabled
+
+    def _call_timed_sync(self, spec: MethodSpec, args, kwargs) -> Any:
+        timer, start = _HTTPTimer(), time.perf_counter()
+        request = self._build_request(spec, args, kwargs)
+        serialized = time.perf_counter()
+        with self._trace_call(spec.name, request):
+            response = self._transport.request(**request, extensions={"trace": timer.record})
+            received = time.perf_counter()
+            try:
+                return self._decode_response(spec, response)
+            finally:
+                self.last_timings = timer.call_timings(spec.name, start, serialized, received, time.perf_counter(), response.headers.get(SERVER_TIMING_HEADER))
+
+    async def _call_timed_async(self, spec: MethodSpec, args, kwargs) -> Any:
+        timer, start = _HTTPTimer(), time.perf_counter()
+        request = self._build_request(spec, args, kwargs)
+        serialized = time.perf_counter()
+        with self._trace_call(spec.name, request):
+            response = await self._transport.arequest(**request, extensions={"trace": timer.arecord})
+            received = time.perf_counter()
+            try:
+                return self._decode_response(spec, response)
+            finally:
+                self.last_timings = timer.call_timings(spec.name, start, serialized, received, time.perf_counter(), response.headers.get(SERVER_TIMING_HEADER))
+
+    def _call_sync(self, spec: MethodSpec, args, kwargs) -> Any:
+        if self._collect_timings:
+            return self._call_timed_sync(spec, args, kwargs)
+        request = self._build_request(spec, args, kwargs)
+        with self._trace_call(spec.name, request):
+            response = self._transport.request(**request)
+            return self._decode_response(spec, response)
+
+    async def _call_async(self, spec: MethodSpec, args, kwargs) -> Any:
+        if self._coalescer is not None and spec.method_type in self._coalescer.method_types and spec.input_stream_param is None and not spec.background:
+            return await self._coalescer.call(spec, args, kwargs)
+        if self._collect_timings:
+            return await self._call_timed_async(spec, args, kwargs)
+        request = self._build_request(spec, args, kwargs)
+        with self._trace_call(spec.name, request):
+            response = await self._transport.arequest(**request)
+            return self._decode_response(spec, response)
+
+    def _stream_sync(self, spec: MethodSpec, args, kwargs) -> Iterator[Any]:
+        """Yield the items of a streaming method as the NDJSON lines of the response arrive."""
+        request = self._build_request(spec, args, kwargs)
+        with self._trace_call(spec.name, request):
+            with self._transport.stream(**request) as response:
+                if response.status_code != 200:
+                    response.read()
+                    self._decode_response(spec, response)
+                for line in response.iter_lines():
+                    if line:
+                        yield self._decode_stream_line(spec, line)
+
+    async def _stream_async(self, spec: MethodSpec, args, kwargs) -> AsyncIterator[Any]:
+        request = self._build_request(spec, args, kwargs)
+        with self._trace_call(spec.name, request):
+            async with self._transport.astream(**request) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    self._decode_response(spec, response)
+                async for line in response.aiter_lines():
+                    if line:
+                        yield self._decode_stream_line(spec, line)
+
+    def _decode_response(self, spec: MethodSpec, response) -> Any:
+        if PROFILE_HEADER in response.headers:
+            self.last_profile = response.headers[PROFILE_HEADER]
+        if spec.background and response.status_code == HTTP_202_ACCEPTED:
+            return self._make_job_handle(JobInfo.model_validate(response.json()), spec)
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling remote method {spec.name}: {response.text}", response.status_code, response.text)
+        return spec.decode_result(response.json())
+
+    def _decode_stream_line(self, spec: MethodSpec, line: str) -> Any:
+        entry = json.loads(line)
+        if "error" in entry:
+            error = entry["error"]
+            raise RemoteCallError(f"Error streaming from remote method {spec.name}: {error['detail']}", error["status_code"], error["detail"])
+        return spec.decode_item(entry["item"])
+
+    def _build_job_request(self, http_method: str, job_id: Optional[str] = None, action: Optional[str] = None, wait: Optional[float] = None) -> Dict[str, Any]:
+        url = f"{self._url}{job_route(job_id, action) if job_id is not None else JOBS_ROUTE}"
+        params = {"wait": wait} if wait is not None else None
+        return dict(method=http_method, url=url, params=params, headers=self._headers)
+
+    def _decode_job_info(self, response) -> JobInfo:
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling job route: {response.text}", response.status_code, response.text)
+        return JobInfo.model_validate(response.json())
+
+    def _make_job_handle(self, info: JobInfo, spec: Optional[MethodSpec] = None) -> JobHandle:
+        return (AsyncJobHandle if self._mode == "async" else JobHandle)(self, info, spec)
+
+    def get_job(self, job_id: str, method_name: Optional[str] = None) -> JobHandle:
+        """
+        Return a handle of an existing background job, without contacting the server. If `method_name` is given,
+        the result of the job is decoded with its return type.
+        """
+        spec = self._get_method_spec(method_name) if method_name is not None else None
+        return self._make_job_handle(JobInfo(job_id=job_id, method=method_name or "", created_at=0.0), spec)
+
+    def _list_jobs_sync(self) -> List[JobInfo]:
+        """List the background jobs on the server."""
+        response = self._transport.request(**self._build_job_request("GET"))
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling job route: {response.text}", response.status_code, response.text)
+        return [JobInfo.model_validate(info) for info in response.json()]
+
+    async def _list_jobs_async(self) -> List[JobInfo]:
+        response = await self._transport.arequest(**self._build_job_request("GET"))
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling job route: {response.text}", response.status_code, response.text)
+        return [JobInfo.model_validate(info) for info in response.json()]
+    _list_jobs_async.__doc__ = _list_jobs_sync.__doc__
+
+    def profile_calls(self, enabled: bool = True, format: Optional[ProfileFormat] = None):
+        """
+        Ask the server to profile the following calls (see `create_controller_server(enable_profiling=True)`). The
+        name of the profile of the last profiled call is kept in `last_profile`.
+
+        Args:
+            enabled (bool): Whether to profile the following calls.
+            format (Optional[ProfileFormat]): Format of the profiles. None uses the settings of each method on the server.
+        """
+        self._headers = {k: v for k, v in self._headers.items() if k != PROFILE_HEADER}
+        if enabled:
+            self._headers[PROFILE_HEADER] = ProfileFormat(format).value if format is not None else "default"
+
+    def _build_profiling_request(self, http_method: str, method_name: Optional[str] = None, profile: Optional[str] = None, settings: Optional[ProfileSettings] = None) -> Dict[str, Any]:
+        url = f"{self._url}{profiling_route(method_name, profile)}"
+        body = settings.model_dump(mode="json") if settings is not None else None
+        return dict(method=http_method, url=url, json=body, headers=self._headers)
+
+    def _check_profiling_response(self, response):
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling profiling route: {response.text}", response.status_code, response.text)
+        return response
+
+    def _get_profiling_sync(self) -> ProfilingInfo:
+        """The profile settings of the methods on the server, and the profiles it keeps."""
+        response = self._transport.request(**self._build_profiling_request("GET"))
+        return ProfilingInfo.model_validate(self._check_profiling_response(response).json())
+
+    async def _get_profiling_async(self) -> ProfilingInfo:
+        response = await self._transport.arequest(**self._build_profiling_request("GET"))
+        return ProfilingInfo.model_validate(self._check_profiling_response(response).json())
+    _get_profiling_async.__doc__ = _get_profiling_sync.__doc__
+
+    def _set_profiling_sync(self, method_name: str, sample_every: int = 0, format: ProfileFormat = ProfileFormat.CPROFILE) -> ProfileSettings:
+        """Profile one call in `sample_every` of a method on the server. 0 stops sampling the method."""
+        settings = ProfileSettings(sample_every=sample_every, format=format)
+        response = self._transport.request(**self._build_profiling_request("PUT", method_name, settings=settings))
+        return ProfileSettings.model_validate(self._check_profiling_response(response).json())
+
+    async def _set_profiling_async(self, method_name: str, sample_every: int = 0, format: ProfileFormat = ProfileFormat.CPROFILE) -> ProfileSettings:
+        settings = ProfileSettings(sample_every=sample_every, format=format)
+        response = await self._transport.arequest(**self._build_profiling_request("PUT", method_name, settings=settings))
+        return ProfileSettings.model_validate(self._check_profiling_response(response).json())
+    _set_profiling_async.__doc__ = _set_profiling_sync.__doc__
+
+    def _get_profile_sync(self, name: str) -> bytes:
+        """Download a profile kept by the server."""
+        response = self._transport.request(**self._build_profiling_request("GET", profile=name))
+        return self._check_profiling_response(response).content
+
+    async def _get_profile_async(self, name: str) -> bytes:
+        response = await self._transport.arequest(**self._build_profiling_request("GET", profile=name))
+        return self._check_profiling_response(response).content
+    _get_profile_async.__doc__ = _get_profile_sync.__doc__
+
+    def _get_method_spec(self, name: str) -> MethodSpec:
+        if self._method_specs is not None:
+            if name not in self._method_specs:
+                raise AttributeError(f"'{type(self).__name__}' has no controller method '{name}'")
+            return self._method_specs[name]
+        return get_method_spec(self._base_controller_cls, name)
+
+    def _build_batch_request(self, calls: List[Tuple[MethodSpec, Dict[str, Any]]]) -> Dict[str, Any]:
+        body = [{"method": spec.name, "args": encoded_args} for spec, encoded_args in calls]
+        return dict(method="POST", url=f"{self._url}{BATCH_ROUTE}", json=body, headers=self._headers)
+
+    def _decode_batch_response(self, calls: List[Tuple[MethodSpec, Dict[str, Any]]], response, return_exceptions: bool) -> List[Any]:
+        if response.status_code != 200:
+            raise RemoteCallError(f"Error calling batch route: {response.text}", response.status_code, response.text)
+        results = []
+        for (spec, _), entry in zip(calls, response.json()):
+            if "error" in entry:
+                status_code, detail = entry["error"]["status_code"], entry["error"]["detail"]
+                error = RemoteCallError(f"Error calling remote method {spec.name}: {json.dumps(detail)}", status_code, detail)
+                if not return_exceptions:
+                    raise error
+                results.append(error)
+            else:
+                results.append(spec.decode_result(entry["result"]))
+        return results
+
+    def _send_batch(self, calls: List[Tuple[MethodSpec, Dict[str, Any]]], return_exceptions: bool = False) -> List[Any]:
+        request = self._build_batch_request(calls)
+        with self._trace_call("batch", request):
+            response = self._transport.request(**request)
+            return self._decode_batch_response(calls, response, return_exceptions)
+
+    async def _asend_batch(self, calls: List[Tuple[MethodSpec, Dict[str, Any]]], return_exceptions: bool = False) -> List[Any]:
+        request = self._build_batch_request(calls)
+        with self._trace_call("batch", request):
+            response = await self._transport.arequest(**request)
+            return self._decode_batch_response(calls, response, return_exceptions)
+
+    def _prepare_calls(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[MethodSpec, Dict[str, Any]]]:
+        prepared = []
+        for name, kwargs in calls:
+            spec = self._get_method_spec(name)
+            prepared.append((spec, spec.encode_args((), kwargs)))
+        return prepared
+
+    def _call_many_sync(self, calls: List[Tuple[str, Dict[str, Any]]], return_exceptions: bool = False) -> List[Any]:
+        """
+        Run many calls in one request to the server's batch route (see `create_controller_server(enable_batch=True)`).
+
+        Args:
+            calls (List[Tuple[str, Dict[str, Any]]]): (method name, keyword arguments) pairs.
+            return_exceptions (bool): If True, failed calls are returned as `RemoteCallError`s in the results
+                instead of raising the first error.
+
+        Returns:
+            List[Any]: The results of the calls, in order.
+        """
+        return self._send_batch(self._prepare_calls(calls), return_exceptions)
+
+    async def _call_many_async(self, calls: List[Tuple[str, Dict[str, Any]]], return_exceptions: bool = False) -> List[Any]:
+        return await self._asend_batch(self._prepare_calls(calls), return_exceptions)
+    _call_many_async.__doc__ = _call_many_sync.__doc__
+
+    def batch(self) -> RemoteBatch:
+        """Queue calls made on the returned object, and send them in one request when the (async) `with` block exits."""
+        return RemoteBatch(self)
+    
+    def __init_subclass__(cls, base_controller_cls: Optional[Type[Controller]] = None, prepend_method_group: bool=True, mode: str="async", **kwargs):
+        super().__init_subclass__(**kwargs)
+        
+        if base_controller_cls is not None and not issubclass(base_controller_cls, Controller):
+            raise TypeError("base_controller_cls must be a subclass of ctrlstack.Controller")
+        if mode not in ("async", "sync"):
+            raise ValueError(f"mode must be 'async' or 'sync', got {mode!r}")
+        cls._base_controller_cls = base_controller_cls
+        cls._prepend_method_group = prepend_method_group
+        cls._mode = mode
+        cls.call_many = RemoteController._call_many_async if mode == "async" else RemoteController._call_many_sync
+        cls.list_jobs = RemoteController._list_jobs_async if mode == "async" else RemoteController._list_jobs_sync
+        cls.get_profiling = RemoteController._get_profiling_async if mode == "async" else RemoteController._get_profiling_sync
+        cls.set_profiling = RemoteController._set_profiling_async if mode == "async" else RemoteController._set_profiling_sync
+        cls.get_profile = RemoteController._get_profile_async if mode == "async" else RemoteController._get_profile_sync
+        if base_controller_cls is None:
+            return  # Generated clients (see `ctrlstack.stubgen`) define their methods themselves
+        
+        def register_method(method_name: str):
+            method = getattr(base_controller_cls, method_name)
+
+            # Specs are compiled on first call
+            if is_stream_function(method):
+                if mode == "async":
+                    async def remote_method(self, *args, **kwargs):
+                        async for item in self._stream_async(get_method_spec(base_controller_cls, method_name), args, kwargs):
+                            yield item
+                else:
+                    def remote_method(self, *args, **kwargs):
+                        yield from self._stream_sync(get_method_spec(base_controller_cls, method_name), args, kwargs)
+            elif mode == "async":
+                async def remote_method(self, *args, **kwargs):
+                    return await self._call_async(get_method_spec(base_controller_cls, method_name), args, kwargs)
+            else:
+                def remote_method(self, *args, **kwargs):
+                    return self._call_sync(get_method_spec(base_controller_cls, method_name), args, kwargs)
+
+            remote_method = functools.wraps(method)(remote_method)
+            remote_method = ctrl_method(method_type=method._controller_method_type, group=method._controller_method_group)(remote_method)
+            _add_method_to_class(remote_method, cls, method_name, pass_self=True)
+        
+        for method_name in base_controller_cls.get_controller_methods():
+            register_method(method_name)
+
+# %% pts/ctrlstack/remote_controller.pct.py 17
+def create_remote_controller(
+    base_controller_cls: Union[Type[Controller], ControllerManifest],
+    url: str,
+    api_key: Optional[str] = None,
+    max_connections: int = 10,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: Optional[float] = 5.0,
+    timeout: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+    busy_retries: int = 3,
+    max_retry_after: float = 30.0,
+    coalesce_window: Optional[float] = None,
+    coalesce_method_types: Tuple[ControllerMethodType, ...] = (ControllerMethodType.QUERY,),
+    tracer: Optional[Tracer] = None,
+    uds: Optional[str] = None,
+    mode: str = "async",
+) -> RemoteController:
+    """
+    Create a client for a server created with `create_controller_server` from `base_controller_cls`.
+
+    Args:
+        base_controller_cls (Union[Type[Controller], ControllerManifest]): The controller class served by the server,
+            or its manifest (see `fetch_manifest`). Calls of a client created from a manifest return decoded JSON.
+        url (str): Base URL of the server.
+        api_key (Optional[str]): API key sent in the `X-API-Key` header.
+        max_connections (int): Maximum number of open connections to the server.
+        max_keepalive_connections (int): Maximum number of idle connections kept alive. 0 disables keep-alive.
+        keepalive_expiry (Optional[float]): Seconds after which an idle connection is closed.
+        timeout (Optional[float]): Request timeout in seconds. None means no timeout.
+        max_concurrency (Optional[int]): Maximum number of calls in flight at once.
+        busy_retries (int): How many times a call rejected by a concurrency limit of the server (429) is retried
+            after the `Retry-After` it asks for.
+        max_retry_after (float): Longest `Retry-After` in seconds that is waited for. Rejections asking for
+            longer waits raise `RemoteCallError`.
+        coalesce_window (Optional[float]): If set, eligible calls made within this many seconds of each other
+            are sent as one request to the batch route (see `create_controller_server(enable_batch=True)`),
+            and identical pending or in-flight calls share one result. Requires `mode="async"`.
+        coalesce_method_types (Tuple[ControllerMethodType, ...]): Method types eligible for coalescing.
+        tracer (Optional[Tracer]): If given, records a client span per call (or per batch request), and sends its
+            context to the server in the `traceparent` header.
+        uds (Optional[str]): Path of the Unix domain socket the server listens on. The host and port of `url`
+            are then ignored (e.g. `url="http://localhost"`).
+        mode (str): "async" generates `async def` methods that can be awaited concurrently. "sync" generates
+            plain blocking methods, for scripts and threads that have no event loop running.
+    """
+    if isinstance(base_controller_cls, ControllerManifest):
+        base_controller_cls = controller_cls_from_manifest(base_controller_cls)
+    class _RemoteController(RemoteController, base_controller_cls=base_controller_cls, mode=mode): pass
+    return _RemoteController(
+        url,
+        api_key,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+        timeout=timeout,
+        max_concurrency=max_concurrency,
+        busy_retries=busy_retries,
+        max_retry_after=max_retry_after,
+        coalesce_window=coalesce_window,
+        coalesce_method_types=coalesce_method_types,
+        tracer=tracer,
+        uds=uds,
+    )
+
+# %% pts/ctrlstack/remote_controller.pct.py 18
+def fetch_manifest(
+    url: str,
+    api_key: Optional[str] = None,
+    cache_path: Optional[str] = None,
+    max_age: Optional[float] = None,
+    timeout: Optional[float] = 10.0,
+    uds: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
+) -> ControllerManifest:
+    """
+    Get the manifest of the controller of a server, to create clients without importing the controller.
+
+    Args:
+        url (str): Base URL of the server.
+        api_key (Optional[str]): API key sent in the `X-API-Key` header.
+        cache_path (Optional[str]): File keeping a copy of the manifest. While the copy is younger than `max_age`, it is
+            returned without contacting the server. Older copies are revalidated with the server, and replaced if
+            the manifest changed.
+        max_age (Optional[float]): Seconds a copy is used without contacting the server. None uses it until the file
+            is deleted.
+        timeout (Optional[float]): Request timeout in seconds.
+        uds (Optional[str]): Path of a Unix domain socket to connect to instead of the host and port of `url`.
+        transport (Optional[HTTPTransport]): Transport to send the request with, e.g. that of the client the
+            manifest is for, instead of one created for this request. `timeout` and `uds` are then its own.
+    """
+    cached = None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            cached = load_manifest(cache_path)
+        except (OSError, ValueError):
+            pass  # Unreadable, fetched again
+        else:
+            if max_age is None or time.time() - os.path.getmtime(cache_path) <= max_age:
+                return cached
+    headers = {"X-API-Key": api_key} if api_key else {}
+    if cached is not None:
+        headers["If-None-Match"] = f'"{cached.hash}"'
+    own_transport = transport is None
+    if own_transport:
+        transport = HTTPTransport(max_connections=1, timeout=timeout, uds=uds)
+    try:
+        response = transport.request("GET", f"{url.rstrip('/')}{MANIFEST_ROUTE}", headers=headers)
+    finally:
+        if own_transport:
+            transport.close()
+    if cached is not None and response.status_code == 304:
+        os.utime(cache_path)  # Used for another `max_age`
+        return cached
+    if response.status_code != 200:
+        raise RemoteCallError(f"Error calling manifest route: {response.text}", response.status_code, response.text)
+    manifest = ControllerManifest.model_validate_json(response.content)
+    if cache_path is not None:
+        save_manifest(manifest, cache_path)
+    return manifest
@@ -0,0 +1,553 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/server.pct.py
+
+__all__ = ['check_local_controller_server_process', 'create_controller_server', 'start_local_controller_server_process', 'stop_local_controller_server_process']
+
+# %% pts/ctrlstack/server.pct.py 3
+from fastapi import FastAPI, Depends, HTTPException, Security, Request
+from fastapi.security.api_key import APIKeyHeader
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_202_ACCEPTED, HTTP_304_NOT_MODIFIED, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+from pydantic import ValidationError
+from . import Controller, ControllerMethodType
+from .controller import _check_execution_options
+from .method_spec import MethodSpec, _construct_route, compile_method_specs
+from .protocol import BATCH_ROUTE, STATS_ROUTE, JOBS_ROUTE, METRICS_ROUTE, PROFILING_ROUTE, MANIFEST_ROUTE, NDJSON_MEDIA_TYPE, BatchCallRequest, JobInfo, JobStatus, ProfileSettings, ProfilingInfo, batch_result, batch_error, stream_error
+from .type_utils import get_type_adapter
+from .query_cache import QueryCache
+from .single_flight import SingleFlight
+from .jobs import JobManager
+from .limits import ConcurrencyLimit, ConcurrencyLimits
+from .thread_pools import ThreadPools
+from .process_pool import ControllerProcessPool
+from .micro_batch import MicroBatcher
+from .metrics import METRICS_MEDIA_TYPE, MetricsMiddleware, ServerMetrics
+from .profiling import ProfileHeaderMiddleware, Profiler
+from .tracing import Tracer, TracingMiddleware
+from .timing import ServerTimingMiddleware
+from .manifest import build_manifest
+from . import timing
+import functools
+from typing import Callable, Optional, List, Tuple, Dict, Any, Awaitable, AsyncIterator, Iterator
+import json
+import inspect
+import asyncio
+import logging
+import time
+
+# %% pts/ctrlstack/server.pct.py 4
+logger = logging.getLogger(__name__)
+_HTTP_422_UNPROCESSABLE = 422  # The starlette constant was renamed across versions
+
+_STREAM_CHUNK_MAX_ITEMS = 1024
+_STREAM_CHUNK_MAX_DELAY = 0.01  # Seconds
+
+async def _iterate_sync_in_chunks(iterator: Iterator, run_sync: Callable[..., Awaitable[Any]] = run_in_threadpool) -> AsyncIterator[List[Any]]:
+    """
+    Iterate a blocking iterator in the threadpool (or with `run_sync`). Items are fetched in chunks, so that fast iterators do
+    not pay for a thread hop per item, while slow ones still deliver each item without delay.
+    """
+    errors = []
+    def next_chunk():
+        chunk = []
+        start = time.perf_counter()
+        try:
+            for item in iterator:
+                chunk.append(item)
+                if len(chunk) >= _STREAM_CHUNK_MAX_ITEMS or time.perf_counter() - start >= _STREAM_CHUNK_MAX_DELAY:
+                    break
+        except Exception as e:
+            if not chunk:
+                raise
+            errors.append(e)  # Deliver the items produced before the error first
+        return chunk
+    try:
+        while chunk := await run_sync(next_chunk):
+            yield chunk
+            if errors:
+                raise errors.pop()
+    finally:
+        if hasattr(iterator, 'close'):
+            await run_sync(iterator.close)
+
+async def _iterate_async_in_chunks(iterator: AsyncIterator) -> AsyncIterator[List[Any]]:
+    try:
+        async for item in iterator:
+            yield [item]
+    finally:
+        if hasattr(iterator, 'aclose'):
+            await iterator.aclose()
+
+def _make_handler(
+    method: Callable,
+    spec: MethodSpec,
+    run_sync: Callable[..., Awaitable[Any]] = run_in_threadpool,
+) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+    """
+    Wrap a bound controller method into a coroutine function taking the call keyword arguments. For
+    streaming methods, the coroutine returns an async iterator of chunks (lists) of items. Sync methods
+    are run with `run_sync`.
+    """
+    if spec.is_stream:
+        async def handler(kwargs: Dict[str, Any]):
+            if spec.is_async:
+                return _iterate_async_in_chunks(method(**kwargs))
+            return _iterate_sync_in_chunks(method(**kwargs), run_sync)
+    elif spec.is_async:
+        async def handler(kwargs: Dict[str, Any]):
+            return await method(**kwargs)
+    else:
+        async def handler(kwargs: Dict[str, Any]):
+            return await run_sync(method, **kwargs)
+    return handler
+
+def _make_batch_handler(
+    controller: Controller,
+    spec: MethodSpec,
+    run_sync: Callable[..., Awaitable[Any]] = run_in_threadpool,
+) -> Callable[[Dict[str, Any]], Awaitable[List[Any]]]:
+    """Handler of the vectorised implementation of a micro-batched method, taking its arguments as lists."""
+    impl = getattr(controller, spec.micro_batch, None)
+    if not callable(impl):
+        raise ValueError(f"'{spec.name}' is micro-batched with '{spec.micro_batch}', which is not a method of {type(controller).__name__}.")
+    if inspect.iscoroutinefunction(impl):
+        async def batch_handler(columns: Dict[str, List[Any]]):
+            return await impl(**columns)
+    else:
+        async def batch_handler(columns: Dict[str, List[Any]]):
+            return await run_sync(impl, **columns)
+    return batch_handler
+
+def _validate_input_item(spec: MethodSpec, line: bytes) -> Any:
+    try:
+        return spec.input_item_adapter.validate_json(line)
+    except ValidationError as e:
+        raise HTTPException(status_code=_HTTP_422_UNPROCESSABLE, detail=e.errors(include_url=False, include_context=False))
+
+async def _iterate_request_items(spec: MethodSpec, request: Request) -> AsyncIterator[List[Any]]:
+    """Decode an NDJSON request body as it is received, yielding the items of each received chunk."""
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        if b"\n" not in data:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        chunk = [_validate_input_item(spec, line) for line in lines if line.strip()]
+        if chunk:
+            yield chunk
+    if buffer.strip():
+        yield [_validate_input_item(spec, buffer)]
+
+async def _flatten_chunks(chunks: AsyncIterator[List[Any]]) -> AsyncIterator[Any]:
+    async for chunk in chunks:
+        for item in chunk:
+            yield item
+
+async def _next_chunk(chunks: AsyncIterator[List[Any]]) -> Optional[List[Any]]:
+    return await anext(chunks, None)
+
+def _iterate_chunks_from_thread(chunks: AsyncIterator[List[Any]], loop: asyncio.AbstractEventLoop) -> Iterator[Any]:
+    """Iterate the request items from a worker thread, fetching one received chunk per hop to the event loop."""
+    while (chunk := asyncio.run_coroutine_threadsafe(_next_chunk(chunks), loop).result()) is not None:
+        yield from chunk
+
+async def _get_input_stream_arg(spec: MethodSpec, request: Request) -> Any:
+    chunks = _iterate_request_items(spec, request)
+    if spec.input_stream_is_async:
+        return _flatten_chunks(chunks)
+    if not spec.is_async:
+        return _iterate_chunks_from_thread(chunks, asyncio.get_running_loop())  # Consumed by the method in a worker thread
+    # An async method taking a sync iterable cannot wait for items, so they are read up front
+    return [item async for chunk in chunks for item in chunk]
+
+_REQUEST_PARAM = "ctrlstack_request"
+
+def _get_endpoint_signature(spec: MethodSpec) -> inspect.Signature:
+    """
+    Signature of a route for FastAPI, with resolved annotations. The streamed argument (if any) is replaced by
+    the request, and streamed results have no response model.
+    """
+    params = [
+        p.replace(annotation=spec.arg_types[p.name] or p.annotation)
+        for p in spec.signature.parameters.values() if p.name != spec.input_stream_param
+    ]
+    if spec.input_stream_param is not None:
+        params.append(inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+    return_annotation = spec.return_type if spec.return_type is not None and not spec.is_stream else inspect.Signature.empty
+    return spec.signature.replace(parameters=params, return_annotation=return_annotation)
+
+def _encode_stream_chunk(spec: MethodSpec, chunk: List[Any]) -> bytes:
+    adapter = spec.item_adapter or get_type_adapter(Any)
+    # Equivalent to `json.dumps(stream_item(...))` per line, without the intermediate Python objects
+    return b"".join(b'{"item":' + adapter.dump_json(item) + b'}\n' for item in chunk)
+
+async def _stream_response(spec: MethodSpec, chunks: AsyncIterator[List[Any]]) -> StreamingResponse:
+    # The first chunk is fetched before responding, so that errors raised up front get a proper status code
+    first = await anext(chunks, [])
+    async def body():
+        try:
+            if first:
+                yield _encode_stream_chunk(spec, first)
+            async for chunk in chunks:
+                yield _encode_stream_chunk(spec, chunk)
+        except HTTPException as e:
+            yield json.dumps(stream_error(e.status_code, e.detail)).encode() + b"\n"
+        except Exception:
+            logger.exception(f"Error while streaming results of '{spec.name}'")
+            yield json.dumps(stream_error(HTTP_500_INTERNAL_SERVER_ERROR, "Internal Server Error")).encode() + b"\n"
+        finally:
+            await chunks.aclose()
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+async def _run_batch_call(call: BatchCallRequest, handlers: Dict[str, Tuple[MethodSpec, Callable]]) -> Dict[str, Any]:
+    entry = handlers.get(call.method)
+    if entry is None:
+        return batch_error(HTTP_404_NOT_FOUND, f"Unknown method '{call.method}'")
+    spec, handler = entry
+    if spec.is_stream or spec.input_stream_param is not None:
+        return batch_error(HTTP_400_BAD_REQUEST, f"Streaming method '{call.method}' cannot be batched")
+    if spec.background:
+        return batch_error(HTTP_400_BAD_REQUEST, f"Background method '{call.method}' cannot be batched")
+    try:
+        kwargs = spec.decode_args(call.args)
+    except ValidationError as e:
+        return batch_error(_HTTP_422_UNPROCESSABLE, e.errors(include_url=False, include_context=False))
+    except TypeError as e:
+        return batch_error(_HTTP_422_UNPROCESSABLE, str(e))
+    try:
+        return batch_result(spec.encode_result(await handler(kwargs)))
+    except HTTPException as e:
+        return batch_error(e.status_code, e.detail)
+    except Exception:
+        logger.exception(f"Error in batched call to '{call.method}'")
+        return batch_error(HTTP_500_INTERNAL_SERVER_ERROR, "Internal Server Error")
+
+# %% pts/ctrlstack/server.pct.py 5
+_MAX_JOB_RESULT_WAIT = 60.0  # Seconds a result request may wait, to stay below common proxy timeouts
+
+def _add_job_routes(app: FastAPI, jobs: JobManager):
+    def get_job(job_id: str) -> JobInfo:
+        try:
+            return jobs.get(job_id)
+        except KeyError:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Unknown job '{job_id}'")
+
+    @app.get(JOBS_ROUTE)
+    async def list_jobs() -> List[JobInfo]:
+        return jobs.list()
+
+    @app.get(JOBS_ROUTE + "/{job_id}")
+    async def job_status(job_id: str) -> JobInfo:
+        return get_job(job_id)
+
+    @app.get(JOBS_ROUTE + "/{job_id}/result")
+    async def job_result(job_id: str, wait: float = 0.0):
+        get_job(job_id)
+        info = await jobs.wait(job_id, timeout=min(max(wait, 0.0), _MAX_JOB_RESULT_WAIT))
+        if info.status == JobStatus.SUCCEEDED:
+            return batch_result(jobs.result(job_id))
+        if info.status.finished:
+            raise HTTPException(status_code=info.error["status_code"], detail=info.error["detail"])
+        return JSONResponse(info.model_dump(mode="json"), status_code=HTTP_202_ACCEPTED)
+
+    @app.post(JOBS_ROUTE + "/{job_id}/cancel")
+    async def cancel_job(job_id: str) -> JobInfo:
+        get_job(job_id)
+        return jobs.cancel(job_id)
+
+def _add_profiling_routes(app: FastAPI, profiler: Profiler, specs: Dict[str, MethodSpec]):
+    @app.get(PROFILING_ROUTE)
+    async def profiling_info() -> ProfilingInfo:
+        return profiler.info()
+
+    @app.put(PROFILING_ROUTE + "/methods/{method}")
+    async def configure_profiling(method: str, settings: ProfileSettings) -> ProfileSettings:
+        if method not in specs:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Unknown method '{method}'")
+        if not Profiler.supports(specs[method]):
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Method '{method}' cannot be profiled")
+        return profiler.configure(method, settings)
+
+    @app.get(PROFILING_ROUTE + "/profiles/{name}")
+    async def get_profile(name: str):
+        try:
+            path = profiler.get_profile_path(name)
+        except KeyError:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Unknown profile '{name}'")
+        return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+# %% pts/ctrlstack/server.pct.py 6
+def create_controller_server(
+    controller: Controller,
+    prepend_method_group: bool=True,
+    api_keys: Optional[List[str]] = None,
+    enable_batch: bool = False,
+    batch_concurrency: int = 8,
+    enable_stats: bool = False,
+    single_flight_queries: bool = False,
+    job_workers: int = 4,
+    job_result_ttl: float = 3600.0,
+    method_limits: Optional[Dict[str, ConcurrencyLimit]] = None,
+    group_limits: Optional[Dict[str, ConcurrencyLimit]] = None,
+    thread_pools: Optional[Dict[str, int]] = None,
+    method_thread_pools: Optional[Dict[str, str]] = None,
+    group_thread_pools: Optional[Dict[str, str]] = None,
+    controller_factory: Optional[Callable[[], Controller]] = None,
+    process_workers: Optional[int] = None,
+    process_start_method: Optional[str] = None,
+    enable_metrics: bool = False,
+    enable_profiling: bool = False,
+    profile_dir: Optional[str] = None,
+    tracer: Optional[Tracer] = None,
+    server_timing: bool = False,
+    enable_manifest: bool = False,
+) -> FastAPI:
+    """
+    Get the controller server instance.
+    
+    Args:
+        controller (Controller): The controller to get the server for.
+        prepend_method_group (bool): Whether to prefix the route of each method with its group.
+        api_keys (Optional[List[str]]): If given, requests must carry one of these keys in the `X-API-Key` header.
+        enable_batch (bool): Whether to expose the batch route, which runs a list of calls in one request.
+        batch_concurrency (int): Maximum number of calls of a single batch that run concurrently.
+        enable_stats (bool): Whether to expose the stats route, which reports server-side counters (e.g. of the query cache).
+        single_flight_queries (bool): Whether concurrent query calls with equal arguments share one execution
+            and its result.
+        job_workers (int): Maximum number of background jobs (commands marked with `background=True`) that run at once.
+        job_result_ttl (float): Seconds that finished background jobs and their results are kept.
+        method_limits (Optional[Dict[str, ConcurrencyLimit]]): Concurrency limits by method name, overriding those
+            declared with `ctrl_method(max_concurrency=...)`. Calls beyond the limit and its queue get a 429.
+        group_limits (Optional[Dict[str, ConcurrencyLimit]]): Concurrency limits shared by all methods of a group.
+            Background jobs are not limited, as they are bounded by `job_workers`.
+        thread_pools (Optional[Dict[str, int]]): Number of threads of each named thread pool. Pools that are
+            assigned but not listed get the default size of `ThreadPoolExecutor`.
+        method_thread_pools (Optional[Dict[str, str]]): Thread pool by method name, for sync methods, overriding
+            those declared with `ctrl_method(thread_pool=...)`. Async and process-pool methods cannot be given one.
+        group_thread_pools (Optional[Dict[str, str]]): Thread pool of the sync methods of a group. Sync methods
+            without a pool run on the shared threadpool of Starlette.
+        controller_factory (Optional[Callable[[], Controller]]): Builds the copies of the controller held by the
+            worker processes of methods declared with `ctrl_method(process_pool=True)`. If None, the controller is
+            pickled to each worker instead.
+        process_workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs.
+        process_start_method (Optional[str]): The multiprocessing start method of the workers. None uses the
+            default of the platform.
+        enable_metrics (bool): Whether to record request metrics (counts, errors, latency, sizes, auth failures) per
+            route and serve them on the metrics route, in the Prometheus text format. With `api_keys`, the metrics
+            route needs a key like any other, so scrapers must send one. Every 401 response counts as an auth failure.
+        enable_profiling (bool): Whether to expose the profiling routes, which set the methods whose calls are
+            sampled for profiling at runtime, and to profile calls carrying the profile header.
+        profile_dir (Optional[str]): Directory of the profile files. Defaults to a new temporary directory,
+            removed on shutdown.
+        tracer (Optional[Tracer]): If given, records a span per request and per phase of the request (decode,
+            queue, exec, encode), continuing the traces of clients. Exported to `tracer.path`, if set, on shutdown.
+        server_timing (bool): Whether to report the time of each phase of a request in its `Server-Timing`
+            response header.
+        enable_manifest (bool): Whether to expose the manifest route, which describes the controller methods, so
+            that clients can be created without importing the controller (see `ctrlstack.manifest`).
+ 
+    Returns:
+        FastAPI: The controller server instance.
+    """
+    if not isinstance(controller, Controller):
+        raise TypeError("The controller must be an instance of ctrlstack.Controller")
+    
+    if api_keys is None:
+        app = FastAPI()
+    else:
+        api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+        async def get_api_key(api_key: str = Security(api_key_header)):
+            if api_key in api_keys:
+                return api_key
+            raise HTTPException(
+                status_code=HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing API Key",
+            )
+        app = FastAPI(dependencies=[Depends(get_api_key)])        
+
+    handlers: Dict[str, Tuple[MethodSpec, Callable]] = {}
+    specs = compile_method_specs(type(controller))
+
+    query_cache = QueryCache()
+    app.state.query_cache = query_cache
+    single_flight = SingleFlight()
+    app.state.single_flight = single_flight
+    jobs = JobManager(max_workers=job_workers, result_ttl=job_result_ttl)
+    app.state.jobs = jobs
+    unknown = set(method_limits or {}).difference(specs)
+    if unknown:
+        raise ValueError(f"Concurrency limits given for unknown methods: {sorted(unknown)}")
+    unknown = set(method_thread_pools or {}).difference(specs)
+    if unknown:
+        raise ValueError(f"Thread pools given for unknown methods: {sorted(unknown)}")
+    for name, pool_name in (method_thread_pools or {}).items():
+        spec = specs[name]
+        _check_execution_options(
+            spec.func, spec.background, spec.max_concurrency, pool_name, spec.process_pool, spec.micro_batch,
+            takes_stream=spec.input_stream_param is not None, name=name,
+        )
+    limits = ConcurrencyLimits(method_limits, group_limits)
+    app.state.limits = limits
+    micro_batcher = MicroBatcher()
+    app.state.micro_batcher = micro_batcher
+    app.router.on_shutdown.append(micro_batcher.shutdown)  # Before the thread pools that run the batches
+    pools = ThreadPools(thread_pools, method_thread_pools, group_thread_pools)
+    app.state.thread_pools = pools
+    app.router.on_shutdown.append(pools.shutdown)
+    process_pool = None
+    if any(spec.process_pool for spec in specs.values()):
+        process_pool = ControllerProcessPool(controller_factory or controller, process_workers, process_start_method)
+        app.router.on_startup.append(process_pool.start)
+        app.router.on_shutdown.append(process_pool.shutdown)
+    app.state.process_pool = process_pool
+    profiler = Profiler(profile_dir) if enable_profiling else None
+    app.state.profiler = profiler
+    cached_groups = {spec.group for spec in specs.values() if spec.cache_ttl is not None}
+    
+    def register_func(func: Callable, spec: MethodSpec, route: str, http_method: str):
+        timed = (tracer is not None or server_timing) and not spec.background  # Jobs run after their request
+        if spec.micro_batch is not None:
+            # Limits apply to the batches, which are what runs the implementation
+            handler = micro_batcher.wrap(spec, limits.wrap(spec, _make_batch_handler(controller, spec, pools.get_runner(spec))))
+        elif spec.process_pool:
+            handler = process_pool.make_handler(spec)
+        elif spec.is_async:
+            handler = _make_handler(func, spec)
+        else:
+            method = func
+            if profiler is not None and Profiler.supports(spec):
+                method = profiler.wrap_method(spec, method)
+            if timed:
+                method = timing.wrap_method(method)
+            handler = _make_handler(method, spec, pools.get_runner(spec))
+        if timed and (spec.is_async or spec.process_pool) and spec.micro_batch is None:
+            handler = timing.wrap_exec(handler)
+        if profiler is not None and Profiler.supports(spec):
+            handler = profiler.wrap(spec, handler)
+        if not spec.background and spec.micro_batch is None:
+            handler = limits.wrap(spec, handler)
+        if single_flight_queries and spec.method_type == ControllerMethodType.QUERY and not spec.is_stream:
+            handler = single_flight.wrap(spec, handler)
+        if spec.cache_ttl is not None:
+            handler = query_cache.wrap_query(spec, handler)
+        if cached_groups.intersection(spec.invalidates):
+            handler = query_cache.wrap_command(spec, handler)
+        if timed:
+            handler = timing.wrap_handler(handler, stream=spec.is_stream)
+        handlers[spec.name] = (spec, handler)
+
+        route_kwargs = {}
+        if spec.is_stream or spec.input_stream_param is not None:
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                if spec.input_stream_param is not None:
+                    kwargs[spec.input_stream_param] = await _get_input_stream_arg(spec, kwargs.pop(_REQUEST_PARAM))
+                result = await handler(kwargs)
+                return await _stream_response(spec, result) if spec.is_stream else result
+            # FastAPI unwraps endpoints to detect generators and read parameters, so the method must not be exposed
+            del wrapper.__wrapped__
+            wrapper.__signature__ = _get_endpoint_signature(spec)
+            if spec.is_stream:
+                route_kwargs = dict(response_model=None, response_class=StreamingResponse)
+        elif spec.background:
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                info = jobs.submit(spec, handler, kwargs)
+                return JSONResponse(info.model_dump(mode="json"), status_code=HTTP_202_ACCEPTED)
+            route_kwargs = dict(response_model=JobInfo, status_code=HTTP_202_ACCEPTED)
+        else:
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                return await handler(kwargs)
+        match http_method:
+            case "GET": app.get(route, **route_kwargs)(wrapper)
+            case "POST": app.post(route, **route_kwargs)(wrapper)
+            case _: raise ValueError(f"Unsupported HTTP method: {http_method}")
+    
+    for method_name, spec in specs.items():
+        method = getattr(controller, method_name)
+        route = spec.get_route(prepend_method_group)
+        match spec.method_type:
+            case ControllerMethodType.QUERY:
+                register_func(method, spec, route, "GET")
+            case ControllerMethodType.COMMAND:
+                register_func(method, spec, route, "POST")
+            case _:
+                raise ValueError(f"Unsupported method type: {spec.method_type}")
+
+    if enable_batch:
+        @app.post(BATCH_ROUTE)
+        async def batch(calls: List[BatchCallRequest]) -> List[Dict[str, Any]]:
+            semaphore = asyncio.Semaphore(batch_concurrency)
+            async def run(call: BatchCallRequest):
+                async with semaphore:
+                    return await _run_batch_call(call, handlers)
+            return await asyncio.gather(*[run(call) for call in calls])
+
+    if any(spec.background for spec in specs.values()):
+        _add_job_routes(app, jobs)
+
+    if profiler is not None:
+        _add_profiling_routes(app, profiler, specs)
+        app.add_middleware(ProfileHeaderMiddleware)
+        app.router.on_shutdown.append(profiler.cleanup)
+
+    if enable_metrics:
+        metrics = ServerMetrics(auth_failure_status=HTTP_401_UNAUTHORIZED)
+        app.state.metrics = metrics
+        app.add_middleware(MetricsMiddleware, metrics=metrics, routes=app.routes)
+
+        @app.get(METRICS_ROUTE, include_in_schema=False)
+        async def get_metrics():
+            return Response(metrics.expose(), media_type=METRICS_MEDIA_TYPE)
+
+    if server_timing:
+        app.add_middleware(ServerTimingMiddleware)
+
+    if tracer is not None:
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+        if tracer.path is not None:
+            app.router.on_shutdown.append(tracer.export)
+
+    if enable_manifest:
+        @functools.cache
+        def manifest_content() -> Tuple[str, bytes]:
+            """The ETag and JSON of the manifest, built on first request."""
+            manifest = build_manifest(type(controller))
+            return f'"{manifest.hash}"', manifest.model_dump_json().encode()
+
+        @app.get(MANIFEST_ROUTE)
+        async def get_manifest(request: Request) -> Response:
+            etag, content = manifest_content()
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            return Response(content, media_type="application/json", headers={"ETag": etag})
+
+    if enable_stats:
+        @app.get(STATS_ROUTE)
+        async def stats() -> Dict[str, Any]:
+            return {
+                "query_cache": query_cache.stats(),
+                "single_flight": single_flight.stats(),
+                "jobs": jobs.stats(),
+                "limits": limits.stats(),
+                "thread_pools": pools.stats(),
+                "process_pool": process_pool.info()._asdict() if process_pool is not None else None,
+                "micro_batch": micro_batcher.stats(),
+            }
+
+    return app
+
+# %% pts/ctrlstack/server.pct.py 8
+import uvicorn
+
+def _start_fastapi_server(app: FastAPI,
+                         port: Optional[int],
+                         uvicorn_kwargs: Optional[Dict[str, Any]] = None):  # No port when given a socket (`fd` or `uds`)
+    uvicorn.run(app, host="127.0.0.1", port=port, **(uvicorn_kwargs or {}))
+
+# %% pts/ctrlstack/server.pct.py 10
+from .local_server import (
+    _is_port_free, _find_free_port, _pid_exists, _read_lockfile, _write_lockfile, _delete_lockfile,
+    start_local_controller_server_process, check_local_controller_server_process, stop_local_controller_server_process,
+)
@@ -0,0 +1,59 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/single_flight.pct.py
+
+__all__ = ['SingleFlight', 'SingleFlightInfo']
+
+# %% pts/ctrlstack/single_flight.pct.py 3
+from .method_spec import MethodSpec
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Tuple
+import asyncio
+
+# %% pts/ctrlstack/single_flight.pct.py 4
+class SingleFlightInfo(NamedTuple):
+    calls: int
+    executions: int
+    collapsed: int
+    inflight: int
+
+# %% pts/ctrlstack/single_flight.pct.py 5
+class _MethodCounters:
+    def __init__(self):
+        self.calls = self.executions = self.collapsed = 0
+
+# %% pts/ctrlstack/single_flight.pct.py 6
+class SingleFlight:
+    """Shares the execution of concurrent identical calls."""
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str, str], asyncio.Task] = {}
+        self._counters: Dict[str, _MethodCounters] = {}
+
+    def info(self, name: str) -> SingleFlightInfo:
+        counters = self._counters[name]
+        inflight = sum(1 for _, method, _ in self._inflight if method == name)
+        return SingleFlightInfo(counters.calls, counters.executions, counters.collapsed, inflight)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters of each deduplicated method, keyed by method name."""
+        return {name: self.info(name)._asdict() for name in self._counters}
+
+    def _finish(self, key, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved, in case every caller went away before it finished
+
+    def wrap(self, spec: MethodSpec, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Wrap a handler so that concurrent calls with equal arguments share one execution."""
+        counters = self._counters.setdefault(spec.name, _MethodCounters())
+        async def single_flight_handler(kwargs: Dict[str, Any]):
+            # Keyed by loop too, as tasks cannot be awaited from another event loop
+            key = (asyncio.get_running_loop(), spec.name, spec.call_key(kwargs))
+            counters.calls += 1
+            task = self._inflight.get(key)
+            if task is None:
+                counters.executions += 1
+                task = asyncio.ensure_future(handler(kwargs))
+                self._inflight[key] = task
+                task.add_done_callback(lambda task: self._finish(key, task))
+            else:
+                counters.collapsed += 1
+            return await asyncio.shield(task)
+        return single_flight_handler
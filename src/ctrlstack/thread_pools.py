@@ -0,0 +1,149 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/thread_pools.pct.py
+
+__all__ = ['ThreadPool', 'ThreadPoolInfo', 'ThreadPools']
+
+# %% pts/ctrlstack/thread_pools.pct.py 3
+from .method_spec import MethodSpec
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+
+# %% pts/ctrlstack/thread_pools.pct.py 4
+class ThreadPoolInfo(NamedTuple):
+    max_workers: int
+    busy: int  # Threads running a call
+    queued: int  # Calls waiting for a thread
+    submitted: int
+    completed: int
+    cancelled: int  # Calls cancelled while waiting for a thread, so never run
+    mean_queue_wait: float  # Seconds
+    max_queue_wait: float  # Seconds
+    mean_run_time: float  # Seconds
+
+# %% pts/ctrlstack/thread_pools.pct.py 5
+class ThreadPool:
+    """
+    A named pool of threads. The threads are started on first use, and can be stopped with `shutdown`.
+
+    Args:
+        name (str): Name of the pool, used for its threads.
+        max_workers (Optional[int]): Number of threads. None uses the default of `ThreadPoolExecutor`.
+        clock (Callable[[], float]): Monotonic clock used for the metrics.
+    """
+    def __init__(self, name: str, max_workers: Optional[int] = None, clock: Callable[[], float] = time.perf_counter):
+        self.name = name
+        self.clock = clock
+        self.max_workers = max_workers if max_workers is not None else min(32, (os.cpu_count() or 1) + 4)  # Default of ThreadPoolExecutor
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.busy = self.queued = self.submitted = self.completed = self.cancelled = 0
+        self.total_queue_wait = self.max_queue_wait = self.total_run_time = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"ctrlstack-{self.name}")
+            return self._executor
+
+    def _call(self, func: Callable, submitted_at: float, *args, **kwargs) -> Any:
+        started_at = self.clock()
+        queue_wait = started_at - submitted_at
+        with self._lock:
+            self.queued -= 1
+            self.busy += 1
+            self.total_queue_wait += queue_wait
+            self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.busy -= 1
+                self.completed += 1
+                self.total_run_time += self.clock() - started_at
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` on the pool and wait for its result. Context variables are passed on, like `run_in_threadpool`."""
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._call, func, self.clock(), *args, **kwargs)
+        future = self.executor.submit(call)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():  # Still queued, so `_call` never runs. A running call cannot be cancelled.
+                with self._lock:
+                    self.queued -= 1
+                    self.cancelled += 1
+            raise
+
+    def info(self) -> ThreadPoolInfo:
+        with self._lock:
+            completed = self.completed
+            started = self.submitted - self.queued - self.cancelled
+            return ThreadPoolInfo(
+                self.max_workers, self.busy, self.queued, self.submitted, completed, self.cancelled,
+                self.total_queue_wait / started if started else 0.0, self.max_queue_wait,
+                self.total_run_time / completed if completed else 0.0,
+            )
+
+    def shutdown(self, wait: bool = False):
+        """Stop the threads once they finish their calls. The pool starts new threads if it is used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+# %% pts/ctrlstack/thread_pools.pct.py 6
+class ThreadPools:
+    """
+    The named thread pools of a server, and the assignment of sync methods to them.
+
+    Args:
+        sizes (Optional[Dict[str, int]]): Number of threads by pool name. Pools that are assigned but not sized
+            get the default size of `ThreadPoolExecutor`.
+        method_pools (Optional[Dict[str, str]]): Pool name by method name. These take precedence over the
+            pools declared with `ctrl_method(thread_pool=...)`.
+        group_pools (Optional[Dict[str, str]]): Pool name by group, for the methods of the group that are not
+            assigned otherwise.
+    """
+    def __init__(
+        self,
+        sizes: Optional[Dict[str, int]] = None,
+        method_pools: Optional[Dict[str, str]] = None,
+        group_pools: Optional[Dict[str, str]] = None,
+    ):
+        self.sizes = dict(sizes or {})
+        self.method_pools = dict(method_pools or {})
+        self.group_pools = dict(group_pools or {})
+        self._pools: Dict[str, ThreadPool] = {}
+
+    def get_pool_name(self, spec: MethodSpec) -> Optional[str]:
+        """The pool a method runs on, or None for the shared threadpool."""
+        return self.method_pools.get(spec.name) or spec.thread_pool or self.group_pools.get(spec.group)
+
+    def get_pool(self, name: str) -> ThreadPool:
+        if name not in self._pools:
+            self._pools[name] = ThreadPool(name, self.sizes.get(name))
+        return self._pools[name]
+
+    def get_runner(self, spec: MethodSpec) -> Callable[..., Awaitable[Any]]:
+        """The coroutine function that runs the blocking calls of a method, with the signature of `run_in_threadpool`."""
+        name = self.get_pool_name(spec)
+        return run_in_threadpool if name is None else self.get_pool(name).run
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Occupancy and wait times of each pool, keyed by pool name."""
+        return {name: pool.info()._asdict() for name, pool in self._pools.items()}
+
+    def shutdown(self, wait: bool = False):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
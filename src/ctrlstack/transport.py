@@ -0,0 +1,199 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/transport.pct.py
+
+__all__ = ['HTTPTransport']
+
+# %% pts/ctrlstack/transport.pct.py 3
+from .protocol import HTTP_429_TOO_MANY_REQUESTS
+import httpx
+import asyncio
+import threading
+import time
+import itertools
+import weakref
+from contextlib import nullcontext, contextmanager, asynccontextmanager
+from typing import Optional, Dict, Any, Tuple, Iterator, AsyncIterator
+
+# %% pts/ctrlstack/transport.pct.py 4
+class HTTPTransport:
+    """
+    Pooled HTTP client for a single server.
+
+    Clients are created on first use and can be closed explicitly with `close()`/`aclose()`, or by using
+    the transport as a (async) context manager.
+
+    Args:
+        max_connections (int): Maximum number of open connections to the server.
+        max_keepalive_connections (int): Maximum number of idle connections kept alive for reuse. 0 disables keep-alive.
+        keepalive_expiry (Optional[float]): Seconds after which an idle connection is closed.
+        timeout (Optional[float]): Request timeout in seconds. None means no timeout.
+        max_concurrency (Optional[int]): Maximum number of requests in flight at once. Further calls wait
+            for a slot. None means no limit (other than `max_connections`).
+        busy_retries (int): How many times a request rejected with `429 Too Many Requests` is retried, after
+            waiting for the `Retry-After` of the response. Requests with a streamed body are not retried.
+        max_retry_after (float): Upper bound in seconds on a single wait for `Retry-After`. Responses asking
+            for longer waits are returned as is.
+        uds (Optional[str]): Path of a Unix domain socket to connect to instead of the host and port of the
+            URLs, e.g. that of a local server (see `ctrlstack.local_server`).
+    """
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: Optional[float] = 5.0,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        busy_retries: int = 3,
+        max_retry_after: float = 30.0,
+        uds: Optional[str] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.max_concurrency = max_concurrency
+        self.busy_retries = busy_retries
+        self.max_retry_after = max_retry_after
+        self.uds = uds
+        self._client: Optional[httpx.Client] = None
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # loop -> (AsyncClient, Optional[asyncio.Semaphore])
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    transport = httpx.HTTPTransport(uds=self.uds, limits=self.limits) if self.uds is not None else None
+                    self._client = httpx.Client(limits=self.limits, timeout=self.timeout, transport=transport)
+        return self._client
+
+    def _retry_delay(self, response: httpx.Response, attempt: int, content: Any) -> Optional[float]:
+        """Seconds to wait before retrying a rejected request, or None if the response is final."""
+        if response.status_code != HTTP_429_TOO_MANY_REQUESTS or attempt >= self.busy_retries:
+            return None
+        if content is not None and not isinstance(content, (bytes, str)):
+            return None  # A streamed body cannot be sent again
+        try:
+            delay = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+        return delay if 0 <= delay <= self.max_retry_after else None
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Any = None,
+        extensions: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        for attempt in itertools.count():
+            with self._semaphore or nullcontext():
+                response = self.client.request(method, url, params=params, json=json, headers=headers, content=content, extensions=extensions)
+            delay = self._retry_delay(response, attempt, content)
+            if delay is None:
+                return response
+            time.sleep(delay)
+
+    def _get_async_client(self) -> Tuple[httpx.AsyncClient, Optional[asyncio.Semaphore]]:
+        loop = asyncio.get_running_loop()
+        state = self._async_clients.get(loop)
+        if state is None:
+            # Connections reference their loop, so entries of closed loops are never collected on their own
+            for closed_loop in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[closed_loop]
+            transport = httpx.AsyncHTTPTransport(uds=self.uds, limits=self.limits) if self.uds is not None else None
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=transport)
+            semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+            state = self._async_clients[loop] = (client, semaphore)
+        return state
+
+    async def arequest(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Any = None,
+        extensions: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        client, semaphore = self._get_async_client()
+        for attempt in itertools.count():
+            async with semaphore or nullcontext():
+                response = await client.request(method, url, params=params, json=json, headers=headers, content=content, extensions=extensions)
+            delay = self._retry_delay(response, attempt, content)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Any = None,
+    ) -> Iterator[httpx.Response]:
+        """Send a request and return the response without reading its body. The concurrency slot is held until the context exits."""
+        for attempt in itertools.count():
+            with self._semaphore or nullcontext():
+                with self.client.stream(method, url, params=params, json=json, headers=headers, content=content) as response:
+                    delay = self._retry_delay(response, attempt, content)
+                    if delay is None:
+                        yield response
+                        return
+            time.sleep(delay)
+
+    @asynccontextmanager
+    async def astream(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Any = None,
+    ) -> AsyncIterator[httpx.Response]:
+        client, semaphore = self._get_async_client()
+        for attempt in itertools.count():
+            async with semaphore or nullcontext():
+                async with client.stream(method, url, params=params, json=json, headers=headers, content=content) as response:
+                    delay = self._retry_delay(response, attempt, content)
+                    if delay is None:
+                        yield response
+                        return
+            await asyncio.sleep(delay)
+
+    def close(self):
+        """Close the blocking client. Async clients can only be closed from their event loop, see `aclose`."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """Close the async client of the running event loop, and the blocking client."""
+        state = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
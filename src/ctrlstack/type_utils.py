@@ -0,0 +1,124 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/ctrlstack/type_utils.pct.py
+
+__all__ = ['TypeAdapterCacheInfo', 'deserialize_value', 'get_type_adapter', 'is_query_param_type', 'serialize_for_query_param', 'serialize_value', 'type_adapter_cache_clear', 'type_adapter_cache_info']
+
+# %% pts/ctrlstack/type_utils.pct.py 3
+from typing import Any, Union, NamedTuple, get_origin, get_args
+from enum import Enum
+from collections import OrderedDict
+import threading
+import time
+from pydantic import TypeAdapter
+
+# %% pts/ctrlstack/type_utils.pct.py 4
+def is_query_param_type(type_hint) -> bool:
+    """True if type should be a URL query param (int/float/str/bool/Enum/Optional thereof)."""
+    if type_hint is None:
+        return False
+    origin = get_origin(type_hint)
+    if origin is Union:
+        args = [a for a in get_args(type_hint) if a is not type(None)]
+        if len(args) == 1:
+            return is_query_param_type(args[0])
+        return False
+    if type_hint in (int, float, str, bool):
+        return True
+    if isinstance(type_hint, type) and issubclass(type_hint, Enum):
+        return True
+    return False
+
+# %% pts/ctrlstack/type_utils.pct.py 5
+def serialize_for_query_param(value: Any) -> Any:
+    """Convert a query param value to its wire format (e.g. Enum -> .value)."""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+# %% pts/ctrlstack/type_utils.pct.py 7
+class TypeAdapterCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+    maxsize: int
+    build_time: float  # Total seconds spent building TypeAdapters
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# %% pts/ctrlstack/type_utils.pct.py 8
+class _TypeAdapterCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._adapters: OrderedDict = OrderedDict()  # key -> (type_hint, TypeAdapter)
+        self._hits = self._misses = self._evictions = 0
+        self._build_time = 0.0
+
+    @staticmethod
+    def _key(type_hint):
+        try:
+            hash(type_hint)
+            return type_hint
+        except TypeError:
+            return ('__unhashable__', id(type_hint))
+
+    def get(self, type_hint) -> TypeAdapter:
+        key = self._key(type_hint)
+        with self._lock:
+            entry = self._adapters.get(key)
+            if entry is not None:
+                self._adapters.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        start = time.perf_counter()
+        adapter = TypeAdapter(type_hint)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._build_time += elapsed
+            entry = self._adapters.setdefault(key, (type_hint, adapter))  # Another thread may have built it too
+            self._adapters.move_to_end(key)
+            while len(self._adapters) > self.maxsize:
+                self._adapters.popitem(last=False)
+                self._evictions += 1
+            return entry[1]
+
+    def info(self) -> TypeAdapterCacheInfo:
+        with self._lock:
+            return TypeAdapterCacheInfo(self._hits, self._misses, self._evictions, len(self._adapters), self.maxsize, self._build_time)
+
+    def clear(self):
+        with self._lock:
+            self._adapters.clear()
+            self._hits = self._misses = self._evictions = 0
+            self._build_time = 0.0
+
+_type_adapter_cache = _TypeAdapterCache()
+
+# %% pts/ctrlstack/type_utils.pct.py 9
+def get_type_adapter(type_hint) -> TypeAdapter:
+    """Return a cached `TypeAdapter` for the type hint."""
+    return _type_adapter_cache.get(type_hint)
+
+def type_adapter_cache_info() -> TypeAdapterCacheInfo:
+    """Hit/miss/eviction counters and total schema build time of the `TypeAdapter` cache."""
+    return _type_adapter_cache.info()
+
+def type_adapter_cache_clear():
+    """Empty the `TypeAdapter` cache and reset its counters."""
+    _type_adapter_cache.clear()
+
+# %% pts/ctrlstack/type_utils.pct.py 10
+def serialize_value(value: Any, type_hint) -> Any:
+    """Serialize any Python value to JSON-safe form via TypeAdapter."""
+    return get_type_adapter(type_hint).dump_python(value, mode='json')
+
+# %% pts/ctrlstack/type_utils.pct.py 11
+def deserialize_value(data: Any, type_hint) -> Any:
+    """Deserialize JSON data to a typed Python object via TypeAdapter."""
+    return get_type_adapter(type_hint).validate_python(data)
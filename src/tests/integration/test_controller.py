@@ -0,0 +1,248 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_controller.pct.py
+
+__all__ = ['ChildController', 'EmptyController', 'LaterItem', 'ParentController', 'SampleController', 'test_annotations_are_only_resolved_for_options_that_need_them', 'test_controller_method_type_has_two_members', 'test_controller_method_type_values', 'test_ctrl_cmd_method_attributes', 'test_ctrl_method_invalid_group_int', 'test_ctrl_method_invalid_group_none', 'test_ctrl_method_invalid_type_none', 'test_ctrl_method_invalid_type_string', 'test_ctrl_method_returns_same_function', 'test_ctrl_method_sets_attributes', 'test_ctrl_query_method_attributes', 'test_exclusive_execution_options', 'test_execution_options_that_do_not_suit_the_method', 'test_execution_options_that_suit_the_method', 'test_get_controller_method_groups', 'test_get_controller_method_groups_empty', 'test_get_controller_methods_all', 'test_get_controller_methods_by_group', 'test_get_controller_methods_by_type_and_group', 'test_get_controller_methods_by_type_command', 'test_get_controller_methods_by_type_query', 'test_get_controller_methods_empty', 'test_get_controller_methods_no_match', 'test_get_controller_methods_returns_copy', 'test_inheritance_carries_methods', 'test_inheritance_parent_unaffected', 'test_non_decorated_methods_excluded', 'test_registry_built_at_class_definition', 'test_registry_update_on_added_method', 'test_registry_update_on_replaced_method', 'test_unresolved_annotations_are_checked_with_the_method_spec']
+
+# %% pts/tests/integration/test_controller.pct.py 3
+import pytest
+from typing import AsyncIterator, Iterable, Iterator
+from pydantic import BaseModel
+from ctrlstack.controller import Controller, ControllerMethodType, ctrl_method, ctrl_cmd_method, ctrl_query_method
+
+# %% pts/tests/integration/test_controller.pct.py 4
+# --- ControllerMethodType ---
+
+def test_controller_method_type_values():
+    assert ControllerMethodType.COMMAND.value == 'command'
+    assert ControllerMethodType.QUERY.value == 'query'
+
+def test_controller_method_type_has_two_members():
+    assert len(ControllerMethodType) == 2
+
+# %% pts/tests/integration/test_controller.pct.py 5
+# --- ctrl_method decorator ---
+
+def test_ctrl_method_sets_attributes():
+    @ctrl_method(ControllerMethodType.COMMAND, "grp")
+    def my_func(): pass
+    assert my_func._is_controller_method is True
+    assert my_func._controller_method_type == ControllerMethodType.COMMAND
+    assert my_func._controller_method_group == "grp"
+
+def test_ctrl_method_returns_same_function():
+    def my_func(): pass
+    result = ctrl_method(ControllerMethodType.COMMAND, "grp")(my_func)
+    assert result is my_func
+
+def test_ctrl_method_invalid_type_none():
+    with pytest.raises(ValueError, match="ControllerMethodType"):
+        ctrl_method(None, "grp")
+
+def test_ctrl_method_invalid_type_string():
+    with pytest.raises(ValueError, match="ControllerMethodType"):
+        ctrl_method("command", "grp")
+
+def test_ctrl_method_invalid_group_none():
+    with pytest.raises(ValueError, match="Group must be a string"):
+        ctrl_method(ControllerMethodType.COMMAND, None)
+
+def test_ctrl_method_invalid_group_int():
+    with pytest.raises(ValueError, match="Group must be a string"):
+        ctrl_method(ControllerMethodType.COMMAND, 123)
+
+# %% pts/tests/integration/test_controller.pct.py 6
+# --- Execution options ---
+
+def _sync(self, x: int) -> int: pass
+async def _async(self, x: int) -> int: pass
+def _stream(self, n: int) -> Iterator[int]: yield n
+async def _async_stream(self, n: int) -> AsyncIterator[int]: yield n
+def _ingest(self, values: Iterable[int]) -> int: pass
+
+@pytest.mark.parametrize("options,match", [
+    (dict(background=True, max_concurrency=2), "job workers"),
+    (dict(thread_pool="io", process_pool=True), "thread pool or on the process pool"),
+    (dict(micro_batch="many", background=True), "Micro-batched"),
+    (dict(micro_batch="many", process_pool=True), "Micro-batched"),
+])
+def test_exclusive_execution_options(options, match):
+    with pytest.raises(ValueError, match=match):
+        ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)
+
+@pytest.mark.parametrize("func,options,match", [
+    (_async, dict(thread_pool="io"), "is async"),
+    (_async_stream, dict(thread_pool="io"), "is async"),
+    (_async, dict(process_pool=True), "process pool"),
+    (_stream, dict(process_pool=True), "process pool"),
+    (_ingest, dict(process_pool=True), "process pool"),
+    (_stream, dict(micro_batch="many"), "micro-batched"),
+    (_ingest, dict(micro_batch="many"), "micro-batched"),
+    (_stream, dict(background=True), "background job"),
+    (_ingest, dict(background=True), "background job"),
+])
+def test_execution_options_that_do_not_suit_the_method(func, options, match):
+    decorator = ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)
+    with pytest.raises(ValueError, match=match):
+        decorator(func)
+
+_resolved = []
+
+def _resolve_int():
+    _resolved.append(True)
+    return int
+
+def test_annotations_are_only_resolved_for_options_that_need_them():
+    def q(self, x: "_resolve_int()") -> int: pass
+    ctrl_method(ControllerMethodType.QUERY, "query", thread_pool="io", max_concurrency=2)(q)
+    assert _resolved == []
+    ctrl_method(ControllerMethodType.COMMAND, "cmd", background=True)(q)
+    assert _resolved == [True]
+
+def test_execution_options_that_suit_the_method():
+    for func, options in [(_sync, dict(thread_pool="io")), (_sync, dict(process_pool=True)), (_async, dict(micro_batch="many")),
+                          (_sync, dict(background=True, micro_batch=None)), (_stream, dict(max_concurrency=1))]:
+        assert ctrl_method(ControllerMethodType.COMMAND, "cmd", **options)(func) is func
+
+@ctrl_cmd_method(micro_batch="many")  # `LaterItem` is not defined yet, so the streamed argument is not seen here
+def _ingest_later(self, values: "Iterable[LaterItem]") -> int: pass
+
+class LaterItem(BaseModel):
+    x: int
+
+def test_unresolved_annotations_are_checked_with_the_method_spec():
+    from ctrlstack.method_spec import compile_method_spec
+    with pytest.raises(ValueError, match="micro-batched"):
+        compile_method_spec(_ingest_later)
+
+# %% pts/tests/integration/test_controller.pct.py 7
+# --- ctrl_cmd_method / ctrl_query_method ---
+
+def test_ctrl_cmd_method_attributes():
+    @ctrl_cmd_method
+    def my_func(): pass
+    assert my_func._is_controller_method is True
+    assert my_func._controller_method_type == ControllerMethodType.COMMAND
+    assert my_func._controller_method_group == 'cmd'
+
+def test_ctrl_query_method_attributes():
+    @ctrl_query_method
+    def my_func(): pass
+    assert my_func._is_controller_method is True
+    assert my_func._controller_method_type == ControllerMethodType.QUERY
+    assert my_func._controller_method_group == 'query'
+
+# %% pts/tests/integration/test_controller.pct.py 8
+# --- Controller.get_controller_methods ---
+
+class SampleController(Controller):
+    @ctrl_cmd_method
+    def cmd_a(self): pass
+
+    @ctrl_cmd_method
+    def cmd_b(self): pass
+
+    @ctrl_query_method
+    def query_a(self): pass
+
+    @ctrl_method(ControllerMethodType.QUERY, "custom")
+    def query_custom(self): pass
+
+    def regular_method(self): pass
+
+class EmptyController(Controller): pass
+
+def test_get_controller_methods_all():
+    methods = SampleController.get_controller_methods()
+    assert methods == ['cmd_a', 'cmd_b', 'query_a', 'query_custom']
+
+def test_get_controller_methods_by_type_command():
+    methods = SampleController.get_controller_methods(method_type=ControllerMethodType.COMMAND)
+    assert methods == ['cmd_a', 'cmd_b']
+
+def test_get_controller_methods_by_type_query():
+    methods = SampleController.get_controller_methods(method_type=ControllerMethodType.QUERY)
+    assert methods == ['query_a', 'query_custom']
+
+def test_get_controller_methods_by_group():
+    assert SampleController.get_controller_methods(group='cmd') == ['cmd_a', 'cmd_b']
+    assert SampleController.get_controller_methods(group='query') == ['query_a']
+    assert SampleController.get_controller_methods(group='custom') == ['query_custom']
+
+def test_get_controller_methods_by_type_and_group():
+    methods = SampleController.get_controller_methods(method_type=ControllerMethodType.QUERY, group='custom')
+    assert methods == ['query_custom']
+
+def test_get_controller_methods_empty():
+    assert EmptyController.get_controller_methods() == []
+
+def test_get_controller_methods_no_match():
+    assert SampleController.get_controller_methods(group='nonexistent') == []
+
+def test_non_decorated_methods_excluded():
+    methods = SampleController.get_controller_methods()
+    assert 'regular_method' not in methods
+
+# %% pts/tests/integration/test_controller.pct.py 9
+# --- Controller.get_controller_method_groups ---
+
+def test_get_controller_method_groups():
+    groups = SampleController.get_controller_method_groups()
+    assert groups == ['cmd', 'cmd', 'query', 'custom']
+
+def test_get_controller_method_groups_empty():
+    assert EmptyController.get_controller_method_groups() == []
+
+# %% pts/tests/integration/test_controller.pct.py 10
+# --- Inheritance ---
+
+class ParentController(Controller):
+    @ctrl_cmd_method
+    def parent_cmd(self): pass
+
+class ChildController(ParentController):
+    @ctrl_query_method
+    def child_query(self): pass
+
+def test_inheritance_carries_methods():
+    methods = ChildController.get_controller_methods()
+    assert 'parent_cmd' in methods
+    assert 'child_query' in methods
+
+def test_inheritance_parent_unaffected():
+    methods = ParentController.get_controller_methods()
+    assert 'parent_cmd' in methods
+    assert 'child_query' not in methods
+
+# %% pts/tests/integration/test_controller.pct.py 11
+# --- Method registry ---
+
+def test_registry_built_at_class_definition():
+    assert '_controller_method_registry' in SampleController.__dict__
+    assert '_controller_method_registry' in ChildController.__dict__
+
+def test_get_controller_methods_returns_copy():
+    methods = SampleController.get_controller_methods()
+    methods.append('injected')
+    assert 'injected' not in SampleController.get_controller_methods()
+
+def test_registry_update_on_added_method():
+    class Parent(Controller):
+        @ctrl_cmd_method
+        def b(self): pass
+    class Child(Parent): pass
+    @ctrl_query_method
+    def a(self): pass
+    Parent.a = a
+    Parent._update_controller_method_registry('a')
+    assert Parent.get_controller_methods() == ['a', 'b']
+    assert Parent.get_controller_methods(method_type=ControllerMethodType.QUERY) == ['a']
+    assert Parent.get_controller_method_groups() == ['query', 'cmd']
+    assert Child.get_controller_methods(group='query') == ['a']
+
+def test_registry_update_on_replaced_method():
+    class MyCtrl(Controller):
+        @ctrl_cmd_method
+        def a(self): pass
+    MyCtrl.a = lambda self: None
+    MyCtrl._update_controller_method_registry('a')
+    assert MyCtrl.get_controller_methods() == []
+    assert MyCtrl.get_controller_methods(method_type=ControllerMethodType.COMMAND) == []
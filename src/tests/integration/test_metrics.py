@@ -0,0 +1,131 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_metrics.pct.py
+
+__all__ = ['ObservedController', 'test_auth_failures', 'test_body_sizes', 'test_counts_errors_and_latency', 'test_in_flight_gauge', 'test_metrics_are_opt_in', 'test_routes_with_parameters_are_labelled_by_template', 'test_unknown_methods_share_a_label']
+
+# %% pts/tests/integration/test_metrics.pct.py 3
+import asyncio
+import re
+import httpx
+from fastapi import HTTPException
+from typing import Iterable
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.metrics import METRICS_MEDIA_TYPE
+from ctrlstack.protocol import METRICS_ROUTE, job_route
+from ctrlstack.server import create_controller_server
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_metrics.pct.py 4
+class ObservedController(Controller):
+    @ctrl_query_method
+    def echo(self, text: str) -> str:
+        return text
+
+    @ctrl_query_method
+    async def wait(self, seconds: float) -> float:
+        await asyncio.sleep(seconds)
+        return seconds
+
+    @ctrl_query_method
+    def crash(self) -> int:
+        raise RuntimeError("boom")
+
+    @ctrl_query_method
+    def conflict(self) -> int:
+        raise HTTPException(status_code=409, detail="conflict")
+
+    @ctrl_cmd_method
+    def count(self, values: Iterable[int]) -> int:
+        return sum(1 for _ in values)
+
+    @ctrl_cmd_method(background=True)
+    def job(self) -> int:
+        return 1
+
+def _samples(text):
+    """Parse the exposition format into {(name, labels): value}."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name_and_labels, value = line.rsplit(" ", 1)
+            match = re.fullmatch(r"(\w+)(?:\{(.*)\})?", name_and_labels)
+            labels = tuple(sorted(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or "")))
+            samples[(match.group(1), labels)] = float(value)
+    return samples
+
+def _labels(route, method="GET", **extra):
+    return tuple(sorted({"route": route, "method": method, **extra}.items()))
+
+# %% pts/tests/integration/test_metrics.pct.py 5
+def test_metrics_are_opt_in():
+    client = TestClient(create_controller_server(ObservedController()))
+    assert client.get(METRICS_ROUTE).status_code == 404
+
+def test_counts_errors_and_latency():
+    client = TestClient(create_controller_server(ObservedController(), enable_metrics=True), raise_server_exceptions=False)
+    for text in ["a", "bb"]:
+        client.get("/query/echo", params={"text": text})
+    assert client.get("/query/crash").status_code == 500
+    assert client.get("/query/conflict").status_code == 409
+    client.get("/nowhere")
+
+    response = client.get(METRICS_ROUTE)
+    assert response.headers["content-type"] == METRICS_MEDIA_TYPE
+    samples = _samples(response.text)
+    assert samples[("ctrlstack_requests_total", _labels("/query/echo", status="200"))] == 2
+    assert samples[("ctrlstack_request_duration_seconds_count", _labels("/query/echo"))] == 2
+    assert samples[("ctrlstack_request_duration_seconds_bucket", _labels("/query/echo", le="+Inf"))] == 2
+    assert samples[("ctrlstack_request_errors_total", _labels("/query/echo"))] == 0
+    assert samples[("ctrlstack_requests_total", _labels("/query/crash", status="500"))] == 1
+    assert samples[("ctrlstack_request_errors_total", _labels("/query/crash"))] == 1
+    assert samples[("ctrlstack_requests_total", _labels("/query/conflict", status="409"))] == 1
+    assert samples[("ctrlstack_request_errors_total", _labels("/query/conflict"))] == 0
+    assert samples[("ctrlstack_requests_total", _labels("<unmatched>", status="404"))] == 1
+    assert samples[("ctrlstack_requests_in_flight", _labels("/query/echo"))] == 0
+
+def test_unknown_methods_share_a_label():
+    client = TestClient(create_controller_server(ObservedController(), enable_metrics=True))
+    for method in ["FOO", "BAR"]:
+        client.request(method, "/query/echo")
+    samples = _samples(client.get(METRICS_ROUTE).text)
+    assert samples[("ctrlstack_requests_total", _labels("<unmatched>", "OTHER", status="405"))] == 2
+    assert not any(("method", "FOO") in labels for _, labels in samples)
+
+def test_routes_with_parameters_are_labelled_by_template():
+    app = create_controller_server(ObservedController(), enable_metrics=True)
+    with TestClient(app) as client:
+        job_id = client.post("/cmd/job").json()["job_id"]
+        client.get(job_route(job_id))
+        samples = _samples(client.get(METRICS_ROUTE).text)
+    assert samples[("ctrlstack_requests_total", _labels("/_ctrlstack/jobs/{job_id}", status="200"))] == 1
+    assert not any(job_id in str(labels) for _, labels in samples)
+
+def test_body_sizes():
+    client = TestClient(create_controller_server(ObservedController(), enable_metrics=True))
+    body = b"1\n" * 1000
+    assert client.post("/cmd/count", content=(body[i:i + 100] for i in range(0, len(body), 100))).json() == 1000
+    client.get("/query/echo", params={"text": "x" * 5000})
+    samples = _samples(client.get(METRICS_ROUTE).text)
+    assert samples[("ctrlstack_request_size_bytes_sum", _labels("/cmd/count", "POST"))] == len(body)
+    assert samples[("ctrlstack_response_size_bytes_sum", _labels("/cmd/count", "POST"))] == len(b"1000")
+    assert samples[("ctrlstack_response_size_bytes_bucket", _labels("/query/echo", le="1000"))] == 0
+    assert samples[("ctrlstack_response_size_bytes_bucket", _labels("/query/echo", le="10000"))] == 1
+
+def test_in_flight_gauge():
+    app = create_controller_server(ObservedController(), enable_metrics=True)
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            slow = [asyncio.ensure_future(client.get("/query/wait", params={"seconds": 0.2})) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            text = (await client.get(METRICS_ROUTE)).text
+            await asyncio.gather(*slow)
+            return text
+    samples = _samples(asyncio.run(run()))
+    assert samples[("ctrlstack_requests_in_flight", _labels("/query/wait"))] == 3
+
+def test_auth_failures():
+    client = TestClient(create_controller_server(ObservedController(), api_keys=["secret"], enable_metrics=True))
+    assert client.get("/query/echo", params={"text": "a"}).status_code == 401
+    assert client.get("/query/echo", params={"text": "a"}, headers={"X-API-Key": "wrong"}).status_code == 401
+    assert client.get(METRICS_ROUTE).status_code == 401  # The metrics route needs a key too
+    samples = _samples(client.get(METRICS_ROUTE, headers={"X-API-Key": "secret"}).text)
+    assert samples[("ctrlstack_auth_failures_total", ())] == 3
@@ -0,0 +1,175 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_profiling.pct.py
+
+__all__ = ['ProfiledController', 'server', 'test_async_profiles_are_marked_as_including_other_tasks', 'test_header_triggers_a_profile', 'test_invalid_settings', 'test_old_profiles_are_deleted', 'test_profiling_is_opt_in', 'test_remote_cli_profiling', 'test_remote_controller_profiling', 'test_sampling_one_in_n', 'test_sync_profile_covers_only_the_call', 'test_temporary_profile_dir_is_removed_on_shutdown']
+
+# %% pts/tests/integration/test_profiling.pct.py 3
+import asyncio
+import json
+import pstats
+import threading
+import time
+import pytest
+import uvicorn
+from typing import Iterator
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError
+from ctrlstack.remote_cli import create_remote_controller_cli
+from ctrlstack.protocol import PROFILE_HEADER, ProfileFormat, profiling_route
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_profiling.pct.py 4
+def _fib(n: int) -> int:
+    return n if n < 2 else _fib(n - 1) + _fib(n - 2)
+
+class ProfiledController(Controller):
+    @ctrl_query_method
+    def fib(self, n: int) -> int:
+        return _fib(n)
+
+    @ctrl_query_method
+    async def afib(self, n: int) -> int:
+        return _fib(n)
+
+    @ctrl_query_method
+    def numbers(self, n: int) -> Iterator[int]:
+        yield from range(n)
+
+def _profiled_client(tmp_path, **kwargs):
+    app = create_controller_server(ProfiledController(), enable_profiling=True, profile_dir=str(tmp_path), **kwargs)
+    return TestClient(app)
+
+# %% pts/tests/integration/test_profiling.pct.py 5
+def test_profiling_is_opt_in():
+    client = TestClient(create_controller_server(ProfiledController()))
+    assert client.get(profiling_route()).status_code == 404
+    response = client.get("/query/fib", params={"n": 5}, headers={PROFILE_HEADER: "cprofile"})
+    assert PROFILE_HEADER not in response.headers
+
+def test_sampling_one_in_n(tmp_path):
+    client = _profiled_client(tmp_path)
+    response = client.put(profiling_route("fib"), json={"sample_every": 3})
+    assert response.json() == {"sample_every": 3, "format": "cprofile"}
+    for _ in range(7):
+        assert client.get("/query/fib", params={"n": 15}).json() == 610
+
+    info = client.get(profiling_route()).json()
+    assert info["methods"] == {"fib": {"sample_every": 3, "format": "cprofile"}}
+    assert [(p["method"], p["trigger"]) for p in info["profiles"]] == [("fib", "sample")] * 2
+    stats = pstats.Stats(str(tmp_path / info["profiles"][0]["name"]))
+    assert any(name == "_fib" for _, _, name in stats.stats)
+
+    client.put(profiling_route("fib"), json={"sample_every": 0})
+    client.get("/query/fib", params={"n": 15})
+    assert len(client.get(profiling_route()).json()["profiles"]) == 2
+
+def test_header_triggers_a_profile(tmp_path):
+    client = _profiled_client(tmp_path)
+    response = client.get("/query/afib", params={"n": 27}, headers={PROFILE_HEADER: "collapsed"})
+    name = response.headers[PROFILE_HEADER]
+    assert name.endswith(".collapsed")
+    [record] = client.get(profiling_route()).json()["profiles"]
+    assert (record["name"], record["trigger"], record["format"]) == (name, "header", "collapsed")
+
+    content = client.get(profiling_route(profile=name)).text
+    stack, count = content.splitlines()[0].rsplit(" ", 1)  # Most frequent first
+    assert "afib" in stack and "_fib" in stack and int(count) > 0
+    assert PROFILE_HEADER not in client.get("/query/afib", params={"n": 3}).headers
+
+def test_sync_profile_covers_only_the_call(tmp_path):
+    client = _profiled_client(tmp_path, thread_pools={"cpu": 1}, method_thread_pools={"fib": "cpu"})
+    name = client.get("/query/fib", params={"n": 12}, headers={PROFILE_HEADER: "1"}).headers[PROFILE_HEADER]
+    stats = pstats.Stats(str(tmp_path / name))
+    assert {name for _, _, name in stats.stats} >= {"fib", "_fib"}
+    assert not any("starlette" in filename or "fastapi" in filename for filename, _, _ in stats.stats)
+
+def test_invalid_settings(tmp_path):
+    client = _profiled_client(tmp_path)
+    assert client.put(profiling_route("nope"), json={"sample_every": 1}).status_code == 404
+    assert client.put(profiling_route("numbers"), json={"sample_every": 1}).status_code == 400
+    assert client.put(profiling_route("fib"), json={"sample_every": -1}).status_code == 422
+    assert client.put(profiling_route("fib"), json={"format": "nope"}).status_code == 422
+    assert client.get(profiling_route(profile="../../etc/passwd")).status_code == 404
+
+def test_old_profiles_are_deleted(tmp_path):
+    client = _profiled_client(tmp_path)
+    client.app.state.profiler.max_profiles = 2
+    names = [client.get("/query/fib", params={"n": 3}, headers={PROFILE_HEADER: "1"}).headers[PROFILE_HEADER] for _ in range(3)]
+    assert [p["name"] for p in client.get(profiling_route()).json()["profiles"]] == names[1:]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(names[1:])
+
+def test_async_profiles_are_marked_as_including_other_tasks(tmp_path):
+    client = _profiled_client(tmp_path)
+    client.get("/query/fib", params={"n": 3}, headers={PROFILE_HEADER: "1"})
+    client.get("/query/afib", params={"n": 3}, headers={PROFILE_HEADER: "1"})
+    records = client.get(profiling_route()).json()["profiles"]
+    assert [(p["method"], p["includes_other_tasks"]) for p in records] == [("fib", False), ("afib", True)]
+
+def test_temporary_profile_dir_is_removed_on_shutdown(tmp_path):
+    with TestClient(create_controller_server(ProfiledController(), enable_profiling=True)) as client:
+        client.get("/query/fib", params={"n": 3}, headers={PROFILE_HEADER: "1"})
+        profile_dir = client.app.state.profiler.output_dir
+        assert len(list(profile_dir.iterdir())) == 1
+    assert not profile_dir.exists()
+
+    with _profiled_client(tmp_path) as client:
+        client.get("/query/fib", params={"n": 3}, headers={PROFILE_HEADER: "1"})
+    assert len(list(tmp_path.iterdir())) == 1
+
+# %% pts/tests/integration/test_profiling.pct.py 6
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    port = _find_free_port()
+    profile_dir = tmp_path_factory.mktemp("profiles")
+    app = create_controller_server(ProfiledController(), enable_profiling=True, profile_dir=str(profile_dir))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield f"http://localhost:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_remote_controller_profiling(server):
+    with create_remote_controller(ProfiledController, url=server, mode="sync") as remote:
+        assert remote.set_profiling("fib", 1, ProfileFormat.COLLAPSED).sample_every == 1
+        assert remote.fib(27) == 196418
+        name = remote.get_profiling().profiles[-1].name
+        assert b"_fib" in remote.get_profile(name)
+        remote.set_profiling("fib", 0)
+
+        remote.profile_calls(format=ProfileFormat.CPROFILE)
+        remote.afib(10)
+        assert remote.last_profile.endswith(".prof")
+        remote.profile_calls(False)
+        with pytest.raises(RemoteCallError):
+            remote.get_profile("unknown.prof")
+
+    async def run():
+        async with create_remote_controller(ProfiledController, url=server) as remote:
+            return (await remote.get_profiling()).methods["fib"].sample_every
+    assert asyncio.run(run()) == 0
+
+def test_remote_cli_profiling(server, tmp_path):
+    runner = CliRunner()
+    app = create_remote_controller_cli(ProfiledController, url=server, enable_profiling=True)
+
+    result = runner.invoke(app, ["profile-method", "afib", "--every", "2", "--format", "collapsed"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout) == {"sample_every": 2, "format": "collapsed"}
+
+    result = runner.invoke(app, ["--profile", "fib", "10"])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "55"
+    name = result.stderr.strip().removeprefix("Profile: ")
+    assert name.startswith("fib-")
+
+    result = runner.invoke(app, ["profiling-status"])
+    assert name in [p["name"] for p in json.loads(result.stdout)["profiles"]]
+    result = runner.invoke(app, ["download-profile", name, "--output", str(tmp_path / "fib.prof")])
+    assert result.exit_code == 0, result.output
+    assert pstats.Stats(str(tmp_path / "fib.prof")).total_calls > 0
@@ -0,0 +1,188 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_query_cache.pct.py
+
+__all__ = ['ItemsController', 'client', 'ctrl', 'test_batch_calls_share_the_cache', 'test_cache_key_args', 'test_command_invalidates_own_group', 'test_command_of_other_group_does_not_invalidate', 'test_command_with_explicit_invalidates', 'test_controller_app_register_options', 'test_decorators_accept_options_and_bare_use', 'test_expiry', 'test_invalid_cache_options', 'test_lru_eviction', 'test_no_stats_route_by_default', 'test_repeated_queries_are_served_from_cache', 'test_result_of_query_overlapping_an_invalidation_is_not_cached', 'test_uncached_queries_always_run']
+
+# %% pts/tests/integration/test_query_cache.pct.py 3
+import asyncio
+import pytest
+from ctrlstack import Controller, ControllerMethodType, ctrl_method, ctrl_query_method, ctrl_cmd_method
+from ctrlstack.controller_app import ControllerApp
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.query_cache import QueryCache
+from ctrlstack.server import create_controller_server
+from ctrlstack.protocol import BATCH_ROUTE, STATS_ROUTE
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_query_cache.pct.py 4
+class ItemsController(Controller):
+    def __init__(self):
+        self.items = {}
+        self.calls = []
+
+    @ctrl_method(ControllerMethodType.QUERY, "items", cache_ttl=60, cache_max_entries=2)
+    def get_item(self, key: str) -> int:
+        self.calls.append(("get_item", key))
+        return self.items.get(key, 0)
+
+    @ctrl_method(ControllerMethodType.QUERY, "items", cache_ttl=60, cache_key_args=["key"])
+    async def describe(self, key: str, verbose: bool = False) -> str:
+        self.calls.append(("describe", key, verbose))
+        return f"{key}={self.items.get(key, 0)}"
+
+    @ctrl_method(ControllerMethodType.COMMAND, "items")
+    def set_item(self, key: str, value: int):
+        self.items[key] = value
+
+    @ctrl_method(ControllerMethodType.COMMAND, "other")
+    def touch(self):
+        pass
+
+    @ctrl_method(ControllerMethodType.COMMAND, "other", invalidates=["items"])
+    def reset(self):
+        self.items.clear()
+
+    @ctrl_query_method
+    def uncached(self) -> int:
+        self.calls.append(("uncached",))
+        return len(self.calls)
+
+@pytest.fixture
+def ctrl():
+    return ItemsController()
+
+@pytest.fixture
+def client(ctrl):
+    return TestClient(create_controller_server(ctrl, enable_batch=True, enable_stats=True))
+
+# %% pts/tests/integration/test_query_cache.pct.py 5
+def test_decorators_accept_options_and_bare_use():
+    class C(Controller):
+        @ctrl_query_method(cache_ttl=5)
+        def a(self) -> int:
+            return 1
+
+        @ctrl_query_method
+        def b(self) -> int:
+            return 2
+
+        @ctrl_cmd_method(invalidates=["query"])
+        def c(self):
+            pass
+
+    assert get_method_spec(C, "a").cache_ttl == 5
+    assert get_method_spec(C, "b").cache_ttl is None
+    assert get_method_spec(C, "c").invalidates == ["query"]
+    assert C.get_controller_methods() == ["a", "b", "c"]
+
+def test_invalid_cache_options():
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.COMMAND, "g", cache_ttl=1)
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.QUERY, "g", invalidates=["g"])
+    with pytest.raises(ValueError):
+        ctrl_method(ControllerMethodType.QUERY, "g", cache_ttl=0)
+
+    class C(Controller):
+        @ctrl_query_method(cache_ttl=1, cache_key_args=["nope"])
+        def a(self, x: int) -> int:
+            return x
+    with pytest.raises(ValueError):
+        get_method_spec(C, "a")
+
+def test_controller_app_register_options():
+    capp = ControllerApp()
+
+    @capp.register_query(cache_ttl=3)
+    def foo() -> int:
+        return 1
+
+    assert get_method_spec(capp.controller_cls, "foo").cache_ttl == 3
+
+# %% pts/tests/integration/test_query_cache.pct.py 6
+def test_repeated_queries_are_served_from_cache(ctrl, client):
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 0
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 0
+    assert ctrl.calls == [("get_item", "a")]
+
+    stats = client.get(STATS_ROUTE).json()["query_cache"]["get_item"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["currsize"] == 1
+
+def test_uncached_queries_always_run(ctrl, client):
+    client.get("/query/uncached")
+    client.get("/query/uncached")
+    assert ctrl.calls == [("uncached",), ("uncached",)]
+    assert "uncached" not in client.get(STATS_ROUTE).json()["query_cache"]
+
+def test_cache_key_args(ctrl, client):
+    assert client.get("/items/describe", params={"key": "a"}).json() == "a=0"
+    assert client.get("/items/describe", params={"key": "a", "verbose": True}).json() == "a=0"
+    assert ctrl.calls == [("describe", "a", False)]
+
+def test_lru_eviction(ctrl, client):
+    for key in ["a", "b", "c", "a"]:
+        client.get("/items/get_item", params={"key": key})
+    assert [call[1] for call in ctrl.calls] == ["a", "b", "c", "a"]
+    stats = client.get(STATS_ROUTE).json()["query_cache"]["get_item"]
+    assert stats["evictions"] == 2
+    assert stats["currsize"] == 2
+
+def test_command_invalidates_own_group(ctrl, client):
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 0
+    client.post("/items/set_item", params={"key": "a", "value": 5})
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 5
+    assert client.get(STATS_ROUTE).json()["query_cache"]["get_item"]["invalidations"] == 1
+
+def test_command_of_other_group_does_not_invalidate(ctrl, client):
+    client.get("/items/get_item", params={"key": "a"})
+    client.post("/other/touch")
+    client.get("/items/get_item", params={"key": "a"})
+    assert len(ctrl.calls) == 1
+
+def test_command_with_explicit_invalidates(ctrl, client):
+    client.post("/items/set_item", params={"key": "a", "value": 5})
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 5
+    client.post("/other/reset")
+    assert client.get("/items/get_item", params={"key": "a"}).json() == 0
+
+def test_batch_calls_share_the_cache(ctrl, client):
+    client.get("/items/get_item", params={"key": "a"})
+    response = client.post(BATCH_ROUTE, json=[{"method": "get_item", "args": {"key": "a"}}])
+    assert response.json() == [{"result": 0}]
+    assert len(ctrl.calls) == 1
+
+def test_no_stats_route_by_default(ctrl):
+    client = TestClient(create_controller_server(ctrl))
+    assert client.get(STATS_ROUTE).status_code == 404
+
+# %% pts/tests/integration/test_query_cache.pct.py 7
+def test_expiry():
+    now = [0.0]
+    ctrl = ItemsController()
+    app = create_controller_server(ctrl)
+    app.state.query_cache.clock = lambda: now[0]
+    client = TestClient(app)
+
+    client.get("/items/get_item", params={"key": "a"})
+    now[0] = 59.0
+    client.get("/items/get_item", params={"key": "a"})
+    now[0] = 61.0
+    client.get("/items/get_item", params={"key": "a"})
+    assert len(ctrl.calls) == 2
+    assert app.state.query_cache.info("get_item").expirations == 1
+
+# %% pts/tests/integration/test_query_cache.pct.py 8
+def test_result_of_query_overlapping_an_invalidation_is_not_cached():
+    cache = QueryCache()
+    spec = get_method_spec(ItemsController, "get_item")
+    results = iter([1, 2])
+
+    async def handler(kwargs):
+        cache.invalidate(["items"])  # A command finishes while the query runs
+        return next(results)
+
+    cached = cache.wrap_query(spec, handler)
+    assert asyncio.run(cached({"key": "a"})) == 1
+    assert asyncio.run(cached({"key": "a"})) == 2
+    assert cache.info("get_item").currsize == 0
@@ -0,0 +1,119 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_remote_cli.pct.py
+
+__all__ = ['remote_cli', 'socket_remote_cli', 'test_no_server_initially', 'test_server_lifecycle', 'test_server_lifecycle_on_socket']
+
+# %% pts/tests/integration/test_remote_cli.pct.py 3
+import pytest
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+from ctrlstack.server import stop_local_controller_server_process
+
+# %% pts/tests/integration/test_remote_cli.pct.py 4
+_REMOTE_CLI_SCRIPT = textwrap.dedent('''\
+    from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
+    from ctrlstack.remote_cli import create_remote_controller_cli
+
+    class FooController(Controller):
+        @ctrl_cmd_method
+        async def bar(self):
+            return "bar"
+
+        @ctrl_query_method
+        def baz(self, x: int) -> str:
+            return f"baz {{x}}"
+
+        @ctrl_method(ControllerMethodType.QUERY, "q")
+        def qux(self):
+            return "qux"
+
+    app = create_remote_controller_cli(
+        FooController,
+        local_mode=True,
+        lockfile_path="{lockfile_path}",
+        local_socket_path={socket_path!r},
+    )
+
+    if __name__ == "__main__":
+        app()
+''')
+
+# %% pts/tests/integration/test_remote_cli.pct.py 5
+@pytest.fixture()
+def remote_cli(tmp_path):
+    """Create a temporary remote CLI script and lockfile, with cleanup."""
+    lockfile = tmp_path / "ctrlstack_test.lock"
+    script = tmp_path / "remote_cli.py"
+    script.write_text(_REMOTE_CLI_SCRIPT.format(lockfile_path=str(lockfile), socket_path=None))
+    yield str(script), str(lockfile)
+    # Cleanup: stop server if running
+    stop_local_controller_server_process(str(lockfile))
+
+def _run_cli(script_path: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, script_path] + list(args),
+        capture_output=True, text=True, timeout=30,
+    )
+
+# %% pts/tests/integration/test_remote_cli.pct.py 6
+def test_no_server_initially(remote_cli):
+    script, lockfile = remote_cli
+    res = _run_cli(script, "get-server-status")
+    assert res.stdout.strip() == "No local server is running."
+
+def test_server_lifecycle(remote_cli):
+    script, lockfile = remote_cli
+
+    # Auto-start via a command
+    res = _run_cli(script, "bar")
+    assert res.stdout.strip() == "bar"
+
+    # Server should now be running
+    res = _run_cli(script, "get-server-status")
+    assert res.stdout.strip().startswith("Local server is running")
+
+    # Other commands should work
+    res = _run_cli(script, "baz", "123")
+    assert res.stdout.strip() == "baz 123"
+
+    res = _run_cli(script, "qux")
+    assert res.stdout.strip() == "qux"
+
+    # Stop the server
+    res = _run_cli(script, "stop-local-server")
+    assert res.stdout.strip().startswith("Stopped local server")
+
+    # Stopping again should say no server
+    res = _run_cli(script, "stop-local-server")
+    assert res.stdout.strip().startswith("No local server running")
+
+# %% pts/tests/integration/test_remote_cli.pct.py 7
+@pytest.fixture()
+def socket_remote_cli(tmp_path):
+    """Like `remote_cli`, with the local server listening on a Unix domain socket."""
+    lockfile, socket_path = tmp_path / "ctrlstack_test.lock", tmp_path / "ctrlstack_test.sock"
+    script = tmp_path / "remote_cli.py"
+    script.write_text(_REMOTE_CLI_SCRIPT.format(lockfile_path=str(lockfile), socket_path=str(socket_path)))
+    yield str(script), str(lockfile), str(socket_path)
+    stop_local_controller_server_process(str(lockfile))
+
+def test_server_lifecycle_on_socket(socket_remote_cli):
+    script, lockfile, socket_path = socket_remote_cli
+
+    res = _run_cli(script, "baz", "7")
+    assert res.stdout.strip() == "baz 7"
+    assert open(lockfile).read().splitlines()[0] == socket_path
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+    res = _run_cli(script, "get-server-status")
+    assert res.stdout.strip().startswith(f"Local server is running on socket {socket_path}")
+    assert _run_cli(script, "bar").stdout.strip() == "bar"
+
+    res = _run_cli(script, "start-local-server", "--port", "8000")
+    assert res.returncode != 0 and "socket" in res.stderr
+
+    res = _run_cli(script, "stop-local-server")
+    assert res.stdout.strip().startswith(f"Stopped local server on socket {socket_path}")
+    assert not os.path.exists(socket_path) and not os.path.exists(lockfile)
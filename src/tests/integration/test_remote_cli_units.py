@@ -0,0 +1,175 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_remote_cli_units.pct.py
+
+__all__ = ['EchoController', 'FooController', 'runner', 'test_cli_commands_block_inside_a_running_loop', 'test_create_remote_cli_local_mode_no_lockfile_raises', 'test_create_remote_cli_local_mode_with_url_raises', 'test_create_remote_cli_non_controller_raises', 'test_create_remote_cli_non_local_with_controller_raises', 'test_create_remote_cli_non_local_with_socket_raises', 'test_is_pickleable_class_instance', 'test_is_pickleable_function', 'test_is_pickleable_lambda', 'test_is_pickleable_socket', 'test_remote_cli_has_controller_methods', 'test_remote_cli_local_mode_has_lifecycle_commands', 'test_remote_cli_no_subcommand_shows_help', 'test_remote_cli_non_local_no_lifecycle_commands']
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 3
+import asyncio
+import pytest
+import socket
+import threading
+import time
+import uvicorn
+from ctrlstack import Controller, ControllerMethodType, ctrl_cmd_method, ctrl_query_method, ctrl_method
+from ctrlstack.remote_cli import create_remote_controller_cli, is_pickleable
+from ctrlstack.server import create_controller_server, _find_free_port
+from typer.testing import CliRunner
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 4
+runner = CliRunner()
+
+class FooController(Controller):
+    @ctrl_cmd_method
+    def bar(self): pass
+
+    @ctrl_query_method
+    def baz(self, x: int) -> str: pass
+
+    @ctrl_method(ControllerMethodType.QUERY, "q")
+    def qux(self): pass
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 5
+# --- Validation ---
+
+def test_create_remote_cli_non_controller_raises():
+    with pytest.raises(TypeError, match="must be a subclass"):
+        create_remote_controller_cli(str, url="http://localhost:8000")
+
+def test_create_remote_cli_local_mode_with_url_raises():
+    with pytest.raises(ValueError, match="url"):
+        create_remote_controller_cli(
+            FooController,
+            url="http://localhost:8000",
+            local_mode=True,
+            lockfile_path="/tmp/test.lock",
+        )
+
+def test_create_remote_cli_non_local_with_socket_raises():
+    with pytest.raises(ValueError, match="local_socket_path"):
+        create_remote_controller_cli(
+            FooController,
+            url="http://localhost:8000",
+            local_socket_path="/tmp/test.sock",
+        )
+
+def test_create_remote_cli_non_local_with_controller_raises():
+    with pytest.raises(ValueError, match="controller"):
+        create_remote_controller_cli(
+            FooController,
+            url="http://localhost:8000",
+            controller=FooController(),
+        )
+
+def test_create_remote_cli_local_mode_no_lockfile_raises():
+    with pytest.raises(ValueError, match="lockfile_path"):
+        create_remote_controller_cli(
+            FooController,
+            local_mode=True,
+        )
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 6
+# --- is_pickleable ---
+
+def test_is_pickleable_lambda():
+    assert is_pickleable(lambda x: x) is False
+
+def test_is_pickleable_function():
+    # Module-level (importable) functions are pickleable; locally-defined are not.
+    # Use a known module-level function as the test subject.
+    import os
+    assert is_pickleable(os.getpid) is True
+
+def test_is_pickleable_class_instance():
+    assert is_pickleable(FooController()) is True
+
+def test_is_pickleable_socket():
+    s = socket.socket()
+    try:
+        assert is_pickleable(s) is False
+    finally:
+        s.close()
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 7
+# --- Local mode CLI has lifecycle commands ---
+
+def test_remote_cli_local_mode_has_lifecycle_commands():
+    app = create_remote_controller_cli(
+        FooController,
+        local_mode=True,
+        lockfile_path="/tmp/test_lifecycle.lock",
+        start_local_server_automatically=False,
+    )
+    result = runner.invoke(app, ["--help"])
+    assert result.exit_code == 0
+    help_text = result.stdout
+    assert "start-local-server" in help_text
+    assert "stop-local-server" in help_text
+    assert "restart-local-server" in help_text
+    assert "get-server-status" in help_text
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 8
+# --- Non-local mode CLI ---
+
+def test_remote_cli_non_local_no_lifecycle_commands():
+    app = create_remote_controller_cli(
+        FooController,
+        url="http://localhost:8000",
+    )
+    result = runner.invoke(app, ["--help"])
+    assert result.exit_code == 0
+    help_text = result.stdout
+    assert "start-local-server" not in help_text
+    assert "stop-local-server" not in help_text
+
+def test_remote_cli_has_controller_methods():
+    app = create_remote_controller_cli(
+        FooController,
+        url="http://localhost:8000",
+    )
+    result = runner.invoke(app, ["--help"])
+    assert result.exit_code == 0
+    help_text = result.stdout
+    assert "bar" in help_text
+    assert "baz" in help_text
+    assert "qux" in help_text
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 9
+# --- No subcommand shows help ---
+
+def test_remote_cli_no_subcommand_shows_help():
+    app = create_remote_controller_cli(
+        FooController,
+        url="http://localhost:8000",
+    )
+    result = runner.invoke(app, [])
+    assert result.exit_code == 0
+    # Help text should be shown
+    assert "bar" in result.stdout or "Usage" in result.stdout
+
+# %% pts/tests/integration/test_remote_cli_units.pct.py 10
+# --- Sync remote controller, also inside a running event loop ---
+
+class EchoController(Controller):
+    @ctrl_query_method
+    def echo(self, text: str) -> str:
+        return text
+
+def test_cli_commands_block_inside_a_running_loop():
+    port = _find_free_port()
+    server = uvicorn.Server(uvicorn.Config(create_controller_server(EchoController()), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+
+    async def inside():
+        app = create_remote_controller_cli(EchoController, url=f"http://localhost:{port}")
+        return runner.invoke(app, ["echo", "hi"])
+    try:
+        result = asyncio.run(inside())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "hi"
@@ -0,0 +1,204 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_stream_inputs.pct.py
+
+__all__ = ['IngestController', 'Record', 'client', 'ctrl', 'module_ctrl', 'server_port', 'test_async_method_with_sync_iterable', 'test_cli_streamed_argument', 'test_invalid_item_is_rejected', 'test_invalid_streamed_arguments', 'test_remote_async_upload', 'test_remote_sync_upload', 'test_remote_upload_is_consumed_while_being_produced', 'test_server_feeds_async_method', 'test_server_feeds_sync_method', 'test_server_reads_items_split_across_chunks', 'test_spec_of_streamed_argument', 'test_streamed_input_and_output', 'test_streamed_input_methods_cannot_be_batched']
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 3
+import asyncio
+import threading
+import time
+import pytest
+import uvicorn
+from pydantic import BaseModel
+from typing import AsyncIterable, Iterable, Iterator, List
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.cli import create_controller_cli
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError
+from ctrlstack.protocol import BATCH_ROUTE, NDJSON_MEDIA_TYPE
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 4
+class Record(BaseModel):
+    id: int
+    name: str
+
+class IngestController(Controller):
+    def __init__(self):
+        self.received: List[Record] = []
+
+    @ctrl_cmd_method
+    def ingest(self, records: Iterable[Record], source: str = "default") -> str:
+        count = 0
+        for record in records:
+            self.received.append(record)
+            count += 1
+        return f"{source}:{count}"
+
+    @ctrl_cmd_method
+    async def aingest(self, records: AsyncIterable[Record]) -> int:
+        count = 0
+        async for record in records:
+            self.received.append(record)
+            count += 1
+        return count
+
+    @ctrl_cmd_method
+    async def ingest_all(self, values: Iterable[int]) -> int:
+        return sum(values)
+
+    @ctrl_cmd_method
+    def echo(self, values: Iterator[int]) -> Iterator[int]:
+        for value in values:
+            yield value * 2
+
+def _ndjson(records):
+    return "".join(record.model_dump_json() + "\n" for record in records).encode()
+
+def _records(n):
+    return [Record(id=i, name=f"r{i}") for i in range(n)]
+
+@pytest.fixture
+def ctrl():
+    return IngestController()
+
+@pytest.fixture
+def client(ctrl):
+    return TestClient(create_controller_server(ctrl, enable_batch=True))
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 5
+def test_spec_of_streamed_argument():
+    spec = get_method_spec(IngestController, "ingest")
+    assert spec.input_stream_param == "records"
+    assert spec.input_item_type is Record
+    assert spec.query_params == ["source"]
+    assert spec.body_params == []
+
+def test_invalid_streamed_arguments():
+    class OnQuery(Controller):
+        @ctrl_query_method
+        def q(self, values: Iterable[int]) -> int:
+            return 0
+
+    class WithOtherBody(Controller):
+        @ctrl_cmd_method
+        def c(self, values: Iterable[int], record: Record) -> int:
+            return 0
+
+    class SyncWithAsyncIterable(Controller):
+        @ctrl_cmd_method
+        def c(self, values: AsyncIterable[int]) -> int:
+            return 0
+
+    for cls, name in [(OnQuery, "q"), (WithOtherBody, "c"), (SyncWithAsyncIterable, "c")]:
+        with pytest.raises(ValueError):
+            get_method_spec(cls, name)
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 6
+def test_server_feeds_sync_method(ctrl, client):
+    content = (chunk for chunk in [_ndjson(_records(2)), _ndjson(_records(3)[2:])])
+    response = client.post("/cmd/ingest", params={"source": "s"}, content=content, headers={"Content-Type": NDJSON_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert response.json() == "s:3"
+    assert ctrl.received == _records(3)
+
+def test_server_feeds_async_method(ctrl, client):
+    response = client.post("/cmd/aingest", content=_ndjson(_records(4)))
+    assert response.json() == 4
+    assert ctrl.received == _records(4)
+
+def test_server_reads_items_split_across_chunks(ctrl, client):
+    data = _ndjson(_records(3))
+    response = client.post("/cmd/aingest", content=(data[i:i + 5] for i in range(0, len(data), 5)))
+    assert response.json() == 3
+    assert ctrl.received == _records(3)
+
+def test_async_method_with_sync_iterable(client):
+    assert client.post("/cmd/ingest_all", content=b"1\n2\n3").json() == 6
+
+def test_streamed_input_and_output(client):
+    assert client.post("/cmd/echo", content=b"1\n2\n").text.splitlines() == ['{"item":2}', '{"item":4}']
+
+def test_invalid_item_is_rejected(client):
+    response = client.post("/cmd/ingest", content=b'{"id": 1, "name": "a"}\n{"id": "x"}\n')
+    assert response.status_code == 422
+
+def test_streamed_input_methods_cannot_be_batched(client):
+    response = client.post(BATCH_ROUTE, json=[{"method": "ingest", "args": {}}])
+    assert response.json()[0]["error"]["status_code"] == 400
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 7
+@pytest.fixture(scope="module")
+def module_ctrl():
+    return IngestController()
+
+@pytest.fixture(scope="module")
+def server_port(module_ctrl):
+    port = _find_free_port()
+    config = uvicorn.Config(create_controller_server(module_ctrl), host="127.0.0.1", port=port, log_level="error")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield port
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_remote_sync_upload(server_port, module_ctrl):
+    module_ctrl.received.clear()
+    with create_remote_controller(IngestController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        assert remote.ingest(iter(_records(5)), source="remote") == "remote:5"
+        assert remote.ingest_all(range(10)) == 45
+        assert list(remote.echo([1, 2])) == [2, 4]
+    assert module_ctrl.received == _records(5)
+
+def test_remote_async_upload(server_port, module_ctrl):
+    module_ctrl.received.clear()
+
+    async def records():
+        for record in _records(3):
+            await asyncio.sleep(0)
+            yield record
+
+    async def run():
+        async with create_remote_controller(IngestController, url=f"http://localhost:{server_port}") as remote:
+            return await remote.aingest(records()), await remote.ingest(_records(2))
+
+    assert asyncio.run(run()) == (3, "default:2")
+    assert module_ctrl.received == _records(3) + _records(2)
+
+def test_remote_upload_is_consumed_while_being_produced(server_port, module_ctrl):
+    module_ctrl.received.clear()
+    seen_before_upload_finished = []
+
+    def records():
+        yield from _records(20_000)
+        # The server must have consumed some items before the client has produced all of them
+        deadline = time.monotonic() + 5
+        while not module_ctrl.received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        seen_before_upload_finished.append(len(module_ctrl.received))
+        yield Record(id=-1, name="last")
+
+    with create_remote_controller(IngestController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        assert remote.ingest(records()) == "default:20001"
+    assert 0 < seen_before_upload_finished[0] < 20_001
+
+# %% pts/tests/integration/test_stream_inputs.pct.py 8
+def test_cli_streamed_argument():
+    ctrl = IngestController()
+    app = create_controller_cli(ctrl)
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["ingest", '[{"id": 1, "name": "a"}]', "--source", "cli"])
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "cli:1"
+
+    result = runner.invoke(app, ["aingest", "-"], input=_ndjson(_records(2)).decode())
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "2"
+    assert ctrl.received == [Record(id=1, name="a")] + _records(2)
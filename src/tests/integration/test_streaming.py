@@ -0,0 +1,212 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_streaming.pct.py
+
+__all__ = ['Row', 'StreamController', 'client', 'controller', 'server_port', 'test_cli_of_remote_controller_prints_each_item', 'test_cli_prints_each_item', 'test_controller_app_keeps_generator_methods', 'test_remote_async_iterator', 'test_remote_errors', 'test_remote_items_arrive_incrementally', 'test_remote_sync_iterator', 'test_server_empty_stream', 'test_server_error_before_first_item_sets_status', 'test_server_error_midway_is_reported_in_stream', 'test_server_streams_async_generators', 'test_server_streams_commands_and_untyped_items', 'test_server_streams_ndjson', 'test_streaming_methods_cannot_be_batched']
+
+# %% pts/tests/integration/test_streaming.pct.py 3
+import asyncio
+import json
+import threading
+import time
+import pytest
+import uvicorn
+from pydantic import BaseModel
+from fastapi import HTTPException
+from typing import AsyncIterator, Iterator, Generator
+from typer.testing import CliRunner
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.controller_app import ControllerApp
+from ctrlstack.cli import create_controller_cli
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller, RemoteCallError
+from ctrlstack.protocol import BATCH_ROUTE, NDJSON_MEDIA_TYPE
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_streaming.pct.py 4
+class Row(BaseModel):
+    id: int
+    name: str
+
+class StreamController(Controller):
+    def __init__(self):
+        self.closed = threading.Event()
+
+    @ctrl_query_method
+    def rows(self, n: int) -> Iterator[Row]:
+        for i in range(n):
+            yield Row(id=i, name=f"row{i}")
+
+    @ctrl_query_method
+    async def arows(self, n: int) -> AsyncIterator[Row]:
+        for i in range(n):
+            await asyncio.sleep(0)
+            yield Row(id=i, name=f"row{i}")
+
+    @ctrl_cmd_method
+    def numbers(self, n: int) -> Generator[int, None, None]:
+        yield from range(n)
+
+    @ctrl_query_method
+    def untyped(self):
+        yield {"a": 1}
+        yield [1, 2]
+
+    @ctrl_query_method
+    def fail_up_front(self) -> Iterator[int]:
+        raise HTTPException(status_code=409, detail="not now")
+        yield
+
+    @ctrl_query_method
+    def fail_midway(self) -> Iterator[int]:
+        yield 1
+        raise HTTPException(status_code=409, detail="midway")
+
+    @ctrl_query_method
+    def crash_midway(self) -> Iterator[int]:
+        yield 1
+        raise RuntimeError("boom")
+
+    @ctrl_query_method
+    def endless(self) -> Iterator[int]:
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+                time.sleep(0.001)
+        finally:
+            self.closed.set()
+
+    @ctrl_query_method
+    def plain(self) -> int:
+        return 1
+
+@pytest.fixture
+def client():
+    return TestClient(create_controller_server(StreamController(), enable_batch=True))
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+# %% pts/tests/integration/test_streaming.pct.py 5
+def test_server_streams_ndjson(client):
+    response = client.get("/query/rows", params={"n": 3})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert _lines(response) == [{"item": {"id": i, "name": f"row{i}"}} for i in range(3)]
+
+def test_server_streams_async_generators(client):
+    response = client.get("/query/arows", params={"n": 3})
+    assert _lines(response) == [{"item": {"id": i, "name": f"row{i}"}} for i in range(3)]
+
+def test_server_streams_commands_and_untyped_items(client):
+    assert _lines(client.post("/cmd/numbers", params={"n": 2})) == [{"item": 0}, {"item": 1}]
+    assert _lines(client.get("/query/untyped")) == [{"item": {"a": 1}}, {"item": [1, 2]}]
+
+def test_server_empty_stream(client):
+    response = client.get("/query/rows", params={"n": 0})
+    assert response.status_code == 200
+    assert response.text == ""
+
+def test_server_error_before_first_item_sets_status(client):
+    response = client.get("/query/fail_up_front")
+    assert response.status_code == 409
+    assert response.json() == {"detail": "not now"}
+
+def test_server_error_midway_is_reported_in_stream(client):
+    assert _lines(client.get("/query/fail_midway")) == [
+        {"item": 1}, {"error": {"status_code": 409, "detail": "midway"}},
+    ]
+    assert _lines(client.get("/query/crash_midway")) == [
+        {"item": 1}, {"error": {"status_code": 500, "detail": "Internal Server Error"}},
+    ]
+
+def test_streaming_methods_cannot_be_batched(client):
+    response = client.post(BATCH_ROUTE, json=[{"method": "rows", "args": {"n": 1}}, {"method": "plain"}])
+    assert response.json()[0]["error"]["status_code"] == 400
+    assert response.json()[1] == {"result": 1}
+
+def test_controller_app_keeps_generator_methods():
+    capp = ControllerApp()
+
+    @capp.register_query()
+    def count(n: int) -> Iterator[int]:
+        yield from range(n)
+
+    client = TestClient(create_controller_server(capp.get_controller()))
+    assert _lines(client.get("/query/count", params={"n": 2})) == [{"item": 0}, {"item": 1}]
+
+# %% pts/tests/integration/test_streaming.pct.py 6
+@pytest.fixture(scope="module")
+def controller():
+    return StreamController()
+
+@pytest.fixture(scope="module")
+def server_port(controller):
+    port = _find_free_port()
+    config = uvicorn.Config(create_controller_server(controller), host="127.0.0.1", port=port, log_level="error")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield port
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_remote_async_iterator(server_port):
+    remote = create_remote_controller(StreamController, url=f"http://localhost:{server_port}")
+
+    async def collect():
+        async with remote:
+            return [row async for row in remote.rows(n=5)], [row async for row in remote.arows(3)]
+
+    rows, arows = asyncio.run(collect())
+    assert rows == [Row(id=i, name=f"row{i}") for i in range(5)]
+    assert arows == rows[:3]
+
+def test_remote_sync_iterator(server_port):
+    with create_remote_controller(StreamController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        assert list(remote.numbers(3)) == [0, 1, 2]
+        assert list(remote.untyped()) == [{"a": 1}, [1, 2]]
+        assert remote.plain() == 1
+
+def test_remote_errors(server_port):
+    with create_remote_controller(StreamController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        with pytest.raises(RemoteCallError) as exc_info:
+            list(remote.fail_up_front())
+        assert exc_info.value.status_code == 409
+
+        items = []
+        with pytest.raises(RemoteCallError) as exc_info:
+            for item in remote.fail_midway():
+                items.append(item)
+        assert items == [1]
+        assert exc_info.value.detail == "midway"
+
+def test_remote_items_arrive_incrementally(server_port, controller):
+    controller.closed.clear()
+    with create_remote_controller(StreamController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        stream = remote.endless()
+        assert [next(stream) for _ in range(3)] == [0, 1, 2]
+        stream.close()  # Closes the response, which stops the generator on the server
+    assert controller.closed.wait(timeout=5)
+
+# %% pts/tests/integration/test_streaming.pct.py 7
+def test_cli_prints_each_item():
+    runner = CliRunner()
+    app = create_controller_cli(StreamController())
+    result = runner.invoke(app, ["numbers", "3"])
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == ["0", "1", "2"]
+
+    result = runner.invoke(app, ["arows", "2"])
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == [str(Row(id=i, name=f"row{i}")) for i in range(2)]
+
+def test_cli_of_remote_controller_prints_each_item(server_port):
+    with create_remote_controller(StreamController, url=f"http://localhost:{server_port}", mode="sync") as remote:
+        result = CliRunner().invoke(create_controller_cli(remote), ["numbers", "3"])
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == ["0", "1", "2"]
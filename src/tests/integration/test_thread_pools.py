@@ -0,0 +1,125 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_thread_pools.pct.py
+
+__all__ = ['PooledController', 'test_cancelled_queued_call', 'test_method_pools_override_decorator', 'test_methods_run_on_their_pools', 'test_pools_are_restarted_after_shutdown', 'test_saturated_pool_does_not_hold_up_other_groups', 'test_thread_pool_option']
+
+# %% pts/tests/integration/test_thread_pools.pct.py 3
+import asyncio
+import json
+import threading
+import time
+import httpx
+import pytest
+from typing import Iterable, Iterator
+from ctrlstack import Controller, ctrl_cmd_method, ctrl_query_method
+from ctrlstack.method_spec import get_method_spec
+from ctrlstack.protocol import STATS_ROUTE
+from ctrlstack.server import create_controller_server
+from ctrlstack.thread_pools import ThreadPool
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_thread_pools.pct.py 4
+class PooledController(Controller):
+    @ctrl_cmd_method
+    def slow(self, seconds: float = 0.2) -> str:
+        time.sleep(seconds)
+        return threading.current_thread().name
+
+    @ctrl_query_method
+    def cheap(self) -> str:
+        return threading.current_thread().name
+
+    @ctrl_query_method(thread_pool="reports")
+    def report(self) -> str:
+        return threading.current_thread().name
+
+    @ctrl_query_method(thread_pool="reports")
+    def rows(self, n: int) -> Iterator[str]:
+        for _ in range(n):
+            yield threading.current_thread().name
+
+    @ctrl_cmd_method
+    def ingest(self, values: Iterable[int]) -> str:
+        return f"{sum(values)}:{threading.current_thread().name}"
+
+def _create_server(**kwargs):
+    return create_controller_server(PooledController(), thread_pools={"io": 2, "reports": 1}, group_thread_pools={"cmd": "io"}, **kwargs)
+
+# %% pts/tests/integration/test_thread_pools.pct.py 5
+def test_thread_pool_option():
+    assert get_method_spec(PooledController, "report").thread_pool == "reports"
+    assert get_method_spec(PooledController, "cheap").thread_pool is None
+
+    with pytest.raises(ValueError, match="is async"):
+        class AsyncPooled(Controller):
+            @ctrl_query_method(thread_pool="reports")
+            async def q(self) -> int:
+                return 1
+    with pytest.raises(ValueError):
+        create_controller_server(PooledController(), method_thread_pools={"missing": "io"})
+
+    class AsyncQuery(Controller):
+        @ctrl_query_method
+        async def q(self) -> int:
+            return 1
+    with pytest.raises(ValueError, match="is async"):
+        create_controller_server(AsyncQuery(), method_thread_pools={"q": "io"})
+
+def test_methods_run_on_their_pools():
+    with TestClient(_create_server()) as client:
+        assert client.post("/cmd/slow", params={"seconds": 0}).json().startswith("ctrlstack-io")
+        assert client.get("/query/report").json().startswith("ctrlstack-reports")
+        assert not client.get("/query/cheap").json().startswith("ctrlstack-")
+        lines = client.get("/query/rows", params={"n": 3}).text.splitlines()
+        assert len(lines) == 3 and all(json.loads(line)["item"].startswith("ctrlstack-reports") for line in lines)
+        ingested = client.post("/cmd/ingest", content=b"1\n2\n3\n").json()
+        assert ingested.startswith("6:ctrlstack-io")
+
+def test_method_pools_override_decorator():
+    app = _create_server(method_thread_pools={"report": "io", "cheap": "reports"})
+    with TestClient(app) as client:
+        assert client.get("/query/report").json().startswith("ctrlstack-io")
+        assert client.get("/query/cheap").json().startswith("ctrlstack-reports")
+
+def test_saturated_pool_does_not_hold_up_other_groups():
+    app = _create_server(enable_stats=True)
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            slow = [asyncio.ensure_future(client.post("/cmd/slow")) for _ in range(6)]
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            await client.get("/query/cheap")
+            elapsed = time.monotonic() - start
+            await asyncio.gather(*slow)
+            return elapsed, (await client.get(STATS_ROUTE)).json()["thread_pools"]["io"]
+    elapsed, stats = asyncio.run(run())
+    assert elapsed < 0.15
+    assert stats["max_workers"] == 2
+    assert (stats["submitted"], stats["completed"], stats["busy"], stats["queued"]) == (6, 6, 0, 0)
+    assert stats["max_queue_wait"] >= 0.3  # The last two calls waited for two rounds of 0.2s
+    assert stats["mean_run_time"] >= 0.2
+
+def test_cancelled_queued_call():
+    pool = ThreadPool("cancel", max_workers=1)
+    async def run():
+        running = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        queued = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.02)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        cancelled_info = pool.info()
+        await running
+        return cancelled_info
+    info = asyncio.run(run())
+    assert (info.busy, info.queued, info.cancelled) == (1, 0, 1)
+    info = pool.info()
+    assert (info.submitted, info.completed, info.cancelled, info.busy, info.queued) == (2, 1, 1, 0, 0)
+    assert info.mean_queue_wait < 0.05  # Only the call that started is averaged
+    pool.shutdown(wait=True)
+
+def test_pools_are_restarted_after_shutdown():
+    app = _create_server()
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.get("/query/report").json().startswith("ctrlstack-reports")
+        assert app.state.thread_pools.get_pool("reports")._executor is None
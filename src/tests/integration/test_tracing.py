@@ -0,0 +1,153 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_tracing.pct.py
+
+__all__ = ['TracedController', 'method_tracer', 'test_async_client_and_streams', 'test_cache_hits_have_no_exec_span', 'test_client_and_server_spans_share_a_trace', 'test_export_formats', 'test_invalid_traceparent_starts_a_new_trace', 'test_queue_span_measures_thread_pool_wait', 'test_without_client_tracer_the_server_starts_the_trace', 'traced_server']
+
+# %% pts/tests/integration/test_tracing.pct.py 3
+import asyncio
+import json
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from typing import Iterator
+from ctrlstack import Controller, ctrl_query_method
+from ctrlstack.server import create_controller_server, _find_free_port
+from ctrlstack.remote_controller import create_remote_controller
+from ctrlstack.protocol import TRACEPARENT_HEADER
+from ctrlstack.tracing import SpanKind, TraceFormat, Tracer
+from fastapi.testclient import TestClient
+
+# %% pts/tests/integration/test_tracing.pct.py 4
+method_tracer = Tracer()  # Used by the controller for its own spans
+
+class TracedController(Controller):
+    @ctrl_query_method
+    def work(self, seconds: float) -> float:
+        with method_tracer.span("inner"):
+            time.sleep(seconds)
+        return seconds
+
+    @ctrl_query_method
+    async def awork(self, seconds: float) -> float:
+        await asyncio.sleep(seconds)
+        return seconds
+
+    @ctrl_query_method(cache_ttl=60)
+    def cached(self, x: int) -> int:
+        return x
+
+    @ctrl_query_method
+    def numbers(self, n: int) -> Iterator[int]:
+        yield from range(n)
+
+def _children(tracer, span):
+    return {s.name: s for s in tracer.spans(span.trace_id) if s.parent_id == span.span_id}
+
+def _server_span(tracer, path):
+    return next(s for s in tracer.spans() if s.kind == SpanKind.SERVER and s.name == f"GET {path}")
+
+# %% pts/tests/integration/test_tracing.pct.py 5
+@pytest.fixture(scope="module")
+def traced_server():
+    port = _find_free_port()
+    tracer = Tracer()
+    app = create_controller_server(TracedController(), tracer=tracer)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+    yield f"http://localhost:{port}", tracer
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def test_client_and_server_spans_share_a_trace(traced_server):
+    url, server_tracer = traced_server
+    client_tracer = Tracer()
+    with create_remote_controller(TracedController, url=url, mode="sync", tracer=client_tracer) as remote:
+        assert remote.work(0.05) == 0.05
+
+    [client_span] = client_tracer.spans()
+    assert (client_span.name, client_span.kind, client_span.parent_id) == ("work", SpanKind.CLIENT, None)
+    [server_span] = [s for s in server_tracer.spans(client_span.trace_id) if s.kind == SpanKind.SERVER]
+    assert server_span.parent_id == client_span.span_id
+    assert server_span.attributes["http.status_code"] == 200
+    assert client_span.start_ns <= server_span.start_ns <= server_span.end_ns <= client_span.end_ns
+
+    phases = _children(server_tracer, server_span)
+    assert list(phases) == ["decode", "queue", "exec", "encode"]
+    assert phases["decode"].end_ns == phases["queue"].start_ns and phases["queue"].end_ns == phases["exec"].start_ns
+    assert phases["exec"].duration >= 0.04
+    assert server_span.start_ns <= phases["decode"].start_ns and phases["encode"].end_ns == server_span.end_ns
+
+    # Spans of the method are children of the server span
+    [inner] = method_tracer.spans(client_span.trace_id)
+    assert inner.parent_id == server_span.span_id
+
+def test_without_client_tracer_the_server_starts_the_trace(traced_server):
+    url, server_tracer = traced_server
+    with create_remote_controller(TracedController, url=url, mode="sync") as remote:
+        remote.awork(0.01)
+    server_span = _server_span(server_tracer, "/query/awork")
+    assert server_span.parent_id is None
+    assert _children(server_tracer, server_span)["exec"].duration >= 0.005  # Wall clock, vs the monotonic clock of sleep
+
+def test_async_client_and_streams(traced_server):
+    url, server_tracer = traced_server
+    client_tracer = Tracer()
+    async def run():
+        async with create_remote_controller(TracedController, url=url, tracer=client_tracer) as remote:
+            with client_tracer.span("parent") as parent:
+                items = [i async for i in remote.numbers(3)]
+            return parent, items
+    parent, items = asyncio.run(run())
+    assert items == [0, 1, 2]
+    [call] = [s for s in client_tracer.spans() if s.name == "numbers"]
+    assert call.parent_id == parent.span_id
+    server_span = next(s for s in server_tracer.spans(parent.trace_id) if s.kind == SpanKind.SERVER)
+    assert list(_children(server_tracer, server_span)) == ["decode", "handle", "stream"]
+
+def test_cache_hits_have_no_exec_span():
+    tracer = Tracer()
+    client = TestClient(create_controller_server(TracedController(), tracer=tracer))
+    for _ in range(2):
+        client.get("/query/cached", params={"x": 1})
+    first, second = [s for s in tracer.spans() if s.kind == SpanKind.SERVER]
+    assert "exec" in _children(tracer, first)
+    assert list(_children(tracer, second)) == ["decode", "handle", "encode"]
+
+def test_queue_span_measures_thread_pool_wait():
+    tracer = Tracer()
+    app = create_controller_server(TracedController(), tracer=tracer, thread_pools={"one": 1}, method_thread_pools={"work": "one"})
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await asyncio.gather(*[client.get("/query/work", params={"seconds": 0.1}) for _ in range(2)])
+    asyncio.run(run())
+    queues = sorted(_children(tracer, s)["queue"].duration for s in tracer.spans() if s.kind == SpanKind.SERVER)
+    assert queues[0] < 0.05 and queues[1] >= 0.08
+
+def test_invalid_traceparent_starts_a_new_trace():
+    tracer = Tracer()
+    client = TestClient(create_controller_server(TracedController(), tracer=tracer))
+    client.get("/query/cached", params={"x": 1}, headers={TRACEPARENT_HEADER: "not-a-traceparent"})
+    assert _server_span(tracer, "/query/cached").parent_id is None
+
+def test_export_formats(tmp_path):
+    tracer = Tracer(service_name="svc", path=str(tmp_path / "trace.json"))
+    with TestClient(create_controller_server(TracedController(), tracer=tracer)) as client:
+        client.get("/query/awork", params={"seconds": 0})
+    chrome = json.loads((tmp_path / "trace.json").read_text())  # Written on shutdown
+    events = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in events] == ["GET /query/awork", "decode", "queue", "exec", "encode"]
+    assert len({e["tid"] for e in events}) == 1 and all(e["dur"] >= 0 for e in events)
+
+    tracer.export(str(tmp_path / "otlp.json"), TraceFormat.OTLP)
+    resource_spans = json.loads((tmp_path / "otlp.json").read_text())["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"][0]["value"] == {"stringValue": "svc"}
+    spans = resource_spans["scopeSpans"][0]["spans"]
+    server = next(s for s in spans if s["kind"] == 2)
+    assert all(s["parentSpanId"] == server["spanId"] for s in spans if s is not server)
+    assert all(len(s["traceId"]) == 32 and len(s["spanId"]) == 16 for s in spans)
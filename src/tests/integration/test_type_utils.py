@@ -0,0 +1,224 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: pts/tests/integration/test_type_utils.pct.py
+
+__all__ = ['Inner', 'Outer', 'Priority', 'test_deserialize_basemodel', 'test_deserialize_dict', 'test_deserialize_enum', 'test_deserialize_list_of_models', 'test_deserialize_nested_model', 'test_deserialize_primitive', 'test_get_type_adapter_cached', 'test_is_query_param_type_basemodel', 'test_is_query_param_type_bool', 'test_is_query_param_type_dict', 'test_is_query_param_type_dict_generic', 'test_is_query_param_type_enum', 'test_is_query_param_type_float', 'test_is_query_param_type_int', 'test_is_query_param_type_list_int', 'test_is_query_param_type_list_model', 'test_is_query_param_type_none', 'test_is_query_param_type_optional_bool', 'test_is_query_param_type_optional_enum', 'test_is_query_param_type_optional_float', 'test_is_query_param_type_optional_int', 'test_is_query_param_type_optional_list', 'test_is_query_param_type_optional_model', 'test_is_query_param_type_str', 'test_is_query_param_type_union', 'test_roundtrip_enum', 'test_roundtrip_list_of_models', 'test_roundtrip_model', 'test_serialize_basemodel', 'test_serialize_dict', 'test_serialize_enum', 'test_serialize_for_query_param_bool', 'test_serialize_for_query_param_enum', 'test_serialize_for_query_param_int', 'test_serialize_for_query_param_str', 'test_serialize_list_of_models', 'test_serialize_nested_model', 'test_serialize_primitive', 'test_serialize_value_uses_cache', 'test_type_adapter_cache_clear', 'test_type_adapter_cache_lru_eviction', 'test_type_adapter_cache_thread_safe', 'test_type_adapter_cache_unhashable_type']
+
+# %% pts/tests/integration/test_type_utils.pct.py 3
+import pytest
+from enum import Enum
+from typing import Optional, List, Dict, Union
+from pydantic import BaseModel
+from ctrlstack.type_utils import is_query_param_type, serialize_value, deserialize_value, serialize_for_query_param
+from ctrlstack.type_utils import get_type_adapter, type_adapter_cache_info, type_adapter_cache_clear, _TypeAdapterCache
+
+# %% pts/tests/integration/test_type_utils.pct.py 4
+class Priority(Enum):
+    LOW = "low"
+    HIGH = "high"
+
+class Inner(BaseModel):
+    x: int
+
+class Outer(BaseModel):
+    name: str
+    inner: Inner
+
+# %% pts/tests/integration/test_type_utils.pct.py 5
+# --- is_query_param_type tests ---
+
+def test_is_query_param_type_int():
+    assert is_query_param_type(int) is True
+
+def test_is_query_param_type_float():
+    assert is_query_param_type(float) is True
+
+def test_is_query_param_type_str():
+    assert is_query_param_type(str) is True
+
+def test_is_query_param_type_bool():
+    assert is_query_param_type(bool) is True
+
+def test_is_query_param_type_enum():
+    assert is_query_param_type(Priority) is True
+
+def test_is_query_param_type_optional_int():
+    assert is_query_param_type(Optional[int]) is True
+
+def test_is_query_param_type_optional_enum():
+    assert is_query_param_type(Optional[Priority]) is True
+
+def test_is_query_param_type_basemodel():
+    assert is_query_param_type(Inner) is False
+
+def test_is_query_param_type_dict():
+    assert is_query_param_type(dict) is False
+
+def test_is_query_param_type_dict_generic():
+    assert is_query_param_type(Dict[str, int]) is False
+
+def test_is_query_param_type_list_int():
+    assert is_query_param_type(List[int]) is False
+
+def test_is_query_param_type_list_model():
+    assert is_query_param_type(List[Inner]) is False
+
+def test_is_query_param_type_none():
+    assert is_query_param_type(None) is False
+
+def test_is_query_param_type_union():
+    assert is_query_param_type(Union[int, str]) is False
+
+# %% pts/tests/integration/test_type_utils.pct.py 6
+# --- serialize_value tests ---
+
+def test_serialize_basemodel():
+    m = Inner(x=42)
+    assert serialize_value(m, Inner) == {'x': 42}
+
+def test_serialize_nested_model():
+    m = Outer(name="test", inner=Inner(x=1))
+    assert serialize_value(m, Outer) == {'name': 'test', 'inner': {'x': 1}}
+
+def test_serialize_list_of_models():
+    models = [Inner(x=1), Inner(x=2)]
+    assert serialize_value(models, List[Inner]) == [{'x': 1}, {'x': 2}]
+
+def test_serialize_dict():
+    d = {"a": 1, "b": 2}
+    assert serialize_value(d, Dict[str, int]) == {"a": 1, "b": 2}
+
+def test_serialize_enum():
+    assert serialize_value(Priority.HIGH, Priority) == "high"
+
+def test_serialize_primitive():
+    assert serialize_value(42, int) == 42
+    assert serialize_value("hello", str) == "hello"
+
+# %% pts/tests/integration/test_type_utils.pct.py 7
+# --- deserialize_value tests ---
+
+def test_deserialize_basemodel():
+    result = deserialize_value({'x': 42}, Inner)
+    assert isinstance(result, Inner)
+    assert result.x == 42
+
+def test_deserialize_nested_model():
+    result = deserialize_value({'name': 'test', 'inner': {'x': 1}}, Outer)
+    assert isinstance(result, Outer)
+    assert isinstance(result.inner, Inner)
+
+def test_deserialize_list_of_models():
+    result = deserialize_value([{'x': 1}, {'x': 2}], List[Inner])
+    assert len(result) == 2
+    assert all(isinstance(m, Inner) for m in result)
+
+def test_deserialize_dict():
+    result = deserialize_value({"a": 1, "b": 2}, Dict[str, int])
+    assert result == {"a": 1, "b": 2}
+
+def test_deserialize_enum():
+    result = deserialize_value("high", Priority)
+    assert result == Priority.HIGH
+
+def test_deserialize_primitive():
+    assert deserialize_value(42, int) == 42
+
+# %% pts/tests/integration/test_type_utils.pct.py 8
+# --- Round-trip tests ---
+
+def test_roundtrip_model():
+    m = Outer(name="rt", inner=Inner(x=99))
+    assert deserialize_value(serialize_value(m, Outer), Outer) == m
+
+def test_roundtrip_list_of_models():
+    models = [Inner(x=1), Inner(x=2)]
+    result = deserialize_value(serialize_value(models, List[Inner]), List[Inner])
+    assert result == models
+
+def test_roundtrip_enum():
+    assert deserialize_value(serialize_value(Priority.LOW, Priority), Priority) == Priority.LOW
+
+# %% pts/tests/integration/test_type_utils.pct.py 9
+# --- serialize_for_query_param tests ---
+
+def test_serialize_for_query_param_enum():
+    assert serialize_for_query_param(Priority.HIGH) == "high"
+    assert serialize_for_query_param(Priority.LOW) == "low"
+
+def test_serialize_for_query_param_int():
+    assert serialize_for_query_param(42) == 42
+
+def test_serialize_for_query_param_str():
+    assert serialize_for_query_param("hello") == "hello"
+
+def test_serialize_for_query_param_bool():
+    assert serialize_for_query_param(True) is True
+
+# %% pts/tests/integration/test_type_utils.pct.py 10
+# --- Additional is_query_param_type edge cases ---
+
+def test_is_query_param_type_optional_float():
+    assert is_query_param_type(Optional[float]) is True
+
+def test_is_query_param_type_optional_bool():
+    assert is_query_param_type(Optional[bool]) is True
+
+def test_is_query_param_type_optional_model():
+    assert is_query_param_type(Optional[Inner]) is False
+
+def test_is_query_param_type_optional_list():
+    assert is_query_param_type(Optional[List[int]]) is False
+
+# %% pts/tests/integration/test_type_utils.pct.py 11
+# --- TypeAdapter cache ---
+
+def test_get_type_adapter_cached():
+    assert get_type_adapter(List[Inner]) is get_type_adapter(List[Inner])
+
+def test_serialize_value_uses_cache():
+    type_adapter_cache_clear()
+    serialize_value(Inner(x=1), Inner)
+    serialize_value(Inner(x=2), Inner)
+    deserialize_value({'x': 3}, Inner)
+    info = type_adapter_cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+    assert info.hit_rate == pytest.approx(2 / 3)
+    assert info.build_time > 0
+
+def test_type_adapter_cache_unhashable_type():
+    from typing import Annotated
+    hint = Annotated[int, {'unhashable': True}]
+    assert get_type_adapter(hint) is get_type_adapter(hint)
+    assert serialize_value(5, hint) == 5
+
+def test_type_adapter_cache_lru_eviction():
+    cache = _TypeAdapterCache(maxsize=2)
+    a = cache.get(int)
+    cache.get(str)
+    cache.get(int)  # int is now the most recently used
+    cache.get(float)  # evicts str
+    info = cache.info()
+    assert info.evictions == 1
+    assert info.currsize == 2
+    assert cache.get(int) is a
+    assert cache.info().misses == 3
+
+def test_type_adapter_cache_clear():
+    get_type_adapter(Outer)
+    type_adapter_cache_clear()
+    info = type_adapter_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+
+def test_type_adapter_cache_thread_safe():
+    import threading
+    cache = _TypeAdapterCache()
+    results = []
+    def worker():
+        for _ in range(50):
+            results.append(cache.get(Dict[str, List[Inner]]))
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len({id(r) for r in results}) == 1
+    info = cache.info()
+    assert info.hits + info.misses == 400